@@ -1,24 +1,53 @@
 #include <iostream>
 #include <fstream>
 #include <sstream>
+#include <iomanip>
 #include <cstdlib>
 #include <cstring>
+#include <vector>
+#include <string>
+#include <thread>
+#include <atomic>
+#include <set>
+#include <memory>
+#include <climits>
+
+#ifndef _WIN32
+#include <stdlib.h>
+#endif
 
 #include "qisa_driver.h"
 
 std::string usage(const std::string& progName)
 {
   std::stringstream ss;
-  ss << "Usage: " << progName << " [OPTIONS] INPUT_FILE" << std::endl;
+  ss << "Usage: " << progName << " [OPTIONS] INPUT_FILE..." << std::endl;
   ss << "Assembler/Disassembler for the Quantum Instuction Set Architecture (QISA)." << std::endl;
   ss << std::endl;
   ss << "Options:" << std::endl;
   ss << "  -q QMAP_FILE      Load quantum instructions from given QMAP_FILE." << std::endl;
+  ss << "  -l LAYOUT_FILE    Load quantum layout information from given LAYOUT_FILE." << std::endl;
   ss << "  --dumpspecs       Output the instruction specifications that have been configured into the assembler" << std::endl;
   ss << "  -d[ 1 | 2 ]       Disassemble the given INPUT_FILE" << std::endl;
   ss << "                    Extra integer option suffix specifies the disassembly output format, default = 1" << std::endl;
+  ss << "  -f[ 1 | 2 | 3 ]   Extra integer option suffix specifies the assembly output format, default = 1" << std::endl;
+  ss << "                    1: raw binary, 2: hexadecimal memory initialization file, 3: image with header" << std::endl;
+  ss << "  --stream          Disassemble without holding the whole disassembly in memory" << std::endl;
   ss << "  -o OUTPUT_FILE    Save binary assembled or textual disassembled instructions to the given OUTPUT_FILE" << std::endl;
+  ss << "                    Only allowed if a single INPUT_FILE is given" << std::endl;
+  ss << "  --outdir DIR      Save the output for each INPUT_FILE in directory DIR (see below)" << std::endl;
+  ss << "  -j N              Process multiple input files using N threads, default = 1" << std::endl;
+  ss << "  --cache DIR       Cache assembled programs in directory DIR, and reuse them when possible" << std::endl;
+  ss << "  --cache-size MB   Maximum size of the cache in MiB, default = 256" << std::endl;
+  ss << "  -O OPTIMIZATIONS  Apply the given comma separated optimizations to the assembled program:" << std::endl;
+  ss << "                    masks: remove SMIS/SMIT instructions that set a mask a register already holds" << std::endl;
+  ss << "                    mask-reuse: use a register that already holds a mask instead of setting another" << std::endl;
+  ss << "                    bundles: pack the quantum operations of each timing point into as few bundles as possible" << std::endl;
+  ss << "                    waits: merge adjacent QWAITs, and fold a QWAIT into the bundle separator of the next bundle" << std::endl;
+  ss << "                    all: all of the above" << std::endl;
   ss << "  -t                Enable scanner and parser tracing while assembling" << std::endl;
+  ss << "  --stats           Show timing and size statistics of each input file on stderr" << std::endl;
+  ss << "  --timing          Show the control flow and timing analysis of each input file on stderr" << std::endl;
   ss << "  -V, --version     Show the program version and exit" << std::endl;
   ss << "  -v, --verbose     Show informational messages while assembling" << std::endl;
   ss << "  -h, --help        Show this help message and exit" << std::endl;
@@ -28,10 +57,449 @@ std::string usage(const std::string& progName)
   ss << "  the file specified in the environment variable QISA_AS_QMAP_FILE." << std::endl;
   ss << "  If -q is not given and QISA_AS_QMAP_FILE is not defined, the factory default quantum instruction" << std::endl;
   ss << "  set will be used instead." << std::endl;
+  ss << std::endl;
+  ss << "  An INPUT_FILE of the form @RESPONSE_FILE specifies a file that contains more input" << std::endl;
+  ss << "  files, one per line. Empty lines and lines starting with '#' are ignored." << std::endl;
+  ss << "  If more than one input file is given, or --outdir is given, the output for each input file" << std::endl;
+  ss << "  is saved to a file with the same base name, in directory DIR if --outdir is given, or next" << std::endl;
+  ss << "  to the input file otherwise. Its extension is '.dis' for disassembly, and '.bin', '.hex' or '.img'" << std::endl;
+  ss << "  for assembly in format 1, 2 or 3 respectively." << std::endl;
+  ss << "  The status of each input file is reported. The exit status is non-zero if any of them failed." << std::endl;
+
+  return ss.str();
+}
+
+/**
+ * Read the input filenames from the given response file.
+ *
+ * @param[in]  responseFilename File that contains input filenames, one per line.
+ * @param[out] inputFilenames   Vector to which the input filenames are appended.
+ *
+ * @return True on success, false if the response file could not be read.
+ */
+bool readResponseFile(const std::string& responseFilename,
+                      std::vector<std::string>& inputFilenames)
+{
+  std::ifstream responseFile(responseFilename);
+  if (!responseFile.is_open())
+  {
+    return false;
+  }
+
+  std::string line;
+  while (std::getline(responseFile, line))
+  {
+    // Strip surrounding whitespace, including carriage returns.
+    size_t first = line.find_first_not_of(" \t\r");
+    if (first == std::string::npos)
+    {
+      continue;
+    }
+    size_t last = line.find_last_not_of(" \t\r");
+    line = line.substr(first, last - first + 1);
+
+    if (line[0] == '#')
+    {
+      continue;
+    }
+
+    inputFilenames.push_back(line);
+  }
+
+  return true;
+}
+
+/**
+ * Determine the name of the output file for the given input file, when
+ * multiple input files are processed.
+ *
+ * @param[in] inputFilename Name of the input file.
+ * @param[in] outputDir     Directory in which to save the output file.
+ *                          If empty, the directory of the input file is used.
+ * @param[in] extension     Extension of the output file.
+ * @param[in] pathSep       Path separator.
+ *
+ * @return The name of the output file.
+ */
+std::string getOutputFilename(const std::string& inputFilename,
+                              const std::string& outputDir,
+                              const std::string& extension,
+                              char pathSep)
+{
+  size_t baseNamePos = inputFilename.find_last_of("/\\");
+  baseNamePos = (baseNamePos == std::string::npos) ? 0 : baseNamePos + 1;
+
+  std::string dirName = inputFilename.substr(0, baseNamePos);
+  std::string baseName = inputFilename.substr(baseNamePos);
+
+  // Strip the extension, if any.
+  size_t extPos = baseName.find_last_of('.');
+  if ((extPos != std::string::npos) && (extPos != 0))
+  {
+    baseName = baseName.substr(0, extPos);
+  }
+
+  if (outputDir.empty())
+  {
+    return dirName + baseName + extension;
+  }
+
+  std::string outputFilename = outputDir;
+  if ((outputFilename.back() != '/') && (outputFilename.back() != pathSep))
+  {
+    outputFilename += pathSep;
+  }
+
+  return outputFilename + baseName + extension;
+}
+
+/**
+ * Determine the canonical name of the given file, so that different names of
+ * the same file (e.g. 'a.bin' and './a.bin') can be recognized.
+ * The file does not have to exist, as long as its directory does.
+ *
+ * @param[in] filename Name of the file.
+ *
+ * @return The canonical name of the file, or the given name if it cannot be
+ *         determined.
+ */
+std::string getCanonicalFilename(const std::string& filename)
+{
+#ifdef _WIN32
+  char canonicalName[_MAX_PATH];
+  if (_fullpath(canonicalName, filename.c_str(), _MAX_PATH) != nullptr)
+  {
+    return canonicalName;
+  }
+#else
+  char canonicalName[PATH_MAX];
+  if (realpath(filename.c_str(), canonicalName) != nullptr)
+  {
+    return canonicalName;
+  }
+
+  // The file does not exist (yet): use the canonical name of its directory.
+  size_t baseNamePos = filename.find_last_of('/');
+  const std::string dirName = (baseNamePos == std::string::npos) ? "." : filename.substr(0, baseNamePos + 1);
+  const std::string baseName = (baseNamePos == std::string::npos) ? filename : filename.substr(baseNamePos + 1);
+
+  if (!baseName.empty() && (baseName != ".") && (baseName != "..") &&
+      (realpath(dirName.c_str(), canonicalName) != nullptr))
+  {
+    return std::string(canonicalName) + "/" + baseName;
+  }
+#endif
+
+  return filename;
+}
+
+/**
+ * Determine the optimizations that have been specified on the command line.
+ *
+ * @param[in]  names         Comma separated names of the optimizations.
+ * @param[out] optimizations Receives the optimizations, or'ed together.
+ *
+ * @return True on success, false if a name is not known.
+ */
+bool parseOptimizations(const std::string& names,
+                        unsigned int& optimizations)
+{
+  static const std::pair<const char*, unsigned int> knownOptimizations[] =
+  {
+    { "masks",      QISA::QISA_Driver::OPTIMIZE_REDUNDANT_MASKS },
+    { "mask-reuse", QISA::QISA_Driver::OPTIMIZE_MASK_REGISTER_REUSE },
+    { "bundles",    QISA::QISA_Driver::OPTIMIZE_BUNDLE_PACKING },
+    { "waits",      QISA::QISA_Driver::OPTIMIZE_WAITS },
+    { "all",        QISA::QISA_Driver::OPTIMIZE_REDUNDANT_MASKS |
+                    QISA::QISA_Driver::OPTIMIZE_MASK_REGISTER_REUSE |
+                    QISA::QISA_Driver::OPTIMIZE_BUNDLE_PACKING |
+                    QISA::QISA_Driver::OPTIMIZE_WAITS }
+  };
+
+  optimizations = QISA::QISA_Driver::OPTIMIZE_NONE;
+
+  std::istringstream ss(names);
+  std::string name;
+  while (std::getline(ss, name, ','))
+  {
+    bool isKnown = false;
+
+    for (const auto& known : knownOptimizations)
+    {
+      if (name == known.first)
+      {
+        optimizations |= known.second;
+        isKnown = true;
+      }
+    }
+
+    if (!isKnown)
+    {
+      return false;
+    }
+  }
+
+  return true;
+}
+
+/**
+ * Print the statistics of an assembly or disassembly to stderr, so that they
+ * are not mixed with the generated output.
+ *
+ * @param[in] inputFilename Name of the input file that the statistics belong to.
+ * @param[in] stats         The statistics to print.
+ */
+void printStatistics(const std::string& inputFilename,
+                     const QISA::QISA_Driver::Statistics& stats)
+{
+  std::ostringstream ss;
+  ss << std::fixed << std::setprecision(6);
+
+  ss << "Statistics for '" << inputFilename << "':" << std::endl;
+  ss << "  total time:          " << stats.totalSeconds << " s" << std::endl;
+  ss << "  cache lookup:        " << stats.cacheLookupSeconds << " s"
+     << (stats.cacheHit ? " (hit)" : "") << std::endl;
+  ss << "  parsing:             " << stats.parseSeconds << " s" << std::endl;
+  ss << "    mask validation:   " << stats.maskValidationSeconds << " s" << std::endl;
+  ss << "  deferred labels:     " << stats.deferredInstructionsSeconds << " s" << std::endl;
+  ss << "  optimization:        " << stats.optimizationSeconds << " s" << std::endl;
+  ss << "  disassembly labels:  " << stats.disassemblyLabelsSeconds << " s" << std::endl;
+  ss << "  save:                " << stats.saveSeconds << " s" << std::endl;
+  ss << "  tokens:              " << stats.nrOfTokens << std::endl;
+  ss << "  instructions:        " << stats.nrOfInstructions << std::endl;
+  ss << "  bundles:             " << stats.nrOfBundles << std::endl;
+  ss << "  labels:              " << stats.nrOfLabels << std::endl;
+  ss << "  deferred label uses: " << stats.nrOfDeferredLabels << std::endl;
+  ss << "  optimized away:      " << stats.nrOfInstructionsRemoved << std::endl;
+  ss << "    redundant masks:   " << stats.nrOfRedundantMaskWrites << std::endl;
+  ss << "    packed bundles:    " << stats.nrOfPackedBundleInstructions << std::endl;
+  ss << "    coalesced waits:   " << stats.nrOfCoalescedWaits << std::endl;
+  ss << "  reused mask regs:    " << stats.nrOfReusedMaskRegisters << std::endl;
+  ss << "  bytes read:          " << stats.bytesRead << std::endl;
+  ss << "  bytes written:       " << stats.bytesWritten << std::endl;
+
+  std::cerr << ss.str();
+}
+
+/**
+ * Format the control flow and timing analysis of the last program assembled
+ * or disassembled by the given driver.
+ *
+ * @param[in] inputFilename Name of the input file that the analysis belongs to.
+ * @param[in] driver        The driver that has assembled or disassembled the input file.
+ *
+ * @return The analysis, or the reason why it failed.
+ */
+std::string formatTimingAnalysis(const std::string& inputFilename,
+                                 QISA::QISA_Driver& driver)
+{
+  std::ostringstream ss;
+
+  QISA::QISA_TimingAnalysis analysis;
+  if (!driver.analyzeTiming(analysis))
+  {
+    ss << "Timing analysis of '" << inputFilename << "' failed:" << std::endl
+       << driver.getLastErrorMessage() << std::endl;
+    return ss.str();
+  }
+
+  const QISA::QISA_TimingAnalysis::Summary& summary = analysis.getSummary();
+
+  ss << "Timing analysis of '" << inputFilename << "':" << std::endl;
+  ss << "  instructions:        " << summary.nrOfInstructions << std::endl;
+  ss << "    classic:           " << summary.nrOfClassicInstructions << std::endl;
+  ss << "    bundles:           " << summary.nrOfBundles << std::endl;
+  ss << "  timing points:       " << summary.nrOfTimingPoints << std::endl;
+  ss << "  basic blocks:        " << summary.nrOfBlocks << std::endl;
+  ss << "  loops:               " << summary.nrOfLoops << std::endl;
+  ss << "  cycles (all blocks): " << summary.cycles << std::endl;
+  ss << "  cycles (min path):   " << summary.minCycles << std::endl;
+  ss << "  cycles (max path):   " << summary.maxCycles << std::endl;
+  if (summary.hasRegisterWaits)
+  {
+    ss << "  note: the waits of QWAITR instructions are not included" << std::endl;
+  }
+
+  ss << "  blocks:" << std::endl;
+  ss << "    " << std::setw(6) << "block"
+     << std::setw(10) << "begin" << std::setw(10) << "end"
+     << std::setw(10) << "classic" << std::setw(10) << "bundles"
+     << std::setw(10) << "cycles" << std::setw(12) << "start min"
+     << std::setw(12) << "start max" << "  successors" << std::endl;
+
+  const std::vector<QISA::QISA_TimingAnalysis::Block>& blocks = analysis.getBlocks();
+
+  for (size_t b = 0; b < blocks.size(); b++)
+  {
+    const QISA::QISA_TimingAnalysis::Block& block = blocks[b];
+
+    ss << "    " << std::setw(6) << b
+       << std::setw(10) << block.begin << std::setw(10) << block.end
+       << std::setw(10) << block.nrOfClassicInstructions << std::setw(10) << block.nrOfBundles
+       << std::setw(10) << block.cycles;
+
+    if (block.isReachable)
+    {
+      ss << std::setw(12) << block.minStartCycles << std::setw(12) << block.maxStartCycles;
+    }
+    else
+    {
+      ss << std::setw(12) << "-" << std::setw(12) << "-";
+    }
+
+    for (size_t i = 0; i < block.successors.size(); i++)
+    {
+      ss << ((i == 0) ? "  " : " ") << block.successors[i];
+    }
+    if (!block.label.empty())
+    {
+      ss << "  (" << block.label << ")";
+    }
+    if (block.hasRegisterWait)
+    {
+      ss << "  (QWAITR)";
+    }
+    ss << std::endl;
+  }
+
+  const std::vector<QISA::QISA_TimingAnalysis::Bottleneck>& bottlenecks = analysis.getBottlenecks();
+
+  ss << "  bottlenecks:         " << bottlenecks.size() << std::endl;
+  for (const auto& bottleneck : bottlenecks)
+  {
+    ss << "    address " << bottleneck.address << ": "
+       << bottleneck.nrOfInstructions << " instructions in "
+       << bottleneck.cycles << " cycles" << std::endl;
+  }
 
   return ss.str();
 }
 
+/**
+ * Assemble or disassemble the given input files using a number of threads.
+ * Each thread uses its own driver, which copies the configuration of the given driver.
+ * The status of each input file is reported, in the order of the input files.
+ *
+ * @param[in] progName        Name of this program, used in messages.
+ * @param[in] configuredDriver Driver that holds the configuration to use.
+ * @param[in] inputFilenames  The input files to process.
+ * @param[in] outputFilenames The output file for each of the input files.
+ * @param[in] doDisassemble   True to disassemble, false to assemble.
+ * @param[in] nrOfThreads     Number of threads to use.
+ * @param[in] doShowStats     True to print the statistics of each input file.
+ * @param[in] doShowTiming    True to print the timing analysis of each input file.
+ *
+ * @return The number of input files that could not be processed.
+ */
+size_t processMultipleFiles(const std::string& progName,
+                            const QISA::QISA_Driver& configuredDriver,
+                            const std::vector<std::string>& inputFilenames,
+                            const std::vector<std::string>& outputFilenames,
+                            bool doDisassemble,
+                            unsigned int nrOfThreads,
+                            bool doShowStats,
+                            bool doShowTiming)
+{
+  size_t nrOfFiles = inputFilenames.size();
+
+  // Error message per input file, empty on success.
+  std::vector<std::string> errorMessages(nrOfFiles);
+  std::vector<QISA::QISA_Driver::Statistics> statistics(nrOfFiles);
+  std::vector<std::string> timingAnalyses(nrOfFiles);
+  // Note: not a vector<bool>, because its elements are written concurrently.
+  std::vector<char> successes(nrOfFiles, false);
+
+  // Index of the next input file to be processed by any of the threads.
+  std::atomic<size_t> nextFile(0);
+
+  auto worker = [&]()
+  {
+    QISA::QISA_Driver driver;
+    driver.copyConfiguration(configuredDriver);
+
+    for (size_t i = nextFile++; i < nrOfFiles; i = nextFile++)
+    {
+      bool success;
+
+      if (doDisassemble)
+      {
+        success = driver.disassemble(inputFilenames[i]);
+      }
+      else
+      {
+        success = driver.assemble(inputFilenames[i]);
+      }
+
+      if (success)
+      {
+        success = driver.save(outputFilenames[i]);
+      }
+
+      if (!success)
+      {
+        errorMessages[i] = driver.getLastErrorMessage();
+      }
+
+      statistics[i] = driver.getStatistics();
+      successes[i] = success;
+
+      if (success && doShowTiming)
+      {
+        timingAnalyses[i] = formatTimingAnalysis(inputFilenames[i], driver);
+      }
+    }
+  };
+
+  if (nrOfThreads > nrOfFiles)
+  {
+    nrOfThreads = nrOfFiles;
+  }
+
+  std::vector<std::thread> threads;
+  for (unsigned int i = 1; i < nrOfThreads; i++)
+  {
+    threads.emplace_back(worker);
+  }
+
+  // The main thread does its share of the work as well.
+  worker();
+
+  for (auto& thread : threads)
+  {
+    thread.join();
+  }
+
+  size_t nrOfFailures = 0;
+
+  for (size_t i = 0; i < nrOfFiles; i++)
+  {
+    if (successes[i])
+    {
+      std::cout << inputFilenames[i] << ": OK -> " << outputFilenames[i] << std::endl;
+    }
+    else
+    {
+      nrOfFailures++;
+      std::cout << inputFilenames[i] << ": FAILED" << std::endl;
+      std::cerr << inputFilenames[i] << ":" << std::endl
+                << errorMessages[i] << std::endl;
+    }
+
+    if (doShowStats)
+    {
+      printStatistics(inputFilenames[i], statistics[i]);
+    }
+
+    std::cerr << timingAnalyses[i];
+  }
+
+  std::cout << progName << ": " << (nrOfFiles - nrOfFailures) << " of " << nrOfFiles
+            << " input files " << (doDisassemble ? "disassembled" : "assembled")
+            << " successfully" << std::endl;
+
+  return nrOfFailures;
+}
+
 int
 main(const int argc, const char **argv)
 {
@@ -39,13 +507,29 @@ main(const int argc, const char **argv)
   bool enableVerbose = false;
   bool doDisassemble = false;
   bool doDumpSpecs = false;
+  bool doStreamDisassembly = false;
+  bool doShowStats = false;
+  bool doShowTiming = false;
   bool doLoadQmap = false;
+  unsigned int optimizations = QISA::QISA_Driver::OPTIMIZE_NONE;
   const char* inputFilename = 0;
   const char* outputFilename = 0;
   const char* qmapFilename = 0;
+  const char* layoutFilename = 0;
+  const char* outputDir = 0;
+  const char* cacheDir = 0;
+  uint64_t cacheSizeBytes = QISA::QISA_AssemblyCache::DEFAULT_MAX_SIZE_BYTES;
+
+  // All input files, in case multiple input files are given.
+  std::vector<std::string> inputFilenames;
+  bool useMultipleFiles = false;
+
+  unsigned int nrOfThreads = 1;
 
   int disassemblyFormatId = 1;
 
+  int assemblyFormatId = 1;
+
   std::string progName = argv[0];
 
   // EXTRACT PROGRAM NAME
@@ -61,6 +545,14 @@ main(const int argc, const char **argv)
   if (spos != std::string::npos)
       progName = progName.substr(spos + 1);
 
+  // Reports a command line option that misses its argument, and returns the exit status.
+  auto missingArgument = [&progName](const char* option, const char* argument)
+  {
+    std::cerr << progName << ": Option " << option << " requires " << argument << std::endl
+              << "Try " << progName << " --help for more information." << std::endl;
+    return EXIT_FAILURE;
+  };
+
   // Parse the command line arguments.
   for (int i = 1; i < argc; i++ )
   {
@@ -93,11 +585,73 @@ main(const int argc, const char **argv)
       {
         enableTrace = true;
       }
+      else if (!std::strcmp(arg, "-O"))
+      {
+        if ((i + 1 >= argc) || !parseOptimizations(argv[++i], optimizations))
+        {
+          std::cerr << progName << ": Option -O requires a comma separated list of known optimizations" << std::endl
+                    << "Try " << progName << " --help for more information." << std::endl;
+          return EXIT_FAILURE;
+        }
+      }
       else if (!std::strcmp(arg, "-q"))
       {
+        if (i + 1 >= argc)
+        {
+          return missingArgument(arg, "a QMAP_FILE");
+        }
         qmapFilename = argv[++i];
         doLoadQmap = true;
       }
+      else if (!std::strcmp(arg, "-l"))
+      {
+        if (i + 1 >= argc)
+        {
+          return missingArgument(arg, "a LAYOUT_FILE");
+        }
+        layoutFilename = argv[++i];
+      }
+      else if (!std::strncmp(arg, "-j", 2))
+      {
+        // Accept both '-j N' and '-jN'.
+        const char* nrOfThreadsArg = (arg[2] != '\0') ? (arg + 2) : ((i + 1 < argc) ? argv[++i] : "");
+        int n = std::atoi(nrOfThreadsArg);
+        if (n < 1)
+        {
+          std::cerr << progName << ": Option -j requires a positive number of threads" << std::endl
+                    << "Try " << progName << " --help for more information." << std::endl;
+          return EXIT_FAILURE;
+        }
+        nrOfThreads = n;
+      }
+      else if (!std::strcmp(arg, "--outdir"))
+      {
+        if (i + 1 >= argc)
+        {
+          return missingArgument(arg, "a directory");
+        }
+        outputDir = argv[++i];
+        useMultipleFiles = true;
+      }
+      else if (!std::strcmp(arg, "--cache"))
+      {
+        if (i + 1 >= argc)
+        {
+          return missingArgument(arg, "a directory");
+        }
+        cacheDir = argv[++i];
+      }
+      else if (!std::strcmp(arg, "--cache-size"))
+      {
+        long long sizeMiB = (i + 1 < argc) ? std::atoll(argv[++i]) : 0;
+        if (sizeMiB < 1)
+        {
+          std::cerr << progName << ": Option --cache-size requires a positive size in MiB" << std::endl
+                    << "Try " << progName << " --help for more information." << std::endl;
+          return EXIT_FAILURE;
+        }
+        cacheSizeBytes = (uint64_t)sizeMiB * 1024 * 1024;
+      }
       else if (!std::strcmp(arg, "-d"))
       {
         doDisassemble = true;
@@ -114,8 +668,36 @@ main(const int argc, const char **argv)
         doDisassemble = true;
         disassemblyFormatId = 2;
       }
+      else if (!std::strcmp(arg, "-f") || !std::strcmp(arg, "-f1"))
+      {
+        assemblyFormatId = 1;
+      }
+      else if (!std::strcmp(arg, "-f2"))
+      {
+        assemblyFormatId = 2;
+      }
+      else if (!std::strcmp(arg, "-f3"))
+      {
+        assemblyFormatId = 3;
+      }
+      else if (!std::strcmp(arg, "--stream"))
+      {
+        doStreamDisassembly = true;
+      }
+      else if (!std::strcmp(arg, "--stats"))
+      {
+        doShowStats = true;
+      }
+      else if (!std::strcmp(arg, "--timing"))
+      {
+        doShowTiming = true;
+      }
       else if (!std::strcmp(arg, "-o"))
       {
+        if (i + 1 >= argc)
+        {
+          return missingArgument(arg, "an OUTPUT_FILE");
+        }
         outputFilename = argv[++i];
       }
       else if (!std::strcmp(arg, "--dumpspecs"))
@@ -129,24 +711,47 @@ main(const int argc, const char **argv)
         return EXIT_FAILURE;
       }
     }
-    else
+    else if (arg[0] == '@')
     {
-      // This command line argument is not an option.
-      // Assume that this is the input filename.
-      // Issue an error if an input filename has already been specified.
-      if (inputFilename != 0)
+      // This command line argument specifies a response file, which
+      // contains the input filenames.
+      if (!readResponseFile(arg + 1, inputFilenames))
       {
-        std::cerr << progName << ": Too many input files specified" << std::endl
-                  << "Try " << progName << " --help for more information." << std::endl;
+        std::cerr << progName << ": Cannot open response file '" << (arg + 1) << "'" << std::endl;
         return EXIT_FAILURE;
       }
 
-      inputFilename = arg;
+      useMultipleFiles = true;
     }
+    else
+    {
+      // This command line argument is not an option.
+      // Assume that this is an input filename.
+      inputFilenames.push_back(arg);
+    }
+  }
+
+  if (inputFilenames.size() > 1)
+  {
+    useMultipleFiles = true;
+  }
+
+  if (useMultipleFiles)
+  {
+    if (outputFilename != 0)
+    {
+      std::cerr << progName << ": Option -o cannot be used with multiple input files, use --outdir instead" << std::endl
+                << "Try " << progName << " --help for more information." << std::endl;
+      return EXIT_FAILURE;
+    }
+  }
+  else if (!inputFilenames.empty())
+  {
+    inputFilename = inputFilenames.front().c_str();
   }
 
 
-  if (inputFilename == 0)
+  if (inputFilenames.empty())
   {
     // If doDumpSpecs is specified, it is not necessary to specify an input filename.
     if (!doDumpSpecs)
@@ -156,10 +761,11 @@ main(const int argc, const char **argv)
       return EXIT_FAILURE;
     }
   }
-  else
+  else if (!useMultipleFiles)
   {
     // Check if the given input file can be opened for reading.
     // Issue an error if not.
+    // With multiple input files, this is reported per input file instead.
 
     std::ifstream tstFileStream(inputFilename);
     if (tstFileStream.fail())
@@ -167,14 +773,47 @@ main(const int argc, const char **argv)
       std::cerr << progName << ": Cannot open file '" << inputFilename << "'" << std::endl;
       return EXIT_FAILURE;
     }
+
+    if ((outputFilename != 0) &&
+        (getCanonicalFilename(outputFilename) == getCanonicalFilename(inputFilename)))
+    {
+      std::cerr << progName << ": Output file '" << outputFilename
+                << "' would overwrite an input file" << std::endl;
+      return EXIT_FAILURE;
+    }
   }
 
   QISA::QISA_Driver driver;
 
-  //driver.read();
+  if (layoutFilename != 0)
+  {
+    std::ifstream tstFileStream(layoutFilename);
+    if (tstFileStream.fail())
+    {
+      std::cerr << progName << ": Cannot open layout file '" << layoutFilename << "'" << std::endl;
+      return EXIT_FAILURE;
+    }
+
+    if (!driver.read(layoutFilename))
+    {
+      std::cerr << driver.getLastErrorMessage() << std::endl;
+      return EXIT_FAILURE;
+    }
+  }
+
+  // The cache must outlive the driver(s) that use it.
+  std::unique_ptr<QISA::QISA_AssemblyCache> cache;
+  if (cacheDir != 0)
+  {
+    cache.reset(new QISA::QISA_AssemblyCache(cacheDir, cacheSizeBytes));
+    driver.setCache(cache.get());
+  }
+
   driver.enableScannerTracing(enableTrace);
   driver.enableParserTracing(enableTrace);
   driver.setVerbose(enableVerbose);
+  driver.enableStreamingDisassembly(doStreamDisassembly);
+  driver.setOptimizations(optimizations);
 
   if (!doLoadQmap)
   {
@@ -223,6 +862,86 @@ main(const int argc, const char **argv)
     return EXIT_SUCCESS;
   }
 
+  if (useMultipleFiles)
+  {
+    if (doDisassemble && !driver.setDisassemblyFormat(disassemblyFormatId))
+    {
+      std::cerr << driver.getLastErrorMessage() << std::endl;
+      return EXIT_FAILURE;
+    }
+
+    if (!doDisassemble && !driver.setAssemblyFormat(assemblyFormatId))
+    {
+      std::cerr << driver.getLastErrorMessage() << std::endl;
+      return EXIT_FAILURE;
+    }
+
+    static const char* const assemblyExtensions[] = { ".bin", ".hex", ".img" };
+
+    const std::string extension = doDisassemble ? ".dis" : assemblyExtensions[assemblyFormatId - 1];
+
+    // Files are compared by their canonical names, so that different names
+    // of the same file are recognized.
+    std::set<std::string> canonicalInputFilenames;
+    for (const auto& name : inputFilenames)
+    {
+      canonicalInputFilenames.insert(getCanonicalFilename(name));
+    }
+
+    std::vector<std::string> outputFilenames;
+    std::set<std::string> uniqueOutputFilenames;
+
+    for (const auto& name : inputFilenames)
+    {
+      outputFilenames.push_back(getOutputFilename(name, outputDir ? outputDir : "", extension, pathSep));
+
+      const std::string canonicalOutputFilename = getCanonicalFilename(outputFilenames.back());
+
+      if (!uniqueOutputFilenames.insert(canonicalOutputFilename).second)
+      {
+        std::cerr << progName << ": Multiple input files map to the same output file '"
+                  << outputFilenames.back() << "'" << std::endl;
+        return EXIT_FAILURE;
+      }
+
+      if (canonicalInputFilenames.count(canonicalOutputFilename) != 0)
+      {
+        std::cerr << progName << ": Output file '" << outputFilenames.back()
+                  << "' would overwrite an input file" << std::endl;
+        return EXIT_FAILURE;
+      }
+    }
+
+    size_t nrOfFailures = processMultipleFiles(progName, driver, inputFilenames, outputFilenames,
+                                               doDisassemble, nrOfThreads, doShowStats,
+                                               doShowTiming);
+
+    if (cache)
+    {
+      std::cout << progName << ": cache: " << cache->getHits() << " hits, "
+                << cache->getMisses() << " misses, "
+                << cache->getStores() << " stores, "
+                << cache->getEvictions() << " evictions" << std::endl;
+    }
+
+    return (nrOfFailures == 0) ? EXIT_SUCCESS : EXIT_FAILURE;
+  }
+
+  // Shows the statistics and the timing analysis, if requested, and returns
+  // the given exit status.
+  auto finish = [&](int exitStatus)
+  {
+    if (doShowStats)
+    {
+      printStatistics(inputFilename, driver.getStatistics());
+    }
+    if (doShowTiming && (exitStatus == EXIT_SUCCESS))
+    {
+      std::cerr << formatTimingAnalysis(inputFilename, driver);
+    }
+    return exitStatus;
+  };
+
   /* Parse the file. */
   bool success;
 
@@ -236,7 +955,17 @@ main(const int argc, const char **argv)
   }
   else
   {
-    success = driver.assemble(inputFilename);
+    success = driver.setAssemblyFormat(assemblyFormatId);
+    if (success)
+    {
+      success = driver.assemble(inputFilename);
+    }
+
+    if (cache && enableVerbose)
+    {
+      std::cout << "QISA-AS: cache " << (cache->getHits() ? "hit" : "miss")
+                << " for '" << inputFilename << "'." << std::endl;
+    }
   }
 
   if (success)
@@ -246,7 +975,35 @@ main(const int argc, const char **argv)
       if (doDisassemble)
       {
         std::cout << "Disassembly output:" << std::endl;
-        std::cout << driver.getDisassemblyOutput();
+
+        // Output the disassembly in pieces, so that a streaming
+        // disassembly is never held in memory completely.
+        const size_t nrOfLinesPerWrite = 4096;
+        bool disassembly_result = true;
+        std::string lines;
+
+        for (uint64_t address = 0; ; address += nrOfLinesPerWrite)
+        {
+          lines.clear();
+          if (!driver.getDisassemblyLines(address, nrOfLinesPerWrite, lines))
+          {
+            disassembly_result = false;
+          }
+
+          if (lines.empty())
+          {
+            break;
+          }
+
+          std::cout << lines;
+        }
+
+        if (!disassembly_result)
+        {
+          std::cerr << driver.getLastErrorMessage() << std::endl;
+          std::cerr << "Disassembly terminated with errors." << std::endl;
+          return finish(EXIT_FAILURE);
+        }
       }
       else
       {
@@ -268,11 +1025,11 @@ main(const int argc, const char **argv)
       {
         std::cerr << "Saving terminated with errors:" << std::endl;
         std::cerr << driver.getLastErrorMessage();
-        return EXIT_FAILURE;
+        return finish(EXIT_FAILURE);
       }
     }
 
-    return EXIT_SUCCESS;
+    return finish(EXIT_SUCCESS);
   }
   else
   {
@@ -287,7 +1044,7 @@ main(const int argc, const char **argv)
       std::cerr << "Assembly terminated with errors." << std::endl;
     }
 
-    return EXIT_FAILURE;
+    return finish(EXIT_FAILURE);
   }
 
 }
@@ -0,0 +1,255 @@
+"""
+Vectorized decoding of QISA instructions into their fields.
+
+This module decodes an array of encoded instructions into a numpy structured
+array, with one record per instruction, holding the opcode and operand
+fields of that instruction. This is much faster than disassembling the
+instructions into text and parsing that text again.
+
+The bit layout of the instructions and the names of the instructions are
+taken from a QISA_Driver, so the quantum instructions that have been loaded
+into that driver (see QISA_Driver.loadQuantumInstructions()) are used.
+
+This module requires numpy.
+"""
+
+import os
+
+# Operand formats of the classic instructions, keyed by instruction name.
+# These are the same formats as used by the disassembler of QISA_Driver.
+FORMAT_UNKNOWN = 0   # Opcode not in use.
+FORMAT_NONE = 1      # INST
+FORMAT_RD_RS_RT = 2  # INST rd, rs, rt
+FORMAT_RD_RT = 3     # INST rd, rt
+FORMAT_RS_RT = 4     # INST rs, rt
+FORMAT_BR = 5        # INST cond, offset
+FORMAT_LDI = 6       # INST rd, imm
+FORMAT_LDUI = 7      # INST rd, u_imm
+FORMAT_FBR = 8       # INST cond, rd
+FORMAT_FMR = 9       # INST rd, qs
+FORMAT_SMIS = 10     # INST sd, s_mask
+FORMAT_SMIT = 11     # INST td, t_mask
+FORMAT_QWAIT = 12    # INST u_imm
+FORMAT_QWAITR = 13   # INST rs
+
+CLASSIC_FORMATS = {
+    'NOP':    FORMAT_NONE,
+    'STOP':   FORMAT_NONE,
+    'ADD':    FORMAT_RD_RS_RT,
+    'ADDC':   FORMAT_RD_RS_RT,
+    'SUB':    FORMAT_RD_RS_RT,
+    'SUBC':   FORMAT_RD_RS_RT,
+    'AND':    FORMAT_RD_RS_RT,
+    'OR':     FORMAT_RD_RS_RT,
+    'XOR':    FORMAT_RD_RS_RT,
+    'NOT':    FORMAT_RD_RT,
+    'CMP':    FORMAT_RS_RT,
+    'BR':     FORMAT_BR,
+    'LDI':    FORMAT_LDI,
+    'LDUI':   FORMAT_LDUI,
+    'FBR':    FORMAT_FBR,
+    'FMR':    FORMAT_FMR,
+    'SMIS':   FORMAT_SMIS,
+    'SMIT':   FORMAT_SMIT,
+    'QWAIT':  FORMAT_QWAIT,
+    'QWAITR': FORMAT_QWAITR,
+}
+
+# Kinds of quantum instructions, as found in the 'q0_kind' and 'q1_kind' fields.
+Q_KIND_UNKNOWN = 0   # Opcode not in use.
+Q_KIND_NONE = 1      # INST
+Q_KIND_ST = 2        # [C,]INST sd
+Q_KIND_TT = 3        # INST td
+
+
+def _instruction_dtype(name_length):
+    import numpy
+
+    name_type = 'U{}'.format(max(1, name_length))
+
+    return numpy.dtype([
+        ('valid', numpy.bool_),       # False if an opcode is not in use.
+        ('quantum', numpy.bool_),     # True for a quantum (double format) instruction.
+        # Classic instructions.
+        ('opcode', numpy.uint8),
+        ('name', name_type),
+        ('format', numpy.uint8),      # One of the FORMAT_... values.
+        ('rd', numpy.uint8),
+        ('rs', numpy.uint8),
+        ('rt', numpy.uint8),
+        ('cond', numpy.uint8),        # Branch condition of BR and FBR.
+        ('offset', numpy.int32),      # Branch offset of BR, relative to the instruction.
+        ('imm', numpy.int32),         # Immediate value of LDI, LDUI and QWAIT.
+        ('qs', numpy.uint8),
+        ('sd', numpy.uint8),
+        ('td', numpy.uint8),
+        ('mask', numpy.uint32),       # Encoded s_mask of SMIS, or t_mask of SMIT.
+        ('pos', numpy.uint8),         # Position of the s_mask part of SMIS, or t_mask part of SMIT.
+        # Quantum instructions.
+        ('bs', numpy.uint8),          # Bundle separator.
+        ('q0_opcode', numpy.uint8),
+        ('q0_name', name_type),
+        ('q0_kind', numpy.uint8),     # One of the Q_KIND_... values.
+        ('q0_cond', numpy.bool_),     # Conditional execution flag (st instructions).
+        ('q0_reg', numpy.uint8),      # S register (st) or T register (tt).
+        ('q1_opcode', numpy.uint8),
+        ('q1_name', name_type),
+        ('q1_kind', numpy.uint8),
+        ('q1_cond', numpy.bool_),
+        ('q1_reg', numpy.uint8),
+    ])
+
+
+def _sign_extend(values, nr_of_bits):
+    import numpy
+
+    values = values.astype(numpy.int32)
+    sign_bit = 1 << (nr_of_bits - 1)
+    return (values ^ sign_bit) - sign_bit
+
+
+def decode_instructions(instructions, target):
+    """
+    Decode the given instructions into their fields.
+
+    Parameters
+    ----------
+    instructions:     Encoded instructions. This is either an array-like of 32-bit unsigned
+                      integers (e.g. the result of QISA_Driver.getInstructionBuffer()), a
+                      bytes-like object (e.g. the result of QISA_Driver.getInstructionsAsBytes()),
+                      or the name of a file that holds instructions in binary form (str or
+                      os.PathLike).
+    target: QISA_Driver  Driver that defines the instructions. Its quantum instructions are used.
+
+    Returns
+    -------
+    --> numpy.ndarray: Structured array with one record per instruction.
+                       Fields that are not used by an instruction are 0 (or empty).
+
+    The fields of each record are:
+
+        valid      False if the (classic or quantum) opcode is not in use.
+        quantum    True for a quantum (double format) instruction.
+
+        opcode     Opcode of a classic instruction.
+        name       Name of a classic instruction.
+        format     Operand format of a classic instruction (one of the FORMAT_... values).
+        rd, rs, rt Register operands.
+        cond       Branch condition of BR and FBR.
+        offset     Branch offset of BR, relative to the address of the instruction.
+        imm        Immediate value of LDI (sign extended), LDUI and QWAIT.
+        qs         Q register operand of FMR.
+        sd, td     S register of SMIS, and T register of SMIT.
+        mask       Encoded s_mask of SMIS, or t_mask of SMIT.
+        pos        Position of the s_mask part of SMIS, or of the t_mask part of SMIT.
+
+        bs         Bundle separator of a quantum instruction.
+        qN_opcode  Opcode of quantum instruction N (0 or 1) of the VLIW.
+        qN_name    Name of quantum instruction N.
+        qN_kind    Kind of quantum instruction N (one of the Q_KIND_... values).
+        qN_cond    Conditional execution flag of quantum instruction N (st instructions).
+        qN_reg     S register (st) or T register (tt) of quantum instruction N.
+    """
+    import numpy
+
+    if isinstance(instructions, (str, os.PathLike)):
+        words = numpy.fromfile(os.fspath(instructions), dtype=numpy.uint32)
+    elif isinstance(instructions, (bytes, bytearray)):
+        words = numpy.frombuffer(instructions, dtype=numpy.uint32)
+    else:
+        words = numpy.asarray(instructions)
+        if words.dtype != numpy.uint32:
+            if words.dtype.kind not in 'ui':
+                raise TypeError("instructions must be integers, not {}".format(words.dtype))
+            words = words.astype(numpy.uint32)
+
+    words = words.reshape(-1)
+
+    c = target.getEncodingConstants()
+
+    # Lookup tables, indexed by opcode.
+    classic_opcodes = target.getClassicOpcodes()
+    classic_names = numpy.full(c['OPCODE_MASK'] + 1, '', dtype=object)
+    classic_formats = numpy.zeros(c['OPCODE_MASK'] + 1, dtype=numpy.uint8)
+    for name, opcode in classic_opcodes.items():
+        classic_names[opcode] = name
+        classic_formats[opcode] = CLASSIC_FORMATS.get(name, FORMAT_UNKNOWN)
+
+    q_names = numpy.full(c['Q_INST_OPCODE_MASK'] + 1, '', dtype=object)
+    q_kinds = numpy.zeros(c['Q_INST_OPCODE_MASK'] + 1, dtype=numpy.uint8)
+    for kind, q_map in zip((Q_KIND_NONE, Q_KIND_ST, Q_KIND_TT), target.getQuantumInstructions()):
+        for name, opcode in q_map.items():
+            q_names[opcode] = name
+            q_kinds[opcode] = kind
+
+    name_length = max(len(name) for name in list(classic_opcodes) + list(q_names) + [''])
+
+    result = numpy.zeros(len(words), dtype=_instruction_dtype(name_length))
+
+    def field(offset, mask):
+        return (words >> numpy.uint32(offset)) & numpy.uint32(mask)
+
+    quantum = field(c['DBL_INST_FORMAT_BIT_OFFSET'], 1).astype(numpy.bool_)
+    classic = ~quantum
+    result['quantum'] = quantum
+
+    # Classic instructions.
+    opcode = field(c['OPCODE_OFFSET'], c['OPCODE_MASK'])
+    fmt = numpy.where(classic, classic_formats[opcode], FORMAT_UNKNOWN)
+
+    result['opcode'] = numpy.where(classic, opcode, 0)
+    result['format'] = fmt
+    result['name'] = numpy.where(classic, classic_names[opcode], '')
+
+    def set_field(name, formats, values):
+        selected = numpy.isin(fmt, formats)
+        result[name] = numpy.where(selected, values, 0)
+
+    set_field('rd', [FORMAT_RD_RS_RT, FORMAT_RD_RT, FORMAT_LDI, FORMAT_LDUI, FORMAT_FBR, FORMAT_FMR],
+              field(c['RD_OFFSET'], c['RD_MASK']))
+    set_field('rs', [FORMAT_RD_RS_RT, FORMAT_RS_RT, FORMAT_QWAITR],
+              field(c['RS_OFFSET'], c['RS_MASK']))
+    set_field('rt', [FORMAT_RD_RS_RT, FORMAT_RD_RT, FORMAT_RS_RT],
+              field(c['RT_OFFSET'], c['RT_MASK']))
+    set_field('cond', [FORMAT_BR, FORMAT_FBR], field(0, c['COND_MASK']))
+    set_field('offset', [FORMAT_BR],
+              _sign_extend(field(c['ADDR_OFFSET'], c['ADDR_MASK']), c['ADDR_MASK'].bit_length()))
+    set_field('qs', [FORMAT_FMR], field(0, c['QS_MASK']))
+    set_field('sd', [FORMAT_SMIS], field(c['SD_OFFSET'], c['SD_MASK']))
+    set_field('td', [FORMAT_SMIT], field(c['TD_OFFSET'], c['TD_MASK']))
+    set_field('pos', [FORMAT_SMIS, FORMAT_SMIT], field(c['POS_OFFSET'], c['POS_MASK']))
+
+    result['mask'] = numpy.select([fmt == FORMAT_SMIS, fmt == FORMAT_SMIT],
+                                  [field(0, c['S_MASK_MASK']), field(0, c['T_MASK_MASK'])])
+
+    result['imm'] = numpy.select(
+        [fmt == FORMAT_LDI, fmt == FORMAT_LDUI, fmt == FORMAT_QWAIT],
+        [_sign_extend(field(0, c['IMM20_MASK']), c['IMM20_MASK'].bit_length()),
+         field(0, c['U_IMM15_MASK']).astype(numpy.int32),
+         field(0, c['U_IMM20_MASK']).astype(numpy.int32)])
+
+    valid = numpy.where(classic, fmt != FORMAT_UNKNOWN, True)
+
+    # Quantum instructions.
+    result['bs'] = numpy.where(quantum, field(0, c['BS_MASK']), 0)
+
+    for slot, vliw_offset in ((0, c['VLIW_INST_0_OFFSET']), (1, c['VLIW_INST_1_OFFSET'])):
+        q_inst = field(vliw_offset, c['VLIW_Q_INST_MASK'])
+        q_opcode = (q_inst >> numpy.uint32(c['Q_INST_OPCODE_OFFSET'])) & numpy.uint32(c['Q_INST_OPCODE_MASK'])
+        q_kind = numpy.where(quantum, q_kinds[q_opcode], Q_KIND_UNKNOWN)
+
+        prefix = 'q{}_'.format(slot)
+        result[prefix + 'opcode'] = numpy.where(quantum, q_opcode, 0)
+        result[prefix + 'name'] = numpy.where(quantum, q_names[q_opcode], '')
+        result[prefix + 'kind'] = q_kind
+        result[prefix + 'cond'] = ((q_kind == Q_KIND_ST) &
+                                   (((q_inst >> numpy.uint32(c['Q_INST_ST_COND_OFFSET'])) & 1) != 0))
+        result[prefix + 'reg'] = numpy.select(
+            [q_kind == Q_KIND_ST, q_kind == Q_KIND_TT],
+            [q_inst & numpy.uint32(c['Q_INST_SD_MASK']), q_inst & numpy.uint32(c['Q_INST_TD_MASK'])])
+
+        valid &= numpy.where(quantum, q_kind != Q_KIND_UNKNOWN, True)
+
+    result['valid'] = valid
+
+    return result
@@ -7,6 +7,152 @@
 %module pyQisaAs
 %{
 #include "qisa_driver.h"
+
+/*
+ * Minimal Python object that exports a read-only view on the instructions
+ * of a QISA_Driver through the buffer protocol, without copying them.
+ * It keeps a reference to the Python object that owns the driver, so that
+ * the driver stays alive for as long as the view is in use.
+ */
+typedef struct
+{
+  PyObject_HEAD
+  PyObject* owner;
+  const QISA::QISA_Driver* driver;
+  const QISA::QISA_Driver::qisa_instruction_type* data;
+  Py_ssize_t nrOfInstructions;
+} QisaInstructionBuffer;
+
+/*
+ * Number of views on the instructions of each QISA_Driver that have been
+ * exported and not released yet. Like a bytearray does, a driver refuses to
+ * replace its instructions while there are such views, because that would
+ * free the memory they refer to.
+ * Only accessed while holding the GIL.
+ */
+static std::map<const QISA::QISA_Driver*, Py_ssize_t> QisaInstructionExports;
+
+/*
+ * Check that the instructions of the given driver may be replaced.
+ * Sets a BufferError and returns false if they have been exported.
+ */
+static bool
+QisaCheckInstructionsNotExported(const QISA::QISA_Driver* driver)
+{
+  if (QisaInstructionExports.count(driver) != 0)
+  {
+    PyErr_SetString(PyExc_BufferError,
+                    "Existing exports of the instructions of this driver (see getInstructionBuffer()): "
+                    "they cannot be replaced until these have been released");
+    return false;
+  }
+
+  return true;
+}
+
+static int
+QisaInstructionBuffer_getbuffer(PyObject* exporter, Py_buffer* view, int flags)
+{
+  QisaInstructionBuffer* self = (QisaInstructionBuffer*)exporter;
+
+  if (flags & PyBUF_WRITABLE)
+  {
+    PyErr_SetString(PyExc_BufferError, "Instruction buffer is read-only");
+    view->obj = NULL;
+    return -1;
+  }
+
+  QisaInstructionExports[self->driver]++;
+
+  Py_INCREF(exporter);
+  view->obj = exporter;
+  view->buf = (void*)self->data;
+  view->itemsize = sizeof(QISA::QISA_Driver::qisa_instruction_type);
+  view->len = self->nrOfInstructions * view->itemsize;
+  view->readonly = 1;
+  view->ndim = 1;
+  view->format = (flags & PyBUF_FORMAT) ? (char*)"I" : NULL;
+  view->shape = (flags & PyBUF_ND) ? &self->nrOfInstructions : NULL;
+  view->strides = ((flags & PyBUF_STRIDES) == PyBUF_STRIDES) ? &view->itemsize : NULL;
+  view->suboffsets = NULL;
+  view->internal = NULL;
+
+  return 0;
+}
+
+static void
+QisaInstructionBuffer_releasebuffer(PyObject* exporter, Py_buffer* view)
+{
+  QisaInstructionBuffer* self = (QisaInstructionBuffer*)exporter;
+
+  auto it = QisaInstructionExports.find(self->driver);
+  if (--it->second == 0)
+  {
+    QisaInstructionExports.erase(it);
+  }
+}
+
+static void
+QisaInstructionBuffer_dealloc(PyObject* exporter)
+{
+  QisaInstructionBuffer* self = (QisaInstructionBuffer*)exporter;
+  Py_XDECREF(self->owner);
+  Py_TYPE(exporter)->tp_free(exporter);
+}
+
+static PyBufferProcs QisaInstructionBuffer_as_buffer = {
+  QisaInstructionBuffer_getbuffer,
+  QisaInstructionBuffer_releasebuffer
+};
+
+/*
+ * Convert an instruction name to opcode map into a Python dictionary.
+ */
+static PyObject*
+QisaOpcodeMapToDict(const std::map<std::string, int>& opcodeMap)
+{
+  PyObject* dict = PyDict_New();
+  if (dict == NULL)
+  {
+    return NULL;
+  }
+
+  for (const auto& entry : opcodeMap)
+  {
+    PyObject* value = PyLong_FromLong(entry.second);
+    if ((value == NULL) || (PyDict_SetItemString(dict, entry.first.c_str(), value) != 0))
+    {
+      Py_XDECREF(value);
+      Py_DECREF(dict);
+      return NULL;
+    }
+    Py_DECREF(value);
+  }
+
+  return dict;
+}
+
+static PyTypeObject QisaInstructionBuffer_Type = {
+  PyVarObject_HEAD_INIT(NULL, 0)
+  "pyQisaAs.InstructionBuffer",       /* tp_name */
+  sizeof(QisaInstructionBuffer),      /* tp_basicsize */
+};
+%}
+
+%init %{
+  QisaInstructionBuffer_Type.tp_dealloc = QisaInstructionBuffer_dealloc;
+  QisaInstructionBuffer_Type.tp_as_buffer = &QisaInstructionBuffer_as_buffer;
+  QisaInstructionBuffer_Type.tp_flags = Py_TPFLAGS_DEFAULT;
+  QisaInstructionBuffer_Type.tp_doc = "Read-only view on the instructions generated by a QISA_Driver.";
+  if (PyType_Ready(&QisaInstructionBuffer_Type) < 0)
+  {
+#if SWIG_VERSION >= 0x040400
+    // Module initialization uses multi-phase initialization.
+    return -1;
+#else
+    return NULL;
+#endif
+  }
 %}
 
 %include std_string.i
@@ -22,9 +168,272 @@ namespace std {
    %template(qisa_qmap) map<string, int>;
 };
 
+%include stdint.i
+
+%include std_shared_ptr.i
+%shared_ptr(QISA::QISA_Target)
+
+/*
+ * Release the Python GIL while the driver is busy with long running work,
+ * so that different QISA_Driver instances can be used concurrently from
+ * multiple Python threads.
+ * Note that a single QISA_Driver instance must not be used by multiple
+ * threads at the same time.
+ */
+%define QISA_RELEASE_GIL(function)
+%exception function {
+  Py_BEGIN_ALLOW_THREADS
+  $action
+  Py_END_ALLOW_THREADS
+}
+%enddef
+
+/*
+ * Functions that replace the instructions of the driver raise a BufferError
+ * while these are exported by getInstructionBuffer().
+ */
+%define QISA_REPLACE_INSTRUCTIONS_RELEASE_GIL(function)
+%exception function {
+  if (!QisaCheckInstructionsNotExported(arg1))
+  {
+    SWIG_fail;
+  }
+  Py_BEGIN_ALLOW_THREADS
+  $action
+  Py_END_ALLOW_THREADS
+}
+%enddef
+
+%exception QISA::QISA_Driver::reset {
+  if (!QisaCheckInstructionsNotExported(arg1))
+  {
+    SWIG_fail;
+  }
+  $action
+}
+
+QISA_RELEASE_GIL(QISA::QISA_Driver::read)
+QISA_REPLACE_INSTRUCTIONS_RELEASE_GIL(QISA::QISA_Driver::assemble)
+QISA_REPLACE_INSTRUCTIONS_RELEASE_GIL(QISA::QISA_Driver::assembleString)
+QISA_REPLACE_INSTRUCTIONS_RELEASE_GIL(QISA::QISA_Driver::disassemble)
+QISA_RELEASE_GIL(QISA::QISA_Driver::save)
+QISA_RELEASE_GIL(QISA::QISA_Driver::loadQuantumInstructions)
+QISA_RELEASE_GIL(QISA::QISA_Driver::analyzeTiming)
+
+/*
+ * QISA_Target.fromBytes() raises a Python exception if the data is invalid.
+ */
+%exception QISA::QISA_Target::fromBytes {
+  $action
+  if (PyErr_Occurred())
+  {
+    SWIG_fail;
+  }
+}
+
 namespace QISA
 {
 
+%feature("autodoc", "
+Content-addressed, on-disk cache of assembled programs.
+
+Each entry is stored in its own file in the cache directory, named after a hash of
+the source code, the quantum layout information, the quantum instructions, the
+assembler version and the revision of the instruction encoding. Entries are written atomically, so multiple processes can share
+the same cache directory. When the total size of the entries exceeds the limit, the
+least recently used entries are removed.
+
+A cache is used by a QISA_Driver after passing it to QISA_Driver.setCache().
+");
+class QISA_AssemblyCache
+{
+public:
+
+  %feature("autodoc", "
+Constructor
+
+Parameters
+----------
+directory: str     Directory in which the cache entries are stored.
+                   It is created if it does not exist yet.
+maxSizeBytes: int  Maximum total size of the cache entries, in bytes (optional).
+");
+  QISA_AssemblyCache(const std::string& directory,
+                     uint64_t maxSizeBytes = 268435456);
+
+  %feature("autodoc", "
+Remove all entries from the cache directory.
+");
+  void clear();
+
+  %feature("autodoc", "
+Returns
+-------
+--> str: The directory in which the cache entries are stored.
+");
+  const std::string& getDirectory() const;
+
+  %feature("autodoc", "
+Returns
+-------
+--> int: The maximum total size of the cache entries, in bytes.
+");
+  uint64_t getMaxSizeBytes() const;
+
+  %feature("autodoc", "
+Returns
+-------
+--> int: The number of lookups that found an entry.
+");
+  uint64_t getHits() const;
+
+  %feature("autodoc", "
+Returns
+-------
+--> int: The number of lookups that did not find an entry.
+");
+  uint64_t getMisses() const;
+
+  %feature("autodoc", "
+Returns
+-------
+--> int: The number of entries that have been stored.
+");
+  uint64_t getStores() const;
+
+  %feature("autodoc", "
+Returns
+-------
+--> int: The number of entries that have been removed to stay within the size limit.
+");
+  uint64_t getEvictions() const;
+
+  %feature("autodoc", "
+Reset the hit, miss, store and eviction counters to zero.
+");
+  void resetStatistics();
+
+  %pythoncode %{
+    def getStatistics(self):
+        """
+        Returns
+        -------
+        --> dict: The hit, miss, store and eviction counters of this cache.
+        """
+        return {'hits': self.getHits(),
+                'misses': self.getMisses(),
+                'stores': self.getStores(),
+                'evictions': self.getEvictions()}
+  %}
+};
+
+%feature("autodoc", "
+Parametric template of an assembled program.
+
+The integer symbols that are defined using '.def_sym' and used as immediate value of
+LDI, LDUI, QWAIT or MOV are the parameters of the template. Instantiating the template
+patches the instruction fields that depend on these parameters into a copy of the
+assembled program, without assembling it again. The same range checks are done as
+during assembly.
+
+A template is created by QISA_Driver.getProgramTemplate().
+");
+class QISA_ProgramTemplate
+{
+public:
+
+  %feature("autodoc", "Constructor");
+  QISA_ProgramTemplate();
+
+  %feature("autodoc", "
+Returns
+-------
+--> int: The number of instructions of each instantiated program.
+");
+  size_t getNrOfInstructions() const;
+
+  %feature("autodoc", "
+Returns
+-------
+--> str: The last generated error message.
+");
+  std::string getLastErrorMessage();
+};
+
+%feature("autodoc", "
+Static control flow and timing analysis of a program.
+
+The program is divided into basic blocks, which start at the program entry, at each
+label (or branch destination, for a disassembled program) and after each BR and STOP
+instruction. Time is counted in quantum cycles: each QWAIT adds its immediate value,
+and each quantum bundle adds its bundle separator. The wait of QWAITR is not known,
+so it is counted as 0 cycles.
+
+A timing point is a quantum bundle with a non-zero bundle separator, a QWAIT with a
+non-zero wait, or a QWAITR. A timing point for which more instructions must be issued
+since the previous timing point than the controller can issue in the cycles between
+them is reported as a bottleneck, also if the previous timing point is in another block.
+
+The paths through the program are analyzed without repeating loops.
+
+An analysis is created by QISA_Driver.analyzeTiming().
+");
+class QISA_TimingAnalysis
+{
+public:
+
+  %feature("autodoc", "Constructor");
+  QISA_TimingAnalysis();
+
+  %feature("autodoc", "
+Returns
+-------
+--> int: The number of instructions issued per cycle that has been assumed.
+");
+  unsigned int getInstructionsPerCycle() const;
+};
+
+%feature("autodoc", "
+Configuration of the processor that is assembled for: the opcodes of the classic and
+quantum instructions, and the quantum layout information.
+
+A target never changes, so it can be shared by any number of drivers, also in
+different threads. The target of a driver is set up using QISA_Driver.read() and
+QISA_Driver.loadQuantumInstructions(), which give that driver a modified copy of its
+target. It can then be retrieved using QISA_Driver.getTarget(), and passed to other
+drivers using QISA_Driver.setTarget() or the QISA_Driver constructor.
+
+A target can be pickled, e.g. to pass it to another process.
+");
+class QISA_Target
+{
+public:
+
+  %feature("autodoc", "
+Constructor
+
+Creates a target that holds the factory default instruction specifications,
+without quantum layout information.
+");
+  QISA_Target();
+
+  %feature("autodoc", "
+Returns
+-------
+--> int: The total number of addressable qubits, or 0 if no quantum layout
+         information has been read.
+");
+  int getNrOfQubits() const;
+
+  %feature("autodoc", "
+Returns
+-------
+--> int: The number of edges (valid target-control pairs) between the qubits,
+         or 0 if no quantum layout information has been read.
+");
+  int getNrOfEdges() const;
+};
+
 class QISA_Driver
 {
 public:
@@ -32,11 +441,34 @@ public:
   %feature("autodoc", "Constructor");
   QISA_Driver();
 
+  %feature("autodoc", "
+Constructor
+
+Parameters
+----------
+target: QISA_Target  Target to use, which holds the instruction specifications and
+                     the quantum layout information.
+");
+  QISA_Driver(std::shared_ptr<const QISA_Target> target);
+
   %feature("autodoc");
   virtual ~QISA_Driver();
 
-  %feature("autodoc");
-  void read(std::string input_filename);
+  %feature("autodoc", "
+Read the quantum layout information (the number of qubits and the edges between
+them) from the given file.
+
+Parameters
+----------
+input_filename: str  Name of the file that contains the quantum layout information.
+
+Returns
+-------
+--> bool: True on success, False on failure.
+          On failure, the quantum layout information is not changed. Use
+          getLastErrorMessage() to get a description of the error.
+");
+  bool read(std::string input_filename);
 
   %feature("autodoc", "
 Return a string that represents the version of the assembler.
@@ -80,6 +512,26 @@ On error, you can use getLastErrorMessage() to get a description of that error.
 ");
   bool assemble(const std::string& filename);
 
+  %feature("autodoc", "
+Assemble the given source code, without reading it from a file.
+
+Parameters
+----------
+source: str      String that contains QISA assembly source code.
+sourceName: str  Name that is used to refer to the source in error messages (optional).
+
+Returns
+-------
+--> bool: True on success, false on failure.
+
+Note
+----
+On error, you can use getLastErrorMessage() to get a description of that error.
+");
+  bool assembleString(const std::string& source,
+                      const std::string& sourceName = "<string>");
+
+
 %feature("autodoc", "
 Disassemble the given file.
 
@@ -90,9 +542,31 @@ filename: str File that contains QISA instructions in binary form.
 Returns
 -------
 --> bool: True on success, false on failure.
+
+Note
+----
+In streaming mode (see enableStreamingDisassembly()), the instructions are only
+disassembled when the disassembly output is requested, so errors in the instructions
+are reported at that point.
 ");
   bool disassemble(const std::string& filename);
 
+  %feature("autodoc", "
+Enable or disable streaming disassembly.
+
+In streaming mode, disassemble() memory-maps its input file instead of keeping the
+disassembled instructions in memory. The disassembly output is generated on the fly
+by iterDisassemblyOutput() and save(), so the memory usage does not depend on the
+size of the input file.
+Note that output format 2 needs an extra pass over the input file to determine the
+width of the lines.
+
+Parameters
+----------
+enabled: bool  -- True to enable streaming disassembly.
+");
+  void enableStreamingDisassembly(bool enabled);
+
   %feature("autodoc", "
 Returns
 -------
@@ -125,6 +599,39 @@ Returns
   std::vector<std::string>
   getInstructionsAsHexStrings(bool withBinaryOutput);
 
+%feature("autodoc", "
+Set the format in which save() writes assembled instructions to one of the known format types.
+
+The known formats:
+
+  1: Raw binary: each instruction is a 32-bit word in native byte order.
+     This is the default assembly output format.
+
+  2: Hexadecimal memory initialization file: one instruction per line,
+     as 8 hexadecimal digits, as in:
+
+         29600002
+
+  3: Image: a header of 32 bytes, followed by the instructions as in format 1.
+     The header holds, in little-endian byte order:
+       - bytes  0..3:  'QISA'
+       - bytes  4..5:  version of the image format (1)
+       - bytes  6..7:  size of the header (32)
+       - bytes  8..11: number of instructions
+       - bytes 12..15: CRC-32 of the instructions, as computed by zlib.crc32()
+       - bytes 16..31: assembler version, zero padded
+
+Parameters
+----------
+format_id: int Sets the output format in which the assembly must be saved.
+
+Returns
+-------
+--> bool: True on success, false on failure.
+
+");
+  bool setAssemblyFormat(int format_id);
+
 %feature("autodoc", "
 Set the disassembly format to one of the known format types.
 
@@ -160,6 +667,13 @@ Returns
 ");
   std::string getDisassemblyOutput();
 
+%feature("autodoc", "
+Returns
+-------
+--> int: The number of instructions in the last disassembled input file.
+");
+  uint64_t getNrOfDisassembledInstructions() const;
+
 
   %feature("autodoc", "
 Save binary assembled or textual disassembled instructions to the given output file.
@@ -181,45 +695,166 @@ Returns
   std::string dumpInstructionsSpecification();
 
   %feature("autodoc", "
-Free the resources allocated by QISA_Driver and reset it, such that it can be used for assembly/disassembly again.
-NOTE: A reset() is done implicitly at each call to assemble()/disassemble().
+Use the given cache for subsequent assemblies.
+Before assembling, the cache is consulted. On a hit, the stored instructions are used,
+without lexing or parsing the source code. On a miss, the result of a successful
+assembly is stored in the cache.
+
+Parameters
+----------
+cache: QISA_AssemblyCache  The cache to use, or None to disable caching.
 ");
-  void reset();
+  %pythonappend setCache %{
+    # Keep the cache alive for as long as this driver uses it.
+    self._cache = cache
+  %}
+  void setCache(QISA_AssemblyCache* cache);
 
   %feature("autodoc", "
-Parse the contents of the given file that contains quantum instruction specifications.
-The quantum instruction definitions are specified using the following format:
+Returns
+-------
+--> QISA_AssemblyCache: The cache that is used, or None if caching is disabled.
+");
+  QISA_AssemblyCache* getCache() const;
 
-   def_q_arg_none['<instruction_name>'] = <opcode>
-   This specifies the quantum instructions that do not have an argument.
+  // Optional optimizations of the assembled program, see setOptimizations().
+  enum Optimizations
+  {
+    OPTIMIZE_NONE                = 0x0,
+    OPTIMIZE_REDUNDANT_MASKS     = 0x1,
+    OPTIMIZE_MASK_REGISTER_REUSE = 0x2,
+    OPTIMIZE_BUNDLE_PACKING      = 0x4,
+    OPTIMIZE_WAITS               = 0x8
+  };
 
-   def_q_arg_st['<instruction_name>'] = <opcode>
-   This specifies the quantum instructions that expect an s-register argument.
+  %feature("autodoc", "
+Set the optimizations to apply to the assembled program, after all labels have been
+resolved. By default, no optimizations are applied.
 
-   def_q_arg_tt['<instruction_name>'] = <opcode>
-   This specifies the quantum instructions that expect a t-register argument.
+The optimizations do not change what the program does: the quantum operations are
+issued with the same timing and the same masks. What they achieve is shown by getStats().
+
+The known optimizations, which can be or'ed together:
+
+  QISA_Driver.OPTIMIZE_REDUNDANT_MASKS:
+     Remove SMIS and SMIT instructions that set (part of) a register to the mask it
+     already holds on all paths to the instruction.
+
+  QISA_Driver.OPTIMIZE_MASK_REGISTER_REUSE:
+     Let quantum operations use a register that already holds a mask, instead of
+     setting another register to the same mask first.
+
+  QISA_Driver.OPTIMIZE_BUNDLE_PACKING:
+     Pack the quantum operations of each timing point (a quantum bundle, and the
+     bundles with 'bs 0' that immediately follow it) into as few instructions as
+     possible, leaving out the QNOPs that fill unused positions.
+
+  QISA_Driver.OPTIMIZE_WAITS:
+     Merge adjacent QWAIT instructions, and fold a QWAIT into the bundle separator of
+     the quantum bundle that immediately follows it, if the sum fits.
 
 Parameters
 ----------
-qMapFilename: str File that specifies quantum instructions.
+optimizations: int  The optimizations to apply, or QISA_Driver.OPTIMIZE_NONE.
+");
+  void setOptimizations(unsigned int optimizations);
 
+  %feature("autodoc", "
 Returns
 -------
---> bool: True on success, false on failure.
+--> int: The optimizations that are applied, see setOptimizations().
+");
+  unsigned int getOptimizations() const;
 
-Note
-----
-On error, you can use getLastErrorMessage() to get a description of that error.
+  %feature("autodoc", "
+Returns
+-------
+--> QISA_Target: The target that is used by this driver, which holds the instruction
+                 specifications and the quantum layout information.
 ");
-  bool loadQuantumInstructions(const std::string& qMapFilename);
+  std::shared_ptr<const QISA_Target> getTarget() const;
 
   %feature("autodoc", "
-Load the quantum instructions that have been specified in the given maps into qisa-as.
+Use the given target for subsequent assemblies and disassemblies.
+The target is shared, not copied.
 
 Parameters
 ----------
-arg_none_map: qisa_qmap Specifies quantum instructions that do not have an argument.
-arg_st_map:   qisa_qmap Specifies quantum instructions that expect an s-register argument.
+target: QISA_Target  Target to use.
+");
+  void setTarget(std::shared_ptr<const QISA_Target> target);
+
+  %feature("autodoc", "
+Create a parametric template of the last assembled program.
+The integer symbols that are defined using '.def_sym' and used as immediate value of
+LDI, LDUI, QWAIT or MOV become the parameters of the template.
+
+Parameters
+----------
+programTemplate: QISA_ProgramTemplate  Receives the template.
+
+Returns
+-------
+--> bool: True on success, False if there is no successfully assembled program.
+");
+  bool getProgramTemplate(QISA_ProgramTemplate& programTemplate);
+
+  %feature("autodoc", "
+Analyze the control flow and the timing of the last assembled or disassembled program.
+See QISA_TimingAnalysis.
+
+Parameters
+----------
+analysis: QISA_TimingAnalysis  Receives the analysis.
+instructionsPerCycle: int      Number of instructions that the controller issues per
+                               quantum cycle, default 1.
+
+Returns
+-------
+--> bool: True on success, False if there is no assembled or disassembled program.
+");
+  bool analyzeTiming(QISA_TimingAnalysis& analysis, unsigned int instructionsPerCycle = 1);
+
+  %feature("autodoc", "
+Free the resources allocated by QISA_Driver and reset it, such that it can be used for assembly/disassembly again.
+NOTE: A reset() is done implicitly at each call to assemble()/disassemble().
+");
+  void reset();
+
+  %feature("autodoc", "
+Parse the contents of the given file that contains quantum instruction specifications.
+The quantum instruction definitions are specified using the following format:
+
+   def_q_arg_none['<instruction_name>'] = <opcode>
+   This specifies the quantum instructions that do not have an argument.
+
+   def_q_arg_st['<instruction_name>'] = <opcode>
+   This specifies the quantum instructions that expect an s-register argument.
+
+   def_q_arg_tt['<instruction_name>'] = <opcode>
+   This specifies the quantum instructions that expect a t-register argument.
+
+Parameters
+----------
+qMapFilename: str File that specifies quantum instructions.
+
+Returns
+-------
+--> bool: True on success, false on failure.
+
+Note
+----
+On error, you can use getLastErrorMessage() to get a description of that error.
+");
+  bool loadQuantumInstructions(const std::string& qMapFilename);
+
+  %feature("autodoc", "
+Load the quantum instructions that have been specified in the given maps into qisa-as.
+
+Parameters
+----------
+arg_none_map: qisa_qmap Specifies quantum instructions that do not have an argument.
+arg_st_map:   qisa_qmap Specifies quantum instructions that expect an s-register argument.
 arg_tt_map:   qisa_qmap Specifies quantum instructions that expect a t-register argument.
 
 Returns
@@ -240,3 +875,1034 @@ On error, you can use getLastErrorMessage() to get a description of that error.
 };
 
 }
+
+%extend QISA::QISA_ProgramTemplate
+{
+  %feature("autodoc", "
+Returns
+-------
+--> dict: The default value of each parameter, as defined in the source code,
+          keyed by parameter name.
+");
+  PyObject* getParameters()
+  {
+    const std::vector<std::string>& names = $self->getParameterNames();
+    const std::vector<int64_t>& values = $self->getDefaultValues();
+
+    PyObject* parameters = PyDict_New();
+    if (parameters == NULL)
+    {
+      return NULL;
+    }
+
+    for (size_t i = 0; i < names.size(); i++)
+    {
+      PyObject* value = PyLong_FromLongLong(values[i]);
+      if ((value == NULL) || (PyDict_SetItemString(parameters, names[i].c_str(), value) != 0))
+      {
+        Py_XDECREF(value);
+        Py_DECREF(parameters);
+        return NULL;
+      }
+      Py_DECREF(value);
+    }
+
+    return parameters;
+  }
+
+  %feature("autodoc", "
+Returns
+-------
+--> list of dict: The instruction fields that depend on the parameters. Each field
+                  is described by: 'parameter', 'address' (index of the instruction),
+                  'shift' and 'mask' (the field is encoded as (value >> shift) & mask),
+                  'min' and 'max' (valid range of the value) and 'location'.
+");
+  PyObject* getFields()
+  {
+    const std::vector<std::string>& names = $self->getParameterNames();
+    const std::vector<QISA::QISA_ProgramTemplate::Field>& fields = $self->getFields();
+
+    PyObject* fieldList = PyList_New(fields.size());
+    if (fieldList == NULL)
+    {
+      return NULL;
+    }
+
+    for (size_t i = 0; i < fields.size(); i++)
+    {
+      const QISA::QISA_ProgramTemplate::Field& field = fields[i];
+
+      PyObject* fieldDict =
+        Py_BuildValue("{s:s,s:n,s:I,s:I,s:L,s:L,s:s}",
+                      "parameter", names[field.parameterIndex].c_str(),
+                      "address", (Py_ssize_t)field.address,
+                      "shift", field.valueShift,
+                      "mask", (unsigned int)field.fieldMask,
+                      "min", (long long)field.minVal,
+                      "max", (long long)field.maxVal,
+                      "location", field.location.c_str());
+      if (fieldDict == NULL)
+      {
+        Py_DECREF(fieldList);
+        return NULL;
+      }
+
+      PyList_SET_ITEM(fieldList, i, fieldDict);
+    }
+
+    return fieldList;
+  }
+
+  %feature("autodoc", "
+Instantiate the template for the given parameter values.
+
+Parameters
+----------
+parameters: dict  Values of the parameters to set, keyed by parameter name.
+                  Parameters that are not given keep their default value.
+
+Returns
+-------
+--> bytes: The instantiated program, in the same form as returned by
+           QISA_Driver.getInstructionsAsBytes(), or None on failure.
+
+Note
+----
+On error, you can use getLastErrorMessage() to get a description of that error.
+");
+  PyObject* instantiate(PyObject* parameters)
+  {
+    if (!PyDict_Check(parameters))
+    {
+      PyErr_SetString(PyExc_TypeError, "parameters must be a dict");
+      return NULL;
+    }
+
+    std::vector<std::string> names;
+    std::vector<int64_t> values;
+
+    PyObject* key;
+    PyObject* value;
+    Py_ssize_t pos = 0;
+
+    while (PyDict_Next(parameters, &pos, &key, &value))
+    {
+      const char* name = PyUnicode_AsUTF8(key);
+      if (name == NULL)
+      {
+        return NULL;
+      }
+
+      long long intValue = PyLong_AsLongLong(value);
+      if ((intValue == -1) && PyErr_Occurred())
+      {
+        return NULL;
+      }
+
+      names.push_back(name);
+      values.push_back(intValue);
+    }
+
+    std::vector<QISA::QISA_ProgramTemplate::qisa_instruction_type> instructions;
+
+    if (!$self->instantiate(names, values, instructions))
+    {
+      Py_RETURN_NONE;
+    }
+
+    return PyBytes_FromStringAndSize((const char*)instructions.data(),
+                                     instructions.size() * sizeof(QISA::QISA_ProgramTemplate::qisa_instruction_type));
+  }
+
+  PyObject* _instantiateMany(PyObject* names, PyObject* columns,
+                             size_t nrOfPrograms, PyObject* output)
+  {
+    std::vector<std::string> parameterNames;
+    std::vector<Py_buffer> views;
+
+    // Release all buffers that have been acquired so far.
+    auto releaseViews = [&views]()
+    {
+      for (Py_buffer& view : views)
+      {
+        PyBuffer_Release(&view);
+      }
+    };
+
+    Py_ssize_t nrOfParameters = PySequence_Size(names);
+    if ((nrOfParameters < 0) || (PySequence_Size(columns) != nrOfParameters))
+    {
+      PyErr_SetString(PyExc_ValueError, "names and columns must be sequences of the same size");
+      return NULL;
+    }
+
+    for (Py_ssize_t i = 0; i < nrOfParameters; i++)
+    {
+      PyObject* name = PySequence_GetItem(names, i);
+      if (name == NULL)
+      {
+        releaseViews();
+        return NULL;
+      }
+
+      const char* nameStr = PyUnicode_AsUTF8(name);
+      if (nameStr != NULL)
+      {
+        parameterNames.push_back(nameStr);
+      }
+      Py_DECREF(name);
+
+      if (nameStr == NULL)
+      {
+        releaseViews();
+        return NULL;
+      }
+
+      PyObject* column = PySequence_GetItem(columns, i);
+      if (column == NULL)
+      {
+        releaseViews();
+        return NULL;
+      }
+
+      Py_buffer view;
+      int status = PyObject_GetBuffer(column, &view, PyBUF_C_CONTIGUOUS);
+      Py_DECREF(column);
+
+      if (status != 0)
+      {
+        releaseViews();
+        return NULL;
+      }
+
+      views.push_back(view);
+
+      if (view.len != (Py_ssize_t)(nrOfPrograms * sizeof(int64_t)))
+      {
+        releaseViews();
+        PyErr_SetString(PyExc_ValueError, "each column must hold one 64-bit integer per program");
+        return NULL;
+      }
+    }
+
+    Py_buffer outputView;
+    if (PyObject_GetBuffer(output, &outputView, PyBUF_C_CONTIGUOUS | PyBUF_WRITABLE) != 0)
+    {
+      releaseViews();
+      return NULL;
+    }
+
+    if (outputView.len != (Py_ssize_t)(nrOfPrograms * $self->getNrOfInstructions() *
+                                       sizeof(QISA::QISA_ProgramTemplate::qisa_instruction_type)))
+    {
+      PyBuffer_Release(&outputView);
+      releaseViews();
+      PyErr_SetString(PyExc_ValueError, "output has the wrong size");
+      return NULL;
+    }
+
+    std::vector<const int64_t*> parameterValues;
+    for (Py_buffer& view : views)
+    {
+      parameterValues.push_back((const int64_t*)view.buf);
+    }
+
+    bool success;
+
+    Py_BEGIN_ALLOW_THREADS
+    success = $self->instantiateMany(nrOfPrograms, parameterNames, parameterValues,
+                                     (QISA::QISA_ProgramTemplate::qisa_instruction_type*)outputView.buf);
+    Py_END_ALLOW_THREADS
+
+    PyBuffer_Release(&outputView);
+    releaseViews();
+
+    return PyBool_FromLong(success);
+  }
+
+  %pythoncode %{
+    def instantiateMany(self, parameters):
+        """
+        Instantiate the template for many parameter values at once.
+        This requires numpy.
+
+        Parameters
+        ----------
+        parameters: dict  Values of the parameters to set, keyed by parameter name.
+                          Each value is a 1-dimensional array-like of integers, holding
+                          one value per program; all of them must have the same length.
+                          Scalars are used for all programs. Parameters that are not
+                          given keep their default value.
+
+        Returns
+        -------
+        --> numpy.ndarray: 2-dimensional array of type uint32, holding one instantiated
+                           program per row, or None on failure.
+
+        Note
+        ----
+        On error, you can use getLastErrorMessage() to get a description of that error.
+        """
+        import numpy
+
+        names = list(parameters)
+        columns = [numpy.asarray(parameters[name]) for name in names]
+
+        for name, column in zip(names, columns):
+            if not numpy.issubdtype(column.dtype, numpy.integer):
+                raise TypeError("values of parameter '{}' must be integers, not {}".format(
+                    name, column.dtype))
+            if column.ndim > 1:
+                raise ValueError("values of parameter '{}' must be 1-dimensional".format(name))
+
+        lengths = set(len(column) for column in columns if column.ndim == 1)
+        if len(lengths) > 1:
+            raise ValueError("all parameters must have the same number of values")
+        nrOfPrograms = lengths.pop() if lengths else 1
+
+        columns = [numpy.ascontiguousarray(numpy.broadcast_to(column, (nrOfPrograms,)),
+                                           dtype=numpy.int64)
+                   for column in columns]
+
+        output = numpy.empty((nrOfPrograms, self.getNrOfInstructions()), dtype=numpy.uint32)
+
+        if not self._instantiateMany(names, columns, nrOfPrograms, output):
+            return None
+
+        return output
+  %}
+}
+
+%extend QISA::QISA_TimingAnalysis
+{
+  %feature("autodoc", "
+Returns
+-------
+--> dict: The totals of the program, with these keys:
+          'instructions':         Number of instructions.
+          'classic_instructions': Number of classic instructions, including QWAIT, BR and STOP.
+          'bundles':              Number of quantum bundle instructions.
+          'timing_points':        Number of timing points.
+          'blocks':               Number of basic blocks.
+          'loops':                Number of branches back to an earlier (or the same) block.
+          'cycles':               Sum of the cycles of all blocks.
+          'min_cycles':           Minimum number of cycles of a path through the program,
+                                  without repeating a loop.
+          'max_cycles':           Maximum number of cycles of such a path.
+          'register_waits':       True if the program holds a QWAITR instruction.
+");
+  PyObject* getSummary()
+  {
+    const QISA::QISA_TimingAnalysis::Summary& summary = $self->getSummary();
+
+    return Py_BuildValue("{s:K,s:K,s:K,s:K,s:K,s:K,s:K,s:K,s:K,s:N}",
+                         "instructions", (unsigned long long)summary.nrOfInstructions,
+                         "classic_instructions", (unsigned long long)summary.nrOfClassicInstructions,
+                         "bundles", (unsigned long long)summary.nrOfBundles,
+                         "timing_points", (unsigned long long)summary.nrOfTimingPoints,
+                         "blocks", (unsigned long long)summary.nrOfBlocks,
+                         "loops", (unsigned long long)summary.nrOfLoops,
+                         "cycles", (unsigned long long)summary.cycles,
+                         "min_cycles", (unsigned long long)summary.minCycles,
+                         "max_cycles", (unsigned long long)summary.maxCycles,
+                         "register_waits", PyBool_FromLong(summary.hasRegisterWaits));
+  }
+
+  %feature("autodoc", "
+Returns
+-------
+--> list of dict: The basic blocks, sorted by address. The first block is the entry of
+                  the program. Each block is described by:
+                  'begin' and 'end' (address of its first instruction, and of the
+                  instruction after its last instruction), 'label' (name of a label at
+                  its start, or ''), 'classic_instructions', 'bundles', 'timing_points',
+                  'cycles', 'register_wait' (True if it holds a QWAITR instruction),
+                  'reachable', 'min_start_cycles' and 'max_start_cycles' (cycles from the
+                  program entry to its start, without repeating a loop) and 'successors'
+                  (list of the indices of the blocks that may follow it).
+");
+  PyObject* getBlocks()
+  {
+    const std::vector<QISA::QISA_TimingAnalysis::Block>& blocks = $self->getBlocks();
+
+    PyObject* blockList = PyList_New(blocks.size());
+    if (blockList == NULL)
+    {
+      return NULL;
+    }
+
+    for (size_t i = 0; i < blocks.size(); i++)
+    {
+      const QISA::QISA_TimingAnalysis::Block& block = blocks[i];
+
+      PyObject* successors = PyList_New(block.successors.size());
+      if (successors == NULL)
+      {
+        Py_DECREF(blockList);
+        return NULL;
+      }
+      for (size_t j = 0; j < block.successors.size(); j++)
+      {
+        PyList_SET_ITEM(successors, j, PyLong_FromSize_t(block.successors[j]));
+      }
+
+      PyObject* blockDict =
+        Py_BuildValue("{s:K,s:K,s:s,s:K,s:K,s:K,s:K,s:N,s:N,s:K,s:K,s:N}",
+                      "begin", (unsigned long long)block.begin,
+                      "end", (unsigned long long)block.end,
+                      "label", block.label.c_str(),
+                      "classic_instructions", (unsigned long long)block.nrOfClassicInstructions,
+                      "bundles", (unsigned long long)block.nrOfBundles,
+                      "timing_points", (unsigned long long)block.nrOfTimingPoints,
+                      "cycles", (unsigned long long)block.cycles,
+                      "register_wait", PyBool_FromLong(block.hasRegisterWait),
+                      "reachable", PyBool_FromLong(block.isReachable),
+                      "min_start_cycles", (unsigned long long)block.minStartCycles,
+                      "max_start_cycles", (unsigned long long)block.maxStartCycles,
+                      "successors", successors);
+      if (blockDict == NULL)
+      {
+        Py_DECREF(blockList);
+        return NULL;
+      }
+
+      PyList_SET_ITEM(blockList, i, blockDict);
+    }
+
+    return blockList;
+  }
+
+  %feature("autodoc", "
+Returns
+-------
+--> list of dict: The timing points that may not be reached in time, sorted by address.
+                  Each of them is described by: 'address' (of the instruction that
+                  starts the timing point), 'instructions' (number of instructions to
+                  issue since the previous timing point, including the one at
+                  'address') and 'cycles' (number of cycles since the previous timing
+                  point).
+");
+  PyObject* getBottlenecks()
+  {
+    const std::vector<QISA::QISA_TimingAnalysis::Bottleneck>& bottlenecks = $self->getBottlenecks();
+
+    PyObject* bottleneckList = PyList_New(bottlenecks.size());
+    if (bottleneckList == NULL)
+    {
+      return NULL;
+    }
+
+    for (size_t i = 0; i < bottlenecks.size(); i++)
+    {
+      PyObject* bottleneckDict =
+        Py_BuildValue("{s:K,s:K,s:K}",
+                      "address", (unsigned long long)bottlenecks[i].address,
+                      "instructions", (unsigned long long)bottlenecks[i].nrOfInstructions,
+                      "cycles", (unsigned long long)bottlenecks[i].cycles);
+      if (bottleneckDict == NULL)
+      {
+        Py_DECREF(bottleneckList);
+        return NULL;
+      }
+
+      PyList_SET_ITEM(bottleneckList, i, bottleneckDict);
+    }
+
+    return bottleneckList;
+  }
+}
+
+%extend QISA::QISA_Target
+{
+  %feature("autodoc", "
+Retrieve the quantum instructions of this target, in the same form as accepted by
+QISA_Driver.loadQuantumInstructions().
+
+Returns
+-------
+--> tuple of dict: (arg_none_map, arg_st_map, arg_tt_map), each of which maps an
+                   instruction name to its opcode.
+");
+  PyObject* getQuantumInstructions()
+  {
+    QISA::QISA_Target::q_map_t arg_none_map;
+    QISA::QISA_Target::q_map_t arg_st_map;
+    QISA::QISA_Target::q_map_t arg_tt_map;
+
+    $self->getQuantumInstructions(arg_none_map, arg_st_map, arg_tt_map);
+
+    return Py_BuildValue("(NNN)",
+                         QisaOpcodeMapToDict(arg_none_map),
+                         QisaOpcodeMapToDict(arg_st_map),
+                         QisaOpcodeMapToDict(arg_tt_map));
+  }
+
+  %feature("autodoc", "
+Returns
+-------
+--> dict: The opcodes of the classic instructions, keyed by instruction name.
+");
+  PyObject* getClassicOpcodes()
+  {
+    return QisaOpcodeMapToDict($self->getClassicOpcodes());
+  }
+
+  %feature("autodoc", "
+Serialize this target into a compact binary form.
+
+Returns
+-------
+--> bytes: The serialized target, which can be turned into a target again using
+           fromBytes(), in the same version of the assembler.
+");
+  PyObject* toBytes()
+  {
+    std::string data = $self->serialize();
+
+    return PyBytes_FromStringAndSize(data.data(), data.size());
+  }
+
+  %feature("autodoc", "
+Create a target from the binary form that has been created by toBytes().
+
+Parameters
+----------
+data: bytes  The serialized target.
+
+Returns
+-------
+--> QISA_Target: The target.
+
+Raises
+------
+ValueError: If the data does not hold a target that has been serialized by this
+            version of the assembler.
+");
+  static std::shared_ptr<const QISA::QISA_Target> fromBytes(PyObject* data)
+  {
+    Py_buffer view;
+    if (PyObject_GetBuffer(data, &view, PyBUF_SIMPLE) != 0)
+    {
+      return nullptr;
+    }
+
+    std::string errorMessage;
+    std::shared_ptr<const QISA::QISA_Target> target =
+      QISA::QISA_Target::deserialize(std::string((const char*)view.buf, view.len), errorMessage);
+
+    PyBuffer_Release(&view);
+
+    if (!target)
+    {
+      PyErr_SetString(PyExc_ValueError, errorMessage.c_str());
+    }
+
+    return target;
+  }
+
+  %pythoncode %{
+    def __reduce__(self):
+        return (_target_from_bytes, (self.toBytes(),))
+  %}
+}
+
+%extend QISA::QISA_Driver
+{
+  %feature("autodoc", "
+Retrieve the quantum instructions that are currently loaded, in the same form as
+accepted by loadQuantumInstructions().
+
+Returns
+-------
+--> tuple of dict: (arg_none_map, arg_st_map, arg_tt_map), each of which maps an
+                   instruction name to its opcode.
+");
+  PyObject* getQuantumInstructions()
+  {
+    QISA::QISA_Driver::q_map_t arg_none_map;
+    QISA::QISA_Driver::q_map_t arg_st_map;
+    QISA::QISA_Driver::q_map_t arg_tt_map;
+
+    $self->getQuantumInstructions(arg_none_map, arg_st_map, arg_tt_map);
+
+    return Py_BuildValue("(NNN)",
+                         QisaOpcodeMapToDict(arg_none_map),
+                         QisaOpcodeMapToDict(arg_st_map),
+                         QisaOpcodeMapToDict(arg_tt_map));
+  }
+
+  %feature("autodoc", "
+Returns
+-------
+--> dict: The opcodes of the classic instructions, keyed by instruction name.
+");
+  PyObject* getClassicOpcodes()
+  {
+    return QisaOpcodeMapToDict($self->getClassicOpcodes());
+  }
+
+  %feature("autodoc", "
+Returns
+-------
+--> dict: The names of the branch conditions, keyed by their encoding.
+");
+  PyObject* getBranchConditionNames()
+  {
+    PyObject* dict = PyDict_New();
+    if (dict == NULL)
+    {
+      return NULL;
+    }
+
+    for (const auto& entry : $self->getBranchConditionNames())
+    {
+      PyObject* key = PyLong_FromLong(entry.first);
+      PyObject* value = PyUnicode_FromString(entry.second.c_str());
+      if ((key == NULL) || (value == NULL) || (PyDict_SetItem(dict, key, value) != 0))
+      {
+        Py_XDECREF(key);
+        Py_XDECREF(value);
+        Py_DECREF(dict);
+        return NULL;
+      }
+      Py_DECREF(key);
+      Py_DECREF(value);
+    }
+
+    return dict;
+  }
+
+  %feature("autodoc", "
+Retrieve the layout of the encoded instructions: the bit offsets and masks of the
+opcode and operand fields, as used to encode and decode instructions.
+
+Returns
+-------
+--> dict: The offsets and masks, keyed by their name (e.g. 'OPCODE_OFFSET').
+");
+  static PyObject* getEncodingConstants()
+  {
+    return QisaOpcodeMapToDict(QISA::QISA_Driver::getEncodingConstants());
+  }
+
+  %feature("autodoc", "
+Retrieve the statistics of the last assembly or disassembly, and of saving its output.
+They are collected for every assembly and disassembly, at almost no cost.
+
+Returns
+-------
+--> dict: The statistics, with these keys:
+          'total_seconds':                 Wall clock time of assemble() or disassemble().
+          'cache_lookup_seconds':          Time spent looking up the program in the cache.
+          'parse_seconds':                 Time spent scanning and parsing, including code generation.
+          'mask_validation_seconds':       Part of 'parse_seconds' spent validating SMIS and SMIT masks.
+          'deferred_instructions_seconds': Time spent resolving labels used before their definition.
+          'optimization_seconds':          Time spent in the optimizations, see setOptimizations().
+          'disassembly_labels_seconds':    Time spent determining branch destinations while disassembling.
+          'save_seconds':                  Time spent in save().
+          'cache_hit':                     True if the assembled program was taken from the cache.
+          'tokens':                        Number of tokens returned by the scanner.
+          'instructions':                  Number of generated or disassembled instructions.
+          'bundles':                       Number of quantum bundles.
+          'labels':                        Number of labels defined, or found while disassembling.
+          'deferred_labels':               Number of instructions that use a label before its definition.
+          'instructions_removed':          Number of instructions removed by the optimizations.
+          'redundant_mask_writes':         Number of SMIS and SMIT instructions removed because the
+                                           register already held the mask they set.
+          'reused_mask_registers':         Number of times a register that already held a mask has
+                                           been used instead of setting another register to it.
+          'packed_bundle_instructions':    Number of quantum bundle instructions removed by packing
+                                           the operations of a timing point into fewer of them.
+          'coalesced_waits':               Number of QWAIT instructions removed by merging them into
+                                           another QWAIT or the bundle separator of the next bundle.
+          'bytes_read':                    Size of the input, in bytes.
+          'bytes_written':                 Size of the output written by save(), in bytes.
+");
+  PyObject* getStats()
+  {
+    const QISA::QISA_Driver::Statistics& stats = $self->getStatistics();
+
+    return Py_BuildValue("{s:d,s:d,s:d,s:d,s:d,s:d,s:d,s:d,s:N,s:K,s:K,s:K,s:K,s:K,s:K,s:K,s:K,s:K,s:K,s:K,s:K}",
+                         "total_seconds", stats.totalSeconds,
+                         "cache_lookup_seconds", stats.cacheLookupSeconds,
+                         "parse_seconds", stats.parseSeconds,
+                         "mask_validation_seconds", stats.maskValidationSeconds,
+                         "deferred_instructions_seconds", stats.deferredInstructionsSeconds,
+                         "optimization_seconds", stats.optimizationSeconds,
+                         "disassembly_labels_seconds", stats.disassemblyLabelsSeconds,
+                         "save_seconds", stats.saveSeconds,
+                         "cache_hit", PyBool_FromLong(stats.cacheHit),
+                         "tokens", (unsigned long long)stats.nrOfTokens,
+                         "instructions", (unsigned long long)stats.nrOfInstructions,
+                         "bundles", (unsigned long long)stats.nrOfBundles,
+                         "labels", (unsigned long long)stats.nrOfLabels,
+                         "deferred_labels", (unsigned long long)stats.nrOfDeferredLabels,
+                         "instructions_removed", (unsigned long long)stats.nrOfInstructionsRemoved,
+                         "redundant_mask_writes", (unsigned long long)stats.nrOfRedundantMaskWrites,
+                         "reused_mask_registers", (unsigned long long)stats.nrOfReusedMaskRegisters,
+                         "packed_bundle_instructions", (unsigned long long)stats.nrOfPackedBundleInstructions,
+                         "coalesced_waits", (unsigned long long)stats.nrOfCoalescedWaits,
+                         "bytes_read", (unsigned long long)stats.bytesRead,
+                         "bytes_written", (unsigned long long)stats.bytesWritten);
+  }
+
+  %feature("autodoc", "
+Assemble the source code held in the given bytes-like object (bytes, bytearray, memoryview, ...).
+
+Parameters
+----------
+data: bytes      Buffer that contains QISA assembly source code.
+sourceName: str  Name that is used to refer to the source in error messages (optional).
+
+Returns
+-------
+--> bool: True on success, false on failure.
+
+Note
+----
+On error, you can use getLastErrorMessage() to get a description of that error.
+");
+  PyObject* assembleBytes(PyObject* data, const std::string& sourceName = "<bytes>")
+  {
+    if (!QisaCheckInstructionsNotExported($self))
+    {
+      return NULL;
+    }
+
+    Py_buffer view;
+    if (PyObject_GetBuffer(data, &view, PyBUF_SIMPLE) != 0)
+    {
+      return NULL;
+    }
+
+    bool success;
+
+    Py_BEGIN_ALLOW_THREADS
+    success = $self->assembleBytes((const char*)view.buf, view.len, sourceName);
+    Py_END_ALLOW_THREADS
+
+    PyBuffer_Release(&view);
+
+    return PyBool_FromLong(success);
+  }
+
+  %feature("autodoc", "
+Retrieve the generated code as a bytes object that holds the encoded instructions.
+Each instruction is stored as a 32-bit word in native byte order, exactly as save() writes it to file
+in the default assembly format.
+
+Returns
+-------
+--> bytes: The encoded instructions.
+");
+  PyObject* getInstructionsAsBytes()
+  {
+    const std::vector<QISA::QISA_Driver::qisa_instruction_type>& instructions =
+      $self->getInstructions();
+
+    return PyBytes_FromStringAndSize((const char*)instructions.data(),
+                                     instructions.size() * sizeof(QISA::QISA_Driver::qisa_instruction_type));
+  }
+
+  %feature("autodoc", "
+Retrieve the generated code in the format that has been set using setAssemblyFormat(),
+exactly as save() writes it to file.
+
+Returns
+-------
+--> bytes: The assembly output, or None if there is nothing to save.
+
+Note
+----
+On error, you can use getLastErrorMessage() to get a description of that error.
+");
+  PyObject* getAssemblyOutput()
+  {
+    std::string output;
+
+    if (!$self->getAssemblyOutput(output))
+    {
+      Py_RETURN_NONE;
+    }
+
+    return PyBytes_FromStringAndSize(output.data(), output.size());
+  }
+
+  PyObject* _assembleMany(PyObject* sources, unsigned int nrOfWorkers)
+  {
+    PyObject* sourcesSeq = PySequence_Fast(sources, "sources must be a sequence");
+    if (sourcesSeq == NULL)
+    {
+      return NULL;
+    }
+
+    Py_ssize_t nrOfSources = PySequence_Fast_GET_SIZE(sourcesSeq);
+    std::vector<QISA::QISA_Driver::AssemblyInput> inputs(nrOfSources);
+
+    for (Py_ssize_t i = 0; i < nrOfSources; i++)
+    {
+      PyObject* source = PySequence_Fast_GET_ITEM(sourcesSeq, i);
+      QISA::QISA_Driver::AssemblyInput& input = inputs[i];
+
+      if (PyUnicode_Check(source))
+      {
+        // A string specifies the name of the file to assemble.
+        Py_ssize_t size;
+        const char* name = PyUnicode_AsUTF8AndSize(source, &size);
+        if (name == NULL)
+        {
+          Py_DECREF(sourcesSeq);
+          return NULL;
+        }
+
+        input.isInMemory = false;
+        input.name.assign(name, size);
+      }
+      else if (PyObject_CheckBuffer(source))
+      {
+        // A bytes-like object holds the source code itself.
+        Py_buffer view;
+        if (PyObject_GetBuffer(source, &view, PyBUF_SIMPLE) != 0)
+        {
+          Py_DECREF(sourcesSeq);
+          return NULL;
+        }
+
+        input.isInMemory = true;
+        input.name = "<source " + std::to_string(i) + ">";
+        input.source.assign((const char*)view.buf, view.len);
+        PyBuffer_Release(&view);
+      }
+      else
+      {
+        PyErr_Format(PyExc_TypeError,
+                     "sources[%zd] must be a file name (str) or a bytes-like object, not '%.200s'",
+                     i, Py_TYPE(source)->tp_name);
+        Py_DECREF(sourcesSeq);
+        return NULL;
+      }
+    }
+
+    Py_DECREF(sourcesSeq);
+
+    std::vector<QISA::QISA_Driver::AssemblyResult> results;
+
+    Py_BEGIN_ALLOW_THREADS
+    results = $self->assembleMany(inputs, nrOfWorkers);
+    Py_END_ALLOW_THREADS
+
+    PyObject* resultList = PyList_New(results.size());
+    if (resultList == NULL)
+    {
+      return NULL;
+    }
+
+    for (size_t i = 0; i < results.size(); i++)
+    {
+      const QISA::QISA_Driver::AssemblyResult& result = results[i];
+
+      PyObject* instructions =
+        PyBytes_FromStringAndSize((const char*)result.instructions.data(),
+                                  result.instructions.size() * sizeof(QISA::QISA_Driver::qisa_instruction_type));
+      if (instructions == NULL)
+      {
+        Py_DECREF(resultList);
+        return NULL;
+      }
+
+      PyObject* resultTuple =
+        Py_BuildValue("(NNs#)",
+                      PyBool_FromLong(result.success),
+                      instructions,
+                      result.errorMessage.data(),
+                      (Py_ssize_t)result.errorMessage.size());
+      if (resultTuple == NULL)
+      {
+        Py_DECREF(resultList);
+        return NULL;
+      }
+
+      PyList_SET_ITEM(resultList, i, resultTuple);
+    }
+
+    return resultList;
+  }
+
+  %feature("autodoc", "
+Retrieve one disassembled instruction, without rendering the rest of the disassembly output.
+
+Parameters
+----------
+address: int  Address (index) of the instruction.
+
+Returns
+-------
+--> tuple of str: The name of the label of the instruction (empty if it is not a branch
+                  destination) and the disassembled instruction, or None if there is no
+                  instruction at the given address or it could not be disassembled.
+");
+  PyObject* getDisassembledInstruction(uint64_t address)
+  {
+    std::string label;
+    std::string instruction;
+
+    if (!$self->getDisassembledInstruction(address, label, instruction))
+    {
+      Py_RETURN_NONE;
+    }
+
+    return Py_BuildValue("(s#s#)",
+                         label.data(), (Py_ssize_t)label.size(),
+                         instruction.data(), (Py_ssize_t)instruction.size());
+  }
+
+  PyObject* _getDisassemblyLines(uint64_t firstAddress, size_t maxNrOfLines)
+  {
+    std::string lines;
+    bool success;
+
+    Py_BEGIN_ALLOW_THREADS
+    success = $self->getDisassemblyLines(firstAddress, maxNrOfLines, lines);
+    Py_END_ALLOW_THREADS
+
+    return Py_BuildValue("(Ns#)", PyBool_FromLong(success), lines.data(), (Py_ssize_t)lines.size());
+  }
+
+  %pythoncode %{
+    def iterDisassemblyOutput(self, linesPerChunk=4096):
+        """
+        Iterate over the disassembly output, one line at a time.
+        In streaming mode (see enableStreamingDisassembly()), the instructions are
+        disassembled while iterating, so the disassembly output of a large input file
+        is never held in memory completely.
+
+        Parameters
+        ----------
+        linesPerChunk: int  Number of instructions that are disassembled at once.
+
+        Returns
+        -------
+        --> generator of str: The disassembly output, one instruction per line,
+                              without line terminator.
+
+        Raises
+        ------
+        RuntimeError: If an instruction could not be disassembled, after the lines up
+                      to and including that instruction have been produced.
+        """
+        address = 0
+        while True:
+            success, lines = self._getDisassemblyLines(address, linesPerChunk)
+            if not lines:
+                if not success:
+                    raise RuntimeError(self.getLastErrorMessage())
+                return
+            yield from lines.splitlines()
+            if not success:
+                raise RuntimeError(self.getLastErrorMessage())
+            address += linesPerChunk
+  %}
+
+  PyObject* _getInstructionBuffer(PyObject* owner)
+  {
+    const std::vector<QISA::QISA_Driver::qisa_instruction_type>& instructions =
+      $self->getInstructions();
+
+    QisaInstructionBuffer* exporter =
+      PyObject_New(QisaInstructionBuffer, &QisaInstructionBuffer_Type);
+    if (exporter == NULL)
+    {
+      return NULL;
+    }
+
+    Py_INCREF(owner);
+    exporter->owner = owner;
+    exporter->driver = $self;
+    exporter->data = instructions.data();
+    exporter->nrOfInstructions = instructions.size();
+
+    PyObject* view = PyMemoryView_FromObject((PyObject*)exporter);
+    Py_DECREF(exporter);
+
+    return view;
+  }
+
+  %pythoncode %{
+    def getInstructionBuffer(self):
+        """
+        Retrieve the generated code as a read-only memoryview (format 'I', one 32-bit
+        unsigned integer per instruction), without copying the instructions.
+        The result can be passed to e.g. numpy.frombuffer(buf, dtype=numpy.uint32),
+        hashlib, or file.write().
+
+        Returns
+        -------
+        --> memoryview: View on the encoded instructions.
+
+        Note
+        ----
+        The view refers to the instructions held by this driver. As long as it (or an
+        object created from it, such as a numpy array) has not been released, calling
+        assemble(), assembleString(), assembleBytes(), disassemble() or reset() on this
+        driver raises a BufferError. Use getInstructionsAsBytes() or copy the view to
+        keep the instructions while the driver is used again.
+        """
+        return self._getInstructionBuffer(self)
+  %}
+}
+
+%pythoncode %{
+import collections as _collections
+import os as _os
+
+
+def _target_from_bytes(data):
+    """
+    Used to unpickle a QISA_Target.
+    """
+    return QISA_Target.fromBytes(data)
+
+
+AssemblyResult = _collections.namedtuple('AssemblyResult', ['success', 'instructions', 'error'])
+AssemblyResult.__doc__ = """
+Result of assembling a single program using assemble_many().
+
+success: bool       -- True if the program has been assembled successfully.
+instructions: bytes -- The generated instructions, in the same form as returned by
+                       QISA_Driver.getInstructionsAsBytes(). Empty on failure.
+error: str          -- Description of the error, in case of failure.
+"""
+
+
+def assemble_many(sources, target, workers=None):
+    """
+    Assemble a number of programs in parallel, using a pool of native worker threads.
+
+    Each worker uses its own driver, which is configured once with the quantum layout
+    information and quantum instructions that have been loaded into the given target.
+    The target itself is not modified. The GIL is released while assembling.
+
+    Parameters
+    ----------
+    sources: iterable  Programs to assemble. Each item is either the name of a file
+                       that contains QISA assembly source code (str or os.PathLike), or
+                       a bytes-like object that holds the source code itself.
+    target: QISA_Driver Driver that has been configured using read() and, optionally,
+                       loadQuantumInstructions().
+    workers: int       Number of worker threads to use.
+                       If None, the number of hardware threads is used.
+
+    Returns
+    -------
+    --> list(AssemblyResult): One result per program, in the same order as the sources.
+    """
+    if workers is not None and workers < 1:
+        raise ValueError("workers must be at least 1")
+
+    sources = [source if isinstance(source, (bytes, bytearray, memoryview)) else _os.fspath(source)
+               for source in sources]
+
+    return [AssemblyResult(*result)
+            for result in target._assembleMany(sources, workers or 0)]
+%}
@@ -0,0 +1,527 @@
+#include <fstream>
+#include <sstream>
+#include <iomanip>
+#include <algorithm>
+#include <cstdio>
+#include <cstring>
+#include <ctime>
+
+#include <sys/types.h>
+#include <sys/stat.h>
+
+#ifdef _WIN32
+#include <windows.h>
+#include <direct.h>
+#include <process.h>
+#include <sys/utime.h>
+#else
+#include <dirent.h>
+#include <unistd.h>
+#include <utime.h>
+#endif
+
+#include "qisa_assembly_cache.h"
+
+namespace QISA
+{
+
+namespace
+{
+
+// Extension of the files that hold the cache entries.
+const char* ENTRY_EXTENSION = ".qbin";
+
+/**
+ * Minimal SHA-256 implementation (FIPS 180-4), used to compute the keys
+ * of the cache entries.
+ */
+class Sha256
+{
+public:
+  Sha256()
+    : _length(0)
+    , _bufferSize(0)
+  {
+    static const uint32_t init[8] = {
+      0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a,
+      0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19
+    };
+    std::copy(init, init + 8, _state);
+  }
+
+  void
+  update(const void* data, size_t size)
+  {
+    const uint8_t* bytes = static_cast<const uint8_t*>(data);
+    _length += size;
+
+    while (size > 0)
+    {
+      size_t n = std::min(size, sizeof(_buffer) - _bufferSize);
+      std::memcpy(_buffer + _bufferSize, bytes, n);
+      _bufferSize += n;
+      bytes += n;
+      size -= n;
+
+      if (_bufferSize == sizeof(_buffer))
+      {
+        transform(_buffer);
+        _bufferSize = 0;
+      }
+    }
+  }
+
+  std::string
+  hexDigest()
+  {
+    uint64_t bitLength = _length * 8;
+
+    uint8_t padding[72] = { 0x80 };
+    size_t paddingSize = (_bufferSize < 56) ? (56 - _bufferSize) : (120 - _bufferSize);
+    update(padding, paddingSize);
+
+    uint8_t lengthBytes[8];
+    for (int i = 0; i < 8; i++)
+    {
+      lengthBytes[i] = static_cast<uint8_t>(bitLength >> (56 - 8 * i));
+    }
+    update(lengthBytes, 8);
+
+    std::ostringstream ss;
+    for (int i = 0; i < 8; i++)
+    {
+      ss << std::hex << std::setfill('0') << std::setw(8) << _state[i];
+    }
+    return ss.str();
+  }
+
+private:
+  static uint32_t
+  rotr(uint32_t x, int n)
+  {
+    return (x >> n) | (x << (32 - n));
+  }
+
+  void
+  transform(const uint8_t* block)
+  {
+    static const uint32_t k[64] = {
+      0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
+      0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
+      0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+      0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
+      0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
+      0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+      0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+      0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2
+    };
+
+    uint32_t w[64];
+    for (int i = 0; i < 16; i++)
+    {
+      w[i] = (uint32_t(block[4 * i]) << 24) | (uint32_t(block[4 * i + 1]) << 16) |
+             (uint32_t(block[4 * i + 2]) << 8) | uint32_t(block[4 * i + 3]);
+    }
+    for (int i = 16; i < 64; i++)
+    {
+      uint32_t s0 = rotr(w[i - 15], 7) ^ rotr(w[i - 15], 18) ^ (w[i - 15] >> 3);
+      uint32_t s1 = rotr(w[i - 2], 17) ^ rotr(w[i - 2], 19) ^ (w[i - 2] >> 10);
+      w[i] = w[i - 16] + s0 + w[i - 7] + s1;
+    }
+
+    uint32_t a = _state[0], b = _state[1], c = _state[2], d = _state[3];
+    uint32_t e = _state[4], f = _state[5], g = _state[6], h = _state[7];
+
+    for (int i = 0; i < 64; i++)
+    {
+      uint32_t s1 = rotr(e, 6) ^ rotr(e, 11) ^ rotr(e, 25);
+      uint32_t ch = (e & f) ^ (~e & g);
+      uint32_t t1 = h + s1 + ch + k[i] + w[i];
+      uint32_t s0 = rotr(a, 2) ^ rotr(a, 13) ^ rotr(a, 22);
+      uint32_t maj = (a & b) ^ (a & c) ^ (b & c);
+      uint32_t t2 = s0 + maj;
+
+      h = g; g = f; f = e; e = d + t1;
+      d = c; c = b; b = a; a = t1 + t2;
+    }
+
+    _state[0] += a; _state[1] += b; _state[2] += c; _state[3] += d;
+    _state[4] += e; _state[5] += f; _state[6] += g; _state[7] += h;
+  }
+
+  uint32_t _state[8];
+  uint64_t _length;
+  uint8_t _buffer[64];
+  size_t _bufferSize;
+};
+
+// Information about a single cache entry file.
+struct EntryInfo
+{
+  std::string filename;
+  uint64_t size;
+  time_t lastUse;
+};
+
+/**
+ * @return True if the given name ends with the given suffix.
+ */
+bool
+endsWith(const std::string& name, const std::string& suffix)
+{
+  return (name.size() >= suffix.size()) &&
+         (name.compare(name.size() - suffix.size(), suffix.size(), suffix) == 0);
+}
+
+/**
+ * Create the given directory, including its parent directories.
+ */
+void
+makeDirectories(const std::string& directory)
+{
+  for (size_t pos = directory.find_first_of("/\\", 1);
+       ;
+       pos = directory.find_first_of("/\\", pos + 1))
+  {
+    std::string dir = directory.substr(0, pos);
+#ifdef _WIN32
+    _mkdir(dir.c_str());
+#else
+    mkdir(dir.c_str(), 0777);
+#endif
+    if (pos == std::string::npos)
+    {
+      break;
+    }
+  }
+}
+
+/**
+ * List the cache entry files in the given directory.
+ */
+std::vector<EntryInfo>
+listEntries(const std::string& directory)
+{
+  std::vector<EntryInfo> entries;
+  std::vector<std::string> names;
+
+#ifdef _WIN32
+  WIN32_FIND_DATAA findData;
+  HANDLE findHandle = FindFirstFileA((directory + "\\*").c_str(), &findData);
+  if (findHandle != INVALID_HANDLE_VALUE)
+  {
+    do
+    {
+      names.push_back(findData.cFileName);
+    } while (FindNextFileA(findHandle, &findData));
+    FindClose(findHandle);
+  }
+#else
+  DIR* dir = opendir(directory.c_str());
+  if (dir != NULL)
+  {
+    for (struct dirent* entry = readdir(dir); entry != NULL; entry = readdir(dir))
+    {
+      names.push_back(entry->d_name);
+    }
+    closedir(dir);
+  }
+#endif
+
+  for (const auto& name : names)
+  {
+    if (!endsWith(name, ENTRY_EXTENSION))
+    {
+      continue;
+    }
+
+    EntryInfo info;
+    info.filename = directory + "/" + name;
+
+    struct stat st;
+    if (stat(info.filename.c_str(), &st) == 0)
+    {
+      info.size = st.st_size;
+      info.lastUse = st.st_mtime;
+      entries.push_back(info);
+    }
+  }
+
+  return entries;
+}
+
+/**
+ * Atomically replace 'to' by 'from'.
+ *
+ * @return True on success.
+ */
+bool
+renameFile(const std::string& from, const std::string& to)
+{
+#ifdef _WIN32
+  return MoveFileExA(from.c_str(), to.c_str(), MOVEFILE_REPLACE_EXISTING) != 0;
+#else
+  return std::rename(from.c_str(), to.c_str()) == 0;
+#endif
+}
+
+/**
+ * Mark the given file as used now, by updating its modification time.
+ */
+void
+touchFile(const std::string& filename)
+{
+#ifdef _WIN32
+  _utime(filename.c_str(), NULL);
+#else
+  utime(filename.c_str(), NULL);
+#endif
+}
+
+/**
+ * @return The id of this process.
+ */
+long
+getProcessId()
+{
+#ifdef _WIN32
+  return _getpid();
+#else
+  return getpid();
+#endif
+}
+
+} /* end anonymous namespace */
+
+
+QISA_AssemblyCache::QISA_AssemblyCache(const std::string& directory,
+                                       uint64_t maxSizeBytes)
+  : _directory(directory)
+  , _maxSizeBytes(maxSizeBytes)
+  , _sizeBytes(0)
+  , _hits(0)
+  , _misses(0)
+  , _stores(0)
+  , _evictions(0)
+  , _tmpCounter(0)
+{
+  // Strip trailing path separators.
+  while ((_directory.size() > 1) &&
+         ((_directory.back() == '/') || (_directory.back() == '\\')))
+  {
+    _directory.pop_back();
+  }
+
+  makeDirectories(_directory);
+
+  uint64_t sizeBytes = 0;
+  for (const auto& entry : listEntries(_directory))
+  {
+    sizeBytes += entry.size;
+  }
+  _sizeBytes = sizeBytes;
+}
+
+std::string
+QISA_AssemblyCache::computeKey(const std::vector<const std::string*>& parts)
+{
+  Sha256 sha;
+
+  for (const std::string* part : parts)
+  {
+    uint64_t size = part->size();
+    uint8_t sizeBytes[8];
+    for (int i = 0; i < 8; i++)
+    {
+      sizeBytes[i] = static_cast<uint8_t>(size >> (8 * i));
+    }
+
+    sha.update(sizeBytes, sizeof(sizeBytes));
+    sha.update(part->data(), part->size());
+  }
+
+  return sha.hexDigest();
+}
+
+std::string
+QISA_AssemblyCache::getEntryFilename(const std::string& key) const
+{
+  return _directory + "/" + key + ENTRY_EXTENSION;
+}
+
+bool
+QISA_AssemblyCache::lookup(const std::string& key,
+                           std::vector<qisa_instruction_type>& instructions)
+{
+  std::string filename = getEntryFilename(key);
+  std::ifstream entryFile(filename, std::ios::binary | std::ios::ate);
+
+  if (entryFile.is_open())
+  {
+    std::streamoff size = entryFile.tellg();
+
+    if ((size >= 0) && (size % sizeof(qisa_instruction_type) == 0))
+    {
+      instructions.resize(size / sizeof(qisa_instruction_type));
+      entryFile.seekg(0);
+
+      if (entryFile.read(reinterpret_cast<char*>(instructions.data()), size))
+      {
+        entryFile.close();
+        touchFile(filename);
+        _hits++;
+        return true;
+      }
+    }
+
+    instructions.clear();
+  }
+
+  _misses++;
+  return false;
+}
+
+bool
+QISA_AssemblyCache::store(const std::string& key,
+                          const std::vector<qisa_instruction_type>& instructions)
+{
+  std::string filename = getEntryFilename(key);
+
+  // Write to a temporary file first, and rename it afterwards.
+  // This makes sure that others never see a partially written entry.
+  std::ostringstream tmpFilename;
+  tmpFilename << filename << ".tmp" << getProcessId() << "_" << _tmpCounter++;
+
+  uint64_t size = instructions.size() * sizeof(qisa_instruction_type);
+  {
+    std::ofstream tmpFile(tmpFilename.str(), std::ios::binary | std::ios::trunc);
+    if (!tmpFile.is_open())
+    {
+      return false;
+    }
+
+    tmpFile.write(reinterpret_cast<const char*>(instructions.data()), size);
+    tmpFile.close();
+
+    if (tmpFile.fail())
+    {
+      std::remove(tmpFilename.str().c_str());
+      return false;
+    }
+  }
+
+  if (!renameFile(tmpFilename.str(), filename))
+  {
+    std::remove(tmpFilename.str().c_str());
+    return false;
+  }
+
+  _stores++;
+
+  if ((_sizeBytes += size) > _maxSizeBytes)
+  {
+    evict();
+  }
+
+  return true;
+}
+
+void
+QISA_AssemblyCache::evict()
+{
+  std::lock_guard<std::mutex> lock(_evictionMutex);
+
+  std::vector<EntryInfo> entries = listEntries(_directory);
+
+  uint64_t sizeBytes = 0;
+  for (const auto& entry : entries)
+  {
+    sizeBytes += entry.size;
+  }
+
+  if (sizeBytes > _maxSizeBytes)
+  {
+    // Remove the least recently used entries first.
+    std::sort(entries.begin(), entries.end(),
+              [](const EntryInfo& lhs, const EntryInfo& rhs)
+              {
+                return lhs.lastUse < rhs.lastUse;
+              });
+
+    for (const auto& entry : entries)
+    {
+      if (sizeBytes <= _maxSizeBytes)
+      {
+        break;
+      }
+
+      if (std::remove(entry.filename.c_str()) == 0)
+      {
+        sizeBytes -= entry.size;
+        _evictions++;
+      }
+    }
+  }
+
+  _sizeBytes = sizeBytes;
+}
+
+void
+QISA_AssemblyCache::clear()
+{
+  std::lock_guard<std::mutex> lock(_evictionMutex);
+
+  for (const auto& entry : listEntries(_directory))
+  {
+    std::remove(entry.filename.c_str());
+  }
+
+  _sizeBytes = 0;
+}
+
+const std::string&
+QISA_AssemblyCache::getDirectory() const
+{
+  return _directory;
+}
+
+uint64_t
+QISA_AssemblyCache::getMaxSizeBytes() const
+{
+  return _maxSizeBytes;
+}
+
+uint64_t
+QISA_AssemblyCache::getHits() const
+{
+  return _hits;
+}
+
+uint64_t
+QISA_AssemblyCache::getMisses() const
+{
+  return _misses;
+}
+
+uint64_t
+QISA_AssemblyCache::getStores() const
+{
+  return _stores;
+}
+
+uint64_t
+QISA_AssemblyCache::getEvictions() const
+{
+  return _evictions;
+}
+
+void
+QISA_AssemblyCache::resetStatistics()
+{
+  _hits = 0;
+  _misses = 0;
+  _stores = 0;
+  _evictions = 0;
+}
+
+} /* end namespace QISA */
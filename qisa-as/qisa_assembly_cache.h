@@ -0,0 +1,180 @@
+#pragma once
+
+#include <string>
+#include <vector>
+#include <atomic>
+#include <mutex>
+#include <cstdint>
+
+#ifndef DllExport
+#ifdef _WIN32
+#define DllExport __declspec(dllexport)
+#else
+#define DllExport
+#endif
+#endif
+
+namespace QISA
+{
+
+/**
+ * This class implements a content-addressed, on-disk cache of assembled
+ * programs.
+ *
+ * Each entry is stored in its own file in the cache directory, named after
+ * its key. The key is a SHA-256 hash of everything that determines the
+ * assembly result (see computeKey()), so that a cache hit can return the
+ * stored instructions without lexing or parsing the source code.
+ *
+ * Entries are written to a temporary file first, which is then renamed to
+ * its final name. This way, multiple processes can safely share the same
+ * cache directory.
+ *
+ * The total size of the cache is limited. When it grows beyond this limit,
+ * the least recently used entries are removed. The modification time of an
+ * entry file is used as its last use time, and is updated on each hit.
+ *
+ * A single cache can be used by multiple drivers at the same time, also
+ * from different threads.
+ */
+class QISA_AssemblyCache
+{
+public:
+
+  // Currently, instructions are encoded in 32 bits.
+  typedef uint32_t qisa_instruction_type;
+
+  /**
+   * Constructor.
+   *
+   * @param[in] directory    Directory in which the cache entries are stored.
+   *                         It is created if it does not exist yet.
+   * @param[in] maxSizeBytes Maximum total size of the cache entries, in bytes.
+   */
+  DllExport
+  QISA_AssemblyCache(const std::string& directory,
+                     uint64_t maxSizeBytes = DEFAULT_MAX_SIZE_BYTES);
+
+  DllExport virtual
+  ~QISA_AssemblyCache()
+  {}
+
+  /**
+   * Compute the key of a cache entry.
+   *
+   * @param[in] parts Everything that determines the assembly result, such as
+   *                  the assembler version, its configuration and the source code.
+   *                  The parts are hashed in order, each one prefixed by its size.
+   *
+   * @return The key, as a hexadecimal string.
+   */
+  DllExport static std::string
+  computeKey(const std::vector<const std::string*>& parts);
+
+  /**
+   * Lookup the entry with the given key.
+   *
+   * @param[in]  key          Key of the entry, as returned by computeKey().
+   * @param[out] instructions Receives the stored instructions on a hit.
+   *
+   * @return True on a hit, false on a miss.
+   */
+  DllExport bool
+  lookup(const std::string& key, std::vector<qisa_instruction_type>& instructions);
+
+  /**
+   * Store an entry with the given key.
+   * This may remove least recently used entries, to keep the size of the
+   * cache within its limit.
+   *
+   * @param[in] key          Key of the entry, as returned by computeKey().
+   * @param[in] instructions The instructions to store.
+   *
+   * @return True on success, false if the entry could not be written.
+   *
+   * @note
+   *   A failure to store an entry is not fatal: it only means that the
+   *   program has to be assembled again next time.
+   */
+  DllExport bool
+  store(const std::string& key, const std::vector<qisa_instruction_type>& instructions);
+
+  /**
+   * Remove all entries from the cache directory.
+   */
+  DllExport void
+  clear();
+
+  /** @return The directory in which the cache entries are stored. */
+  DllExport const std::string&
+  getDirectory() const;
+
+  /** @return The maximum total size of the cache entries, in bytes. */
+  DllExport uint64_t
+  getMaxSizeBytes() const;
+
+  /** @return The number of lookups that found an entry. */
+  DllExport uint64_t
+  getHits() const;
+
+  /** @return The number of lookups that did not find an entry. */
+  DllExport uint64_t
+  getMisses() const;
+
+  /** @return The number of entries that have been stored. */
+  DllExport uint64_t
+  getStores() const;
+
+  /** @return The number of entries that have been removed to stay within the size limit. */
+  DllExport uint64_t
+  getEvictions() const;
+
+  /**
+   * Reset the hit, miss, store and eviction counters to zero.
+   */
+  DllExport void
+  resetStatistics();
+
+  // Default maximum total size of the cache entries: 256 MiB.
+  static const uint64_t DEFAULT_MAX_SIZE_BYTES = 256ULL * 1024 * 1024;
+
+private:
+
+  /**
+   * @return The name of the file that holds the entry with the given key.
+   */
+  std::string
+  getEntryFilename(const std::string& key) const;
+
+  /**
+   * Remove least recently used entries until the total size of the cache
+   * is within its limit.
+   */
+  void
+  evict();
+
+  // Directory in which the cache entries are stored.
+  std::string _directory;
+
+  // Maximum total size of the cache entries, in bytes.
+  uint64_t _maxSizeBytes;
+
+  // (Estimated) total size of the cache entries, in bytes.
+  // Other processes may add entries as well, so this is corrected each time
+  // the cache directory is scanned for eviction.
+  std::atomic<uint64_t> _sizeBytes;
+
+  // Statistics.
+  std::atomic<uint64_t> _hits;
+  std::atomic<uint64_t> _misses;
+  std::atomic<uint64_t> _stores;
+  std::atomic<uint64_t> _evictions;
+
+  // Used to generate unique temporary file names within this process.
+  std::atomic<uint64_t> _tmpCounter;
+
+  // Serializes evictions within this process.
+  std::mutex _evictionMutex;
+};
+
+} /* end namespace QISA */
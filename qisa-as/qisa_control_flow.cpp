@@ -0,0 +1,133 @@
+#include <algorithm>
+
+#include "qisa_control_flow.h"
+
+namespace QISA
+{
+
+void
+QISA_ControlFlowGraph::build(uint64_t nrOfInstructions,
+                             const std::vector<ControlTransfer>& transfers,
+                             std::vector<uint64_t> leaders)
+{
+  _blocks.clear();
+
+  if (nrOfInstructions == 0)
+  {
+    return;
+  }
+
+  // A block starts at the entry of the program, at each branch destination,
+  // and after each control transfer.
+  leaders.push_back(0);
+  for (const ControlTransfer& transfer : transfers)
+  {
+    if (transfer.hasDestination)
+    {
+      leaders.push_back(transfer.destination);
+    }
+    leaders.push_back(transfer.address + 1);
+  }
+
+  std::sort(leaders.begin(), leaders.end());
+  leaders.erase(std::unique(leaders.begin(), leaders.end()), leaders.end());
+  leaders.erase(std::lower_bound(leaders.begin(), leaders.end(), nrOfInstructions), leaders.end());
+
+  _blocks.resize(leaders.size());
+  for (size_t i = 0; i < leaders.size(); i++)
+  {
+    _blocks[i].begin = leaders[i];
+    _blocks[i].end = (i + 1 < leaders.size()) ? leaders[i + 1] : nrOfInstructions;
+  }
+
+  auto nextTransfer = transfers.begin();
+
+  for (size_t i = 0; i < _blocks.size(); i++)
+  {
+    BasicBlock& block = _blocks[i];
+    const uint64_t last = block.end - 1;
+
+    while ((nextTransfer != transfers.end()) && (nextTransfer->address < last))
+    {
+      ++nextTransfer;
+    }
+
+    bool fallsThrough = true;
+
+    if ((nextTransfer != transfers.end()) && (nextTransfer->address == last))
+    {
+      fallsThrough = nextTransfer->fallsThrough;
+
+      if (nextTransfer->hasDestination && (nextTransfer->destination < nrOfInstructions))
+      {
+        block.successors.push_back(findBlock(nextTransfer->destination));
+      }
+    }
+
+    if (fallsThrough && (block.end < nrOfInstructions) &&
+        std::find(block.successors.begin(), block.successors.end(), i + 1) == block.successors.end())
+    {
+      block.successors.push_back(i + 1);
+    }
+
+    for (size_t successor : block.successors)
+    {
+      _blocks[successor].predecessors.push_back(i);
+    }
+  }
+}
+
+size_t
+QISA_ControlFlowGraph::findBlock(uint64_t address) const
+{
+  auto it = std::upper_bound(_blocks.begin(), _blocks.end(), address,
+                             [](uint64_t a, const BasicBlock& block) { return a < block.begin; });
+
+  return (it - _blocks.begin()) - 1;
+}
+
+std::vector<size_t>
+QISA_ControlFlowGraph::getReversePostOrder() const
+{
+  std::vector<size_t> order;
+
+  if (_blocks.empty())
+  {
+    return order;
+  }
+
+  // Iterative depth first search, which keeps the index of the next
+  // successor to visit of each block on the stack.
+  std::vector<bool> visited(_blocks.size(), false);
+  std::vector<std::pair<size_t, size_t> > stack;
+
+  visited[0] = true;
+  stack.emplace_back(0, 0);
+
+  while (!stack.empty())
+  {
+    const size_t blockIndex = stack.back().first;
+    const std::vector<size_t>& successors = _blocks[blockIndex].successors;
+
+    if (stack.back().second < successors.size())
+    {
+      const size_t successor = successors[stack.back().second++];
+
+      if (!visited[successor])
+      {
+        visited[successor] = true;
+        stack.emplace_back(successor, 0);
+      }
+    }
+    else
+    {
+      order.push_back(blockIndex);
+      stack.pop_back();
+    }
+  }
+
+  std::reverse(order.begin(), order.end());
+  return order;
+}
+
+} // namespace QISA
@@ -0,0 +1,96 @@
+#pragma once
+
+#include <vector>
+#include <cstddef>
+#include <cstdint>
+
+namespace QISA
+{
+
+/**
+ * This class holds the basic blocks of a program, and the control flow
+ * between them.
+ *
+ * The graph does not decode instructions itself. It is built from the
+ * instructions that transfer control (branches and STOP), and from the
+ * addresses at which a block must start anyway, such as those of labels.
+ * It can therefore be built both for an assembled program and for a program
+ * that is being disassembled.
+ */
+class QISA_ControlFlowGraph
+{
+public:
+
+  // An instruction after which execution does not simply continue with the
+  // next instruction.
+  struct ControlTransfer
+  {
+    // Address of the instruction.
+    uint64_t address;
+
+    // True if execution may continue with the next instruction, as is the
+    // case for a conditional branch.
+    bool fallsThrough;
+
+    // True if the instruction may branch to 'destination'.
+    bool hasDestination;
+
+    uint64_t destination;
+  };
+
+  struct BasicBlock
+  {
+    // Address of the first instruction of the block.
+    uint64_t begin;
+
+    // Address of the instruction after the last instruction of the block.
+    uint64_t end;
+
+    // Indices of the blocks to which control may flow from the end of this
+    // block, and from which control may flow to the start of this block.
+    std::vector<size_t> successors;
+    std::vector<size_t> predecessors;
+  };
+
+  /**
+   * (Re)build the graph.
+   *
+   * @param[in] nrOfInstructions Number of instructions of the program.
+   * @param[in] transfers        Control transfers of the program, sorted by address.
+   *                             Destinations outside of the program leave the program.
+   * @param[in] leaders          Other addresses at which a block must start.
+   *                             They do not have to be sorted or unique.
+   */
+  void
+  build(uint64_t nrOfInstructions,
+        const std::vector<ControlTransfer>& transfers,
+        std::vector<uint64_t> leaders);
+
+  /** @return The basic blocks, sorted by address. Block 0 is the entry of the program. */
+  const std::vector<BasicBlock>&
+  getBlocks() const
+  {
+    return _blocks;
+  }
+
+  /**
+   * @param[in] address Address of an instruction of the program.
+   * @return The index of the block that holds the instruction.
+   */
+  size_t
+  findBlock(uint64_t address) const;
+
+  /**
+   * @return The indices of the blocks that are reachable from the entry of
+   *         the program, in reverse postorder. In this order, a block comes
+   *         before its successors, except along back edges (loops).
+   */
+  std::vector<size_t>
+  getReversePostOrder() const;
+
+private:
+
+  std::vector<BasicBlock> _blocks;
+};
+
+} // namespace QISA
@@ -3,13 +3,19 @@
 #include <iomanip>
 #include <iostream>
 #include <cstring>
+#include <cerrno>
+#include <cstdio>
+#include <limits>
+#include <thread>
+#include <atomic>
+#include <chrono>
 
 #include "qisa_driver.h"
 #include "qisa_version.h"
 
-#include "qisa_opcode_defs.inc"
-
 #include "qisa_qmap_parser.h"
+#include "qisa_layout_parser.h"
+#include "qisa_optimizer.h"
 
 namespace QISA
 {
@@ -17,243 +23,157 @@ namespace QISA
 // Set the prefix that denotes a label in the disassembly.
 const char* QISA_Driver::DISASSEMBLY_LABEL_PREFIX = "label_";
 
-QISA_Driver::QISA_Driver()
-    : _traceScanning(false)
-    , _traceParsing(false)
-    , _verbose(false)
-    , _hadEOF(false)
-    , _totalNrOfQubits(0)
-    , _max_bs_val(0)
-    , _disassemblyFormatId(1)
-    , _disassemblyLabelStringLength(0)
-    , _disassemblyStartedQuantumBundle(false)
-    , _maxQuantumOpcodeVal(Q_INST_OPCODE_MASK) // 8 bits for the quantum instruction opcode.
-    , _lastDriverAction(DRIVER_ACTION_NONE)
+namespace
 {
-  // Bring in the opcodes that have been defined for the qisa instructions.
-  setOpcodes();
-
-  // Number of registers per kind of register.
-  _nrOfRegisters[Q_REGISTER] = 7;
-  _nrOfRegisters[R_REGISTER] = 32;
-  _nrOfRegisters[S_REGISTER] = 32;
-  _nrOfRegisters[T_REGISTER] = 64;
-
-  _registerName[Q_REGISTER] = 'Q';
-  _registerName[R_REGISTER] = 'R';
-  _registerName[S_REGISTER] = 'S';
-  _registerName[T_REGISTER] = 'T';
-
-  _totalNrOfQubits = 0;
-
-  // Maximum value to specify as bundle separator.
-  // The width of this field is currently 3 bits, so the maximum value is set to 7.
-  _max_bs_val = 7;
-
-  // Name the branch conditions.
-  _branchConditionNames[COND_ALWAYS] = "ALWAYS";
-  _branchConditionNames[COND_NEVER ] = "NEVER";
-  _branchConditionNames[COND_EQ    ] = "EQ";
-  _branchConditionNames[COND_NE    ] = "NE";
-  _branchConditionNames[COND_LTZ   ] = "LTZ";
-  _branchConditionNames[COND_GEZ   ] = "GEZ";
-  _branchConditionNames[COND_LTU   ] = "LTU";
-  _branchConditionNames[COND_GEU   ] = "GEU";
-  _branchConditionNames[COND_LEU   ] = "LEU";
-  _branchConditionNames[COND_GTU   ] = "GTU";
-  _branchConditionNames[COND_LT    ] = "LT";
-  _branchConditionNames[COND_GE    ] = "GE";
-  _branchConditionNames[COND_LE    ] = "LE";
-  _branchConditionNames[COND_GT    ] = "GT";
-
-  // Branch condition aliases.
-  // Maps the alias name to the 'real' condition.
-  _branchConditionAliases["NOTCARRY"] = 0x8;
-  _branchConditionAliases["CARRY"]    = 0x9;
-  _branchConditionAliases["EQZ"]      = 0xa;
-  _branchConditionAliases["NEZ"]      = 0xb;
-
-  /*
-  // Valid target-control pairs: 'left-to-right' direction
-  _valid_target_control_pairs[std::make_pair(2,0)] =  0;
-  _valid_target_control_pairs[std::make_pair(0,3)] =  1;
-  _valid_target_control_pairs[std::make_pair(4,1)] =  2;
-  _valid_target_control_pairs[std::make_pair(1,5)] =  3;
-  _valid_target_control_pairs[std::make_pair(5,2)] =  4;
-  _valid_target_control_pairs[std::make_pair(2,6)] =  5;
-  _valid_target_control_pairs[std::make_pair(6,3)] =  6;
-  _valid_target_control_pairs[std::make_pair(4,7)] =  7;
-  _valid_target_control_pairs[std::make_pair(7,5)] =  8;
-  _valid_target_control_pairs[std::make_pair(5,8)] =  9;
-  _valid_target_control_pairs[std::make_pair(8,6)] =  10;
-  _valid_target_control_pairs[std::make_pair(6,9)] =  11;
-  _valid_target_control_pairs[std::make_pair(7,10)] =  12;
-  _valid_target_control_pairs[std::make_pair(10,8)] =  13;
-  _valid_target_control_pairs[std::make_pair(8,11)] =  14;
-  _valid_target_control_pairs[std::make_pair(11,9)] =  15;
-  _valid_target_control_pairs[std::make_pair(9,12)] =  16;
-  _valid_target_control_pairs[std::make_pair(13,10)] =  17;
-  _valid_target_control_pairs[std::make_pair(10,14)] =  18;
-  _valid_target_control_pairs[std::make_pair(14,11)] =  19;
-  _valid_target_control_pairs[std::make_pair(11,15)] =  20;
-  _valid_target_control_pairs[std::make_pair(15,12)] =  21;
-  _valid_target_control_pairs[std::make_pair(13,16)] =  22;
-  _valid_target_control_pairs[std::make_pair(16,14)] =  23;
-
-  // Valid target-control pairs: opposite direction
-  _valid_target_control_pairs[std::make_pair(0,2)] =  24;
-  _valid_target_control_pairs[std::make_pair(3,0)] =  25;
-  _valid_target_control_pairs[std::make_pair(1,4)] =  26;
-  _valid_target_control_pairs[std::make_pair(5,1)] =  27;
-  _valid_target_control_pairs[std::make_pair(2,5)] =  28;
-  _valid_target_control_pairs[std::make_pair(6,2)] =  29;
-  _valid_target_control_pairs[std::make_pair(3,6)] =  30;
-  _valid_target_control_pairs[std::make_pair(7,4)] =  31;
-  _valid_target_control_pairs[std::make_pair(5,7)] =  32;
-  _valid_target_control_pairs[std::make_pair(8,5)] =  33;
-  _valid_target_control_pairs[std::make_pair(6,8)] =  34;
-  _valid_target_control_pairs[std::make_pair(9,6)] =  35;
-  _valid_target_control_pairs[std::make_pair(10,7)] =  36;
-  _valid_target_control_pairs[std::make_pair(8,10)] =  37;
-  _valid_target_control_pairs[std::make_pair(11,8)] =  38;
-  _valid_target_control_pairs[std::make_pair(9,11)] =  39;
-  _valid_target_control_pairs[std::make_pair(12,9)] =  40;
-  _valid_target_control_pairs[std::make_pair(10,13)] =  41;
-  _valid_target_control_pairs[std::make_pair(14,10)] =  42;
-  _valid_target_control_pairs[std::make_pair(11,14)] =  43;
-  _valid_target_control_pairs[std::make_pair(15,11)] =  44;
-  _valid_target_control_pairs[std::make_pair(12,15)] =  45;
-  _valid_target_control_pairs[std::make_pair(16,13)] =  46;
-  _valid_target_control_pairs[std::make_pair(14,16)] =  47;
-  */
-
-  // Lookup table to go from bit number to target-control pair.
-  _bit2tc_pair[ 0] = std::make_pair(2,0);
-  _bit2tc_pair[ 1] = std::make_pair(0,3);
-  _bit2tc_pair[ 2] = std::make_pair(3,1);
-  _bit2tc_pair[ 3] = std::make_pair(1,4);
-  _bit2tc_pair[ 4] = std::make_pair(2,5);
-  _bit2tc_pair[ 5] = std::make_pair(5,3);
-  _bit2tc_pair[ 6] = std::make_pair(3,6);
-  _bit2tc_pair[ 7] = std::make_pair(6,4);
-  _bit2tc_pair[ 8] = std::make_pair(0,2);
-  _bit2tc_pair[ 9] = std::make_pair(3,0);
-  _bit2tc_pair[10] = std::make_pair(1,3);
-  _bit2tc_pair[11] = std::make_pair(4,1);
-  _bit2tc_pair[12] = std::make_pair(5,2);
-  _bit2tc_pair[13] = std::make_pair(3,5);
-  _bit2tc_pair[14] = std::make_pair(6,3);
-  _bit2tc_pair[15] = std::make_pair(4,6);
-
-}
 
-void
-QISA_Driver::read(std::string input_filename)
+// Adds the wall clock time between its construction and destruction to the
+// given number of seconds.
+class PhaseTimer
 {
-    std::ifstream                           in;
-    //std::string                             input_filename;
-    std::string                            line;
-
-    std::pair <int, int> one[48];
-    std::pair <uint8_t, uint8_t> two[48];
-    int             i = 0;
-    int             qubit_num = 0;
-    int             num_edge_address = 0;
-    bool read_qubit_num, read_edge_list, read_num_nn_edge = false;
+public:
+  explicit PhaseTimer(double& seconds)
+    : _seconds(seconds)
+    , _start(std::chrono::steady_clock::now())
+  {
+  }
 
-    //input_filename = "D:\\Projects\\QuMA_Sim\\scripts\\quantum_layout_information.txt";
+  ~PhaseTimer()
+  {
+    _seconds += std::chrono::duration<double>(std::chrono::steady_clock::now() - _start).count();
+  }
 
-    in.open(input_filename);
-    //std::cout << "opening file..." << std::endl;
+private:
+  double& _seconds;
+  std::chrono::steady_clock::time_point _start;
+};
 
-    if (!in) {
-        std::cerr << "Error while open quantum layout information file" << std::endl;
-    }
+// True if the given locations refer to the same part of the source code.
+bool
+isSameLocation(const location& lhs, const location& rhs)
+{
+  return (lhs.begin.line == rhs.begin.line) && (lhs.begin.column == rhs.begin.column) &&
+         (lhs.end.line == rhs.end.line) && (lhs.end.column == rhs.end.column);
+}
 
-    while (getline(in, line))
+// Update a CRC-32 (as used by zlib, IEEE 802.3) with the given data.
+// Start with crc = 0.
+uint32_t
+updateCrc32(uint32_t crc, const unsigned char* data, size_t size)
+{
+  static const std::vector<uint32_t> table = []()
+  {
+    std::vector<uint32_t> result(256);
+    for (uint32_t i = 0; i < 256; i++)
     {
-        std::istringstream iss(line);
-        int num_qubits;
-        int edge_number, left_operation, right_operation;
-        char buff;
+      uint32_t c = i;
+      for (int bit = 0; bit < 8; bit++)
+      {
+        c = (c & 1) ? (0xedb88320u ^ (c >> 1)) : (c >> 1);
+      }
+      result[i] = c;
+    }
+    return result;
+  }();
 
-        //std::cout << line << std::endl;
-        /***********************Read number of qubits****************************/
-        if (strcmp(line.c_str(), ".EndNumQubits") == 0) {
-            read_qubit_num = false;
-            //std::cout << "End reading number of qubits" << std::endl;
-        }
+  crc = ~crc;
+  for (size_t i = 0; i < size; i++)
+  {
+    crc = table[(crc ^ data[i]) & 0xff] ^ (crc >> 8);
+  }
+  return ~crc;
+}
 
-        if (read_qubit_num == true) {
-            iss >> num_qubits;
-            qubit_num = num_qubits;
-            //std::cout << "There are " << num_qubits << " qubits" << std::endl;
-        }
+// Store the given value at the given position, in little-endian byte order.
+void
+putLittleEndian(char* destination, uint32_t value, size_t nrOfBytes)
+{
+  for (size_t i = 0; i < nrOfBytes; i++)
+  {
+    destination[i] = (char)((value >> (8 * i)) & 0xff);
+  }
+}
 
-        if (strcmp(line.c_str(), ".NumQubits") == 0) {
-            read_qubit_num = true;
-            //std::cout << "Start reading number of qubits" << std::endl;
-        }
+// Look up the given key in the given map of the (read-only) target.
+// Returns a default constructed value if the key is not present.
+template <typename Map>
+typename Map::mapped_type
+findOrDefault(const Map& map, const typename Map::key_type& key)
+{
+  auto it = map.find(key);
 
-        /***********************Read number of direct edge address*********************/
-        if (strcmp(line.c_str(), ".EndNumDirEdge") == 0) {
-            read_num_nn_edge = false;
-            //std::cout << "End reading number of direct edge address" << std::endl;
-        }
+  return (it != map.end()) ? it->second : typename Map::mapped_type();
+}
 
-        if (read_num_nn_edge == true) {
-            iss >> num_edge_address;
-            //std::cout << "There are " << num_edge_address << " edge addresses there" << std::endl;
-        }
+} // namespace
 
-        if (strcmp(line.c_str(), ".NumDirEdge") == 0) {
-            read_num_nn_edge = true;
-            //std::cout << "\nStart reading number of direct edge address" << std::endl;
-        }
+QISA_Driver::QISA_Driver()
+    : _traceScanning(false)
+    , _traceParsing(false)
+    , _verbose(false)
+    , _sourceIsInMemory(false)
+    , _hadSyntaxErrorAtNewline(false)
+    , _cache(nullptr)
+    , _optimizations(OPTIMIZE_NONE)
+    , _hadEOF(false)
+    , _target(QISA_Target::getDefault())
+    , _disassemblyFormatId(1)
+    , _assemblyFormatId(1)
+    , _disassemblyLabelStringLength(0)
+    , _disassemblyStartedQuantumBundle(false)
+    , _streamingDisassembly(false)
+    , _disassemblyLineWidth(0)
+    , _assemblySucceeded(false)
+    , _symbolFieldsValid(false)
+    , _lastDriverAction(DRIVER_ACTION_NONE)
+    , _statistics()
+{
+}
 
-        /***********************Read edge list information***********************/
-        if (strcmp(line.c_str(), ".EndEdgeList") == 0) {
-            read_edge_list = false;
-            //std::cout << "End reading edge list" << std::endl;
-        }
+QISA_Driver::QISA_Driver(std::shared_ptr<const QISA_Target> target)
+    : _traceScanning(false)
+    , _traceParsing(false)
+    , _verbose(false)
+    , _sourceIsInMemory(false)
+    , _hadSyntaxErrorAtNewline(false)
+    , _cache(nullptr)
+    , _optimizations(OPTIMIZE_NONE)
+    , _hadEOF(false)
+    , _target(std::move(target))
+    , _disassemblyFormatId(1)
+    , _assemblyFormatId(1)
+    , _disassemblyLabelStringLength(0)
+    , _disassemblyStartedQuantumBundle(false)
+    , _streamingDisassembly(false)
+    , _disassemblyLineWidth(0)
+    , _assemblySucceeded(false)
+    , _symbolFieldsValid(false)
+    , _lastDriverAction(DRIVER_ACTION_NONE)
+    , _statistics()
+{
+}
 
-        if (read_edge_list == true) {
-            if (!(iss >> edge_number >> buff >> left_operation >> buff >> right_operation)) { break; } // error
-
-            iss >> edge_number >> buff >> left_operation >> buff >> right_operation;
-            //if (!check_range(left_operation, min, max) {
-
-            //}
-            uint8_t a = static_cast<uint8_t>(left_operation);
-            uint8_t b = right_operation;
-            //std::cout << a << b << std::endl;
-            //printf("%d, %d\n", a, b);
-            one[i] = std::make_pair(left_operation, right_operation);
-            two[i] = std::make_pair(a, b);
-            //std::cout << one[i].first << ", " << one[i].second << std::endl;
-            i++;
-        }
+bool
+QISA_Driver::read(std::string input_filename)
+{
+  QISA_LayoutParser layoutParser;
 
-        if (strcmp(line.c_str(), ".EdgeList") == 0) {
-            read_edge_list = true;
-            //std::cout << "Start reading edge list" << std::endl;
-        }
+  if (!layoutParser.parse(input_filename))
+  {
+    _errorStream << "Error parsing quantum layout information file '" << input_filename << "':" << std::endl;
+    _errorStream << "\t" << layoutParser.getLastErrorMessage() << std::endl;
+    _errorLoc = location();
 
-    }
+    return false;
+  }
 
-    in.close();
+  // The target may be shared with other drivers, so change a copy of it.
+  std::shared_ptr<QISA_Target> target = std::make_shared<QISA_Target>(*_target);
 
-    //initiate target_control_pairs
-    for (int j = 0; j < num_edge_address; j++) {
-        _valid_target_control_pairs[two[j]] = j;
-    }
-    _totalNrOfQubits = qubit_num;
-    _NrOfEdgeAdress = num_edge_address;
+  target->setLayout(layoutParser.getNrOfQubits(), layoutParser.getEdges());
 
-    //In the QCC assembler, one binary instruction generated for SMIS and three binary instructions generated for SMIT
-    pos_number_s = 1;
-    pos_number_t = 3;
+  _target = target;
 
+  return true;
 }
 
 void
@@ -262,15 +182,24 @@ QISA_Driver::reset()
   _hadEOF = false;
   _filename.clear();
 
-  _instructions.clear();
+  _sourceIsInMemory = false;
+  _source.clear();
+  _lineOffsets.clear();
+  _hadSyntaxErrorAtNewline = false;
 
-  _disassembledInstructions.clear();
+  _instructions.clear();
 
   _disassemblyStartedQuantumBundle = false;
 
-  _disassemblyLabels.clear();
+  _symbolTable.clear();
   _labels.clear();
 
+  _disassemblyInput.close();
+  _disassemblyWords.clear();
+  _disassemblyLabelAddresses.clear();
+  _disassemblyErrorAddresses.clear();
+  _disassemblyLineWidth = 0;
+
   _registerAliases[0].clear();
   _registerAliases[1].clear();
   _registerAliases[2].clear();
@@ -280,6 +209,13 @@ QISA_Driver::reset()
 
   _strSymbols.clear();
 
+  _lastSymbolName.clear();
+  _lastSymbolLoc = location();
+  _symbolFields.clear();
+  _symbolFieldNames.clear();
+  _assemblySucceeded = false;
+  _symbolFieldsValid = false;
+
   _deferredInstructions.clear();
 
   _errorStream.str(""); // Clear the accumulated error messages.
@@ -288,6 +224,8 @@ QISA_Driver::reset()
   _lastDriverAction = DRIVER_ACTION_NONE;
 
   _errorLoc = location();
+
+  _statistics = Statistics();
 }
 
 bool
@@ -296,9 +234,166 @@ QISA_Driver::assemble(const std::string &filename)
   // First, reset the driver to get a clean start.
   reset();
 
+  _filename = filename;
+
+  return assembleSource();
+}
+
+bool
+QISA_Driver::assembleString(const std::string& source,
+                            const std::string& sourceName)
+{
+  // First, reset the driver to get a clean start.
+  reset();
+
+  _filename = sourceName;
+  _source = source;
+  _sourceIsInMemory = true;
+
+  return assembleSource();
+}
+
+bool
+QISA_Driver::assembleBytes(const char* data,
+                           size_t size,
+                           const std::string& sourceName)
+{
+  // First, reset the driver to get a clean start.
+  reset();
+
+  _filename = sourceName;
+  _source.assign(data, size);
+  _sourceIsInMemory = true;
+
+  return assembleSource();
+}
+
+std::vector<QISA_Driver::AssemblyResult>
+QISA_Driver::assembleMany(const std::vector<AssemblyInput>& inputs,
+                          unsigned int nrOfWorkers) const
+{
+  std::vector<AssemblyResult> results(inputs.size());
+
+  if (nrOfWorkers == 0)
+  {
+    nrOfWorkers = std::max(1u, std::thread::hardware_concurrency());
+  }
+
+  if (nrOfWorkers > inputs.size())
+  {
+    nrOfWorkers = inputs.size();
+  }
+
+  // Index of the next input to be assembled by any of the workers.
+  std::atomic<size_t> nextInput(0);
+
+  auto worker = [&]()
+  {
+    QISA_Driver driver;
+    driver.copyConfiguration(*this);
+
+    for (size_t i = nextInput++; i < inputs.size(); i = nextInput++)
+    {
+      const AssemblyInput& input = inputs[i];
+      AssemblyResult& result = results[i];
+
+      if (input.isInMemory)
+      {
+        result.success = driver.assembleString(input.source, input.name);
+      }
+      else
+      {
+        result.success = driver.assemble(input.name);
+      }
+
+      if (result.success)
+      {
+        result.instructions.swap(driver._instructions);
+      }
+      else
+      {
+        result.errorMessage = driver.getLastErrorMessage();
+      }
+    }
+  };
+
+  std::vector<std::thread> workers;
+  for (unsigned int i = 1; i < nrOfWorkers; i++)
+  {
+    workers.emplace_back(worker);
+  }
+
+  // The calling thread acts as a worker as well.
+  if (nrOfWorkers > 0)
+  {
+    worker();
+  }
+
+  for (auto& w : workers)
+  {
+    w.join();
+  }
+
+  return results;
+}
+
+void
+QISA_Driver::copyConfiguration(const QISA_Driver& other)
+{
+  _traceScanning = other._traceScanning;
+  _traceParsing = other._traceParsing;
+  _verbose = other._verbose;
+
+  _target = other._target;
+
+  _disassemblyFormatId = other._disassemblyFormatId;
+  _assemblyFormatId = other._assemblyFormatId;
+  _streamingDisassembly = other._streamingDisassembly;
+
+  _cache = other._cache;
+  _optimizations = other._optimizations;
+}
+
+bool
+QISA_Driver::assembleSource()
+{
+  PhaseTimer totalTimer(_statistics.totalSeconds);
+
+  // The scanner always reads from memory, so that errors can be reported
+  // against the source that has actually been parsed.
+  if (!_sourceIsInMemory && !readSourceFile())
+  {
+    return false;
+  }
+
+  std::string cacheKey;
+
+  if (_cache != nullptr)
+  {
+    PhaseTimer cacheLookupTimer(_statistics.cacheLookupSeconds);
+
+    std::string configuration = _target->getFingerprint();
+    if (_optimizations != OPTIMIZE_NONE)
+    {
+      configuration += "optimizations " + std::to_string(_optimizations) + "\n";
+    }
+    cacheKey = QISA_AssemblyCache::computeKey({&configuration, &_source});
+
+    if (_cache->lookup(cacheKey, _instructions))
+    {
+      _statistics.cacheHit = true;
+      _statistics.bytesRead = _source.size();
+      _statistics.nrOfInstructions = _instructions.size();
+
+      // This is for save() to know it has to save binary assembly output.
+      _lastDriverAction = DRIVER_ACTION_PARSE;
+      _assemblySucceeded = true;
+      return true;
+    }
+  }
+
   yyscan_t flex_scanner;
 
-  _filename = filename;
   bool success = scanBegin(&flex_scanner);
 
   if (!success)
@@ -306,7 +401,7 @@ QISA_Driver::assemble(const std::string &filename)
     return false;
   }
 
-  if(_totalNrOfQubits == 0) {
+  if(_target->_totalNrOfQubits == 0) {
     std::cout << "\nError: the quantum layout information is not read into assembler" << std::endl;
     success = false;
   }
@@ -314,11 +409,16 @@ QISA_Driver::assemble(const std::string &filename)
   QISA_Parser parser (*this, flex_scanner);
   parser.set_debug_level (_traceParsing);
 
-  int parser_result = parser.parse ();
+  int parser_result;
+  {
+    PhaseTimer parseTimer(_statistics.parseSeconds);
+    parser_result = parser.parse ();
+  }
   scanEnd(flex_scanner);
 
   if (parser_result == 0)
   {
+    PhaseTimer deferredInstructionsTimer(_statistics.deferredInstructionsSeconds);
     success = processDeferredInstructions();
   }
   else
@@ -326,17 +426,132 @@ QISA_Driver::assemble(const std::string &filename)
     success = false;
   }
 
+  if (success && (_optimizations != OPTIMIZE_NONE))
+  {
+    PhaseTimer optimizationTimer(_statistics.optimizationSeconds);
+
+    QISA_Optimizer optimizer(*this);
+    optimizer.run(_optimizations);
+  }
+
+  _statistics.nrOfInstructions = _instructions.size();
+  _statistics.nrOfLabels = _labels.size();
+  _statistics.nrOfDeferredLabels = _deferredInstructions.size();
+
+  if (success && !cacheKey.empty())
+  {
+    // Failing to store the result is not fatal, so ignore the result.
+    _cache->store(cacheKey, _instructions);
+  }
+
   // This is for save() to know it has to save binary assembly output.
   _lastDriverAction = DRIVER_ACTION_PARSE;
+  _assemblySucceeded = success;
+  _symbolFieldsValid = success;
   return success;
 }
 
+bool
+QISA_Driver::readSourceFile()
+{
+  FILE* srcFile = fopen(_filename.c_str(), "rb");
+
+  if (srcFile == nullptr)
+  {
+    error("Cannot open file '" + _filename + "': " + strerror(errno));
+
+    // Return false to indicate failure;
+    return false;
+  }
+
+  fseek(srcFile, 0, SEEK_END);
+  long size = ftell(srcFile);
+  rewind(srcFile);
+
+  if (size <= 0)
+  {
+    fclose(srcFile);
+    error("File '" + _filename + "' is empty!");
+
+    // Return false to indicate failure;
+    return false;
+  }
+
+  // Read the whole file at once.
+  _source.resize(size);
+  const size_t nrOfBytesRead = fread(&_source[0], 1, size, srcFile);
+  fclose(srcFile);
+
+  if (nrOfBytesRead != (size_t)size)
+  {
+    _source.clear();
+    error("Cannot read file '" + _filename + "'");
+
+    // Return false to indicate failure;
+    return false;
+  }
+
+  // Return true to indicate success;
+  return true;
+}
+
+void
+QISA_Driver::setCache(QISA_AssemblyCache* cache)
+{
+  _cache = cache;
+}
+
+QISA_AssemblyCache*
+QISA_Driver::getCache() const
+{
+  return _cache;
+}
+
+void
+QISA_Driver::setOptimizations(unsigned int optimizations)
+{
+  _optimizations = optimizations;
+}
+
+unsigned int
+QISA_Driver::getOptimizations() const
+{
+  return _optimizations;
+}
+
 bool
 QISA_Driver::disassemble(const std::string& filename)
 {
   // First reset the driver to get a clean start.
   reset();
 
+  PhaseTimer totalTimer(_statistics.totalSeconds);
+
+  if (_streamingDisassembly)
+  {
+    if (!_disassemblyInput.open(filename))
+    {
+      error("Cannot open file '" + filename + "'.");
+      return false;
+    }
+
+    if (_disassemblyInput.size() == 0)
+    {
+      error("File '" + filename + "' is empty!");
+      return false;
+    }
+
+    _statistics.bytesRead = _disassemblyInput.size();
+    _statistics.nrOfInstructions = getNrOfDisassembledInstructions();
+
+    // Only the labels are determined here.
+    // The instructions are disassembled when the output is requested.
+    collectDisassemblyLabels();
+
+    _lastDriverAction = DRIVER_ACTION_DISASSEMBLE;
+    return true;
+  }
+
   std::ifstream inputFile (filename, std::ios::in | std::ios::binary);
 
   // Assume no errors while disassembling.
@@ -355,14 +570,28 @@ QISA_Driver::disassemble(const std::string& filename)
     }
 
 
-    // Read the instructions one at a time.
-    qisa_instruction_type inst;
+    // Read all instructions at once.
+    // A trailing partial instruction is ignored.
+    inputFile.seekg(0, std::ios::end);
+    const std::streamoff fileSize = inputFile.tellg();
+    inputFile.seekg(0, std::ios::beg);
 
-    // Used to keep track of the current instruction within the input file.
-    size_t disassemblyInstructionCounter = 0;
+    _disassemblyWords.resize(fileSize / sizeof(qisa_instruction_type));
+    inputFile.read(reinterpret_cast<char*>(_disassemblyWords.data()),
+                   _disassemblyWords.size() * sizeof(qisa_instruction_type));
 
-    while(inputFile.read((char*)&inst, sizeof(qisa_instruction_type)))
+    _statistics.bytesRead = fileSize;
+    _statistics.nrOfInstructions = _disassemblyWords.size();
+
+    // Check all instructions, so that errors are reported here.
+    // Only the raw instructions are kept: their text is rendered when
+    // the disassembly output is requested.
+    DisassembledInstruction disassembledInstruction;
+
+    for (uint64_t address = 0; address < _disassemblyWords.size(); address++)
     {
+      const qisa_instruction_type inst = _disassemblyWords[address];
+
       if (_verbose)
       {
         std::bitset<sizeof(qisa_instruction_type)*8> binary(inst);
@@ -370,23 +599,19 @@ QISA_Driver::disassemble(const std::string& filename)
                   << " (" << binary << ")" << std::endl;
       }
 
-      DisassembledInstruction disassembledInstruction;
-      disassembledInstruction.address = disassemblyInstructionCounter;
-      disassembledInstruction.hexCode = getHex(inst, 8);
+      disassembledInstruction.address = address;
       if (!disassembleInstruction(inst, disassembledInstruction))
       {
         _errorStream << "Error while disassembling instruction "
                      << getHex(inst, 8)
-                     <<  ", instructionCount = " << disassemblyInstructionCounter;
+                     <<  ", instructionCount = " << address;
         _errorLoc = location();
+        _disassemblyErrorAddresses.push_back(address);
         result = false;
       }
-
-      _disassembledInstructions[disassemblyInstructionCounter] = disassembledInstruction;
-
-      disassemblyInstructionCounter++;
     }
-    postProcessDisassembly();
+
+    collectDisassemblyLabels();
   }
   else
   {
@@ -400,28 +625,145 @@ QISA_Driver::disassemble(const std::string& filename)
 }
 
 void
-QISA_Driver::postProcessDisassembly()
+QISA_Driver::enableStreamingDisassembly(bool enabled)
 {
-  if (_verbose)
-    std::cout << "DISASSEMBLY POST-PROCESS" << std::endl;
+  _streamingDisassembly = enabled;
+}
+
+bool
+QISA_Driver::getBranchDestination(qisa_instruction_type inst, uint64_t address, uint64_t& destination) const
+{
+  if (inst & (1L << DBL_INST_FORMAT_BIT_OFFSET))
+  {
+    return false;
+  }
+
+  const int opc = (inst >> OPCODE_OFFSET) & OPCODE_MASK;
+
+  if (_target->_classicDecodeTable[opc].format != QISA_Target::CLASSIC_FORMAT_BR)
+  {
+    return false;
+  }
+
+  const int cond = inst & COND_MASK;
+
+  if (_target->_branchConditionNames.find(cond) == _target->_branchConditionNames.end())
+  {
+    return false;
+  }
+
+  const int addr = (inst >> ADDR_OFFSET) & ADDR_MASK;
+
+  // Sign extend the address, which is an offset relative to the current instruction counter.
+  // Source: http://graphics.stanford.edu/~seander/bithacks.html#FixedSignExtend
+  struct {signed int x:21;} s;
+  const int addr_offset = s.x = addr;
+
+  destination = address + addr_offset;
+  return true;
+}
+
+bool
+QISA_Driver::getControlTransfer(qisa_instruction_type inst, uint64_t address,
+                                QISA_ControlFlowGraph::ControlTransfer& transfer) const
+{
+  transfer.address = address;
+
+  if (getBranchDestination(inst, address, transfer.destination))
+  {
+    const int cond = inst & COND_MASK;
+
+    transfer.fallsThrough = (cond != COND_ALWAYS);
+    transfer.hasDestination = (cond != COND_NEVER);
+    return true;
+  }
+
+  if (inst & (1L << DBL_INST_FORMAT_BIT_OFFSET))
+  {
+    return false;
+  }
+
+  const QISA_Target::ClassicDecodeEntry& entry = _target->_classicDecodeTable[(inst >> OPCODE_OFFSET) & OPCODE_MASK];
+
+  if ((entry.format == QISA_Target::CLASSIC_FORMAT_NONE) && (entry.name == "STOP"))
+  {
+    transfer.fallsThrough = false;
+    transfer.hasDestination = false;
+    transfer.destination = 0;
+    return true;
+  }
+
+  return false;
+}
+
+uint64_t
+QISA_Driver::getNrOfDisassembledInstructions() const
+{
+  if (_disassemblyInput.data() != nullptr)
+  {
+    return _disassemblyInput.size() / sizeof(qisa_instruction_type);
+  }
+
+  return _disassemblyWords.size();
+}
+
+QISA_Driver::qisa_instruction_type
+QISA_Driver::getDisassemblyWord(uint64_t address) const
+{
+  if (_disassemblyInput.data() != nullptr)
+  {
+    qisa_instruction_type inst;
+    std::memcpy(&inst, _disassemblyInput.data() + address * sizeof(qisa_instruction_type), sizeof(inst));
+    return inst;
+  }
+
+  return _disassemblyWords[address];
+}
+
+std::string
+QISA_Driver::getDisassemblyLabelName(size_t labelIndex) const
+{
+  const size_t nrOfDigitsPerLabel = _disassemblyLabelStringLength - strlen(DISASSEMBLY_LABEL_PREFIX) - 2;
+
+  std::ostringstream ssLabel;
+  ssLabel << DISASSEMBLY_LABEL_PREFIX << std::setw(nrOfDigitsPerLabel) << std::setfill('0') << labelIndex;
+  return ssLabel.str();
+}
+
+void
+QISA_Driver::collectDisassemblyLabels()
+{
+  PhaseTimer disassemblyLabelsTimer(_statistics.disassemblyLabelsSeconds);
+
+  const uint64_t nrOfInstructions = getNrOfDisassembledInstructions();
+
+  _disassemblyLabelAddresses.clear();
+
+  for (uint64_t address = 0; address < nrOfInstructions; address++)
+  {
+    uint64_t destination;
+    if (getBranchDestination(getDisassemblyWord(address), address, destination))
+    {
+      _disassemblyLabelAddresses.push_back(destination);
+    }
+  }
+
+  std::sort(_disassemblyLabelAddresses.begin(), _disassemblyLabelAddresses.end());
+  _disassemblyLabelAddresses.erase(std::unique(_disassemblyLabelAddresses.begin(),
+                                               _disassemblyLabelAddresses.end()),
+                                   _disassemblyLabelAddresses.end());
 
   // This will be set to the actual label length in case branch
   // instructions are used.
   _disassemblyLabelStringLength = 0;
 
-  // Only do the following in case labels have been used.
-  if (!_disassemblyLabels.empty())
+  if (!_disassemblyLabelAddresses.empty())
   {
-    // Create a map from the used branch destination to label with an index.
-
-    std::map<uint64_t, std::string> dest2LabelMap;
-    int labelCounter = 0;
-
     // Calculate the number of digits needed to print the labels.
     // Source: https://stackoverflow.com/a/1489861
     int nrOfDigitsPerLabel = 0;
 
-    size_t nrOfLabels = _disassemblyLabels.size();
+    size_t nrOfLabels = _disassemblyLabelAddresses.size();
     while (nrOfLabels != 0)
     {
       nrOfLabels /= 10;
@@ -431,58 +773,141 @@ QISA_Driver::postProcessDisassembly()
     // Used to get the correct indentation in case there is no label.
     // The extra spaces (+ 2) are for the ": " that come after a 'full' label.
     _disassemblyLabelStringLength = strlen(DISASSEMBLY_LABEL_PREFIX) + nrOfDigitsPerLabel + 2;
-    std::string emptyLabel(_disassemblyLabelStringLength, ' ');
+  }
 
-    // Determine the name of the labels.
-    for (auto it = _disassemblyLabels.begin(); it != _disassemblyLabels.end(); ++it)
-    {
-      std::ostringstream ssLabel;
+  _statistics.nrOfLabels = _disassemblyLabelAddresses.size();
 
-      ssLabel << DISASSEMBLY_LABEL_PREFIX << std::setw(nrOfDigitsPerLabel) << std::setfill('0') << labelCounter;
-      dest2LabelMap[it->first] = ssLabel.str();
-      labelCounter++;
-    }
+  if (_verbose)
+    std::cout << "Found " << _disassemblyLabelAddresses.size() << " branch destinations." << std::endl;
+}
+
+bool
+QISA_Driver::renderDisassembledInstruction(uint64_t address, DisassembledInstruction& disassembledInst)
+{
+  const qisa_instruction_type inst = getDisassemblyWord(address);
+
+  disassembledInst.address = address;
+  disassembledInst.hexCode = getHex(inst, 8);
+  disassembledInst.label.clear();
+  disassembledInst.instruction.clear();
 
-    // Create a map that maps a branch instruction to its branch destination.
-    std::map<uint64_t, uint64_t> branchInstr2destAddrMap;
+  bool result;
 
-    for (auto it = _disassemblyLabels.begin(); it != _disassemblyLabels.end(); ++it)
+  if (_disassemblyInput.data() != nullptr)
+  {
+    if (_verbose)
     {
-      for (auto branchIt = it->second.begin(); branchIt != it->second.end(); ++branchIt)
-      {
-        branchInstr2destAddrMap[*branchIt] = it->first;
-      }
+      std::bitset<sizeof(qisa_instruction_type)*8> binary(inst);
+      std::cout << "Input instruction: " << getHex(inst, 8)
+                << " (" << binary << ")" << std::endl;
     }
 
-    if (_verbose)
-      std::cout << "Processing " << branchInstr2destAddrMap.size() << " branch instructions..." << std::endl;
+    result = disassembleInstruction(inst, disassembledInst);
+  }
+  else
+  {
+    // Instructions that could not be disassembled have already been reported
+    // by disassemble(), and are rendered without text.
+    result = !std::binary_search(_disassemblyErrorAddresses.begin(), _disassemblyErrorAddresses.end(), address);
 
-    for (auto itInstr = _disassembledInstructions.begin(); itInstr != _disassembledInstructions.end(); ++itInstr)
+    if (result)
     {
-      // If this is a branch destination, prepend the label instruction;
-      auto itDest = _disassemblyLabels.find(itInstr->second.address);
-      if (itDest != _disassemblyLabels.end())
-      {
-        itInstr->second.label = dest2LabelMap[itDest->first] + ": ";
-      }
-      else
-      {
-        // Else, just use spaces instead.
-        itInstr->second.label = emptyLabel;
-      }
+      disassembleInstruction(inst, disassembledInst);
+    }
+  }
 
-      auto itBranchInstr = branchInstr2destAddrMap.find(itInstr->second.address);
-      // If this is a branch instruction, emit its corresponding label and offset as comment.
-      if (itBranchInstr != branchInstr2destAddrMap.end())
-      {
-        const int64_t offset = itBranchInstr->second - itInstr->second.address;
+  if (_disassemblyLabelAddresses.empty())
+  {
+    return result;
+  }
 
-        std::ostringstream ssNewInstruction;
-        ssNewInstruction << itInstr->second.instruction << ", " << dest2LabelMap[itBranchInstr->second]
-                  << " # offset(" << std::showpos << offset << std::noshowpos << ")";
-        itInstr->second.instruction = ssNewInstruction.str();
-      }
-    }
+  // If this is a branch destination, prepend the label.
+  auto itLabel = std::lower_bound(_disassemblyLabelAddresses.begin(), _disassemblyLabelAddresses.end(), address);
+  if (itLabel != _disassemblyLabelAddresses.end() && *itLabel == address)
+  {
+    disassembledInst.label = getDisassemblyLabelName(itLabel - _disassemblyLabelAddresses.begin()) + ": ";
+  }
+  else
+  {
+    // Else, just use spaces instead.
+    disassembledInst.label.assign(_disassemblyLabelStringLength, ' ');
+  }
+
+  // If this is a branch instruction, emit its corresponding label and offset as comment.
+  uint64_t destination;
+  if (result && getBranchDestination(inst, address, destination))
+  {
+    auto itDest = std::lower_bound(_disassemblyLabelAddresses.begin(), _disassemblyLabelAddresses.end(), destination);
+    const int64_t offset = destination - address;
+
+    std::ostringstream ssBranch;
+    ssBranch << ", " << getDisassemblyLabelName(itDest - _disassemblyLabelAddresses.begin())
+             << " # offset(" << std::showpos << offset << std::noshowpos << ")";
+    disassembledInst.instruction += ssBranch.str();
+  }
+
+  return result;
+}
+
+size_t
+QISA_Driver::getDisassemblyLineWidth()
+{
+  if (_disassemblyLineWidth != 0)
+  {
+    return _disassemblyLineWidth;
+  }
+
+  size_t maxDisassemblyLineLength = 0;
+
+  // This needs a pass over all instructions.
+  // Errors of a streaming disassembly are reported when the instructions
+  // are output, so the error state is restored afterwards.
+  const std::string savedErrors = _errorStream.str();
+  const location savedErrorLoc = _errorLoc;
+
+  DisassembledInstruction disassembledInst;
+  const uint64_t nrOfInstructions = getNrOfDisassembledInstructions();
+
+  for (uint64_t address = 0; address < nrOfInstructions; address++)
+  {
+    renderDisassembledInstruction(address, disassembledInst);
+
+    // The label has a fixed length, which is added below.
+    maxDisassemblyLineLength = std::max(maxDisassemblyLineLength, disassembledInst.instruction.size());
+  }
+
+  _errorStream.str("");
+  _errorStream.clear();
+  _errorStream << savedErrors;
+  _errorLoc = savedErrorLoc;
+
+  // Add 4 to leave some space between the end of the instruction text
+  // and the start of the hex code.
+  maxDisassemblyLineLength += 4;
+  // Add the label string length to it.
+  // This will be zero when no branch instructions were used.
+  maxDisassemblyLineLength += _disassemblyLabelStringLength;
+
+  _disassemblyLineWidth = maxDisassemblyLineLength;
+  return _disassemblyLineWidth;
+}
+
+void
+QISA_Driver::writeDisassemblyLine(std::ostream& outputStream,
+                                  const DisassembledInstruction& disassembledInst,
+                                  size_t lineWidth) const
+{
+  // The label is empty when there are no branch instructions.
+  if (_disassemblyFormatId == 1)
+  {
+    outputStream << disassembledInst.hexCode << "  # " << disassembledInst.label
+                 << disassembledInst.instruction << '\n';
+  }
+  else // For now there are only two output formats, so this must be format 2.
+  {
+    outputStream << std::setw(lineWidth) << std::left
+                 << (disassembledInst.label + disassembledInst.instruction)
+                 << "# " << disassembledInst.hexCode << '\n';
   }
 }
 
@@ -523,46 +948,39 @@ QISA_Driver::disassembleClassicInstruction(qisa_instruction_type inst, Disassemb
   // Define an empty location that we will use with these checking functions.
   location errLoc = location();
 
-  if (_classicOpcode2instName.find(opc) == _classicOpcode2instName.end())
+  // The dispatch tables of the target cover all values of the opcode fields.
+  static_assert((QISA_Target::NR_OF_CLASSIC_OPCODES == OPCODE_MASK + 1) &&
+                (QISA_Target::NR_OF_QUANTUM_OPCODES == Q_INST_OPCODE_MASK + 1),
+                "Dispatch table sizes do not match the opcode fields");
+
+  // The mask encoding of the target matches the SMIS, SMIT and FMR fields.
+  static_assert((S_MASK_MASK == (1 << QISA_MaskEngine::S_MASK_PART_WIDTH) - 1) &&
+                (T_MASK_MASK == (1 << QISA_MaskEngine::T_MASK_PART_WIDTH) - 1) &&
+                (QISA_MaskEngine::MAX_NR_OF_MASK_PARTS == POS_MASK + 1) &&
+                (QISA_Target::MAX_NR_OF_Q_REGISTERS == QS_MASK + 1),
+                "Mask encoding does not match the instruction fields");
+
+  const QISA_Target::ClassicDecodeEntry& entry = _target->_classicDecodeTable[opc];
+
+  if (entry.format == QISA_Target::CLASSIC_FORMAT_UNKNOWN)
   {
     _errorStream << "Unknown opcode: " << getHex(opc, 2);
     _errorLoc = errLoc;
     return false;
   }
 
-  std::string inst_name = _classicOpcode2instName[opc];
-
-  // Might use a hashing function to speed things up if necessary.
-  // Possible implementation: http://www.cse.yorku.ca/~oz/hash.html
-  //
-  // Djb2:
-  //
-  //  unsigned long
-  //  hash(unsigned char *str)
-  //  {
-  //      unsigned long hash = 5381;
-  //      int c;
-
-  //      while (c = *str++)
-  //          hash = ((hash << 5) + hash) + c; /* hash * 33 + c */
-
-  //      return hash;
-  //  }
+  const std::string& inst_name = entry.name;
 
   std::ostringstream ssInst;
 
-  if ((inst_name == "NOP") ||
-      (inst_name == "STOP"))
+  switch (entry.format)
+  {
+  case QISA_Target::CLASSIC_FORMAT_NONE:
   {
     ssInst << inst_name;
+    break;
   }
-  else if ((inst_name == "ADD")  ||
-           (inst_name == "ADDC") ||
-           (inst_name == "SUB")  ||
-           (inst_name == "SUBC") ||
-           (inst_name == "AND")  ||
-           (inst_name == "OR")   ||
-           (inst_name == "XOR"))
+  case QISA_Target::CLASSIC_FORMAT_RD_RS_RT:
   {
     const int rd = (inst >> RD_OFFSET) & RD_MASK;
     if (!checkRegisterNumber(rd, errLoc, R_REGISTER)) return false;
@@ -574,8 +992,9 @@ QISA_Driver::disassembleClassicInstruction(qisa_instruction_type inst, Disassemb
     if (!checkRegisterNumber(rt, errLoc, R_REGISTER)) return false;
 
     ssInst << inst_name << " R" << rd << ", R" << rs << ", R" << rt;
+    break;
   }
-  else if (inst_name == "NOT")
+  case QISA_Target::CLASSIC_FORMAT_RD_RT:
   {
     const int rd = (inst >> RD_OFFSET) & RD_MASK;
     if (!checkRegisterNumber(rd, errLoc, R_REGISTER)) return false;
@@ -584,8 +1003,9 @@ QISA_Driver::disassembleClassicInstruction(qisa_instruction_type inst, Disassemb
     if (!checkRegisterNumber(rt, errLoc, R_REGISTER)) return false;
 
     ssInst << inst_name << " R" << rd << ", R" << rt;
+    break;
   }
-  else if (inst_name == "CMP")
+  case QISA_Target::CLASSIC_FORMAT_RS_RT:
   {
     const int rs = (inst >> RS_OFFSET) & RS_MASK;
     if (!checkRegisterNumber(rs, errLoc, R_REGISTER)) return false;
@@ -594,35 +1014,25 @@ QISA_Driver::disassembleClassicInstruction(qisa_instruction_type inst, Disassemb
     if (!checkRegisterNumber(rt, errLoc, R_REGISTER)) return false;
 
     ssInst << inst_name << " R" << rs << ", R" << rt;
+    break;
   }
-  else if (inst_name == "BR")
+  case QISA_Target::CLASSIC_FORMAT_BR:
   {
     const int cond = inst & COND_MASK;
 
-    if (_branchConditionNames.find(cond) == _branchConditionNames.end())
+    if (_target->_branchConditionNames.find(cond) == _target->_branchConditionNames.end())
     {
       _errorStream << "Unknown branch condition: " << getHex(cond, 2);
       _errorLoc = location();
       return false;
     }
 
-    const int addr = (inst >> ADDR_OFFSET) & ADDR_MASK;
-
-    // Sign extend the address, which is an offset relative to the current instruction counter.
-    // Source: http://graphics.stanford.edu/~seander/bithacks.html#FixedSignExtend
-    struct {signed int x:21;} s;
-    const int addr_offset = s.x = addr;
-
-    const uint64_t dest_address = disassembledInst.address + addr_offset;
-
-    // Mark the fact that this instruction is a branch instruction
-    // that will need to address a label.
-    _disassemblyLabels[dest_address].push_back(disassembledInst.address);
-
-    // The labels will be added afterwards.
-    ssInst << inst_name << " " << _branchConditionNames[cond];
+    // The branch destination is added as a label by renderDisassembledInstruction(),
+    // after the labels have been collected by collectDisassemblyLabels().
+    ssInst << inst_name << " " << findOrDefault(_target->_branchConditionNames, cond);
+    break;
   }
-  else if (inst_name == "LDI")
+  case QISA_Target::CLASSIC_FORMAT_LDI:
   {
     const int rd = (inst >> RD_OFFSET) & RD_MASK;
     if (!checkRegisterNumber(rd, errLoc, R_REGISTER)) return false;
@@ -636,8 +1046,9 @@ QISA_Driver::disassembleClassicInstruction(qisa_instruction_type inst, Disassemb
     ssInst << inst_name << " R" << rd << ", "
            << getHex(signed_imm, 5) << " # dec("
            << signed_imm << ")";
+    break;
   }
-  else if (inst_name == "LDUI")
+  case QISA_Target::CLASSIC_FORMAT_LDUI:
   {
     const int rd = (inst >> RD_OFFSET) & RD_MASK;
     if (!checkRegisterNumber(rd, errLoc, R_REGISTER)) return false;
@@ -647,12 +1058,13 @@ QISA_Driver::disassembleClassicInstruction(qisa_instruction_type inst, Disassemb
     ssInst << inst_name << " R" << rd << ", "
            << getHex(imm, 4) << " # dec("
            << imm << ")";
+    break;
   }
-  else if (inst_name == "FBR")
+  case QISA_Target::CLASSIC_FORMAT_FBR:
   {
     const int cond = inst & COND_MASK;
 
-    if (_branchConditionNames.find(cond) == _branchConditionNames.end())
+    if (_target->_branchConditionNames.find(cond) == _target->_branchConditionNames.end())
     {
       _errorStream << "Unknown branch condition: " << getHex(cond, 2);
       _errorLoc = location();
@@ -661,9 +1073,10 @@ QISA_Driver::disassembleClassicInstruction(qisa_instruction_type inst, Disassemb
 
     const int rd = (inst >> RD_OFFSET) & RD_MASK;
 
-    ssInst << inst_name << " " << _branchConditionNames[cond] << ", R" << rd;
+    ssInst << inst_name << " " << findOrDefault(_target->_branchConditionNames, cond) << ", R" << rd;
+    break;
   }
-  else if (inst_name == "FMR")
+  case QISA_Target::CLASSIC_FORMAT_FMR:
   {
     const int rd = (inst >> RD_OFFSET) & RD_MASK;
     if (!checkRegisterNumber(rd, errLoc, R_REGISTER)) return false;
@@ -672,28 +1085,33 @@ QISA_Driver::disassembleClassicInstruction(qisa_instruction_type inst, Disassemb
     if (!checkRegisterNumber(qs, errLoc, Q_REGISTER)) return false;
 
     ssInst << inst_name << " R" << rd << ", Q" << qs;
+    break;
   }
-  else if (inst_name == "SMIS")
+  case QISA_Target::CLASSIC_FORMAT_SMIS:
   {
     const int sd = (inst >> SD_OFFSET) & SD_MASK;
     if (!checkRegisterNumber(sd, errLoc, S_REGISTER)) return false;
 
     uint64_t s_mask_bits = (inst & S_MASK_MASK);
+    const int pos = (inst >> POS_OFFSET) & POS_MASK;
 
-    auto s_mask = bits2s_mask(s_mask_bits);
+    auto s_mask = bits2s_mask(s_mask_bits, pos * QISA_MaskEngine::S_MASK_PART_WIDTH);
     ssInst << inst_name << " S" << sd << ", " << get_s_mask_str(s_mask);
+    break;
   }
-  else if (inst_name == "SMIT")
+  case QISA_Target::CLASSIC_FORMAT_SMIT:
   {
     const int td = (inst >> TD_OFFSET) & TD_MASK;
     if (!checkRegisterNumber(td, errLoc, T_REGISTER)) return false;
 
     uint64_t t_mask_bits = (inst & T_MASK_MASK);
+    const int pos = (inst >> POS_OFFSET) & POS_MASK;
 
-    auto t_mask = bits2t_mask(t_mask_bits);
+    auto t_mask = bits2t_mask(t_mask_bits, pos * QISA_MaskEngine::T_MASK_PART_WIDTH);
     ssInst << inst_name << " T" << td << ", " << get_t_mask_str(t_mask);
+    break;
   }
-  else if (inst_name == "QWAIT")
+  case QISA_Target::CLASSIC_FORMAT_QWAIT:
   {
     const int rd = (inst >> RD_OFFSET) & RD_MASK;
     if (!checkRegisterNumber(rd, errLoc, R_REGISTER)) return false;
@@ -701,18 +1119,22 @@ QISA_Driver::disassembleClassicInstruction(qisa_instruction_type inst, Disassemb
     const int u_imm = inst & U_IMM20_MASK;
 
     ssInst << inst_name << " " << u_imm;
+    break;
   }
-  else if (inst_name == "QWAITR")
+  case QISA_Target::CLASSIC_FORMAT_QWAITR:
   {
     const int rs = (inst >> RS_OFFSET) & RS_MASK;
     if (!checkRegisterNumber(rs, errLoc, R_REGISTER)) return false;
 
     ssInst << inst_name << " R" << rs;
+    break;
   }
-  else
+  default:
   {
     ssInst << "<Not yet supported: '"
-           << _classicOpcode2instName[opc] << "'>" << std::endl;
+           << inst_name << "'>" << std::endl;
+    break;
+  }
   }
 
   disassembledInst.instruction = ssInst.str();
@@ -846,7 +1268,7 @@ QISA_Driver::getErrorSourceLine()
   }
 
   bool error_was_on_prev_line = false;
-  if (_errorStream.str().find("syntax error, unexpected NEWLINE") != std::string::npos)
+  if (_hadSyntaxErrorAtNewline)
   {
     error_was_on_prev_line = true;
     if ((start_error_line > 1) && (end_error_line > 1))
@@ -878,100 +1300,130 @@ QISA_Driver::getErrorSourceLine()
 
   std::string line;
   std::string last_error_source_line;
-  size_t line_counter = 0;
 
-  std::ifstream srcFile (_filename);
-  if (srcFile.is_open())
+  // Only the lines around the error are looked up in the source.
+  for (size_t line_counter = start_context_line;
+       (line_counter <= (size_t)end_context_line) && getSourceLine(line_counter, line);
+       line_counter++)
   {
-    while ( std::getline (srcFile,line) )
+    if (line_counter < start_error_line)
     {
-      line_counter++;
-
-      if ((line_counter >= (size_t)start_context_line) &&
-          (line_counter <= (size_t)end_context_line))
+      ss_pre_context << std::setfill(' ') << std::setw(8) << line_counter << ": ";
+      ss_pre_context << line << std::endl;
+    }
+    else
+      if ((line_counter >= start_error_line) &&
+          (line_counter <= end_error_line))
       {
-        if (line_counter < start_error_line)
-        {
-          ss_pre_context << std::setfill(' ') << std::setw(8) << line_counter << ": ";
-          ss_pre_context << line << std::endl;
-        }
-        else
-          if ((line_counter >= start_error_line) &&
-              (line_counter <= end_error_line))
-          {
-            last_error_source_line = line;
-            ss_error_lines << std::setfill(' ') << std::setw(8) << line_counter << ": ";
-            ss_error_lines << line << std::endl;
-          }
-          else
-          {
-            ss_post_context << std::setfill(' ') << std::setw(8) << line_counter << ": ";
-            ss_post_context << line << std::endl;
-          }
+        last_error_source_line = line;
+        ss_error_lines << std::setfill(' ') << std::setw(8) << line_counter << ": ";
+        ss_error_lines << line << std::endl;
       }
-      if (line_counter > (size_t)end_context_line)
+      else
       {
-        break;
+        ss_post_context << std::setfill(' ') << std::setw(8) << line_counter << ": ";
+        ss_post_context << line << std::endl;
       }
-    }
-    srcFile.close();
+  }
 
+  // Insert a set of carets (^) to show the exact location of the error.
 
-    // Insert a set of carets (^) to show the exact location of the error.
+  // Special case for when the error was an unexpected NEWLINE.
+  // In that case, we want the error marker (^) to point to the
+  // last valid position on the previous line.
+  if (error_was_on_prev_line)
+  {
+    start_error_column = last_error_source_line.size() + 1;
 
-    // Special case for when the error was an unexpected NEWLINE.
-    // In that case, we want the error marker (^) to point to the
-    // last valid position on the previous line.
-    if (error_was_on_prev_line)
+    // Check if there is a comment character (#) in this line.
+    // Discard everything after that character.
+    size_t comment_pos = last_error_source_line.find("#");
+    if (comment_pos != std::string::npos)
     {
-      start_error_column = last_error_source_line.size() + 1;
-
-      // Check if there is a comment character (#) in this line.
-      // Discard everything after that character.
-      size_t comment_pos = last_error_source_line.find("#");
-      if (comment_pos != std::string::npos)
-      {
-        start_error_column = comment_pos + 1;
-      }
-
-      end_error_column = start_error_column + 1;
+      start_error_column = comment_pos + 1;
     }
 
-    for (unsigned int i = 1; i < end_error_column; i++)
+    end_error_column = start_error_column + 1;
+  }
+
+  for (unsigned int i = 1; i < end_error_column; i++)
+  {
+    if (i < start_error_column)
     {
-      if (i < start_error_column)
+      if (last_error_source_line[i-1] == '\t')
       {
-        if (last_error_source_line[i-1] == '\t')
-        {
-          ss_marker_line << "\t";
-        }
-        else
-        {
-          ss_marker_line << " ";
-        }
+        ss_marker_line << "\t";
       }
       else
       {
-        ss_marker_line << "^";
+        ss_marker_line << " ";
       }
     }
-    ss_marker_line << std::endl;
+    else
+    {
+      ss_marker_line << "^";
+    }
+  }
+  ss_marker_line << std::endl;
+
+  ss << ss_pre_context.str();
+  ss << "-------------------------------" << std::endl;
+  ss << ss_error_lines.str();
+  // Note: add 10 spaces to account for the line number.
+  ss << "          " << ss_marker_line.str();
+  ss << "-------------------------------" << std::endl;
+  ss << ss_post_context.str();
 
-    ss << ss_pre_context.str();
-    ss << "-------------------------------" << std::endl;
-    ss << ss_error_lines.str();
-    // Note: add 10 spaces to account for the line number.
-    ss << "          " << ss_marker_line.str();
-    ss << "-------------------------------" << std::endl;
-    ss << ss_post_context.str();
+  return ss.str();
+}
 
+bool
+QISA_Driver::getSourceLine(size_t lineNr, std::string& line)
+{
+  if (lineNr == 0)
+  {
+    return false;
   }
-  else
+
+  if (_lineOffsets.empty())
   {
-    ss << "<Could not read from file: " << _filename << ">";
+    _lineOffsets.push_back(0);
   }
 
-  return ss.str();
+  // The scanner only records the lines it has reached. Lines beyond those
+  // (e.g. after the parser has given up) are indexed when they are needed.
+  while (_lineOffsets.size() < lineNr)
+  {
+    const size_t offset = _lineOffsets.back();
+
+    if (offset >= _source.size())
+    {
+      return false;
+    }
+
+    const char* newline = (const char*)memchr(_source.data() + offset, '\n', _source.size() - offset);
+
+    if (newline == nullptr)
+    {
+      return false;
+    }
+
+    _lineOffsets.push_back(newline + 1 - _source.data());
+  }
+
+  const size_t begin = _lineOffsets[lineNr - 1];
+
+  if (begin >= _source.size())
+  {
+    // There are no characters after the last new-line.
+    return false;
+  }
+
+  const char* newline = (const char*)memchr(_source.data() + begin, '\n', _source.size() - begin);
+  const size_t end = (newline == nullptr) ? _source.size() : (newline - _source.data());
+
+  line.assign(_source, begin, end - begin);
+  return true;
 }
 
 std::string
@@ -983,11 +1435,6 @@ QISA_Driver::getVersion()
 std::string
 QISA_Driver::dumpInstructionsSpecification()
 {
-  if (_opcodes.empty())
-  {
-    setOpcodes();
-  }
-
   std::ostringstream ss;
   ss << "##################################################" << std::endl;
   ss << "#                                                #" << std::endl;
@@ -1006,7 +1453,7 @@ QISA_Driver::dumpInstructionsSpecification()
 
   std::string opc_str;
 
-  for (auto it : _opcodes)
+  for (auto it : _target->_opcodes)
   {
     opc_str = "def_opcode['" + it.first+ "']";
     ss << std::setw(30) << std::left << opc_str << "= " << getHex(it.second, 2) << std::endl;
@@ -1022,7 +1469,7 @@ QISA_Driver::dumpInstructionsSpecification()
   ss << "# No arguments" << std::endl;
   ss << "# (def_q_arg_none)" << std::endl;
 
-  for (auto it : _q_inst_arg_none_opcodes)
+  for (auto it : _target->_q_inst_arg_none_opcodes)
   {
     opc_str = "def_q_arg_none['" + it.first + "']";
     ss << std::setw(30) << std::left << opc_str << "= " << getHex(it.second, 2) << std::endl;
@@ -1032,7 +1479,7 @@ QISA_Driver::dumpInstructionsSpecification()
   ss << "# Uses 'S' register as parameter" << std::endl;
   ss << "# (def_q_arg_st)" << std::endl;
 
-  for (auto it : _q_inst_arg_st_opcodes)
+  for (auto it : _target->_q_inst_arg_st_opcodes)
   {
     opc_str = "def_q_arg_st['" + it.first + "']";
     ss << std::setw(30) << std::left << opc_str << "= " << getHex(it.second, 2) << std::endl;
@@ -1042,7 +1489,7 @@ QISA_Driver::dumpInstructionsSpecification()
   ss << "# Uses 'T' register as parameter" << std::endl;
   ss << "# (def_q_arg_tt)" << std::endl;
 
-  for (auto it : _q_inst_arg_tt_opcodes)
+  for (auto it : _target->_q_inst_arg_tt_opcodes)
   {
     opc_str = "def_q_arg_tt['" + it.first + "']";
     ss << std::setw(30) << std::left << opc_str << "= " << getHex(it.second, 2) << std::endl;
@@ -1076,6 +1523,13 @@ QISA_Driver::error(const location& l, const std::string& m)
 {
   _errorStream << _filename << ":" << l << ": " << m << std::endl;
   _errorLoc = l;
+
+  static const char syntaxErrorAtNewline[] = "syntax error, unexpected NEWLINE";
+
+  if (m.compare(0, sizeof(syntaxErrorAtNewline) - 1, syntaxErrorAtNewline) == 0)
+  {
+    _hadSyntaxErrorAtNewline = true;
+  }
 }
 
 void
@@ -1109,15 +1563,15 @@ QISA_Driver::addExpectedConditionErrorMessage()
     ss << std::endl;
     ss << "ERROR DETECTED: Expected a CONDITION here." << std::endl;
     ss << "Valid conditions are:" << std::endl;
-    for (auto it = _branchConditionNames.begin(); it != _branchConditionNames.end(); ++it)
+    for (auto it = _target->_branchConditionNames.begin(); it != _target->_branchConditionNames.end(); ++it)
     {
       ss << "  " << it->second << std::endl;
     }
     ss << std::endl;
     ss << "Valid condition ALIASES are:" << std::endl;
-    for (auto it = _branchConditionAliases.begin(); it != _branchConditionAliases.end(); ++it)
+    for (auto it = _target->_branchConditionAliases.begin(); it != _target->_branchConditionAliases.end(); ++it)
     {
-      ss << "  " << std::setw(9) << std::left << it->first << ": aliased to: " << _branchConditionNames[it->second] << std::endl;
+      ss << "  " << std::setw(9) << std::left << it->first << ": aliased to: " << findOrDefault(_target->_branchConditionNames, it->second) << std::endl;
     }
 
     addSpecificErrorMessage(ss.str());
@@ -1126,82 +1580,88 @@ QISA_Driver::addExpectedConditionErrorMessage()
 
 
 void
-QISA_Driver::add_symbol(const std::string& symbol_name,
+QISA_Driver::add_symbol(const QISA_Identifier& symbol_name,
                         const QISA::location& symbol_name_loc,
                         int64_t symbol_value,
                         const QISA::location& symbol_value_loc)
 {
   if (_verbose)
       std::cout <<  "          "
-                << "ADD_SYMBOL[int](name='" << symbol_name << "', val=" << symbol_value << ");" << std::endl;
+                << "ADD_SYMBOL[int](name='" << symbol_name.name << "', val=" << symbol_value << ");" << std::endl;
 
   // Note that if a symbol already exists, its value will be overwritten.
-  _intSymbols[symbol_name] = symbol_value;
+  _intSymbols.define(symbol_name.id, symbol_name.name, symbol_value);
 
 }
 
 bool
-QISA_Driver::get_symbol(const std::string& symbol_name,
+QISA_Driver::get_symbol(const QISA_Identifier& symbol_name,
                         const QISA::location& symbol_name_loc,
                         int64_t& imm_val)
 {
   if (_verbose)
       std::cout <<  "          "
-                << "GET_SYMBOL[int](name='" << symbol_name << "');" << std::endl;
+                << "GET_SYMBOL[int](name='" << symbol_name.name << "');" << std::endl;
 
-  auto findIt = _intSymbols.find(symbol_name);
+  auto symbol = _intSymbols.find(symbol_name.id);
 
-  if (findIt == _intSymbols.end())
+  if (symbol == nullptr)
   {
-    _errorStream << symbol_name_loc << ": symbol '" << symbol_name << "' not found" << std::endl;
+    _errorStream << symbol_name_loc << ": symbol '" << symbol_name.name << "' not found" << std::endl;
     _errorLoc = symbol_name_loc;
     return false;
   }
 
-  imm_val = findIt->second;
+  imm_val = symbol->value;
+
+  // Remember where this symbol is used, such that the instruction that uses
+  // it can record the bit field that depends on it (see recordSymbolField()).
+  _lastSymbolName = symbol->name;
+  _lastSymbolLoc = symbol_name_loc;
+
   return true;
 }
 
 // Add a string valued symbol (not used yet).
 void
-QISA_Driver::add_symbol(const std::string& symbol_name,
+QISA_Driver::add_symbol(const QISA_Identifier& symbol_name,
                         const QISA::location& symbol_name_loc,
                         const std::string&  symbol_value,
                         const QISA::location& symbol_value_loc)
 {
   if (_verbose)
       std::cout <<  "          "
-                << "ADD_SYMBOL[str](name='" << symbol_name << "', val=" << symbol_value << ");" << std::endl;
-  _strSymbols[symbol_name] = symbol_value;
+                << "ADD_SYMBOL[str](name='" << symbol_name.name << "', val=" << symbol_value << ");" << std::endl;
+  _strSymbols.define(symbol_name.id, symbol_name.name, symbol_value);
 }
 
 
 bool
-QISA_Driver::get_symbol(const std::string& symbol_name,
+QISA_Driver::get_symbol(const QISA_Identifier& symbol_name,
                         const QISA::location& symbol_name_loc,
                         std::string& imm_val)
 {
   if (_verbose)
       std::cout <<  "          "
-                << "GET_SYMBOL[str](name='" << symbol_name << "');" << std::endl;
+                << "GET_SYMBOL[str](name='" << symbol_name.name << "');" << std::endl;
 
-  auto findIt = _strSymbols.find(symbol_name);
+  auto symbol = _strSymbols.find(symbol_name.id);
 
-  if (findIt == _strSymbols.end())
+  if (symbol == nullptr)
   {
-    _errorStream << symbol_name_loc << ": symbol '" << symbol_name << "' not found" << std::endl;
+    _errorStream << symbol_name_loc << ": symbol '" << symbol_name.name << "' not found" << std::endl;
     _errorLoc = symbol_name_loc;
     return false;
   }
 
-  imm_val = findIt->second;
+  imm_val = symbol->value;
   return true;
 }
 
 // Add a register definition.
 // This is used to give a register a meaningful name.
 bool
-QISA_Driver::add_register_definition(const std::string& register_name,
+QISA_Driver::add_register_definition(const QISA_Identifier& register_name,
                                      const QISA::location& register_name_loc,
                                      uint8_t reg_nr,
                                      const QISA::location& reg_nr_loc,
@@ -1209,72 +1669,72 @@ QISA_Driver::add_register_definition(const std::string& register_name,
 {
   if (_verbose)
       std::cout << "          "
-                << "DEFINE_REG(name='" << register_name
-                << "', reg=" << _registerName[register_kind] << (int)reg_nr << ");" << std::endl;
+                << "DEFINE_REG(name='" << register_name.name
+                << "', reg=" << _target->_registerName[register_kind] << (int)reg_nr << ");" << std::endl;
 
   if (!checkRegisterNumber(reg_nr, reg_nr_loc, register_kind))
   {
     return false;
   }
 
-  _registerAliases[register_kind][register_name] = reg_nr;
+  _registerAliases[register_kind].define(register_name.id, register_name.name, reg_nr);
   return true;
 
 }
 
 bool
-QISA_Driver::get_register_nr(const std::string& register_name,
+QISA_Driver::get_register_nr(const QISA_Identifier& register_name,
                              const QISA::location& register_name_loc,
                              RegisterKind register_kind,
                              uint8_t& result)
 {
   if (_verbose)
       std::cout <<  "          "
-                << "GET_REG(name='" << register_name << "');" << std::endl;
+                << "GET_REG(name='" << register_name.name << "');" << std::endl;
 
-  auto findIt = _registerAliases[register_kind].find(register_name);
+  auto alias = _registerAliases[register_kind].find(register_name.id);
 
-  if (findIt == _registerAliases[register_kind].end())
+  if (alias == nullptr)
   {
     _errorStream << register_name_loc << ": '"
-                 << _registerName[register_kind]
-                 << "' register named '" << register_name
+                 << _target->_registerName[register_kind]
+                 << "' register named '" << register_name.name
                  << "' not found" << std::endl;
     _errorLoc = register_name_loc;
     return false;
   }
 
-  result = findIt->second;
+  result = alias->value;
   return true;
 }
 
 void
-QISA_Driver::add_label(const std::string& label_name,
+QISA_Driver::add_label(const QISA_Identifier& label_name,
                        const QISA::location& label_name_loc)
 {
   if (_verbose)
       std::cout <<  "          "
-                << "ADD_LABEL(name='" << label_name << "') -> addr=" << _instructions.size() << ";" << std::endl;
-  _labels[label_name] = _instructions.size();
+                << "ADD_LABEL(name='" << label_name.name << "') -> addr=" << _instructions.size() << ";" << std::endl;
+  _labels.define(label_name.id, label_name.name, _instructions.size());
 }
 
 int64_t
-QISA_Driver::get_label_address(const std::string& label_name,
+QISA_Driver::get_label_address(const QISA_Identifier& label_name,
                                const QISA::location& label_name_loc,
                                bool get_offset)
 {
   if (_verbose)
       std::cout <<  "          "
-                << "GET_LABEL_ADDRESS(name='" << label_name << "');" << std::endl;
+                << "GET_LABEL_ADDRESS(name='" << label_name.name << "');" << std::endl;
 
 
   const uint64_t programCounter = _instructions.size();
 
   int64_t result;
 
-  auto findIt = _labels.find(label_name);
+  auto label = _labels.find(label_name.id);
 
-  if (findIt == _labels.end())
+  if (label == nullptr)
   {
     // This label has not yet been defined.
     // Record all information that is necessary to assemble the instruction that uses this label after the
@@ -1285,24 +1745,27 @@ QISA_Driver::get_label_address(const std::string& label_name,
     // The instruction type (token) and programCounter will be set when the instruction
     // on the current line will be handled.
     deferred.is_offset = get_offset;
-    deferred.label_name = label_name;
+    deferred.is_alias = false;
+    deferred.label_name = label_name.name;
+    deferred.label_id = label_name.id;
     deferred.label_name_loc = label_name_loc;
 
     // Check if a label has already been used in the current instruction.
-    auto itDeferred = _deferredInstructions.find(label_name_loc);
-
-    if (itDeferred == _deferredInstructions.end())
+    // Label uses are recorded in the order of the source code, so only the
+    // last one can belong to the current instruction.
+    if (_deferredInstructions.empty() ||
+        !isSameLocation(_deferredInstructions.back().label_name_loc, label_name_loc))
     {
-      // If not, add this deferred label use to the deferred instruction map.
+      // If not, add this deferred label use to the deferred instructions.
 
-      _deferredInstructions[label_name_loc] = std::move(deferred);
+      _deferredInstructions.push_back(std::move(deferred));
     }
     else
     {
       // Another label has already been used in this instruction.
       // To indicate this error, modify the original label name and set the location to the offending label.
-      itDeferred->second.label_name = "<<MULTI_LABEL_ERROR>>";
-      itDeferred->second.label_name_loc = label_name_loc;
+      _deferredInstructions.back().label_name = "<<MULTI_LABEL_ERROR>>";
+      _deferredInstructions.back().label_name_loc = label_name_loc;
     }
 
     // This should be a non-sensical return value...
@@ -1310,20 +1773,20 @@ QISA_Driver::get_label_address(const std::string& label_name,
 
     if (_verbose)
         std::cout << "          "
-                  << "    GET_LABEL_ADDRESS didn't find label '" << label_name << "' (yet)" << std::endl;
+                  << "    GET_LABEL_ADDRESS didn't find label '" << label_name.name << "' (yet)" << std::endl;
   }
   else
   {
     if (_verbose)
         std::cout << "          "
-                  << "    GET_LABEL_ADDRESS found label: '" << findIt->first << "', address=: " << findIt->second << std::endl;
+                  << "    GET_LABEL_ADDRESS found label: '" << label->name << "', address=: " << label->value << std::endl;
     if (get_offset)
     {
-      result = findIt->second - programCounter;
+      result = label->value - programCounter;
     }
     else
     {
-      result = findIt->second;
+      result = label->value;
     }
   }
 
@@ -1336,47 +1799,31 @@ QISA_Driver::get_opcode(const std::string& instruction_name,
                         int& opcode,
                         QISA_InstructionKind instruction_kind)
 {
-  const std::map<std::string, int>* opCodeMap;
-
-  switch (instruction_kind) {
-  case IK_SINGLE_FORMAT:
-    opCodeMap = &_opcodes;
-    break;
-  case IK_DF_ARG_NONE:
-    opCodeMap = &_q_inst_arg_none_opcodes;
-    break;
-  case IK_DF_ARG_ST:
-    opCodeMap = &_q_inst_arg_st_opcodes;
-    break;
-  case IK_DF_ARG_TT:
-    opCodeMap = &_q_inst_arg_tt_opcodes;
-    break;
-  }
-
-  std::string searchString(instruction_name);
+  // The instruction index of the target holds the opcodes in the order of QISA_InstructionKind.
+  static_assert((IK_SINGLE_FORMAT == 0) && (IK_DF_ARG_NONE == 1) &&
+                (IK_DF_ARG_ST == 2) && (IK_DF_ARG_TT == 3) &&
+                (QISA_InstructionIndex::NR_OF_INSTRUCTION_KINDS == 4),
+                "Instruction kinds do not match the instruction index");
 
-  // Make the instruction name uppercase.
-  // https://stackoverflow.com/a/17793588
-  for (auto & c: searchString) c = toupper((unsigned char)c);
+  // A single lookup yields the opcodes of all kinds of instructions with this name.
+  const QISA_InstructionIndex::Entry* entry = _target->_instructionIndex.find(instruction_name);
 
-  auto findIt = opCodeMap->find(searchString);
-
-  if (findIt == opCodeMap->end())
+  if (!entry || (entry->opcodes[instruction_kind] == QISA_InstructionIndex::NO_OPCODE))
   {
     // The opcode of the requested instruction kind has not been found.
-    // Check if it is specified in one of the other opcode maps.
+    // Check if it is specified for one of the other instruction kinds.
     // If so, the user has mixed up his parameters, so give him a hint about that.
 
-    if ((instruction_kind != IK_SINGLE_FORMAT) &&
-        _opcodes.find(searchString) != _opcodes.end())
+    if (entry && (instruction_kind != IK_SINGLE_FORMAT) &&
+        (entry->opcodes[IK_SINGLE_FORMAT] != QISA_InstructionIndex::NO_OPCODE))
     {
       _errorStream << instruction_name_loc << ": "
                    << "Classic instruction '" << instruction_name
                    << "' used instead of a quantum instruction. "
                    << std::endl;
     }
-    else if ((instruction_kind != IK_DF_ARG_NONE) &&
-        _q_inst_arg_none_opcodes.find(searchString) != _q_inst_arg_none_opcodes.end())
+    else if (entry && (instruction_kind != IK_DF_ARG_NONE) &&
+        (entry->opcodes[IK_DF_ARG_NONE] != QISA_InstructionIndex::NO_OPCODE))
     {
       _errorStream << instruction_name_loc << ": "
                    << "Instruction '" << instruction_name
@@ -1384,16 +1831,16 @@ QISA_Driver::get_opcode(const std::string& instruction_name,
                    << std::endl;
 
     }
-    else if ((instruction_kind != IK_DF_ARG_ST) &&
-        _q_inst_arg_st_opcodes.find(searchString) != _q_inst_arg_st_opcodes.end())
+    else if (entry && (instruction_kind != IK_DF_ARG_ST) &&
+        (entry->opcodes[IK_DF_ARG_ST] != QISA_InstructionIndex::NO_OPCODE))
     {
       _errorStream << instruction_name_loc << ": "
                    << "Instruction '" << instruction_name
                    << "' needs an S-register argument."
                    << std::endl;
     }
-    else if ((instruction_kind != IK_DF_ARG_TT) &&
-        _q_inst_arg_tt_opcodes.find(searchString) != _q_inst_arg_tt_opcodes.end())
+    else if (entry && (instruction_kind != IK_DF_ARG_TT) &&
+        (entry->opcodes[IK_DF_ARG_TT] != QISA_InstructionIndex::NO_OPCODE))
     {
       _errorStream << instruction_name_loc << ": "
                    << "Instruction '" << instruction_name
@@ -1409,7 +1856,7 @@ QISA_Driver::get_opcode(const std::string& instruction_name,
     return false;
   }
 
-  opcode = findIt->second;
+  opcode = entry->opcodes[instruction_kind];
   return true;
 }
 
@@ -1587,7 +2034,7 @@ QISA_Driver::generate_BR(const location& inst_loc,
 {
   if (_verbose)
       std::cout << std::setw(8) << std::setfill('0') << _instructions.size() << ": " << std::setw(0)
-                << "BR(cond='" << _branchConditionNames[cond] << "',addr=" << addr << ");" << std::endl;
+                << "BR(cond='" << findOrDefault(_target->_branchConditionNames, cond) << "',addr=" << addr << ");" << std::endl;
 
   int opcode;
 
@@ -1638,8 +2085,10 @@ QISA_Driver::generate_BR(const location& inst_loc,
     // A deferred instruction has been created in the attempt to resolve a label.
     // Locate this and set the instruction type.
 
-    auto findIt = _deferredInstructions.find(addr_loc);
-    if (findIt == _deferredInstructions.end())
+    // This is the last deferred label use, because it belongs to the
+    // instruction that is being generated.
+    if (_deferredInstructions.empty() ||
+        !isSameLocation(_deferredInstructions.back().label_name_loc, addr_loc))
     {
       // This should not happen.
       _errorStream << "INTERNAL ASSEMBLER ERROR <BR:DEFER>, location=" << addr_loc << std::endl;
@@ -1648,8 +2097,9 @@ QISA_Driver::generate_BR(const location& inst_loc,
     }
     else
     {
-      findIt->second.instruction = QISA_Parser::token::TOK_BR;
-      findIt->second.programCounter = _instructions.size();
+      _deferredInstructions.back().instruction = QISA_Parser::token::TOK_BR;
+      _deferredInstructions.back().is_alias = is_alias;
+      _deferredInstructions.back().programCounter = _instructions.size();
     }
   }
 
@@ -1697,6 +2147,7 @@ bool QISA_Driver::generate_LDI(const location& inst_loc,
                                       | (imm & IMM20_MASK);
 
   _instructions.emplace_back(instruction);
+  recordSymbolField(imm_loc, _instructions.size() - 1, 0, IMM20_MASK, minImm, maxImm);
   return true;
 }
 
@@ -1740,6 +2191,7 @@ bool QISA_Driver::generate_LDUI(const location& inst_loc,
                                       | (imm & U_IMM15_MASK);
 
   _instructions.emplace_back(instruction);
+  recordSymbolField(imm_loc, _instructions.size() - 1, 0, U_IMM15_MASK, minImm, maxImm);
   return true;
 }
 
@@ -1753,7 +2205,7 @@ QISA_Driver::generate_FBR(const location& inst_loc,
 {
   if (_verbose)
       std::cout << std::setw(8) << std::setfill('0') << _instructions.size() << ": " << std::setw(0)
-                << "FBR(cond='" << _branchConditionNames[cond] << "',rd=" << (int)rd << ");" << std::endl;
+                << "FBR(cond='" << findOrDefault(_target->_branchConditionNames, cond) << "',rd=" << (int)rd << ");" << std::endl;
 
   int opcode;
 
@@ -1821,7 +2273,7 @@ bool
 QISA_Driver::generate_SMIS(const location& inst_loc,
                            uint8_t sd,
                            const location& sd_loc,
-                           const std::vector<uint8_t>& s_mask,
+                           const SMask& s_mask,
                            const location& s_mask_loc)
 {
   if (_verbose)
@@ -1841,56 +2293,57 @@ QISA_Driver::generate_SMIS(const location& inst_loc,
   }
 
   // Construct the s_mask on bit level.
-  // NOTE: The parser already has checked the given s_mask.
-  int64_t s_mask_bits = 0;
+  // NOTE: The parser already has checked the given s_mask, which implies
+  //       that it can be encoded.
+  QISA_MaskEngine::QubitBits s_mask_bits;
   for (auto it = s_mask.begin(); it != s_mask.end(); ++it)
   {
-    s_mask_bits |= (1LL << *it);
+    s_mask_bits.set(*it);
   }
 
-  //divide it into two parts
-  //int64_t s_mask_bits = s_mask_bits & 0x1ffff;
-  int64_t s_mask_bits_array;
-  s_mask_bits_array = s_mask_bits & 0x1ffff;
-
-  //corresponding pos value
-  //No position field for SMIS
-
-  // Encode the parameters into an instruction and add it to the instruction list.
-  unsafe_generate_SMIS(opcode, sd, s_mask_bits_array);
-  //unsafe_generate_SMIS(opcode, sd, pos1, s_mask_bits1);
-  //unsafe_generate_SMIS(opcode, sd, pos2, s_mask_bits2);
+  // Divide the mask value into parts of 17 bits, each of which is encoded
+  // into an instruction of its own, with the part number as its pos value.
+  const int nrOfParts = _target->_maskEngine.getNrOfSMaskParts();
+  for (int pos = 0; pos < nrOfParts; ++pos)
+  {
+    unsafe_generate_SMIS(opcode, sd, pos, QISA_MaskEngine::getSMaskPart(s_mask_bits, pos));
+  }
 
   return true;
 }
 
 
-std::vector<uint8_t>
-QISA_Driver::bits2s_mask(int64_t s_mask_bits)
+SMask
+QISA_Driver::bits2s_mask(uint64_t s_mask_bits,
+                         int first_qubit)
 {
-  std::vector<uint8_t> result;
-  const std::bitset<sizeof(s_mask_bits)> bs(s_mask_bits);
-  for (uint8_t i = 0; i < _totalNrOfQubits; i++)
+  SMask result;
+  for (int qubit = first_qubit; (s_mask_bits != 0) && (qubit < _target->_totalNrOfQubits); qubit++)
   {
-    if (bs[i])
+    if (s_mask_bits & 1)
     {
-      result.push_back(i);
+      result.push_back(qubit);
     }
+    s_mask_bits >>= 1;
   }
 
   return result;
 }
 
-std::vector<QISA_Driver::TargetControlPair>
-QISA_Driver::bits2t_mask(int64_t t_mask_bits)
+TMask
+QISA_Driver::bits2t_mask(uint64_t t_mask_bits,
+                         int first_edge)
 {
-  std::vector<TargetControlPair>  result;
-  for (size_t i = 0; i < _valid_target_control_pairs.size(); i++)
+  const std::vector<TargetControlPair>& edges = _target->_maskEngine.getEdges();
+
+  TMask result;
+  for (size_t edgeNr = first_edge; (t_mask_bits != 0) && (edgeNr < edges.size()); edgeNr++)
   {
-    if (t_mask_bits & ( 1LL<< i))
+    if (t_mask_bits & 1)
     {
-      result.push_back(_bit2tc_pair[i]);
+      result.push_back(edges[edgeNr]);
     }
+    t_mask_bits >>= 1;
   }
 
   return result;
@@ -1933,7 +2386,7 @@ QISA_Driver::generate_SMIS(const location& inst_loc,
   }
 
   // Encode the parameters into an instruction and add it to the instruction list.
-  unsafe_generate_SMIS(opcode, sd, imm);
+  unsafe_generate_SMIS(opcode, sd, 0, imm);
 
   return true;
 }
@@ -1945,10 +2398,12 @@ QISA_Driver::generate_SMIS(const location& inst_loc,
 void
 QISA_Driver::unsafe_generate_SMIS(int opcode,
                                   uint8_t sd,
+                                  uint8_t pos,
                                   int64_t s_mask_bits)
 {
   qisa_instruction_type instruction = ((opcode & OPCODE_MASK) << OPCODE_OFFSET)
                                       | ((sd & SD_MASK) << SD_OFFSET)
+                                      | ((pos & POS_MASK) << POS_OFFSET)
                                       | (s_mask_bits & S_MASK_MASK);
 
   _instructions.emplace_back(instruction);
@@ -1960,7 +2415,7 @@ bool
 QISA_Driver::generate_SMIT(const location& inst_loc,
                            uint8_t td,
                            const location& td_loc,
-                           const std::vector<TargetControlPair>& t_mask,
+                           const TMask& t_mask,
                            const location& t_mask_loc)
 {
   if (_verbose)
@@ -1979,42 +2434,23 @@ QISA_Driver::generate_SMIT(const location& inst_loc,
     return false;
   }
 
-  // Construct the t_mask on bit level.
-  // NOTE: The parser already has checked the given t_mask.
+  const QISA_MaskEngine& maskEngine = _target->_maskEngine;
 
-  int64_t t_mask_bits = 0;
+  // Construct the t_mask on bit level.
+  // NOTE: The parser already has checked the given t_mask, which implies
+  //       that it can be encoded.
+  QISA_MaskEngine::EdgeBits t_mask_bits = 0;
   for (auto it = t_mask.begin(); it != t_mask.end(); ++it)
   {
-    const uint8_t t_mask_bit = _valid_target_control_pairs[*it];
-    t_mask_bits |= (1LL << t_mask_bit);
-  }
-
-  //divide the 48 bits mask value into three parts
-  //int64_t t_mask_bits1 = (t_mask_bits & 0xffff);
-  //int64_t t_mask_bits2 = (t_mask_bits & 0xffff0000) >> 16;
-  //int64_t t_mask_bits3 = (t_mask_bits & 0xffff00000000) >> 32;
-  int64_t *t_mask_bits_array;
-  t_mask_bits_array = new int64_t[pos_number_t];
-  for (int i = 0; i < pos_number_t; ++i) {
-    t_mask_bits_array[i] = (t_mask_bits >> (16 * i)) & 0xffff;
-  }
-
-  //corresponding pos value
-  //uint8_t pos1 = 0;
-  //uint8_t pos2 = 1;
-  //uint8_t pos3 = 2;
-  uint8_t *pos;
-  pos = new uint8_t[pos_number_t];
-  for (int i = 0; i < pos_number_t; ++i) {
-    pos[i] = i;
+    t_mask_bits |= (1ULL << maskEngine.findEdge(it->first, it->second));
   }
 
-  // Encode the parameters into an instruction and add it to the instruction list.
-  //unsafe_generate_SMIT(opcode, td, pos1, t_mask_bits1);
-  //unsafe_generate_SMIT(opcode, td, pos2, t_mask_bits2);
-  //unsafe_generate_SMIT(opcode, td, pos3, t_mask_bits3);
-  for (int i = 0; i < pos_number_t; ++i) {
-    unsafe_generate_SMIT(opcode, td, pos[i], t_mask_bits_array[i]);
+  // Divide the mask value into parts of 16 bits, each of which is encoded
+  // into an instruction of its own, with the part number as its pos value.
+  const int nrOfParts = maskEngine.getNrOfTMaskParts();
+  for (int pos = 0; pos < nrOfParts; ++pos)
+  {
+    unsafe_generate_SMIT(opcode, td, pos, QISA_MaskEngine::getTMaskPart(t_mask_bits, pos));
   }
 
   return true;
@@ -2058,7 +2494,7 @@ QISA_Driver::generate_SMIT(const location& inst_loc,
   // Now, we must subject this value to the same tests as done in validate_t_mask.
 
   // First, we will convert the given immediate value to a vector of tc_pairs.
-  auto t_mask = bits2t_mask(imm);
+  auto t_mask = bits2t_mask(imm, 0);
 
   // Now we can perform the check.
   if (!validate_t_mask(t_mask, imm_loc))
@@ -2123,6 +2559,7 @@ QISA_Driver::generate_QWAIT(const location& inst_loc,
                                       | (imm & U_IMM20_MASK);
 
   _instructions.emplace_back(instruction);
+  recordSymbolField(imm_loc, _instructions.size() - 1, 0, U_IMM20_MASK, minImm, maxImm);
   return true;
 }
 
@@ -2351,7 +2788,7 @@ QISA_Driver::generate_BR_COND(const location& inst_loc,
 {
   if (_verbose)
       std::cout << std::setw(8) << std::setfill('0') << _instructions.size() << ": " << std::setw(0)
-                << "-- ALIAS: B" << _branchConditionNames[cond]
+                << "-- ALIAS: B" << findOrDefault(_target->_branchConditionNames, cond)
                    << "(rs=" << (int)rs << ",rt=" << (int)rt << ",addr=" << addr << ");" << std::endl;
 
   // We leave checking the parameters up to the generation functions we call.
@@ -2426,12 +2863,29 @@ bool QISA_Driver::generate_MOV(const location& inst_loc,
     const int64_t lowerPart = imm & U_IMM17_MASK;
     const int64_t upperPart = ((imm & ~U_IMM17_MASK) >> 17) & U_IMM15_MASK;
 
+    // The generated LDI and LDUI instructions do not encode the symbol value
+    // itself, so record the fields that depend on it here instead.
+    const std::string symbolName = _lastSymbolName;
+    const size_t ldiAddress = _instructions.size();
+    _lastSymbolName.clear();
+
     result = generate_LDI(inst_loc, rd, rd_loc, lowerPart, imm_loc);
 
     if (result)
     {
       result = generate_LDUI(inst_loc, rd, rd_loc, upperPart, imm_loc);
     }
+
+    if (result)
+    {
+      // Values that fit in 20 bits would result in a single LDI instruction,
+      // so these are not acceptable when instantiating a program template.
+      _lastSymbolName = symbolName;
+      recordSymbolField(imm_loc, ldiAddress, 0, U_IMM17_MASK,
+                        minImm, maxImm, minImm20, maxImm20);
+      recordSymbolField(imm_loc, ldiAddress + 1, 17, U_IMM15_MASK,
+                        minImm, maxImm, minImm20, maxImm20);
+    }
   }
   else
   {
@@ -2472,10 +2926,10 @@ QISA_Driver::generate_MULT2(const location& inst_loc,
 bool
 QISA_Driver::checkRegisterNumber(uint8_t reg_nr, const QISA::location& register_nr_loc, RegisterKind register_kind)
 {
-  if (reg_nr >= _nrOfRegisters[register_kind])
+  if (reg_nr >= _target->_nrOfRegisters[register_kind])
   {
     _errorStream << register_nr_loc << ": register nr (" << (int)reg_nr << ") too high, max="
-                 << _nrOfRegisters[register_kind] - 1 << std::endl;
+                 << _target->_nrOfRegisters[register_kind] - 1 << std::endl;
     _errorLoc = register_nr_loc;
     return false;
   }
@@ -2504,14 +2958,53 @@ QISA_Driver::checkValueRange(int64_t val,
     return true;
 }
 
+void
+QISA_Driver::recordSymbolField(const QISA::location& imm_loc,
+                               size_t address,
+                               unsigned int valueShift,
+                               qisa_instruction_type fieldMask,
+                               int64_t minVal,
+                               int64_t maxVal,
+                               int64_t excludedMinVal,
+                               int64_t excludedMaxVal)
+{
+  // Only the immediate value at the location of the last symbol lookup
+  // has been taken from that symbol.
+  if (_lastSymbolName.empty() ||
+      (_lastSymbolLoc.begin.line != imm_loc.begin.line) ||
+      (_lastSymbolLoc.begin.column != imm_loc.begin.column) ||
+      (_lastSymbolLoc.end.line != imm_loc.end.line) ||
+      (_lastSymbolLoc.end.column != imm_loc.end.column))
+  {
+    return;
+  }
+
+  std::ostringstream loc;
+  loc << imm_loc;
+
+  QISA_ProgramTemplate::Field field;
+  field.parameterIndex = 0; // Determined by getProgramTemplate().
+  field.address = address;
+  field.valueShift = valueShift;
+  field.fieldMask = fieldMask;
+  field.minVal = minVal;
+  field.maxVal = maxVal;
+  field.excludedMinVal = excludedMinVal;
+  field.excludedMaxVal = excludedMaxVal;
+  field.location = loc.str();
+
+  _symbolFields.push_back(field);
+  _symbolFieldNames.push_back(_lastSymbolName);
+}
+
 bool
-QISA_Driver::validate_qubit_address(uint8_t qubit_address,
+QISA_Driver::validate_qubit_address(int64_t qubit_address,
                                         const location& loc)
 {
-  if (qubit_address > (_totalNrOfQubits - 1))
+  if ((qubit_address < 0) || (qubit_address > (_target->_totalNrOfQubits - 1)))
   {
     _errorStream << loc << ": Invalid qubit number used. Valid range: [0-"
-                 << (_totalNrOfQubits - 1) << "]" << std::endl;
+                 << (_target->_totalNrOfQubits - 1) << "]" << std::endl;
     _errorLoc = loc;
     return false;
   }
@@ -2520,13 +3013,16 @@ QISA_Driver::validate_qubit_address(uint8_t qubit_address,
 
 
 bool
-QISA_Driver::validate_s_mask(const std::vector<uint8_t>& s_mask,
+QISA_Driver::validate_s_mask(const SMask& s_mask,
                              const location& s_mask_loc)
 {
+  PhaseTimer maskValidationTimer(_statistics.maskValidationSeconds);
+
   // A valid s_mask:
   //   - contains at least one element,
-  //   - contains at most _totalNrOfQubits elements,
+  //   - contains at most _target->_totalNrOfQubits elements,
   //   - has no duplicates
+  //   - can be encoded for the layout of the target.
 
   // It is assumed here that the qubit values given in s_mask have already been validated.
   if (s_mask.empty())
@@ -2536,20 +3032,29 @@ QISA_Driver::validate_s_mask(const std::vector<uint8_t>& s_mask,
     return false;
   }
 
-  if ((int)s_mask.size() > _totalNrOfQubits)
+  if ((int)s_mask.size() > _target->_totalNrOfQubits)
+  {
+    _errorStream << s_mask_loc << ": to many bits in s_mask: max=" << _target->_totalNrOfQubits << std::endl;
+    _errorLoc = s_mask_loc;
+    return false;
+  }
+
+  if (!_target->_maskEngine.canEncodeSMask())
   {
-    _errorStream << s_mask_loc << ": to many bits in s_mask: max=" << _totalNrOfQubits << std::endl;
+    _errorStream << s_mask_loc << ": s_mask cannot be encoded for "
+                 << _target->_totalNrOfQubits << " qubits: max="
+                 << QISA_MaskEngine::MAX_NR_OF_S_MASK_QUBITS << std::endl;
     _errorLoc = s_mask_loc;
     return false;
   }
 
   // Check for duplicates
-  std::set<uint8_t> prev_values;
+  QISA_MaskEngine::QubitBits prev_values;
   for (auto it = s_mask.begin(); it != s_mask.end(); ++it)
   {
-    if (prev_values.count(*it) == 0)
+    if (!prev_values[*it])
     {
-      prev_values.insert(*it);
+      prev_values.set(*it);
     }
     else
     {
@@ -2564,12 +3069,15 @@ QISA_Driver::validate_s_mask(const std::vector<uint8_t>& s_mask,
 
 
 bool
-QISA_Driver::validate_t_mask(const std::vector<TargetControlPair>& t_mask,
+QISA_Driver::validate_t_mask(const TMask& t_mask,
                              const location& t_mask_loc)
 {
+  PhaseTimer maskValidationTimer(_statistics.maskValidationSeconds);
+
   // A valid t_mask:
   //   - contains at least one element,
   //   - should not exceed the number of valid pairs,
+  //   - can be encoded for the layout of the target,
   //   - has no duplicates
   //   - a qubit address can appear no more than once.
 
@@ -2581,81 +3089,93 @@ QISA_Driver::validate_t_mask(const std::vector<TargetControlPair>& t_mask,
     return false;
   }
 
-  if (t_mask.size() > _valid_target_control_pairs.size())
+  const QISA_MaskEngine& maskEngine = _target->_maskEngine;
+
+  if ((int)t_mask.size() > maskEngine.getNrOfEdges())
   {
     _errorStream << t_mask_loc << ": too many pairs in t_mask: max="
-                 << _valid_target_control_pairs.size() << std::endl;
+                 << maskEngine.getNrOfEdges() << std::endl;
     _errorLoc = t_mask_loc;
     return false;
   }
 
-  // Check for duplicates
-  std::set<TargetControlPair> prev_values;
-  for (auto it = t_mask.begin(); it != t_mask.end(); ++it)
+  if (!maskEngine.canEncodeTMask())
   {
-    if (prev_values.count(*it) == 0)
-    {
-      prev_values.insert(*it);
-    }
-    else
+    _errorStream << t_mask_loc << ": t_mask cannot be encoded for "
+                 << maskEngine.getNrOfEdges() << " edges: max="
+                 << QISA_MaskEngine::MAX_NR_OF_T_MASK_EDGES << std::endl;
+    _errorLoc = t_mask_loc;
+    return false;
+  }
+
+  // Edge number of each pair. The number of pairs is limited by the checks above.
+  int edge_nrs[QISA_MaskEngine::MAX_NR_OF_T_MASK_EDGES];
+
+  // Check for duplicates.
+  QISA_MaskEngine::EdgeBits prev_edges = 0;
+  for (size_t i = 0; i < t_mask.size(); i++)
+  {
+    edge_nrs[i] = maskEngine.findEdge(t_mask[i].first, t_mask[i].second);
+
+    const QISA_MaskEngine::EdgeBits edge_bit = 1ULL << edge_nrs[i];
+    if (prev_edges & edge_bit)
     {
-      _errorStream << t_mask_loc << ": duplicate entry in t_mask: " << get_tc_pair_str(*it) << std::endl;
+      _errorStream << t_mask_loc << ": duplicate entry in t_mask: " << get_tc_pair_str(t_mask[i]) << std::endl;
       _errorLoc = t_mask_loc;
       return false;
     }
+    prev_edges |= edge_bit;
   }
 
   // Ensure that each qubit only appears once in the list.
-  std::set<uint8_t> prev_qubit_uses;
-  for (auto it = t_mask.begin(); it != t_mask.end(); ++it)
+  // A qubit of a pair has been used before if one of the previous pairs is
+  // an edge that uses that qubit.
+  QISA_MaskEngine::EdgeBits prev_qubit_uses = 0;
+  for (size_t i = 0; i < t_mask.size(); i++)
   {
-    size_t first_count = prev_qubit_uses.count(it->first);
-    size_t second_count = prev_qubit_uses.count(it->second);
-    if ((first_count  == 0) &&
-        (second_count == 0))
-    {
-      prev_qubit_uses.insert(it->first);
-      prev_qubit_uses.insert(it->second);
-    }
-    else
+    const bool first_used = (prev_qubit_uses & maskEngine.getTargetQubitEdges(edge_nrs[i])) != 0;
+    const bool second_used = (prev_qubit_uses & maskEngine.getControlQubitEdges(edge_nrs[i])) != 0;
+
+    if (first_used || second_used)
     {
       std::ostringstream ss;
-      if ((first_count != 0) && (second_count != 0))
+      if (first_used && second_used)
       {
-        ss << ": qubits '" << (int)it->first << "' and '" << (int)it->second << "' are ";
+        ss << ": qubits '" << (int)t_mask[i].first << "' and '" << (int)t_mask[i].second << "' are ";
       }
-      else if ((first_count != 0))
+      else if (first_used)
       {
-        ss << ": qubit '" << (int)it->first << "' is ";
+        ss << ": qubit '" << (int)t_mask[i].first << "' is ";
       }
       else
       {
-        ss << ": qubit '" << (int)it->second << "' is ";
+        ss << ": qubit '" << (int)t_mask[i].second << "' is ";
       }
 
       _errorStream << t_mask_loc << ss.str()
                    << "used in more than one target-control pair in t_mask. Offending entry: "
-                   << get_tc_pair_str(*it) << " (t_mask bit "
-                   << (int)_valid_target_control_pairs[*it] << ") " << std::endl;
+                   << get_tc_pair_str(t_mask[i]) << " (t_mask bit "
+                   << edge_nrs[i] << ") " << std::endl;
       _errorLoc = t_mask_loc;
       return false;
     }
+
+    prev_qubit_uses |= 1ULL << edge_nrs[i];
   }
 
   return true;
 }
 
 
-bool QISA_Driver::validate_target_control_pair(const TargetControlPair& target_control_pair,
+bool QISA_Driver::validate_target_control_pair(int64_t target_qubit,
+                                               int64_t control_qubit,
                                                const location& target_control_pair_loc)
 {
-  auto findIt = _valid_target_control_pairs.find(target_control_pair);
-
-  if (findIt == _valid_target_control_pairs.end())
+  if (_target->_maskEngine.findEdge(target_qubit, control_qubit) == QISA_MaskEngine::NO_EDGE)
   {
     _errorStream << target_control_pair_loc << ": ("
-                 << (int)target_control_pair.first << ","
-                 << (int)target_control_pair.second
+                 << target_qubit << ","
+                 << control_qubit
                  << ") is an invalid target-control pair" << std::endl;
     _errorLoc = target_control_pair_loc;
     return false;
@@ -2676,79 +3196,79 @@ QISA_Driver::validate_bundle_separator(uint8_t bs_val,
   return true;
 }
 
-QInstructionPtr
+bool
 QISA_Driver::get_q_instr_arg_none(const std::string& inst_name,
-                                  const location& inst_loc)
+                                  const location& inst_loc,
+                                  QInstruction& q_inst)
 {
   int opcode;
 
   if (!get_opcode(inst_name, inst_loc, opcode, IK_DF_ARG_NONE))
   {
-    return NULL;
+    return false;
   }
 
-  return std::make_shared<QInstruction>(opcode);;
+  q_inst = QInstruction(opcode);
+  return true;
 }
 
-QInstructionPtr
+bool
 QISA_Driver::get_q_instr_arg_st(const std::string& inst_name,
                                 const location& inst_loc,
                                 uint8_t st,
                                 const location& st_loc,
-                                bool is_conditional)
+                                bool is_conditional,
+                                QInstruction& q_inst)
 {
   int opcode;
 
   if (!get_opcode(inst_name, inst_loc, opcode, IK_DF_ARG_ST))
   {
-    return NULL;
+    return false;
   }
 
   if (!checkRegisterNumber(st, st_loc, S_REGISTER))
   {
-    return NULL;
+    return false;
   }
 
-  return std::make_shared<QInstruction>(opcode, st, is_conditional);
+  q_inst = QInstruction(opcode, st, is_conditional);
+  return true;
 }
 
-QInstructionPtr
+bool
 QISA_Driver::get_q_instr_arg_tt(const std::string& inst_name,
                                 const location& inst_loc,
                                 uint8_t tt,
-                                const location& tt_loc)
+                                const location& tt_loc,
+                                QInstruction& q_inst)
 {
   int opcode;
 
   if (!get_opcode(inst_name, inst_loc, opcode, IK_DF_ARG_TT))
   {
-    return NULL;
+    return false;
   }
 
   if (!checkRegisterNumber(tt, tt_loc, T_REGISTER))
   {
-    return NULL;
+    return false;
   }
 
-  return std::make_shared<QInstruction>(opcode, tt);
+  q_inst = QInstruction(opcode, tt);
+  return true;
 }
 
-QInstructionPtr
+bool
 QISA_Driver::get_q_instr_arg_one(const std::string& inst_name,
                                  const location& inst_loc,
-                                 const std::string& reg_name,
-                                 const location& reg_name_loc)
+                                 const QISA_Identifier& reg_name,
+                                 const location& reg_name_loc,
+                                 QInstruction& q_inst)
 {
-  std::string searchString(inst_name);
-
-  // Make the instruction name uppercase.
-  // https://stackoverflow.com/a/17793588
-  for (auto & c: searchString) c = toupper((unsigned char)c);
+  const QISA_InstructionIndex::Entry* entry = _target->_instructionIndex.find(inst_name);
 
-
-  auto stIt = _q_inst_arg_st_opcodes.find(searchString);
-
-  if (stIt != _q_inst_arg_st_opcodes.end())
+  if (entry && (entry->opcodes[IK_DF_ARG_ST] != QISA_InstructionIndex::NO_OPCODE))
   {
     // This is a quantum instruction that expects an s-register.
     // The given reg_name should be an existing s-register alias.
@@ -2759,7 +3279,8 @@ QISA_Driver::get_q_instr_arg_one(const std::string& inst_name,
     {
       // By giving the false flag, we make sure that a s-register
       // type quantum instruction is created.
-      return std::make_shared<QInstruction>(stIt->second, reg_nr, false);
+      q_inst = QInstruction(entry->opcodes[IK_DF_ARG_ST], reg_nr, false);
+      return true;
     }
     else
     {
@@ -2767,13 +3288,12 @@ QISA_Driver::get_q_instr_arg_one(const std::string& inst_name,
       // However, to keep consistent with the rest of the error messages,
       // add another one that specifically states that an s-register is expected.
       addExpectationErrorMessage("an S_REGISTER");
-      return NULL;
+      return false;
     }
   }
   else
   {
-    auto ttIt = _q_inst_arg_tt_opcodes.find(searchString);
-    if (ttIt != _q_inst_arg_tt_opcodes.end())
+    if (entry && (entry->opcodes[IK_DF_ARG_TT] != QISA_InstructionIndex::NO_OPCODE))
     {
       // This is a quantum instruction that expects a t-register.
       // The given reg_name should be an existing t-register alias.
@@ -2782,7 +3302,8 @@ QISA_Driver::get_q_instr_arg_one(const std::string& inst_name,
       bool success = get_register_nr(reg_name, reg_name_loc, QISA::QISA_Driver::T_REGISTER, reg_nr);
       if (success)
       {
-        return std::make_shared<QInstruction>(ttIt->second, reg_nr);
+        q_inst = QInstruction(entry->opcodes[IK_DF_ARG_TT], reg_nr);
+        return true;
       }
       else
       {
@@ -2790,14 +3311,14 @@ QISA_Driver::get_q_instr_arg_one(const std::string& inst_name,
         // However, to keep consistent with the rest of the error messages,
         // add another one that specifically states that an s-register is expected.
         addExpectationErrorMessage("a T_REGISTER");
-        return NULL;
+        return false;
       }
     }
     else
     {
       _errorStream << inst_loc << ": opcode for quantum instruction '" << inst_name << "' not found" << std::endl;
       _errorLoc = inst_loc;
-      return NULL;
+      return false;
     }
   }
 }
@@ -2805,20 +3326,20 @@ QISA_Driver::get_q_instr_arg_one(const std::string& inst_name,
 
 
 uint64_t
-QISA_Driver::encode_q_instr(const std::shared_ptr<QInstruction>& q_inst)
+QISA_Driver::encode_q_instr(const QInstruction& q_inst)
 {
   uint64_t result;
-  result = (q_inst->opcode & Q_INST_OPCODE_MASK) << Q_INST_OPCODE_OFFSET;
+  result = (q_inst.opcode & Q_INST_OPCODE_MASK) << Q_INST_OPCODE_OFFSET;
 
-  switch (q_inst->type) {
+  switch (q_inst.type) {
     case QInstruction::ARG_NONE:
       break;
     case QInstruction::ARG_ST:
-      result |= (q_inst->reg_nr & Q_INST_SD_MASK)
-                | (q_inst->is_conditional & 1) << Q_INST_ST_COND_OFFSET;
+      result |= (q_inst.reg_nr & Q_INST_SD_MASK)
+                | (q_inst.is_conditional & 1) << Q_INST_ST_COND_OFFSET;
       break;
     case QInstruction::ARG_TT:
-      result |= (q_inst->reg_nr & Q_INST_TD_MASK);
+      result |= (q_inst.reg_nr & Q_INST_TD_MASK);
       break;
     default:
       // Set to 0 in case another type has been given that we
@@ -2833,24 +3354,15 @@ QISA_Driver::encode_q_instr(const std::shared_ptr<QInstruction>& q_inst)
 bool
 QISA_Driver::decode_q_instr(uint64_t q_inst, std::string& q_inst_str)
 {
-  std::ostringstream ss;
-
   int opc = (q_inst >> Q_INST_OPCODE_OFFSET) & Q_INST_OPCODE_MASK;
 
   location errLoc = location();
 
-  if (_quantumOpcode2instName.find(opc) == _quantumOpcode2instName.end())
-  {
-    _errorStream << "Unknown quantum opcode: " << getHex(opc, 2);
-    _errorLoc = errLoc;
-    ss << "<INVALID QUANTUM OPCODE: " << getHex(opc, 2) << ">";
-    q_inst_str = ss.str();
-    return false;
-  }
-
-  std::string inst_name = _quantumOpcode2instName[opc];
+  const QISA_Target::QuantumDecodeEntry& entry = _target->_quantumDecodeTable[opc];
 
-  if (_q_inst_arg_st_opcodes.find(inst_name) != _q_inst_arg_st_opcodes.end())
+  switch (entry.format)
+  {
+  case QISA_Target::QUANTUM_FORMAT_ST:
   {
     int rs = (q_inst & Q_INST_SD_MASK);
     if (!checkRegisterNumber(rs, errLoc, S_REGISTER))
@@ -2858,28 +3370,36 @@ QISA_Driver::decode_q_instr(uint64_t q_inst, std::string& q_inst_str)
 
     bool is_cond = (q_inst >> Q_INST_ST_COND_OFFSET) & 1;
 
-    if (is_cond)
-    {
-      ss << "C,";
-    }
-
-    ss << inst_name << " S" << rs;
+    q_inst_str = is_cond ? "C," : "";
+    q_inst_str += entry.name;
+    q_inst_str += " S";
+    q_inst_str += std::to_string(rs);
+    break;
   }
-  else if (_q_inst_arg_tt_opcodes.find(inst_name) != _q_inst_arg_tt_opcodes.end())
+  case QISA_Target::QUANTUM_FORMAT_TT:
   {
     int rt = (q_inst & Q_INST_TD_MASK);
     if (!checkRegisterNumber(rt, errLoc, T_REGISTER))
       return false;
 
-    ss << inst_name << " T" << rt;
+    q_inst_str = entry.name;
+    q_inst_str += " T";
+    q_inst_str += std::to_string(rt);
+    break;
   }
-  else
+  case QISA_Target::QUANTUM_FORMAT_NONE:
   {
-    // If it is neither an st nor a tt instruction, it must be one without an argument.
-    ss << inst_name;
+    q_inst_str = entry.name;
+    break;
+  }
+  default:
+  {
+    _errorStream << "Unknown quantum opcode: " << getHex(opc, 2);
+    _errorLoc = errLoc;
+    q_inst_str = "<INVALID QUANTUM OPCODE: " + getHex(opc, 2) + ">";
+    return false;
+  }
   }
-
-  q_inst_str = ss.str();
 
   return true;
 }
@@ -2900,16 +3420,18 @@ QISA_Driver::generate_q_bundle(uint8_t bs_val,
     auto it = bundle.begin();
     if (it != bundle.end())
     {
-      std::cout << _quantumOpcode2instName[(*it)->opcode];
+      std::cout << findOrDefault(_target->_quantumOpcode2instName, it->opcode);
     }
     ++it;
     for (; it != bundle.end(); ++it)
     {
-      std::cout << "," << _quantumOpcode2instName[(*it)->opcode];
+      std::cout << "," << findOrDefault(_target->_quantumOpcode2instName, it->opcode);
     }
     std::cout << ")" << std::endl;
   }
 
+  _statistics.nrOfBundles++;
+
   bool issued_bs = false;
 
   for (auto it = bundle.begin(); it != bundle.end(); ++it)
@@ -2952,7 +3474,7 @@ QISA_Driver::generate_q_bundle(uint8_t bs_val,
 
 
 std::string
-QISA_Driver::get_s_mask_str(const std::vector<uint8_t>& s_mask)
+QISA_Driver::get_s_mask_str(const SMask& s_mask)
 {
   std::ostringstream ss;
   ss << "{";
@@ -2981,7 +3503,7 @@ QISA_Driver::get_tc_pair_str(const TargetControlPair& tc_pair)
 
 
 std::string
-QISA_Driver::get_t_mask_str(const std::vector<QISA_Driver::TargetControlPair>& t_mask)
+QISA_Driver::get_t_mask_str(const TMask& t_mask)
 {
   std::ostringstream ss;
   ss << "{";
@@ -3014,15 +3536,15 @@ QISA_Driver::processDeferredInstructions()
       std::cout << "Processing deferred instructions..." << std::endl;
   }
 
-  for (auto& itKV : _deferredInstructions)
+  for (auto& deferred : _deferredInstructions)
   {
-    if (itKV.second.label_name == "<<MULTI_LABEL_ERROR>>")
+    if (deferred.label_name == "<<MULTI_LABEL_ERROR>>")
     {
       // An error has already been detected: an undeclared label has been used multiple times for the same instruction.
       // This is as of yet not supported.
-      _errorStream << itKV.second.label_name_loc
+      _errorStream << deferred.label_name_loc
                    << ": Using multiple labels for one instruction is not supported." << std::endl;
-      _errorLoc = itKV.second.label_name_loc;
+      _errorLoc = deferred.label_name_loc;
 
       // Set return value to false to indicate an error condition.
       result = false;
@@ -3031,15 +3553,15 @@ QISA_Driver::processDeferredInstructions()
       continue;
     }
 
-    auto findIt = _labels.find(itKV.second.label_name);
-    if (findIt == _labels.end())
+    auto label = _labels.find(deferred.label_id);
+    if (label == nullptr)
     {
       // Label has not been defined in this program.
       // Issue an error.
 
-      _errorStream << itKV.second.label_name_loc
-                   << ": Label '" << itKV.second.label_name << "' not found." << std::endl;
-      _errorLoc = itKV.second.label_name_loc;
+      _errorStream << deferred.label_name_loc
+                   << ": Label '" << deferred.label_name << "' not found." << std::endl;
+      _errorLoc = deferred.label_name_loc;
 
       // Set return value to false to indicate an error condition.
       result = false;
@@ -3053,13 +3575,13 @@ QISA_Driver::processDeferredInstructions()
       return result;
     }
 
-    const uint64_t label_address = findIt->second;
+    const uint64_t label_address = label->value;
 
-    switch (itKV.second.instruction)
+    switch (deferred.instruction)
     {
       case QISA_Parser::token::TOK_BR:
       {
-        int64_t offset = label_address - itKV.second.programCounter;
+        int64_t offset = label_address - deferred.programCounter;
 
         // Ensure that the new offset is valid.
 
@@ -3070,12 +3592,12 @@ QISA_Driver::processDeferredInstructions()
         const int64_t maxOffset =  (1LL<<20) - 1;
 
 
-        if (!checkValueRange(offset, minOffset, maxOffset, "addr", itKV.second.label_name_loc))
+        if (!checkValueRange(offset, minOffset, maxOffset, "addr", deferred.label_name_loc))
         {
           return false;
         }
 
-        if (itKV.second.is_alias)
+        if (deferred.is_alias)
         {
           // Correct for the implicit CMP instruction that precedes the actual branch instruction.
           // Normally, the branch offset will always be positive, but just to be sure we handle
@@ -3093,34 +3615,150 @@ QISA_Driver::processDeferredInstructions()
 
 
         // We only have to set the offset, so we 'or' the affected instruction with this offset.
-        _instructions[itKV.second.programCounter] |= ((offset & ADDR_MASK) << ADDR_OFFSET);
+        _instructions[deferred.programCounter] |= ((offset & ADDR_MASK) << ADDR_OFFSET);
+
+        if (_verbose)
+        {
+          std::cout << "Resolved label offset for instruction " << deferred.programCounter
+                    << " to " << offset << std::endl;
+        }
+
+        break;
+      }
+      default:
+      {
+        _errorStream << deferred.label_name_loc
+                     << ": Use of forward defined label '" << deferred.label_name
+                     << "' for this instruction is not yet supported!" << std::endl;
+        _errorLoc = deferred.label_name_loc;
+        // Set return value to false to indicate an error condition.
+        result = false;
+
+        break;
+      }
+    }
+  }
+
+  return result;
+}
+
+
+const std::vector<QISA_Driver::qisa_instruction_type>&
+QISA_Driver::getInstructions() const
+{
+  return _instructions;
+}
+
+const QISA_Driver::Statistics&
+QISA_Driver::getStatistics() const
+{
+  return _statistics;
+}
+
+bool
+QISA_Driver::getProgramTemplate(QISA_ProgramTemplate& programTemplate)
+{
+  if ((_lastDriverAction != DRIVER_ACTION_PARSE) || !_assemblySucceeded)
+  {
+    _errorStream << "Cannot create a program template: no program has been assembled successfully"
+                 << std::endl;
+    return false;
+  }
+
+  // It is only known which symbols the program uses if it has been parsed.
+  if (!parseIfTakenFromCache())
+  {
+    return false;
+  }
+
+  std::vector<std::string> parameterNames;
+  std::vector<int64_t> defaultValues;
+  std::vector<QISA_ProgramTemplate::Field> fields = _symbolFields;
+
+  for (size_t i = 0; i < fields.size(); i++)
+  {
+    const std::string& symbolName = _symbolFieldNames[i];
+
+    auto findIt = std::find(parameterNames.begin(), parameterNames.end(), symbolName);
+
+    if (findIt == parameterNames.end())
+    {
+      parameterNames.push_back(symbolName);
+      // The symbol has been defined, because it has been used.
+      QISA_SymbolTable::SymbolId symbolId = 0;
+      _symbolTable.find(symbolName, symbolId);
+      defaultValues.push_back(_intSymbols.find(symbolId)->value);
+      findIt = parameterNames.end() - 1;
+    }
+
+    fields[i].parameterIndex = findIt - parameterNames.begin();
+  }
+
+  programTemplate.initialize(_instructions, parameterNames, defaultValues, fields);
+  return true;
+}
+
+bool
+QISA_Driver::parseIfTakenFromCache()
+{
+  if (_symbolFieldsValid)
+  {
+    return true;
+  }
+
+  // Assemble the program again, this time parsing the source code.
+  QISA_AssemblyCache* cache = _cache;
+  const std::string source = _source;
+  const std::string sourceName = _filename;
+
+  // The instructions are the same as those taken from the cache. Keep their
+  // storage, because views on it may have been handed out (see
+  // getInstructions()).
+  std::vector<qisa_instruction_type> instructions;
+  instructions.swap(_instructions);
+
+  _cache = nullptr;
+  bool success = assembleString(source, sourceName);
+  _cache = cache;
+
+  if (success && (instructions.size() == _instructions.size()))
+  {
+    std::copy(_instructions.begin(), _instructions.end(), instructions.begin());
+    _instructions.swap(instructions);
+  }
 
-        if (_verbose)
-        {
-          std::cout << "Resolved label offset for instruction " << itKV.second.programCounter
-                    << " to " << offset << std::endl;
-        }
+  return success;
+}
 
-        break;
-      }
-      default:
-      {
-        _errorStream << itKV.second.label_name_loc
-                     << ": Use of forward defined label '" << itKV.second.label_name
-                     << "' for this instruction is not yet supported!" << std::endl;
-        _errorLoc = itKV.second.label_name_loc;
-        // Set return value to false to indicate an error condition.
-        result = false;
+bool
+QISA_Driver::analyzeTiming(QISA_TimingAnalysis& analysis, unsigned int instructionsPerCycle)
+{
+  if (instructionsPerCycle == 0)
+  {
+    _errorStream << "Cannot analyze the timing: the number of instructions per cycle must be positive"
+                 << std::endl;
+    return false;
+  }
 
-        break;
-      }
+  if ((_lastDriverAction == DRIVER_ACTION_PARSE) && _assemblySucceeded)
+  {
+    // The labels of the program are only known if it has been parsed.
+    if (!parseIfTakenFromCache())
+    {
+      return false;
     }
   }
+  else if (_lastDriverAction != DRIVER_ACTION_DISASSEMBLE)
+  {
+    _errorStream << "Cannot analyze the timing: no program has been assembled or disassembled successfully"
+                 << std::endl;
+    return false;
+  }
 
-  return result;
+  analysis.analyze(*this, instructionsPerCycle);
+  return true;
 }
 
-
 std::vector<std::string>
 QISA_Driver::getInstructionsAsHexStrings(bool withBinaryOutput)
 {
@@ -3144,6 +3782,39 @@ QISA_Driver::getInstructionsAsHexStrings(bool withBinaryOutput)
   return result;
 }
 
+bool
+QISA_Driver::setAssemblyFormat(int format_id)
+{
+  if (format_id < 1 || format_id > 3)
+  {
+    error("Incorrect format_id. Allowed is either 1, 2 or 3.");
+    // Return false to indicate failure;
+    return false;
+  }
+
+  _assemblyFormatId = format_id;
+  return true;
+}
+
+bool
+QISA_Driver::getAssemblyOutput(std::string& output)
+{
+  std::ostringstream outputStream;
+
+  // Nothing is saved, so keep the statistics of the last save().
+  const uint64_t bytesWritten = _statistics.bytesWritten;
+  const bool result = saveAssembly(outputStream);
+  _statistics.bytesWritten = bytesWritten;
+
+  if (!result)
+  {
+    return false;
+  }
+
+  output = outputStream.str();
+  return true;
+}
+
 bool
 QISA_Driver::setDisassemblyFormat(int format_id)
 {
@@ -3165,83 +3836,104 @@ std::string QISA_Driver::getDisassemblyOutput()
     return "Can only get disassembly output after successful disassembly!";
   }
 
-  // Determine the longest assembly output line.
-  // This will be used to properly indent the instruction
-  // hex code comment in output format 2.
+  if (_verbose && _disassemblyLabelAddresses.empty())
+    std::cout << "No branch instructions found." << std::endl;
 
-  size_t maxDisassemblyLineLength = 0;
-  if (_disassemblyFormatId == 2)
+  // This will hold the disassembly output to return.
+  std::string disassemblyOutput;
+
+  getDisassemblyLines(0, std::numeric_limits<size_t>::max(), disassemblyOutput);
+
+  return disassemblyOutput;
+}
+
+bool
+QISA_Driver::getDisassembledInstruction(uint64_t address, std::string& label, std::string& instruction)
+{
+  if (_lastDriverAction != DRIVER_ACTION_DISASSEMBLE)
   {
-    for (auto it : _disassembledInstructions)
-    {
-      if (maxDisassemblyLineLength < it.second.instruction.size())
-      {
-        maxDisassemblyLineLength = it.second.instruction.size();
-      }
-    }
-    // Add 4 to leave some space between the end of the instruction text
-    // and the start of the hex code.
-    maxDisassemblyLineLength += 4;
-    // Add the label string length to it.
-    // This will be zero when no branch instructions were used.
-    maxDisassemblyLineLength += _disassemblyLabelStringLength;
+    error("Can only get disassembly output after successful disassembly!");
+    return false;
   }
 
+  if (address >= getNrOfDisassembledInstructions())
+  {
+    _errorStream << "No instruction at address " << address
+                 << ", the number of instructions is " << getNrOfDisassembledInstructions() << std::endl;
+    _errorLoc = location();
+    return false;
+  }
 
-  // This will hold the disassembly output to return.
-  std::stringstream disassemblyOutput;
+  DisassembledInstruction disassembledInst;
+  if (!renderDisassembledInstruction(address, disassembledInst))
+  {
+    _errorStream << "Error while disassembling instruction "
+                 << disassembledInst.hexCode
+                 <<  ", instructionCount = " << address;
+    _errorLoc = location();
+    return false;
+  }
 
-  if (_disassemblyLabels.empty())
+  // Only the name of the label, without the ': ' of the disassembly output.
+  auto itLabel = std::lower_bound(_disassemblyLabelAddresses.begin(), _disassemblyLabelAddresses.end(), address);
+  if (itLabel != _disassemblyLabelAddresses.end() && *itLabel == address)
+  {
+    label = getDisassemblyLabelName(itLabel - _disassemblyLabelAddresses.begin());
+  }
+  else
   {
-    // This is the simple (but unlikely) case where there are no branch
-    // instructions in the code.
+    label.clear();
+  }
 
-    if (_verbose)
-      std::cout << "No branch instructions found." << std::endl;
+  instruction = disassembledInst.instruction;
+  return true;
+}
 
-    if (_disassemblyFormatId == 1)
-    {
-      for (auto it : _disassembledInstructions)
-      {
-        disassemblyOutput << it.second.hexCode << "  # " << it.second.instruction << std::endl;
-      }
-    }
-    else // For now there are only two output formats, so this must be format 2.
-    {
-      for (auto it : _disassembledInstructions)
-      {
-        disassemblyOutput << std::setw(maxDisassemblyLineLength) << std::left
-                  << it.second.instruction << "# "
-                  << it.second.hexCode << std::endl;
-      }
-    }
+bool
+QISA_Driver::getDisassemblyLines(uint64_t firstAddress, size_t maxNrOfLines, std::string& lines)
+{
+  if (_lastDriverAction != DRIVER_ACTION_DISASSEMBLE)
+  {
+    error("Can only get disassembly output after successful disassembly!");
+    return false;
   }
-  else
+
+  // Determine the longest assembly output line.
+  // This will be used to properly indent the instruction
+  // hex code comment in output format 2.
+  const size_t lineWidth = (_disassemblyFormatId == 2) ? getDisassemblyLineWidth() : 0;
+
+  std::ostringstream disassemblyOutput;
+  bool result = true;
+
+  const uint64_t nrOfInstructions = getNrOfDisassembledInstructions();
+  DisassembledInstruction disassembledInst;
+
+  for (uint64_t address = firstAddress;
+       address < nrOfInstructions && (address - firstAddress) < maxNrOfLines;
+       address++)
   {
-    if (_disassemblyFormatId == 1)
-    {
-      for (auto it : _disassembledInstructions)
-      {
-        disassemblyOutput << it.second.hexCode << "  # " << it.second.label
-                  << it.second.instruction << std::endl;
-      }
-    }
-    else // For now there are only two output formats, so this must be format 2.
+    // Only the errors of a streaming disassembly have not been reported yet.
+    if (!renderDisassembledInstruction(address, disassembledInst) &&
+        _disassemblyInput.data() != nullptr)
     {
-      for (auto it : _disassembledInstructions)
-      {
-        std::string fullInstruction(it.second.label + it.second.instruction);
-        disassemblyOutput << std::setw(maxDisassemblyLineLength) << std::left
-                  << fullInstruction << "# " << it.second.hexCode << std::endl;
-      }
+      _errorStream << "Error while disassembling instruction "
+                   << disassembledInst.hexCode
+                   <<  ", instructionCount = " << address;
+      _errorLoc = location();
+      result = false;
     }
+
+    writeDisassemblyLine(disassemblyOutput, disassembledInst, lineWidth);
   }
 
-  return disassemblyOutput.str();
+  lines += disassemblyOutput.str();
+
+  return result;
 }
 
 bool
-QISA_Driver::saveAssembly(std::ofstream& outputStream)
+QISA_Driver::saveAssembly(std::ostream& outputStream)
 {
   if (_instructions.empty())
   {
@@ -3250,18 +3942,87 @@ QISA_Driver::saveAssembly(std::ofstream& outputStream)
     return false;
   }
 
-  for (auto& it : _instructions)
+  const char* instructionBytes = reinterpret_cast<const char*>(_instructions.data());
+  const size_t nrOfInstructionBytes = _instructions.size() * sizeof(qisa_instruction_type);
+
+  if (_assemblyFormatId == 2)
+  {
+    // Hexadecimal memory initialization file.
+    // The output is written in pieces, to limit the size of the buffer.
+    const size_t nrOfLinesPerWrite = 65536;
+    const size_t nrOfCharsPerLine = 2 * sizeof(qisa_instruction_type) + 1;
+    static const char hexDigits[] = "0123456789abcdef";
+
+    std::string lines;
+
+    for (size_t first = 0; first < _instructions.size(); first += nrOfLinesPerWrite)
+    {
+      const size_t nrOfLines = std::min(nrOfLinesPerWrite, _instructions.size() - first);
+
+      lines.resize(nrOfLines * nrOfCharsPerLine);
+      char* line = &lines[0];
+
+      for (size_t i = 0; i < nrOfLines; i++, line += nrOfCharsPerLine)
+      {
+        qisa_instruction_type instruction = _instructions[first + i];
+        for (int digit = 2 * sizeof(qisa_instruction_type) - 1; digit >= 0; digit--)
+        {
+          line[digit] = hexDigits[instruction & 0xf];
+          instruction >>= 4;
+        }
+        line[nrOfCharsPerLine - 1] = '\n';
+      }
+
+      outputStream.write(lines.data(), lines.size());
+      if (outputStream.fail())
+      {
+        error("Error occurred while writing assembly output to output stream.");
+        return false;
+      }
+
+      _statistics.bytesWritten += lines.size();
+    }
+
+    // Return true to indicate success;
+    return true;
+  }
+
+  if (_assemblyFormatId == 3)
   {
-    const qisa_instruction_type instruction = it;
-    outputStream.write(reinterpret_cast<const char*>(&instruction), sizeof(qisa_instruction_type));
+    // Image: a header, followed by the instructions as in the raw binary format.
+    char header[IMAGE_HEADER_SIZE] = {};
 
+    std::memcpy(header + IMAGE_MAGIC_OFFSET, "QISA", 4);
+    putLittleEndian(header + IMAGE_FORMAT_VERSION_OFFSET, IMAGE_FORMAT_VERSION, 2);
+    putLittleEndian(header + IMAGE_HEADER_SIZE_OFFSET, IMAGE_HEADER_SIZE, 2);
+    putLittleEndian(header + IMAGE_NR_OF_INSTRUCTIONS_OFFSET, (uint32_t)_instructions.size(), 4);
+    putLittleEndian(header + IMAGE_CHECKSUM_OFFSET,
+                    updateCrc32(0, reinterpret_cast<const unsigned char*>(instructionBytes),
+                                nrOfInstructionBytes),
+                    4);
+    std::strncpy(header + IMAGE_VERSION_OFFSET, QISA_VERSION_STRING, IMAGE_VERSION_SIZE);
+
+    outputStream.write(header, IMAGE_HEADER_SIZE);
     if (outputStream.fail())
     {
       error("Error occurred while writing assembly output to output stream.");
       return false;
     }
+
+    _statistics.bytesWritten += IMAGE_HEADER_SIZE;
+  }
+
+  // Raw binary: write all instructions at once.
+  outputStream.write(instructionBytes, nrOfInstructionBytes);
+
+  if (outputStream.fail())
+  {
+    error("Error occurred while writing assembly output to output stream.");
+    return false;
   }
 
+  _statistics.bytesWritten += nrOfInstructionBytes;
+
   // Return true to indicate success;
   return true;
 }
@@ -3298,21 +4059,41 @@ QISA_Driver::saveAssembly(const std::string& outputFileName)
 }
 
 bool
-QISA_Driver::saveDisassembly(std::ofstream& outputStream)
+QISA_Driver::saveDisassembly(std::ostream& outputStream)
 {
-  std::string disassemblyOutput = getDisassemblyOutput();
+  // The output is written in pieces, so that the output of a streaming
+  // disassembly is never held in memory completely.
+  const size_t nrOfLinesPerWrite = 4096;
 
-  outputStream << disassemblyOutput;
-  if (outputStream.fail())
+  const uint64_t nrOfInstructions = getNrOfDisassembledInstructions();
+
+  // Assume no errors while disassembling.
+  bool result = true;
+
+  std::string disassemblyOutput;
+
+  for (uint64_t address = 0; address < nrOfInstructions; address += nrOfLinesPerWrite)
   {
-    error("Error occurred while writing disassembly output to output stream");
+    disassemblyOutput.clear();
 
-    // Return false to indicate failure;
-    return false;
+    if (!getDisassemblyLines(address, nrOfLinesPerWrite, disassemblyOutput))
+    {
+      result = false;
+    }
+
+    outputStream << disassemblyOutput;
+    if (outputStream.fail())
+    {
+      error("Error occurred while writing disassembly output to output stream");
+
+      // Return false to indicate failure;
+      return false;
+    }
+
+    _statistics.bytesWritten += disassemblyOutput.size();
   }
 
-  // Return true to indicate success;
-  return true;
+  return result;
 }
 
 bool
@@ -3329,8 +4110,12 @@ QISA_Driver::saveDisassembly(const std::string& outputFileName)
 
   if (!saveDisassembly(outputFileStream))
   {
-    _errorStream << "Write error on file '" << outputFileName << "'" << std::endl;
-    _errorLoc = location();
+    // Errors in the disassembled instructions have already been reported.
+    if (outputFileStream.fail())
+    {
+      _errorStream << "Write error on file '" << outputFileName << "'" << std::endl;
+      _errorLoc = location();
+    }
     // Return false to indicate failure;
     return false;
   }
@@ -3340,8 +4125,12 @@ QISA_Driver::saveDisassembly(const std::string& outputFileName)
 }
 
 bool
-QISA_Driver::save(std::ofstream& outputStream)
+QISA_Driver::save(std::ostream& outputStream)
 {
+  _statistics.saveSeconds = 0;
+  _statistics.bytesWritten = 0;
+  PhaseTimer saveTimer(_statistics.saveSeconds);
+
   bool result = false;
 
   switch(_lastDriverAction)
@@ -3370,6 +4159,10 @@ QISA_Driver::save(std::ofstream& outputStream)
 bool
 QISA_Driver::save(const std::string& outputFileName)
 {
+  _statistics.saveSeconds = 0;
+  _statistics.bytesWritten = 0;
+  PhaseTimer saveTimer(_statistics.saveSeconds);
+
   bool result = false;
 
   switch(_lastDriverAction)
@@ -3427,193 +4220,105 @@ QISA_Driver::loadQuantumInstructions(const std::string& qMapFilename)
 }
 
 
-bool
-QISA_Driver::checkQuantumInstructionMap(const std::string& mapName,
-                                        const q_map_t& inputMap,
-                                        std::map<std::string, std::string>& checkInstructionMap,
-                                        std::map<int, std::string>& checkOpcodeMap,
-                                        q_map_t& outputMap)
-{
-  auto itCheckOpc = checkOpcodeMap.begin();
-  auto itCheckInstr = checkInstructionMap.begin();
-
-  for(auto it : inputMap)
-  {
-    // First, check that the given opcode is within range.
-    if (it.second < 0)
-    {
-      _errorStream << "Negative opcode not allowed: "
-                   << mapName << "['" << it.first << "'] = "
-                   << it.second;
-      _errorLoc = location();
-      return false;
-    }
-    else if (it.second > _maxQuantumOpcodeVal)
-    {
-      _errorStream << "Opcode value too high (max=" << _maxQuantumOpcodeVal
-                   << mapName << "['" << it.first << "'] = (" << it.second << "/"
-                   << getHex(it.second, 2)
-                   << ")";
-      _errorLoc = location();
-      return false;
-    }
-
-    // Now check if the opcode has been used in another map.
-    itCheckOpc = checkOpcodeMap.find(it.second);
-    if (itCheckOpc != checkOpcodeMap.end())
-    {
-      _errorStream << "Opcode (" << it.second << "/"
-                   << getHex(it.second, 2)
-                   << ") specified for "
-                   << mapName << "['" << it.first
-                   << "'] is already used in " <<
-                   itCheckOpc->second << std::endl;
-      _errorLoc = location();
-      return false;
-    }
-
-    // The opcode seems OK.
-    // Put the combination into checkOpcodeMap so that it can be
-    // checked against for other instructions.
-    checkOpcodeMap[it.second] = mapName + "['" + it.first + "']";
-
-    // Make the instruction name uppercase.
-    // https://stackoverflow.com/a/17793588
-    std::string instructionName = it.first;
-    for (auto & c: instructionName) c = toupper((unsigned char)c);
-
-
-    // Check if the instruction name is already used in another map.
-    itCheckInstr = checkInstructionMap.find(instructionName);
-    if (itCheckInstr != checkInstructionMap.end())
-    {
-      _errorStream << "Instruction "
-                   << mapName << "['" << instructionName
-                   << "'] is already used in"
-                   << itCheckInstr->second << std::endl;
-      _errorLoc = location();
-      return false;
-    }
-
-    // The instruction name seems OK.
-    // Put the combination into checkInstructionMap so that it can be
-    // checked against for other instructions.
-    checkInstructionMap[instructionName] = mapName + "['" + instructionName + "']";
-
-
-    // Put the validated result in outputMap.
-    outputMap[instructionName] = it.second;
-  }
-
-  return true;
-}
-
 bool
 QISA_Driver::loadQuantumInstructions(const q_map_t& arg_none_map,
                                     const q_map_t& arg_st_map,
                                     const q_map_t& arg_tt_map)
 {
-  // Will hold the validated results.
-  q_map_t q_inst_arg_none_opcodes;
-  q_map_t q_inst_arg_st_opcodes;
-  q_map_t q_inst_arg_tt_opcodes;
-
-
-  // Do not assume that the given maps are OK.
-
-  // This map will be used to ensure that there are no
-  // duplicate opcodes between the given maps.
-  std::map<int, std::string> checkOpcodeMap;
-
-  // This map will be used to ensure that there are no
-  // duplicate instruction names between the given maps.
-  std::map<std::string, std::string> checkInstructionMap;
-
-  bool result = checkQuantumInstructionMap("arg_none_map",
-                                           arg_none_map,
-                                           checkInstructionMap,
-                                           checkOpcodeMap,
-                                           q_inst_arg_none_opcodes);
-
-
-  // Check if  opcode '0' is present in 'arg_none_map'.
-
-  // This instruction is used as filler when only one double format
-  // instruction has been specified on an assembly instruction.
-  bool foundOpcodeZero = false;
-  for (auto it : q_inst_arg_none_opcodes)
-  {
-    if (it.second == 0)
-    {
-      foundOpcodeZero = true;
-      break;
-    }
-  }
-
-  if (!foundOpcodeZero)
-  {
-    _errorStream << "The Quantum instruction for opcode 0 is missing." << std::endl;
-    _errorStream << "It is mandatory for correct operation of QISA-AS."  << std::endl;
-    _errorStream << "Specify this in parameter 'arg_none_map'."  << std::endl;
-    return false;
-  }
-
-  if (result == false)
-  {
-    // An error message already has been left.
-    return false;
-  }
+  // The target may be shared with other drivers, so change a copy of it.
+  std::shared_ptr<QISA_Target> target = std::make_shared<QISA_Target>(*_target);
 
-  result = checkQuantumInstructionMap("arg_st_map",
-                                      arg_st_map,
-                                      checkInstructionMap,
-                                      checkOpcodeMap,
-                                      q_inst_arg_st_opcodes);
-  if (result == false)
+  if (!target->loadQuantumInstructions(arg_none_map,
+                                       arg_st_map,
+                                       arg_tt_map,
+                                       _errorStream))
   {
-    // An error message already has been left.
+    _errorLoc = location();
     return false;
   }
 
-  result = checkQuantumInstructionMap("arg_tt_map",
-                                      arg_tt_map,
-                                      checkInstructionMap,
-                                      checkOpcodeMap,
-                                      q_inst_arg_tt_opcodes);
-  if (result == false)
-  {
-    // An error message already has been left.
-    return false;
-  }
+  _target = target;
 
-  // Everything seems fine.
-  // Now update the appropriate member maps.
-  _q_inst_arg_none_opcodes.swap(q_inst_arg_none_opcodes);
-  _q_inst_arg_st_opcodes.swap(q_inst_arg_st_opcodes);
-  _q_inst_arg_tt_opcodes.swap(q_inst_arg_tt_opcodes);
+  return true;
+}
 
+void
+QISA_Driver::getQuantumInstructions(q_map_t& arg_none_map,
+                                    q_map_t& arg_st_map,
+                                    q_map_t& arg_tt_map) const
+{
+  _target->getQuantumInstructions(arg_none_map, arg_st_map, arg_tt_map);
+}
 
-  // For disassembly purposes, we also need the reverse map,
-  // which maps an opcode to an instruction name.
-  // Process all maps in sequence.
-  _quantumOpcode2instName.clear();
+const QISA_Driver::q_map_t&
+QISA_Driver::getClassicOpcodes() const
+{
+  return _target->getClassicOpcodes();
+}
 
-  for (auto it : _q_inst_arg_none_opcodes)
-  {
-    _quantumOpcode2instName[it.second] = it.first;
-  }
+const std::map<uint8_t, std::string>&
+QISA_Driver::getBranchConditionNames() const
+{
+  return _target->getBranchConditionNames();
+}
 
-  for (auto it : _q_inst_arg_st_opcodes)
-  {
-    _quantumOpcode2instName[it.second] = it.first;
-  }
+std::shared_ptr<const QISA_Target>
+QISA_Driver::getTarget() const
+{
+  return _target;
+}
 
-  for (auto it : _q_inst_arg_tt_opcodes)
-  {
-    _quantumOpcode2instName[it.second] = it.first;
-  }
+void
+QISA_Driver::setTarget(std::shared_ptr<const QISA_Target> target)
+{
+  _target = std::move(target);
+}
 
-  return true;
+QISA_Driver::q_map_t
+QISA_Driver::getEncodingConstants()
+{
+  return q_map_t
+  {
+    // Classic instructions.
+    { "OPCODE_OFFSET",              OPCODE_OFFSET              },
+    { "RD_OFFSET",                  RD_OFFSET                  },
+    { "RS_OFFSET",                  RS_OFFSET                  },
+    { "RT_OFFSET",                  RT_OFFSET                  },
+    { "SD_OFFSET",                  SD_OFFSET                  },
+    { "TD_OFFSET",                  TD_OFFSET                  },
+    { "ADDR_OFFSET",                ADDR_OFFSET                },
+    { "POS_OFFSET",                 POS_OFFSET                 },
+
+    { "OPCODE_MASK",                OPCODE_MASK                },
+    { "RS_MASK",                    RS_MASK                    },
+    { "RT_MASK",                    RT_MASK                    },
+    { "RD_MASK",                    RD_MASK                    },
+    { "ADDR_MASK",                  ADDR_MASK                  },
+    { "COND_MASK",                  COND_MASK                  },
+    { "IMM20_MASK",                 IMM20_MASK                 },
+    { "U_IMM17_MASK",               U_IMM17_MASK               },
+    { "U_IMM15_MASK",               U_IMM15_MASK               },
+    { "QS_MASK",                    QS_MASK                    },
+    { "POS_MASK",                   POS_MASK                   },
+    { "SD_MASK",                    SD_MASK                    },
+    { "TD_MASK",                    TD_MASK                    },
+    { "S_MASK_MASK",                S_MASK_MASK                },
+    { "T_MASK_MASK",                T_MASK_MASK                },
+    { "U_IMM20_MASK",               U_IMM20_MASK               },
+
+    // Quantum instructions.
+    { "VLIW_INST_0_OFFSET",         VLIW_INST_0_OFFSET         },
+    { "VLIW_INST_1_OFFSET",         VLIW_INST_1_OFFSET         },
+    { "Q_INST_ST_COND_OFFSET",      Q_INST_ST_COND_OFFSET      },
+    { "Q_INST_OPCODE_OFFSET",       Q_INST_OPCODE_OFFSET       },
+    { "DBL_INST_FORMAT_BIT_OFFSET", DBL_INST_FORMAT_BIT_OFFSET },
+
+    { "VLIW_Q_INST_MASK",           VLIW_Q_INST_MASK           },
+    { "BS_MASK",                    BS_MASK                    },
+    { "Q_INST_OPCODE_MASK",         Q_INST_OPCODE_MASK         },
+    { "Q_INST_SD_MASK",             Q_INST_SD_MASK             },
+    { "Q_INST_TD_MASK",             Q_INST_TD_MASK             }
+  };
 }
 
 } // namespace QISA
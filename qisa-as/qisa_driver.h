@@ -18,6 +18,14 @@ typedef void* yyscan_t;
 #endif
 
 #include "qisa_parser.tab.hh"
+#include "qisa_assembly_cache.h"
+#include "qisa_program_template.h"
+#include "qisa_timing_analysis.h"
+#include "qisa_mapped_file.h"
+#include "qisa_symbol_table.h"
+#include "qisa_instruction_index.h"
+#include "qisa_target.h"
+#include "qisa_control_flow.h"
 
 
 # define YY_DECL \
@@ -39,7 +47,7 @@ class QISA_Driver
 public: // -- types
 
     // Defines the type of a target-control pair.
-    typedef std::pair<uint8_t, uint8_t>   TargetControlPair;
+    typedef QISA_Target::TargetControlPair TargetControlPair;
 
 public: // -- constants
 
@@ -77,6 +85,43 @@ public: // -- constants
     COND_GT       = 0xf
   };
 
+  // Layout of the header of assembly output format 3 (image).
+  // All fields are little-endian. The header is followed by the instructions.
+  enum ImageHeaderLayout
+  {
+    IMAGE_MAGIC_OFFSET              = 0,  // 4 bytes: "QISA"
+    IMAGE_FORMAT_VERSION_OFFSET     = 4,  // 2 bytes: IMAGE_FORMAT_VERSION
+    IMAGE_HEADER_SIZE_OFFSET        = 6,  // 2 bytes: IMAGE_HEADER_SIZE
+    IMAGE_NR_OF_INSTRUCTIONS_OFFSET = 8,  // 4 bytes
+    IMAGE_CHECKSUM_OFFSET           = 12, // 4 bytes: CRC-32 of the instructions
+    IMAGE_VERSION_OFFSET            = 16, // IMAGE_VERSION_SIZE bytes: assembler version, zero padded
+    IMAGE_VERSION_SIZE              = 16,
+    IMAGE_HEADER_SIZE               = 32,
+    IMAGE_FORMAT_VERSION            = 1
+  };
+
+  // Optional optimizations of the assembled program, see setOptimizations().
+  enum Optimizations
+  {
+    OPTIMIZE_NONE                = 0x0,
+
+    // Remove SMIS and SMIT instructions that set (part of) a register to the
+    // mask it already holds on all paths to the instruction.
+    OPTIMIZE_REDUNDANT_MASKS     = 0x1,
+
+    // Let quantum operations use a register that already holds a mask,
+    // instead of setting another register to the same mask first.
+    OPTIMIZE_MASK_REGISTER_REUSE = 0x2,
+
+    // Pack the quantum operations of each timing point into as few
+    // instructions as possible.
+    OPTIMIZE_BUNDLE_PACKING      = 0x4,
+
+    // Merge adjacent QWAIT instructions, and fold a QWAIT into the bundle
+    // separator of the quantum bundle that follows it.
+    OPTIMIZE_WAITS               = 0x8
+  };
+
 public:
 
   // Currently, instructions are encoded in 32 bits.
@@ -84,6 +129,15 @@ public:
 
   DllExport QISA_Driver();
 
+  /**
+   * Create a driver that uses the given target.
+   *
+   * @param[in] target Target to use, which holds the instruction
+   *                   specifications and the quantum layout information.
+   */
+  DllExport explicit
+  QISA_Driver(std::shared_ptr<const QISA_Target> target);
+
   DllExport virtual
   ~QISA_Driver()
   {}
@@ -98,8 +152,18 @@ public:
   DllExport void
   reset();
 
-  //read the quantum information layout file
-  DllExport void
+  /**
+   * Read the quantum layout information (the number of qubits and the edges
+   * between them) from the given file.
+   * The format of this file is described in QISA_LayoutParser.
+   *
+   * @param[in] input_filename File that contains the quantum layout information.
+   *
+   * @return True on success, false on failure.
+   *         On failure, the quantum layout information is not changed, and
+   *         getLastErrorMessage() describes the error.
+   */
+  DllExport bool
   read(std::string input_filename);
 
   // Handling the scanner.
@@ -112,6 +176,28 @@ public:
   void
   scanEnd (yyscan_t flex_scanner);
 
+  // Called by the scanner for each token it returns.
+  void
+  countToken()
+  {
+    _statistics.nrOfTokens++;
+  }
+
+  // Called by the scanner for each new-line, with the offset in the source of
+  // the line that starts after it.
+  void
+  addLineStart(size_t offset)
+  {
+    _lineOffsets.push_back(offset);
+  }
+
+  // Called by the scanner for each identifier, to intern it case-insensitively.
+  QISA_Identifier
+  internIdentifier(const char* name, size_t length)
+  {
+    return QISA_Identifier{std::string(name, length), _symbolTable.intern(name, length)};
+  }
+
 
 
   DllExport void
@@ -127,15 +213,181 @@ public:
   DllExport bool
   assemble(const std::string& filename);
 
+  /**
+   * Assemble the given source code, which is held in memory.
+   * The source is kept by the driver, so that error reporting can show
+   * the affected source lines afterwards.
+   *
+   * @param[in] source     QISA assembly source code.
+   * @param[in] sourceName Name used to refer to the source in error messages.
+   *
+   * @return True on success, false on failure.
+   */
+  DllExport bool
+  assembleString(const std::string& source,
+                 const std::string& sourceName = "<string>");
+
+  /**
+   * Assemble the given source code, which is held in a memory buffer.
+   * The buffer is copied, so it does not have to outlive this call.
+   *
+   * @param[in] data       Start of the buffer that contains QISA assembly source code.
+   * @param[in] size       Size of the buffer in bytes.
+   * @param[in] sourceName Name used to refer to the source in error messages.
+   *
+   * @return True on success, false on failure.
+   */
+  DllExport bool
+  assembleBytes(const char* data,
+                size_t size,
+                const std::string& sourceName = "<bytes>");
+
+  /**
+   * Copy the configuration of the given driver into this driver.
+   * This concerns everything that does not change during assembly or
+   * disassembly: the target (which is shared, not copied), the cache, and
+   * the tracing, verbosity and output format settings.
+   * This is cheaper than loading the same configuration again from file,
+   * e.g. when setting up a driver per worker thread.
+   *
+   * @param[in] other Driver to copy the configuration from.
+   */
+  DllExport void
+  copyConfiguration(const QISA_Driver& other);
+
+  /**
+   * @return The target that is used by this driver, which holds the
+   *         instruction specifications and the quantum layout information.
+   *         It can be shared with other drivers, see setTarget().
+   */
+  DllExport std::shared_ptr<const QISA_Target>
+  getTarget() const;
+
+  /**
+   * Use the given target for subsequent assemblies and disassemblies.
+   *
+   * @param[in] target Target to use.
+   */
+  DllExport void
+  setTarget(std::shared_ptr<const QISA_Target> target);
+
+  /**
+   * Use the given cache for subsequent assemblies.
+   * Before assembling, the cache is consulted using a key that is computed
+   * from the source code, the quantum layout information, the quantum
+   * instruction specifications and the assembler version. On a hit, the
+   * stored instructions are used, without lexing or parsing the source code.
+   * On a miss, the result of a successful assembly is stored in the cache.
+   *
+   * @param[in] cache The cache to use, or nullptr to disable caching.
+   *                  The cache is not owned by the driver, so it must stay
+   *                  alive for as long as the driver uses it.
+   *
+   * @note
+   *   On a cache hit, no informational messages are shown, even if the
+   *   assembler is verbose.
+   */
+  DllExport void
+  setCache(QISA_AssemblyCache* cache);
+
+  /** @return The cache that is used, or nullptr if caching is disabled. */
+  DllExport QISA_AssemblyCache*
+  getCache() const;
+
+  /**
+   * Set the optimizations to apply to the assembled program, after all
+   * labels have been resolved. By default, no optimizations are applied.
+   *
+   * The optimizations do not change what the program does: the quantum
+   * operations are issued with the same timing and the same masks.
+   * What they achieve is recorded in the statistics, see getStatistics().
+   *
+   * @param[in] optimizations The Optimizations to apply, or'ed together.
+   */
+  DllExport void
+  setOptimizations(unsigned int optimizations);
+
+  /** @return The optimizations that are applied, see setOptimizations(). */
+  DllExport unsigned int
+  getOptimizations() const;
+
+  /**
+   * Specifies a single program to assemble using assembleMany().
+   */
+  struct AssemblyInput
+  {
+    // True if the source code is held in 'source', false if it must be
+    // read from the file named 'name'.
+    bool isInMemory;
+
+    // Name of the file to assemble, or the name used to refer to the
+    // in-memory source code in error messages.
+    std::string name;
+
+    // Source code to assemble, in case isInMemory is true.
+    std::string source;
+  };
+
+  /**
+   * Result of assembling a single program using assembleMany().
+   */
+  struct AssemblyResult
+  {
+    // True if the program has been assembled successfully.
+    bool success;
+
+    // The generated instructions, in case of success.
+    std::vector<qisa_instruction_type> instructions;
+
+    // Description of the error, in case of failure.
+    std::string errorMessage;
+  };
+
+  /**
+   * Assemble a number of programs, using a pool of worker threads.
+   * Each worker uses its own driver, which is configured once with the
+   * quantum layout information and instructions of this driver.
+   * This driver itself is not modified.
+   *
+   * @param[in] inputs      The programs to assemble.
+   * @param[in] nrOfWorkers Number of worker threads to use.
+   *                        If 0, the number of hardware threads is used.
+   *
+   * @return The results, in the same order as the given inputs.
+   */
+  DllExport std::vector<AssemblyResult>
+  assembleMany(const std::vector<AssemblyInput>& inputs,
+               unsigned int nrOfWorkers = 0) const;
+
   /**
    * Disassemble the given file.
    *
+   * In streaming mode (see enableStreamingDisassembly()), the file is only
+   * scanned for branch destinations here. The instructions are disassembled
+   * when the disassembly output is requested, so errors in the instructions
+   * are reported at that point.
+   *
    * @param filename File that contains QISA instructions in binary form.
    * @return True on success, false on failure.
    */
   DllExport bool
   disassemble(const std::string& filename);
 
+  /**
+   * Enable or disable streaming disassembly.
+   *
+   * In streaming mode, disassemble() memory-maps its input file instead of
+   * keeping the disassembled instructions in memory. The disassembly output
+   * is generated on the fly by getDisassemblyLines() and save(), so the
+   * memory usage does not depend on the size of the input file.
+   * Note that output format 2 needs an extra pass over the input file to
+   * determine the width of the lines.
+   *
+   * @param[in] enabled True to enable streaming disassembly.
+   */
+  DllExport void
+  enableStreamingDisassembly(bool enabled);
+
   /**
    * @return The last generated error message.
    */
@@ -173,6 +425,81 @@ public:
   DllExport std::vector<std::string>
   getInstructionsAsHexStrings(bool withBinaryOutput);
 
+  /**
+   * Retrieve the generated code as encoded instructions, without the need
+   * to save() them to a file first.
+   *
+   * @return The generated instructions, in program order.
+   */
+  DllExport const std::vector<qisa_instruction_type>&
+  getInstructions() const;
+
+  /**
+   * Create a parametric template of the last assembled program.
+   * The integer symbols defined using '.def_sym' that are used as immediate
+   * value of LDI, LDUI, QWAIT or MOV become the parameters of the template.
+   * The template can then be instantiated for many parameter values, without
+   * assembling the program again.
+   *
+   * @param[out] programTemplate Receives the template.
+   *
+   * @return True on success, false if there is no successfully assembled program.
+   */
+  DllExport bool
+  getProgramTemplate(QISA_ProgramTemplate& programTemplate);
+
+  /**
+   * Analyze the control flow and the timing of the last assembled or
+   * disassembled program: the basic blocks and the quantum cycles, bundles
+   * and classic instructions of each of them, the cycles along the paths
+   * through the program, and the timing points that may not be reached in
+   * time because too many instructions must be issued before them.
+   * See QISA_TimingAnalysis.
+   *
+   * @param[out] analysis             Receives the analysis.
+   * @param[in]  instructionsPerCycle Number of instructions that the
+   *                                  controller issues per quantum cycle.
+   *
+   * @return True on success, false if there is no assembled or disassembled program.
+   */
+  DllExport bool
+  analyzeTiming(QISA_TimingAnalysis& analysis, unsigned int instructionsPerCycle = 1);
+
+  /**
+   * Set the format in which save() writes assembled instructions to one of
+   * the known format types.
+   *
+   * The known formats:
+   *
+   *   1: Raw binary: each instruction is a 32-bit word in native byte order.
+   *      This is the default assembly output format.
+   *
+   *   2: Hexadecimal memory initialization file: one instruction per line,
+   *      as 8 hexadecimal digits, as in:
+   *
+   *          29600002
+   *
+   *   3: Image: a header of IMAGE_HEADER_SIZE bytes, followed by the
+   *      instructions as in format 1. See ImageHeaderLayout.
+   *
+   * @param format_id Sets the output format in which the assembly must be saved.
+   *
+   * @return True on success, false on failure.
+   */
+  DllExport bool
+  setAssemblyFormat(int format_id);
+
+  /**
+   * Retrieve the assembled instructions in the format that has been set
+   * using setAssemblyFormat(), exactly as save() would write them.
+   *
+   * @param[out] output Receives the assembly output.
+   *
+   * @return True on success, false if there is nothing to save.
+   */
+  DllExport bool
+  getAssemblyOutput(std::string& output);
+
   /**
    * Set the disassembly format to one of the known format types.
    *
@@ -202,16 +529,56 @@ public:
   DllExport std::string
   getDisassemblyOutput();
 
+  /**
+   * Retrieve part of the disassembly output.
+   * This can be used to process the disassembly output of a large input
+   * file piece by piece, in particular in streaming mode.
+   *
+   * @param[in]  firstAddress  Address of the first instruction to retrieve.
+   * @param[in]  maxNrOfLines  Maximum number of instructions to retrieve.
+   * @param[out] lines         The disassembly output of the requested instructions
+   *                           is appended to this, one instruction per line.
+   *                           Nothing is appended beyond the last instruction.
+   *
+   * @return True on success, false if an instruction could not be disassembled.
+   *         In that case, all requested lines are still appended.
+   */
+  DllExport bool
+  getDisassemblyLines(uint64_t firstAddress, size_t maxNrOfLines, std::string& lines);
+
+  /**
+   * Retrieve one disassembled instruction, without rendering the rest of
+   * the disassembly output.
+   *
+   * @param[in]  address     Address of the instruction.
+   * @param[out] label       Receives the name of the label of the instruction,
+   *                         or an empty string if it is not a branch destination.
+   * @param[out] instruction Receives the disassembled instruction, including
+   *                         its branch destination if it is a branch instruction.
+   *
+   * @return True on success, false if there is no instruction at the given
+   *         address, or if it could not be disassembled.
+   */
+  DllExport bool
+  getDisassembledInstruction(uint64_t address, std::string& label, std::string& instruction);
+
+  /**
+   * @return The number of instructions in the last disassembled input file.
+   */
+  DllExport uint64_t
+  getNrOfDisassembledInstructions() const;
+
 
   /**
    * Save binary assembled or textual disassembled instructions to the given output stream.
    *
-   * @param[in] outputFileStream Already opened file stream opened in which to store the generated output.
+   * @param[in] outputStream Already opened stream in which to store the generated output,
+   *                         e.g. a file stream or a string stream.
    *
    * @return True on success, false on failure.
    */
   DllExport bool
-  save(std::ofstream& outputFileStream);
+  save(std::ostream& outputStream);
 
   /**
    * Save binary assembled or textual disassembled instructions to an output file with the given name.
@@ -223,6 +590,90 @@ public:
   DllExport bool
   save(const std::string& outputFileName);
 
+  /**
+   * Statistics of the last assembly or disassembly, and of saving its output.
+   * They are collected for every assembly and disassembly; this only costs a
+   * few clock readings and counter increments.
+   */
+  struct Statistics
+  {
+    // Wall clock time of assemble() or disassemble() as a whole, in seconds.
+    double totalSeconds;
+
+    // Time spent looking up the program in the cache (see setCache()),
+    // including reading the source file to compute its key.
+    double cacheLookupSeconds;
+
+    // Time spent scanning and parsing the source code, including code
+    // generation. Scanning and parsing cannot be timed separately, because
+    // the parser drives the scanner.
+    double parseSeconds;
+
+    // Part of parseSeconds spent validating the masks of SMIS and SMIT instructions.
+    double maskValidationSeconds;
+
+    // Time spent resolving the labels that were used before their definition.
+    double deferredInstructionsSeconds;
+
+    // Time spent in the optimizations, see setOptimizations().
+    double optimizationSeconds;
+
+    // Time spent determining the branch destinations of disassembled instructions.
+    double disassemblyLabelsSeconds;
+
+    // Time spent in save().
+    double saveSeconds;
+
+    // True if the assembled program was taken from the cache.
+    bool cacheHit;
+
+    // Number of tokens returned by the scanner.
+    uint64_t nrOfTokens;
+
+    // Number of generated or disassembled instructions.
+    uint64_t nrOfInstructions;
+
+    // Number of quantum bundles in the source code.
+    uint64_t nrOfBundles;
+
+    // Number of labels defined in the source code, or found while disassembling.
+    uint64_t nrOfLabels;
+
+    // Number of instructions that use a label before its definition.
+    uint64_t nrOfDeferredLabels;
+
+    // Number of instructions removed by the optimizations.
+    uint64_t nrOfInstructionsRemoved;
+
+    // Number of SMIS and SMIT instructions removed because the register
+    // already held the mask (part) they set.
+    uint64_t nrOfRedundantMaskWrites;
+
+    // Number of times a register that already held a mask has been used
+    // instead of setting another register to the same mask.
+    uint64_t nrOfReusedMaskRegisters;
+
+    // Number of quantum bundle instructions removed by packing the quantum
+    // operations of a timing point into fewer instructions.
+    uint64_t nrOfPackedBundleInstructions;
+
+    // Number of QWAIT instructions removed by merging them into the QWAIT
+    // instruction or the quantum bundle that precedes or follows them.
+    uint64_t nrOfCoalescedWaits;
+
+    // Size of the input, in bytes.
+    uint64_t bytesRead;
+
+    // Size of the output written by save(), in bytes.
+    uint64_t bytesWritten;
+  };
+
+  /**
+   * @return The statistics of the last assembly or disassembly, and of saving its output.
+   */
+  DllExport const Statistics&
+  getStatistics() const;
+
   /**
    * Load new quantum instruction specifications from the given file.
    *
@@ -238,7 +689,7 @@ public:
   loadQuantumInstructions(const std::string& qMapFilename);
 
   //! Defines the type used to store mappings between an instruction name and its opcode.
-  typedef std::map<std::string, int> q_map_t;
+  typedef QISA_Target::q_map_t q_map_t;
 
   /**
    * Load the quantum instructions that have been specified in the given maps into QISA-AS.
@@ -262,6 +713,43 @@ public:
                          const q_map_t& arg_st_map,
                          const q_map_t& arg_tt_map);
 
+  /**
+   * Retrieve the quantum instructions that are currently loaded.
+   *
+   * @param[out] arg_none_map Instruction code map for quantum
+   *                          instructions without parameters.
+   * @param[out] arg_st_map Instruction code map for quantum
+   *                        instructions with an s-register parameter.
+   * @param[out] arg_tt_map Instruction code map for quantum
+   *                        instructions with a t-register parameter.
+   */
+  DllExport void
+  getQuantumInstructions(q_map_t& arg_none_map,
+                         q_map_t& arg_st_map,
+                         q_map_t& arg_tt_map) const;
+
+  /**
+   * @return The opcodes of the classic instructions, keyed by instruction name.
+   */
+  DllExport const q_map_t&
+  getClassicOpcodes() const;
+
+  /**
+   * @return The names of the branch conditions, keyed by their encoding.
+   */
+  DllExport const std::map<uint8_t, std::string>&
+  getBranchConditionNames() const;
+
+  /**
+   * Retrieve the layout of the encoded instructions: the bit offsets and
+   * masks of the opcode and operand fields, as used to encode and decode
+   * instructions.
+   *
+   * @return The offsets and masks, keyed by their name (e.g. 'OPCODE_OFFSET').
+   */
+  DllExport static q_map_t
+  getEncodingConstants();
+
 
   // Error reporting.
   void
@@ -305,26 +793,26 @@ public:
 
   // Add an integer symbol
   void
-  add_symbol(const std::string& symbol_name,
+  add_symbol(const QISA_Identifier& symbol_name,
              const QISA::location& symbol_name_loc,
              int64_t symbol_value,
              const QISA::location& symbol_value_loc);
 
   bool
-  get_symbol(const std::string& symbol_name,
+  get_symbol(const QISA_Identifier& symbol_name,
              const QISA::location& symbol_name_loc,
              int64_t& imm_val);
 
   // Add a string valued symbol (not used yet).
   void
-  add_symbol(const std::string& symbol_name,
+  add_symbol(const QISA_Identifier& symbol_name,
              const QISA::location& symbol_name_loc,
              const std::string&  symbol_value,
              const QISA::location& symbol_value_loc);
 
 
   bool
-  get_symbol(const std::string& symbol_name,
+  get_symbol(const QISA_Identifier& symbol_name,
              const QISA::location& symbol_name_loc,
              std::string& imm_val);
 
@@ -332,7 +820,7 @@ public:
   // Add a register definition.
   // This is used to give a register a meaningful name.
   bool
-  add_register_definition(const std::string& register_name,
+  add_register_definition(const QISA_Identifier& register_name,
                           const QISA::location& register_name_loc,
                           uint8_t reg_nr,
                           const QISA::location& reg_nr_loc,
@@ -348,13 +836,13 @@ public:
    * @return True on success, false on failure.
    */
   bool
-  get_register_nr(const std::string& register_name,
+  get_register_nr(const QISA_Identifier& register_name,
                   const QISA::location& register_name_loc,
                   RegisterKind register_kind,
                   uint8_t& result);
 
   void
-  add_label(const std::string& label_name,
+  add_label(const QISA_Identifier& label_name,
             const QISA::location& label_name_loc);
 
   /**
@@ -371,7 +859,7 @@ public:
    *         returned to indicate that fact.
    */
   int64_t
-  get_label_address(const std::string& label_name,
+  get_label_address(const QISA_Identifier& label_name,
                     const QISA::location& label_name_loc,
                     bool get_offset);
 
@@ -382,27 +870,29 @@ public:
    * @return True if qubit_address is valid, false if it isn't.
    */
   bool
-  validate_qubit_address(uint8_t qubit_address,
+  validate_qubit_address(int64_t qubit_address,
                         const QISA::location& loc);
 
   bool
-  validate_s_mask(const std::vector<uint8_t>& s_mask,
+  validate_s_mask(const SMask& s_mask,
                   const location& s_mask_loc);
 
   bool
-  validate_t_mask(const std::vector<TargetControlPair>& t_mask,
+  validate_t_mask(const TMask& t_mask,
                   const location& t_mask_loc);
 
 
 
   /**
    *
-   * @param target_control_pair Values of the given target-control pair
+   * @param target_qubit Target qubit of the given target-control pair.
+   * @param control_qubit Control qubit of the given target-control pair.
    * @param target_control_pair_loc Location of the affected target-control pair in the source file.
    * @return True on success, false on failure.
    */
   bool
-  validate_target_control_pair(const TargetControlPair& target_control_pair,
+  validate_target_control_pair(int64_t target_qubit,
+                               int64_t control_qubit,
                                const location& target_control_pair_loc);
 
   /**
@@ -425,12 +915,14 @@ public:
    *
    * @param inst_name Name of the instruction.
    * @param inst_loc Location of the instruction in the source file.
+   * @param q_inst Receives the instruction.
    *
-   * @return Shared pointer to a QInstruction, or empty pointer if an error occurred.
+   * @return True on success, false on failure.
    */
-  QInstructionPtr
+  bool
   get_q_instr_arg_none(const std::string& inst_name,
-                       const QISA::location& inst_loc);
+                       const QISA::location& inst_loc,
+                       QInstruction& q_inst);
 
   /**
    * Parse a quantum instruction that accepts an S register as a parameter.
@@ -440,15 +932,17 @@ public:
    * @param st Indicates the register involved.
    * @param st_loc Location of the register specification in the source file.
    * @param is_conditional Denotes if this instruction is conditional or not.
+   * @param q_inst Receives the instruction.
    *
-   * @return Shared pointer to a QInstruction, or empty pointer if an error occurred.
+   * @return True on success, false on failure.
    */
-  QInstructionPtr
+  bool
   get_q_instr_arg_st(const std::string& inst_name,
                      const QISA::location& inst_loc,
                      uint8_t st,
                      const QISA::location& st_loc,
-                     bool is_conditional);
+                     bool is_conditional,
+                     QInstruction& q_inst);
 
   /**
    * Parse a quantum instruction that accepts a T register as a parameter.
@@ -457,14 +951,16 @@ public:
    * @param inst_loc Location of the instruction in the source file.
    * @param tt Indicates the register involved.
    * @param tt_loc Location of the register specification in the source file.
+   * @param q_inst Receives the instruction.
    *
-   * @return Shared pointer to a QInstruction, or empty pointer if an error occurred.
+   * @return True on success, false on failure.
    */
-  QInstructionPtr
+  bool
   get_q_instr_arg_tt(const std::string& inst_name,
                      const QISA::location& inst_loc,
                      uint8_t tt,
-                     const QISA::location& tt_loc);
+                     const QISA::location& tt_loc,
+                     QInstruction& q_inst);
 
   /**
    * Parse a quantum instruction that specifies a register alias as a parameter.
@@ -472,21 +968,23 @@ public:
    * 'st' or a 'tt' parameter.
    * Depending the kind of quantum instruction, the alias must resolve to either
    * an 's' or a 't' register.
-   * If these conditions are met, a pointer to the appropriate QInstruction is
-   * given, otherwise, an error message is generated and an empty pointer is
-   * returned.
+   * If these conditions are met, the appropriate QInstruction is given,
+   * otherwise, an error message is generated.
    *
    * @param inst_name Name of the instruction.
    * @param inst_loc Location of the instruction in the source file.
    * @param reg_name Register alias.
    * @param reg_name_loc Location of the register alias in the source file.
-   * @return
+   * @param q_inst Receives the instruction.
+   *
+   * @return True on success, false on failure.
    */
-  QInstructionPtr
+  bool
   get_q_instr_arg_one(const std::string& inst_name,
                       const location& inst_loc,
-                      const std::string& reg_name,
-                      const location& reg_name_loc);
+                      const QISA_Identifier& reg_name,
+                      const location& reg_name_loc,
+                      QInstruction& q_inst);
 
 
   /**
@@ -514,7 +1012,7 @@ public:
    * @return Encoded instruction.
    */
   uint64_t
-  encode_q_instr(const std::shared_ptr<QInstruction>& q_inst);
+  encode_q_instr(const QInstruction& q_inst);
 
 
   /**
@@ -613,7 +1111,7 @@ public:
   generate_SMIS(const location& inst_loc,
                 uint8_t sd,
                 const location& sd_loc,
-                const std::vector<uint8_t>& s_mask,
+                const SMask& s_mask,
                 const location& s_mask_loc);
 
   /* smis sd, imm  (NOTE: Alternative representation.) */
@@ -629,7 +1127,7 @@ public:
   generate_SMIT(const location& inst_loc,
                 uint8_t td,
                 const location& td_loc,
-                const std::vector<TargetControlPair>& t_mask,
+                const TMask& t_mask,
                 const location& t_mask_loc);
 
   /* smis sd, imm  (NOTE: Alternative representation.) */
@@ -785,21 +1283,42 @@ public:
 
   private: // -- functions
 
+  /**
+   * Parse the source that has been set up by assemble(), assembleString() or
+   * assembleBytes(), and generate the instructions.
+   *
+   * @return True on success, false on failure.
+   */
+  bool
+  assembleSource();
 
   /**
-   * Lookup the last error location in the source file and return its contents.
+   * Read the source file named _filename into _source, so that it can be
+   * scanned from memory and errors can be reported against it.
+   *
+   * @return True on success, false if the file cannot be read or is empty.
+   */
+  bool
+  readSourceFile();
+
+  /**
+   * Lookup the last error location in the source and return its contents.
    * @return The source line affected by the las error.
    */
   std::string
   getErrorSourceLine();
 
-
   /**
-   * Used to set the opcodes of the classic instructions.
-   * The code for this is defined in an automatically generated file.
+   * Retrieve a line of the source that has been assembled last.
+   *
+   * @param[in]  lineNr Number of the line, starting at 1.
+   * @param[out] line   Receives the contents of the line, without new-line.
+   *
+   * @return True on success, false if the source has no such line.
    */
-  void
-  setOpcodes();
+  bool
+  getSourceLine(size_t lineNr, std::string& line);
+
 
   /**
    * Get an opcode for a given (classic) instruction name.
@@ -838,6 +1357,7 @@ public:
   void
   unsafe_generate_SMIS(int opcode,
                        uint8_t sd,
+                       uint8_t pos,
                        int64_t s_mask_bits);
 
   // Used by the two flavors of generate_SMIT.
@@ -926,25 +1446,53 @@ public:
   checkValueRange(int64_t val, int64_t minVal, int64_t maxVal,
                   const std::string& val_name, const QISA::location& val_loc);
 
+  /**
+   * If the immediate value at the given location has been taken from an
+   * integer symbol, record that the given bit field of the given instruction
+   * depends on this symbol.
+   *
+   * @param[in] imm_loc        Location of the immediate value in the input source file.
+   * @param[in] address        Index of the instruction that holds the field.
+   * @param[in] valueShift     Shift (to the right) applied to the value before encoding.
+   * @param[in] fieldMask      Mask that selects the bits of the field within the instruction.
+   * @param[in] minVal         Minimum acceptable value.
+   * @param[in] maxVal         Maximum acceptable value.
+   * @param[in] excludedMinVal Minimum of the range of values that are not acceptable.
+   * @param[in] excludedMaxVal Maximum of the range of values that are not acceptable.
+   */
+  void
+  recordSymbolField(const QISA::location& imm_loc,
+                    size_t address,
+                    unsigned int valueShift,
+                    qisa_instruction_type fieldMask,
+                    int64_t minVal,
+                    int64_t maxVal,
+                    int64_t excludedMinVal = 1,
+                    int64_t excludedMaxVal = 0);
+
   std::string
-  get_s_mask_str(const std::vector<uint8_t>& s_mask);
+  get_s_mask_str(const SMask& s_mask);
 
   /**
    * Return the s_mask corresponding to the given encoded value.
    * @param s_mask_bits Binary encoded s_mask.
+   * @param first_qubit Qubit that corresponds to bit 0 of s_mask_bits.
    * @return The corresponding s_mask.
    */
-  std::vector<uint8_t>
-  bits2s_mask(int64_t s_mask_bits);
+  SMask
+  bits2s_mask(uint64_t s_mask_bits,
+              int first_qubit);
 
 
   /**
    * Return the t_mask corresponding to the given encoded value.
-   * @param t_mask_bits Binary encoded s_mask.
+   * @param t_mask_bits Binary encoded t_mask.
+   * @param first_edge Edge that corresponds to bit 0 of t_mask_bits.
    * @return The corresponding t_mask.
    */
-  std::vector<TargetControlPair>
-  bits2t_mask(int64_t t_mask_bits);
+  TMask
+  bits2t_mask(uint64_t t_mask_bits,
+              int first_edge);
 
 
 
@@ -952,7 +1500,7 @@ public:
   get_tc_pair_str(const TargetControlPair& tc_pair);
 
   std::string
-  get_t_mask_str(const std::vector<TargetControlPair>& t_mask);
+  get_t_mask_str(const TMask& t_mask);
 
   /**
    * Process all instructions that used labels that were (supposed to be) defined afterwards.
@@ -962,6 +1510,17 @@ public:
   bool
   processDeferredInstructions();
 
+  /**
+   * Make sure that what is only known after parsing the source code (the
+   * labels and the symbol fields) is known for the last assembled program.
+   * If the program has been taken from the cache, it is assembled again,
+   * this time parsing the source code.
+   *
+   * @return True on success, false if the assembly failed.
+   */
+  bool
+  parseIfTakenFromCache();
+
 
   /**
    * Reverse the bits in the given src.
@@ -981,29 +1540,6 @@ public:
   template<typename SrcType, int nrOfBits>
   SrcType reverseBits(const SrcType src);
 
-  /*****************************************************************/
-  /* Comparator for case-insensitive comparison in STL associative */
-  /* containers.                                                   */
-  /* source: https://stackoverflow.com/a/1801913                   */
-  /*****************************************************************/
-  struct ci_less : std::binary_function<std::string, std::string, bool>
-  {
-    // case-independent (ci) compare_less binary function
-    struct nocase_compare : public std::binary_function<unsigned char,unsigned char,bool>
-    {
-      bool operator() (const unsigned char& c1, const unsigned char& c2) const {
-          return tolower (c1) < tolower (c2);
-      }
-    };
-    bool operator() (const std::string & s1, const std::string & s2) const {
-      return std::lexicographical_compare
-        (s1.begin (), s1.end (),   // source range
-        s2.begin (), s2.end (),   // dest range
-        nocase_compare ());  // comparison
-    }
-  };
-
-
   std::string
   getHex(uint64_t val, int nDigits);
 
@@ -1028,23 +1564,90 @@ public:
   disassembleQuantumInstruction(qisa_instruction_type inst, DisassembledInstruction& disassembledInst);
 
   /**
-   * Post-process the disassembly steps to add labels.
-   * By doing this after all branch destinations are known, we can issue labels
-   * with steadily increasing numbers.
-   * In this part we'll also add the instruction counter (as text).
+   * Determine the destination of the given branch instruction.
+   *
+   * @param[in]  inst        The encoded instruction.
+   * @param[in]  address     Address of the instruction.
+   * @param[out] destination Receives the branch destination.
+   *
+   * @return True if inst is a valid BR instruction, false otherwise.
+   */
+  bool
+  getBranchDestination(qisa_instruction_type inst, uint64_t address, uint64_t& destination) const;
+
+  /**
+   * Determine whether the given instruction transfers control, as BR and
+   * STOP do.
+   *
+   * @param[in]  inst     The instruction.
+   * @param[in]  address  Address of the instruction.
+   * @param[out] transfer Receives the control transfer, if any.
+   *
+   * @return True if inst is a valid BR instruction or a STOP instruction, false otherwise.
+   */
+  bool
+  getControlTransfer(qisa_instruction_type inst, uint64_t address,
+                     QISA_ControlFlowGraph::ControlTransfer& transfer) const;
+
+  /**
+   * @return The instruction at the given address of the last disassembled input file.
+   */
+  qisa_instruction_type
+  getDisassemblyWord(uint64_t address) const;
+
+  /**
+   * Scan the disassembled instructions for branch destinations, which will
+   * get a label.
    */
   void
-  postProcessDisassembly();
+  collectDisassemblyLabels();
 
   /**
-   * Save binary assembled instructions to the given output stream.
+   * @return The name of the label with the given index, without the ': '.
+   */
+  std::string
+  getDisassemblyLabelName(size_t labelIndex) const;
+
+  /**
+   * Render the text of one disassembled instruction, including its label
+   * and branch destination.
+   *
+   * @param[in]  address         Address of the instruction to render.
+   * @param[out] disassembledInst Receives the disassembled instruction.
    *
-   * @param[in] outputFileStream Already opened file stream opened in which to store the generated output.
+   * @return True on success, false if the instruction could not be disassembled.
+   */
+  bool
+  renderDisassembledInstruction(uint64_t address, DisassembledInstruction& disassembledInst);
+
+  /**
+   * @return The width of the instruction text (including label) in disassembly output format 2.
+   */
+  size_t
+  getDisassemblyLineWidth();
+
+  /**
+   * Write one line of disassembly output, in the current output format.
+   *
+   * @param[in] outputStream     Stream to write to.
+   * @param[in] disassembledInst The instruction to write.
+   * @param[in] lineWidth        Width of the instruction text in output format 2.
+   */
+  void
+  writeDisassemblyLine(std::ostream& outputStream,
+                       const DisassembledInstruction& disassembledInst,
+                       size_t lineWidth) const;
+
+  /**
+   * Save assembled instructions to the given output stream, in the format
+   * that has been set using setAssemblyFormat().
+   *
+   * @param[in] outputStream Already opened stream in which to store the generated output.
    *
    * @return True on success, false on failure.
    */
   bool
-  saveAssembly(std::ofstream& outputFileStream);
+  saveAssembly(std::ostream& outputStream);
 
   /**
    * Save binary assembled instructions to an output file with the given name.
@@ -1060,12 +1663,12 @@ public:
   /**
    * Save textual disassembled instructions to the given output stream.
    *
-   * @param[in] outputFileStream Already opened file stream opened in which to store the generated output.
+   * @param[in] outputStream Already opened stream in which to store the generated output.
    *
    * @return True on success, false on failure.
    */
   bool
-  saveDisassembly(std::ofstream& outputFileStream);
+  saveDisassembly(std::ostream& outputStream);
 
   /**
    * Save textual disassembled instructions to an output file with the given name.
@@ -1077,27 +1680,12 @@ public:
   bool
   saveDisassembly(const std::string& outputFileName);
 
-  /**
-   * Check a given map containing quantum instruction names and their opcode for correctness.
-   *
-   * @param mapName Name of the map, used in diagnostic messages.
-   * @param inputMap Input map that contains the quantum instruction names and opcode.
-   * @param checkInstructionMap Map that is used to check for duplicate instructions.
-   * @param checkOpcodeMap Map that is used to check for duplicate opcodes.
-   *
-   * @param outputMap Map that contains validated input.
-   *
-   * @return True on success, false on failure.
-   */
-  bool
-  checkQuantumInstructionMap(const std::string& mapName,
-                             const q_map_t& inputMap,
-                             std::map<std::string, std::string>& checkInstructionMap,
-                             std::map<int, std::string>& checkOpcodeMap,
-                             q_map_t& outputMap);
-
 private: // -- constants
 
+  // The optimizations and the timing analysis work on the encoded instructions.
+  friend class QISA_Optimizer;
+  friend class QISA_TimingAnalysis;
+
   //---------------------------------------------------------
   // Classic instructions
   //---------------------------------------------------------
@@ -1196,36 +1784,39 @@ private: // -- variables
   // Specifies the verbosity of the assembler.
   bool _verbose;
 
-  // Used to track if we have already had an EOF character.
-  // This is set from within the lexer when it sees an EOF character.
-  bool _hadEOF;
-
-  // Total number of registers available in processor, per kind of register.
-  int _nrOfRegisters[4];
+  // True if the source to assemble has been given by assembleString() or
+  // assembleBytes() instead of being read from the file named _filename.
+  bool _sourceIsInMemory;
 
-  // 'Name' of a register, per kind of register
-  char _registerName[4];
+  // Source code that is being assembled. A source file is read into it
+  // completely before it is scanned.
+  // It is kept after assembly, so that errors are reported against the source
+  // that has actually been parsed, even if the file has changed since.
+  std::string _source;
 
-  // Total number of addressable qubits in the processor.
-  int _totalNrOfQubits;
+  // Offset in _source of the start of each line, recorded by the scanner.
+  // Element i holds the offset of line i + 1.
+  std::vector<size_t> _lineOffsets;
 
-  // Total number of direct edge address in the processor
-  int _NrOfEdgeAdress;
+  // True if a syntax error has been found at the end of a line. It is then
+  // reported at the end of the previous line.
+  bool _hadSyntaxErrorAtNewline;
 
-  // Number of pos in SMIS and SMIT respectively
-  int pos_number_s;
-  int pos_number_t;
+  // Cache of assembled programs, or nullptr if caching is disabled.
+  // Not owned by the driver.
+  QISA_AssemblyCache* _cache;
 
-  // Maximum value to specify as bundle separator.
-  // This is the number of quantum cycles (20 ns) between quantum instruction bundles.
-  int _max_bs_val;
+  // Optimizations to apply to the assembled program, see setOptimizations().
+  unsigned int _optimizations;
 
-  // Contains a mapping of all valid control pairs to their
-  // respective bit index in the t_mask.
-  std::map<TargetControlPair, uint8_t> _valid_target_control_pairs;
+  // Used to track if we have already had an EOF character.
+  // This is set from within the lexer when it sees an EOF character.
+  bool _hadEOF;
 
-  // Other way around, to go from bit number to tc_pair.
-  std::map<uint8_t, TargetControlPair> _bit2tc_pair;
+  // Configuration of the processor that is being assembled for.
+  // It can be shared with other drivers, and is never changed: changing the
+  // configuration of this driver replaces it by a modified copy.
+  std::shared_ptr<const QISA_Target> _target;
 
   // List of assembled instructions.
   std::vector<qisa_instruction_type> _instructions;
@@ -1233,68 +1824,82 @@ private: // -- variables
   // Id of the output format in which the disassembly must be given.
   int _disassemblyFormatId;
 
+  // Format in which assembled instructions are saved, see setAssemblyFormat().
+  int _assemblyFormatId;
+
   // Set when disassembling.
   // Is zero when there are no branch instructions.
   // Contains the maximum length of a label when there were branch instructions.
   size_t _disassemblyLabelStringLength;
 
-  // Maps an instruction address to the information about the corresponding disassebled instruction.
-  std::map<uint64_t, DisassembledInstruction> _disassembledInstructions;
-
   // Used to check whether a bundle specification of 0 is legal or not.
   // This is used while disassembling.
   bool _disassemblyStartedQuantumBundle;
 
-  // Used to keep track of which instruction should have a label,
-  // according to branch destinations.
-  // The map maps a branch destination to the branch instruction(s) that use it.
-  std::map<uint64_t, std::vector<uint64_t> > _disassemblyLabels;
-
   // Prefix used to denote a label in the disassembly.
   // (This will be followed by a number.)
   static const char* DISASSEMBLY_LABEL_PREFIX;
 
-  // Opcodes for the instructions.
-  // They are defined elsewhere.
-  std::map<std::string, int> _opcodes;
-
-  // Reverse lookup of the _opcodes map, for the classic instructions.
-  std::map<int, std::string> _classicOpcode2instName;
+  // True if disassemble() must stream its output, see enableStreamingDisassembly().
+  bool _streamingDisassembly;
 
-  int _maxQuantumOpcodeVal;
+  // The disassembled instructions are stored in raw form: their text is
+  // only rendered when the disassembly output is requested.
+  // In streaming disassembly, they are read from the memory-mapped input file,
+  // otherwise they are read into _disassemblyWords.
+  QISA_MappedFile _disassemblyInput;
+  std::vector<qisa_instruction_type> _disassemblyWords;
 
-  // Contains the opcodes for the quantum instructions that do not have an argument.
-  q_map_t _q_inst_arg_none_opcodes;
+  // Sorted branch destinations.
+  // The index of a destination is the number of its label.
+  std::vector<uint64_t> _disassemblyLabelAddresses;
 
-  // Contains the opcodes for the quantum instructions specifying an st argument.
-  q_map_t _q_inst_arg_st_opcodes;
+  // Sorted addresses of the instructions that could not be disassembled.
+  // Not used in streaming disassembly.
+  std::vector<uint64_t> _disassemblyErrorAddresses;
 
-  // Contains the opcodes for the quantum instructions specifying a tt argument.
-  q_map_t _q_inst_arg_tt_opcodes;
+  // Width of the instruction text in disassembly output format 2.
+  // Zero if it has not been determined yet.
+  size_t _disassemblyLineWidth;
 
-  // Reverse lookup of the combination of above quantum opcode maps, used
-  // for disassembling the quantum instructions.
-  std::map<int, std::string> _quantumOpcode2instName;
+  // Identifiers used in the source code, interned case-insensitively by the
+  // scanner. The labels, register aliases and symbols below are keyed by the
+  // ids of their identifiers.
+  QISA_SymbolTable _symbolTable;
 
   // Label to 'address' map.
   // This 'address' is in instruction units, not in byte units.
-  std::map<std::string, uint64_t, ci_less> _labels;
+  QISA_SymbolMap<uint64_t> _labels;
 
   // Aliases for registers, one map per kind of register.
-  std::map<std::string, uint8_t, ci_less> _registerAliases[4];
+  QISA_SymbolMap<uint8_t> _registerAliases[4];
 
   // Integer valued symbols.
-  std::map<std::string, int64_t, ci_less> _intSymbols;
+  QISA_SymbolMap<int64_t> _intSymbols;
 
   // Symbols that represent strings.
-  std::map<std::string, std::string, ci_less> _strSymbols;
+  QISA_SymbolMap<std::string> _strSymbols;
+
+  // Name and location of the last integer symbol that has been looked up.
+  // Used to find out which immediate values have been taken from a symbol.
+  std::string _lastSymbolName;
+  location _lastSymbolLoc;
+
+  // Bit fields of the generated instructions that have been computed from
+  // an integer symbol, used to create a program template.
+  // The parameterIndex of each field is not known yet, see _symbolFieldNames.
+  std::vector<QISA_ProgramTemplate::Field> _symbolFields;
 
-  // Names of the known branch conditions.
-  // Used for pretty printing.
-  std::map<uint8_t, std::string> _branchConditionNames;
+  // Name of the symbol each of the _symbolFields has been computed from.
+  std::vector<std::string> _symbolFieldNames;
 
-  // Names of the condition aliases that will be translated into the primitive versions.
-  std::map<std::string, uint8_t> _branchConditionAliases;
+  // True if the last assembly has succeeded.
+  bool _assemblySucceeded;
+
+  // True if the last assembly has been done by parsing the source code,
+  // as opposed to taking it from the cache.
+  // Only in this case, _symbolFields and _labels are valid.
+  bool _symbolFieldsValid;
 
   // Structure to fill if a non-defined label is encountered.
   // It might be defined later on...
@@ -1314,6 +1919,9 @@ private: // -- variables
     // Name of the label that was being used.
     std::string label_name;
 
+    // Id of the label in the symbol table.
+    QISA_SymbolTable::SymbolId label_id;
+
     // Location in the assembly input file.
     QISA::location label_name_loc;
 
@@ -1340,30 +1948,11 @@ private: // -- variables
 
   };
 
-
-
-  // Needed to be able to use a location in a std::map.
-  struct LocationCompare {
-    bool
-    operator() (const QISA::location& lhs, const QISA::location& rhs) const
-    {
-      if (lhs.begin == rhs.begin)
-      {
-        return ((lhs.end.line < rhs.end.line) ||
-                ((lhs.end.line == rhs.end.line) && (lhs.end.column < rhs.end.column)));
-      }
-      else
-      {
-        return ((lhs.begin.line < rhs.begin.line) ||
-                ((lhs.begin.line == rhs.begin.line) && (lhs.begin.column < rhs.begin.column)));
-      }
-    }
-  };
-
   // Used to resolve labels that are used before declaration.
+  // The uses are kept in the order of the source code, and are patched into
+  // the instructions after the whole source code has been parsed.
   // NOTE: Currently only one label use per instruction is supported.
-  //       The key is the location on which the label is used.
-  std::map<location, DeferredLabelUse, LocationCompare> _deferredInstructions;
+  std::vector<DeferredLabelUse> _deferredInstructions;
 
   // Used to redirect error messages to.
   std::ostringstream _errorStream;
@@ -1379,6 +1968,9 @@ private: // -- variables
 
   // Records the location of the last error.
   location _errorLoc;
+
+  // Statistics of the last assembly or disassembly.
+  Statistics _statistics;
 };
 
 /**
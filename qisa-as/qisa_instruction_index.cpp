@@ -0,0 +1,219 @@
+#include <algorithm>
+#include <cctype>
+
+#include "qisa_instruction_index.h"
+
+namespace QISA
+{
+
+namespace
+{
+
+// Smallest power of two that is not less than the given value.
+uint32_t
+powerOfTwoAtLeast(size_t value)
+{
+  uint32_t result = 1;
+
+  while (result < value)
+  {
+    result <<= 1;
+  }
+
+  return result;
+}
+
+// Maximum number of seeds to try for a bucket, before the number of slots is doubled.
+const uint32_t MAX_NR_OF_DISPLACEMENTS = 1 << 16;
+
+} // namespace
+
+const size_t QISA_InstructionIndex::NR_OF_INSTRUCTION_KINDS;
+const int QISA_InstructionIndex::NO_OPCODE;
+
+QISA_InstructionIndex::QISA_InstructionIndex()
+  : _bucketMask(0)
+  , _slotMask(0)
+{
+}
+
+uint32_t
+QISA_InstructionIndex::hash(const char* name, size_t length, uint32_t seed)
+{
+  // FNV-1a on the uppercase characters, followed by the finalizer of MurmurHash3
+  // so that the low bits (which select the bucket and slot) depend on all characters.
+  uint32_t h = 2166136261u ^ (seed * 0x9e3779b9u);
+
+  for (size_t i = 0; i < length; i++)
+  {
+    h ^= (uint32_t)toupper((unsigned char)name[i]);
+    h *= 16777619u;
+  }
+
+  h ^= h >> 16;
+  h *= 0x85ebca6bu;
+  h ^= h >> 13;
+  h *= 0xc2b2ae35u;
+  h ^= h >> 16;
+
+  return h;
+}
+
+void
+QISA_InstructionIndex::build(const OpcodeMap* const opcodeMaps[NR_OF_INSTRUCTION_KINDS])
+{
+  _entries.clear();
+
+  // Merge the opcode maps: the same name may be used by more than one kind of instruction.
+  std::map<std::string, size_t> entryIndices;
+
+  for (size_t kind = 0; kind < NR_OF_INSTRUCTION_KINDS; kind++)
+  {
+    for (const auto& it : *opcodeMaps[kind])
+    {
+      auto insertResult = entryIndices.emplace(it.first, _entries.size());
+
+      if (insertResult.second)
+      {
+        Entry entry;
+        entry.name = it.first;
+        std::fill(entry.opcodes, entry.opcodes + NR_OF_INSTRUCTION_KINDS, NO_OPCODE);
+        _entries.push_back(entry);
+      }
+
+      _entries[insertResult.first->second].opcodes[kind] = it.second;
+    }
+  }
+
+  _bucketMask = powerOfTwoAtLeast(_entries.size() / 2) - 1;
+
+  size_t nrOfSlots = powerOfTwoAtLeast(2 * _entries.size());
+
+  while (!place(nrOfSlots))
+  {
+    nrOfSlots *= 2;
+  }
+}
+
+bool
+QISA_InstructionIndex::place(size_t nrOfSlots)
+{
+  _slotMask = (uint32_t)nrOfSlots - 1;
+  _slots.assign(nrOfSlots, -1);
+  _displacements.assign(_bucketMask + 1, 0);
+
+  std::vector<std::vector<int32_t> > buckets(_bucketMask + 1);
+
+  for (size_t i = 0; i < _entries.size(); i++)
+  {
+    const std::string& name = _entries[i].name;
+    buckets[hash(name.data(), name.size(), 0) & _bucketMask].push_back((int32_t)i);
+  }
+
+  // Place the largest buckets first, while most of the slots are still free.
+  std::vector<uint32_t> bucketOrder(buckets.size());
+
+  for (uint32_t b = 0; b < bucketOrder.size(); b++)
+  {
+    bucketOrder[b] = b;
+  }
+
+  std::stable_sort(bucketOrder.begin(), bucketOrder.end(),
+                   [&buckets](uint32_t a, uint32_t b) { return buckets[a].size() > buckets[b].size(); });
+
+  std::vector<uint32_t> candidateSlots;
+
+  for (uint32_t b : bucketOrder)
+  {
+    const std::vector<int32_t>& bucket = buckets[b];
+
+    if (bucket.empty())
+    {
+      break;
+    }
+
+    bool placed = false;
+
+    for (uint32_t seed = 1; !placed && (seed < MAX_NR_OF_DISPLACEMENTS); seed++)
+    {
+      candidateSlots.clear();
+      placed = true;
+
+      for (int32_t i : bucket)
+      {
+        const std::string& name = _entries[i].name;
+        uint32_t slot = hash(name.data(), name.size(), seed) & _slotMask;
+
+        if ((_slots[slot] != -1) ||
+            (std::find(candidateSlots.begin(), candidateSlots.end(), slot) != candidateSlots.end()))
+        {
+          placed = false;
+          break;
+        }
+
+        candidateSlots.push_back(slot);
+      }
+
+      if (placed)
+      {
+        for (size_t j = 0; j < bucket.size(); j++)
+        {
+          _slots[candidateSlots[j]] = bucket[j];
+        }
+
+        _displacements[b] = seed;
+      }
+    }
+
+    if (!placed)
+    {
+      return false;
+    }
+  }
+
+  return true;
+}
+
+const QISA_InstructionIndex::Entry*
+QISA_InstructionIndex::find(const char* name, size_t length) const
+{
+  if (_entries.empty())
+  {
+    return nullptr;
+  }
+
+  const uint32_t seed = _displacements[hash(name, length, 0) & _bucketMask];
+
+  if (seed == 0)
+  {
+    // Empty bucket.
+    return nullptr;
+  }
+
+  const int32_t i = _slots[hash(name, length, seed) & _slotMask];
+
+  if (i == -1)
+  {
+    return nullptr;
+  }
+
+  // The slot may hold another name that has the same hash.
+  const Entry& entry = _entries[i];
+
+  if (entry.name.size() != length)
+  {
+    return nullptr;
+  }
+
+  for (size_t c = 0; c < length; c++)
+  {
+    if (toupper((unsigned char)name[c]) != toupper((unsigned char)entry.name[c]))
+    {
+      return nullptr;
+    }
+  }
+
+  return &entry;
+}
+
+} // namespace QISA
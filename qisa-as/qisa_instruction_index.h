@@ -0,0 +1,103 @@
+#pragma once
+
+#include <string>
+#include <vector>
+#include <map>
+#include <cstddef>
+#include <cstdint>
+
+namespace QISA
+{
+
+/**
+ * Case-insensitive index of all instruction names, classic as well as quantum.
+ *
+ * A single lookup of an instruction name yields the opcodes under which it
+ * has been defined for each kind of instruction. The index uses a perfect
+ * hash (hash and displace), so that a lookup hashes the name, probes exactly
+ * one slot and compares one name, without copying or case-folding the name
+ * into a separate string first.
+ *
+ * The index must be rebuilt each time one of the opcode maps changes.
+ */
+class QISA_InstructionIndex
+{
+public:
+
+  typedef std::map<std::string, int> OpcodeMap;
+
+  // Number of kinds of instructions, i.e. the number of opcode maps given to build().
+  static const size_t NR_OF_INSTRUCTION_KINDS = 4;
+
+  // Value in Entry::opcodes if the instruction has not been defined for that kind.
+  static const int NO_OPCODE = -1;
+
+  struct Entry
+  {
+    // Uppercase name of the instruction.
+    std::string name;
+
+    // Opcode of the instruction per kind of instruction,
+    // in the order in which the opcode maps have been given to build().
+    int opcodes[NR_OF_INSTRUCTION_KINDS];
+  };
+
+  QISA_InstructionIndex();
+
+  /**
+   * (Re)build the index.
+   *
+   * @param[in] opcodeMaps Opcode maps, one per kind of instruction.
+   *                       Their keys must be uppercase instruction names.
+   */
+  void
+  build(const OpcodeMap* const opcodeMaps[NR_OF_INSTRUCTION_KINDS]);
+
+  /**
+   * Find an instruction, regardless of the case in which its name has been written.
+   *
+   * @param[in] name   Start of the instruction name.
+   * @param[in] length Length of the instruction name, in characters.
+   *
+   * @return The entry of the instruction, or nullptr if no instruction has that name.
+   */
+  const Entry*
+  find(const char* name, size_t length) const;
+
+  const Entry*
+  find(const std::string& name) const
+  {
+    return find(name.data(), name.size());
+  }
+
+  /** @return The number of instruction names in the index. */
+  size_t
+  size() const
+  {
+    return _entries.size();
+  }
+
+private:
+
+  // Case-insensitive hash of the given name, with the given seed.
+  static uint32_t
+  hash(const char* name, size_t length, uint32_t seed);
+
+  // Try to place all entries with the given number of slots.
+  bool
+  place(size_t nrOfSlots);
+
+  std::vector<Entry> _entries;
+
+  // Seed to use for the slot hash of the names in each bucket.
+  // The bucket is selected by the hash with seed 0.
+  std::vector<uint32_t> _displacements;
+
+  // Index into _entries for each slot, or -1 if the slot is empty.
+  std::vector<int32_t> _slots;
+
+  uint32_t _bucketMask;
+  uint32_t _slotMask;
+};
+
+} // namespace QISA
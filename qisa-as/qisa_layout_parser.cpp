@@ -0,0 +1,420 @@
+#include <fstream>
+#include <map>
+#include <cctype>
+#include <cerrno>
+#include <cstdlib>
+#include <limits>
+
+#include "qisa_layout_parser.h"
+
+namespace QISA
+{
+
+namespace
+{
+
+// Remove comments, and leading and trailing spaces (including the carriage
+// return of a DOS line ending) from the given line.
+std::string
+cleanupLine(const std::string& inputLine)
+{
+  size_t end = inputLine.find('#');
+  if (end == std::string::npos)
+  {
+    end = inputLine.size();
+  }
+
+  size_t begin = 0;
+  while ((begin < end) && std::isspace((unsigned char)inputLine[begin]))
+  {
+    begin++;
+  }
+
+  while ((end > begin) && std::isspace((unsigned char)inputLine[end - 1]))
+  {
+    end--;
+  }
+
+  return inputLine.substr(begin, end - begin);
+}
+
+// Parse a non-negative decimal number at the given position of the given
+// string, skipping the spaces in front of it.
+// On success, the position is advanced past the number.
+bool
+parseNumber(const std::string& str, size_t& pos, long& value)
+{
+  while ((pos < str.size()) && std::isspace((unsigned char)str[pos]))
+  {
+    pos++;
+  }
+
+  if ((pos == str.size()) || !std::isdigit((unsigned char)str[pos]))
+  {
+    return false;
+  }
+
+  const char* begin = str.c_str() + pos;
+  char* end;
+
+  errno = 0;
+  value = std::strtol(begin, &end, 10);
+  if (errno == ERANGE)
+  {
+    return false;
+  }
+
+  pos += end - begin;
+  return true;
+}
+
+// Skip the spaces at the given position of the given string, and the given
+// separator after them.
+bool
+parseSeparator(const std::string& str, size_t& pos, char separator)
+{
+  while ((pos < str.size()) && std::isspace((unsigned char)str[pos]))
+  {
+    pos++;
+  }
+
+  if ((pos == str.size()) || (str[pos] != separator))
+  {
+    return false;
+  }
+
+  pos++;
+  return true;
+}
+
+} // namespace
+
+QISA_LayoutParser::QISA_LayoutParser()
+  : _nrOfQubits(-1)
+  , _nrOfEdges(-1)
+{
+}
+
+void
+QISA_LayoutParser::reset()
+{
+  _nrOfQubits = -1;
+  _nrOfEdges = -1;
+  _edgeDefinitions.clear();
+  _edges.clear();
+  _filename.clear();
+  _errorStream.str("");
+  _errorStream.clear();
+}
+
+bool
+QISA_LayoutParser::parse(const std::string& filename)
+{
+  reset();
+
+  _filename = filename;
+
+  std::ifstream srcFile(_filename);
+  if (!srcFile.is_open())
+  {
+    _errorStream << "<Could not read from file: " << _filename << ">";
+    return false;
+  }
+
+  // Names of the sections, indexed by Section.
+  static const char* const sectionNames[] =
+  {
+    "",
+    ".NumQubits",
+    ".NumDirEdge",
+    ".EdgeList"
+  };
+
+  // Names of the lines that end the sections, indexed by Section.
+  static const char* const sectionEndNames[] =
+  {
+    "",
+    ".EndNumQubits",
+    ".EndNumDirEdge",
+    ".EndEdgeList"
+  };
+
+  Section section = SECTION_NONE;
+  size_t sectionLineNr = 0;
+
+  std::string line;
+  size_t line_counter = 0;
+
+  while (std::getline(srcFile, line))
+  {
+    line_counter++;
+
+    line = cleanupLine(line);
+
+    if (line.empty())
+    {
+      continue;
+    }
+
+    if (line[0] == '.')
+    {
+      if ((section != SECTION_NONE) && (line == sectionEndNames[section]))
+      {
+        section = SECTION_NONE;
+        continue;
+      }
+
+      if (section != SECTION_NONE)
+      {
+        _errorStream << "Unexpected '" << line << "' on line[" << line_counter
+                     << "], within section '" << sectionNames[section]
+                     << "' that starts on line[" << sectionLineNr << "].";
+        return false;
+      }
+
+      if (line == sectionNames[SECTION_NUM_QUBITS])
+      {
+        section = SECTION_NUM_QUBITS;
+      }
+      else if (line == sectionNames[SECTION_NUM_DIR_EDGE])
+      {
+        section = SECTION_NUM_DIR_EDGE;
+      }
+      else if (line == sectionNames[SECTION_EDGE_LIST])
+      {
+        section = SECTION_EDGE_LIST;
+      }
+      else
+      {
+        _errorStream << "Unknown section '" << line << "' on line[" << line_counter << "].";
+        return false;
+      }
+
+      sectionLineNr = line_counter;
+      continue;
+    }
+
+    bool success = true;
+
+    switch (section)
+    {
+    case SECTION_NUM_QUBITS:
+      // Qubit addresses must fit in a QubitAddress.
+      success = parseCount(line, line_counter, "number of qubits",
+                           (long)std::numeric_limits<QubitAddress>::max() + 1, _nrOfQubits);
+      break;
+
+    case SECTION_NUM_DIR_EDGE:
+      success = parseCount(line, line_counter, "number of edges",
+                           std::numeric_limits<int>::max(), _nrOfEdges);
+      break;
+
+    case SECTION_EDGE_LIST:
+      success = parseEdge(line, line_counter);
+      break;
+
+    default:
+      _errorStream << "Badly formed line[" << line_counter << "]: '" << line
+                   << "', outside of a section.";
+      success = false;
+      break;
+    }
+
+    if (!success)
+    {
+      return false;
+    }
+  }
+
+  if (section != SECTION_NONE)
+  {
+    _errorStream << "Section '" << sectionNames[section] << "' that starts on line["
+                 << sectionLineNr << "] is not ended by '" << sectionEndNames[section] << "'.";
+    return false;
+  }
+
+  if (_nrOfQubits < 0)
+  {
+    _errorStream << "The number of qubits has not been specified, using section '"
+                 << sectionNames[SECTION_NUM_QUBITS] << "'.";
+    return false;
+  }
+
+  if (_nrOfQubits == 0)
+  {
+    _errorStream << "The number of qubits must be at least 1.";
+    return false;
+  }
+
+  if (_nrOfEdges < 0)
+  {
+    _errorStream << "The number of edges has not been specified, using section '"
+                 << sectionNames[SECTION_NUM_DIR_EDGE] << "'.";
+    return false;
+  }
+
+  return checkEdges();
+}
+
+bool
+QISA_LayoutParser::parseCount(const std::string& line,
+                              size_t lineNr,
+                              const char* valueName,
+                              long maxValue,
+                              int& value)
+{
+  if (value >= 0)
+  {
+    _errorStream << "The " << valueName << " specified on line[" << lineNr
+                 << "] has already been specified.";
+    return false;
+  }
+
+  size_t pos = 0;
+  long count;
+
+  if (!parseNumber(line, pos, count) || (pos != line.size()))
+  {
+    _errorStream << "Invalid " << valueName << " on line[" << lineNr << "]: '" << line << "'";
+    return false;
+  }
+
+  if (count > maxValue)
+  {
+    _errorStream << "The " << valueName << " is too high (max=" << maxValue
+                 << "), line[" << lineNr << "]: '" << line << "'";
+    return false;
+  }
+
+  value = (int)count;
+  return true;
+}
+
+bool
+QISA_LayoutParser::parseEdge(const std::string& line,
+                             size_t lineNr)
+{
+  EdgeDefinition edge;
+  size_t pos = 0;
+
+  // Format: <edge number>: <target qubit>, <control qubit>
+  if (!parseNumber(line, pos, edge.edgeNr) ||
+      !parseSeparator(line, pos, ':') ||
+      !parseNumber(line, pos, edge.target) ||
+      !parseSeparator(line, pos, ',') ||
+      !parseNumber(line, pos, edge.control) ||
+      (pos != line.size()))
+  {
+    _errorStream << "Badly formed edge on line[" << lineNr << "]: '" << line
+                 << "', expected '<edge number>: <target qubit>, <control qubit>'";
+    return false;
+  }
+
+  edge.lineNr = lineNr;
+  _edgeDefinitions.push_back(edge);
+
+  return true;
+}
+
+bool
+QISA_LayoutParser::checkEdges()
+{
+  if (_edgeDefinitions.size() > (size_t)_nrOfEdges)
+  {
+    _errorStream << "More edges have been specified (" << _edgeDefinitions.size()
+                 << ") than the number of edges (" << _nrOfEdges << ").";
+    return false;
+  }
+
+  // Line on which each edge has been defined, indexed by edge number.
+  // Zero for the edges that have not been defined (yet).
+  std::vector<size_t> edgeLineNrs(_nrOfEdges, 0);
+
+  // Used to check for duplicate edges.
+  // Maps an edge to the line on which it has been defined.
+  std::map<TargetControlPair, size_t> usedEdges;
+
+  std::vector<TargetControlPair> edges(_nrOfEdges);
+
+  for (const EdgeDefinition& edge : _edgeDefinitions)
+  {
+    if (edge.edgeNr >= _nrOfEdges)
+    {
+      _errorStream << "Edge number (" << edge.edgeNr << ") on line[" << edge.lineNr
+                   << "] is out of range (max=" << (_nrOfEdges - 1) << ").";
+      return false;
+    }
+
+    if (edgeLineNrs[edge.edgeNr] != 0)
+    {
+      _errorStream << "Edge number (" << edge.edgeNr << ") specified on line["
+                   << edge.lineNr << "] has already been used on line["
+                   << edgeLineNrs[edge.edgeNr] << "].";
+      return false;
+    }
+
+    if ((edge.target >= _nrOfQubits) || (edge.control >= _nrOfQubits))
+    {
+      _errorStream << "Qubit number ("
+                   << ((edge.target >= _nrOfQubits) ? edge.target : edge.control)
+                   << ") of edge " << edge.edgeNr << " on line[" << edge.lineNr
+                   << "] is out of range (max=" << (_nrOfQubits - 1) << ").";
+      return false;
+    }
+
+    if (edge.target == edge.control)
+    {
+      _errorStream << "Edge " << edge.edgeNr << " on line[" << edge.lineNr
+                   << "] connects qubit " << edge.target << " to itself.";
+      return false;
+    }
+
+    const TargetControlPair tcPair((QubitAddress)edge.target, (QubitAddress)edge.control);
+
+    auto insertResult = usedEdges.insert(std::make_pair(tcPair, edge.lineNr));
+    if (!insertResult.second)
+    {
+      _errorStream << "Edge (" << edge.target << "," << edge.control << ") specified on line["
+                   << edge.lineNr << "] has already been specified on line["
+                   << insertResult.first->second << "].";
+      return false;
+    }
+
+    edgeLineNrs[edge.edgeNr] = edge.lineNr;
+    edges[edge.edgeNr] = tcPair;
+  }
+
+  for (int edgeNr = 0; edgeNr < _nrOfEdges; edgeNr++)
+  {
+    if (edgeLineNrs[edgeNr] == 0)
+    {
+      _errorStream << "Edge number " << edgeNr << " has not been specified (expected "
+                   << _nrOfEdges << " edges).";
+      return false;
+    }
+  }
+
+  _edges.swap(edges);
+
+  return true;
+}
+
+std::string
+QISA_LayoutParser::getLastErrorMessage() const
+{
+  return _errorStream.str();
+}
+
+int
+QISA_LayoutParser::getNrOfQubits() const
+{
+  return _nrOfQubits;
+}
+
+const std::vector<QISA_LayoutParser::TargetControlPair>&
+QISA_LayoutParser::getEdges() const
+{
+  return _edges;
+}
+
+} /* end namespace QISA */
@@ -0,0 +1,168 @@
+#pragma once
+
+#include <string>
+#include <vector>
+#include <sstream>
+#include <cstdint>
+
+#include "qisa_target.h"
+
+namespace QISA
+{
+
+/**
+ * This class is used to parse a file that contains the quantum layout
+ * information of a processor: the number of qubits and the directed edges
+ * between them.
+ *
+ * The quantum layout information is specified using the following format:
+ *
+ *   .NumQubits
+ *   <number of qubits>
+ *   .EndNumQubits
+ *   .NumDirEdge
+ *   <number of edges>
+ *   .EndNumDirEdge
+ *   .EdgeList
+ *   <edge number>: <target qubit>, <control qubit>
+ *   ...
+ *   .EndEdgeList
+ *
+ * The edge number of an edge is the number of its bit in a t_mask.
+ * The edges must be numbered 0 up to the number of edges, each of them
+ * exactly once, but they may be listed in any order.
+ * Empty lines are ignored, as is everything after a '#'.
+ */
+class QISA_LayoutParser
+{
+public:
+
+  typedef QISA_Target::QubitAddress QubitAddress;
+  typedef QISA_Target::TargetControlPair TargetControlPair;
+
+  /**
+   * Constructor.
+   */
+  QISA_LayoutParser();
+
+  /**
+   * Reset the parser such that it can be used to parse a new file again.
+   *
+   * @note
+   *   A reset() is done implicitly at each call to parse().
+   */
+  void
+  reset();
+
+  /**
+   * Parse the given file that contains quantum layout information.
+   * @param filename File to parse.
+   *
+   * @return True on success, false if an error was detected during parse.
+   *
+   * @note
+   *   On error, you can use getLastErrorMessage() to get a
+   *   description of that error.
+   */
+  bool
+  parse(const std::string& filename);
+
+  /**
+   * @return The last generated error message.
+   */
+  std::string
+  getLastErrorMessage() const;
+
+  /**
+   * @return The number of qubits that has been parsed.
+   */
+  int
+  getNrOfQubits() const;
+
+  /**
+   * @return The edges that have been parsed, indexed by edge number.
+   */
+  const std::vector<TargetControlPair>&
+  getEdges() const;
+
+private:
+
+  // Section of the file that is being parsed.
+  enum Section
+  {
+    SECTION_NONE,
+    SECTION_NUM_QUBITS,
+    SECTION_NUM_DIR_EDGE,
+    SECTION_EDGE_LIST
+  };
+
+  /**
+   * Parse a line within the .NumQubits or .NumDirEdge section.
+   *
+   * @param[in]  line      Line to parse, without comments and surrounding spaces.
+   * @param[in]  lineNr    Number of the line, used in error messages.
+   * @param[in]  valueName Name of the value, used in error messages.
+   * @param[in]  maxValue  Maximum value that is accepted.
+   * @param[out] value     Receives the parsed value.
+   *
+   * @return True on success, false on failure.
+   */
+  bool
+  parseCount(const std::string& line,
+             size_t lineNr,
+             const char* valueName,
+             long maxValue,
+             int& value);
+
+  /**
+   * Parse a line within the .EdgeList section.
+   *
+   * @param[in] line   Line to parse, without comments and surrounding spaces.
+   * @param[in] lineNr Number of the line, used in error messages.
+   *
+   * @return True on success, false on failure.
+   */
+  bool
+  parseEdge(const std::string& line,
+            size_t lineNr);
+
+  /**
+   * Check that the edges that have been parsed form a valid layout.
+   *
+   * @return True on success, false on failure.
+   */
+  bool
+  checkEdges();
+
+  // An edge as it has been given in the .EdgeList section.
+  // These are only checked after the whole file has been parsed, so that the
+  // sections can be given in any order.
+  struct EdgeDefinition
+  {
+    long edgeNr;
+    long target;
+    long control;
+    size_t lineNr;
+  };
+
+  // Number of qubits that has been parsed, or -1 if not given (yet).
+  int _nrOfQubits;
+
+  // Number of edges that has been parsed, or -1 if not given (yet).
+  int _nrOfEdges;
+
+  // Edges in the order in which they have been given.
+  std::vector<EdgeDefinition> _edgeDefinitions;
+
+  // Edges that have been parsed, indexed by edge number.
+  // They are only set once the edge definitions have been checked.
+  std::vector<TargetControlPair> _edges;
+
+  // Name of the file that has been parsed.
+  std::string _filename;
+
+  // Used to redirect error messages to.
+  std::ostringstream _errorStream;
+};
+
+} /* end namespace QISA */
@@ -0,0 +1,161 @@
+#ifdef _WIN32
+#include <windows.h>
+#else
+#include <sys/types.h>
+#include <sys/stat.h>
+#include <sys/mman.h>
+#include <fcntl.h>
+#include <unistd.h>
+#endif
+
+#include "qisa_mapped_file.h"
+
+namespace QISA
+{
+
+QISA_MappedFile::QISA_MappedFile()
+  : _data(nullptr)
+  , _size(0)
+#ifdef _WIN32
+  , _fileHandle(INVALID_HANDLE_VALUE)
+  , _mappingHandle(NULL)
+#endif
+{
+}
+
+QISA_MappedFile::~QISA_MappedFile()
+{
+  close();
+}
+
+#ifdef _WIN32
+
+bool
+QISA_MappedFile::open(const std::string& filename)
+{
+  close();
+
+  _fileHandle = CreateFileA(filename.c_str(), GENERIC_READ, FILE_SHARE_READ, NULL,
+                            OPEN_EXISTING, FILE_FLAG_SEQUENTIAL_SCAN, NULL);
+  if (_fileHandle == INVALID_HANDLE_VALUE)
+  {
+    return false;
+  }
+
+  LARGE_INTEGER fileSize;
+  if (!GetFileSizeEx(_fileHandle, &fileSize))
+  {
+    close();
+    return false;
+  }
+
+  _size = static_cast<size_t>(fileSize.QuadPart);
+
+  // An empty file cannot be mapped, but is not an error.
+  if (_size == 0)
+  {
+    return true;
+  }
+
+  _mappingHandle = CreateFileMappingA(_fileHandle, NULL, PAGE_READONLY, 0, 0, NULL);
+  if (_mappingHandle == NULL)
+  {
+    close();
+    return false;
+  }
+
+  _data = static_cast<const uint8_t*>(MapViewOfFile(_mappingHandle, FILE_MAP_READ, 0, 0, 0));
+  if (_data == nullptr)
+  {
+    close();
+    return false;
+  }
+
+  return true;
+}
+
+void
+QISA_MappedFile::close()
+{
+  if (_data != nullptr)
+  {
+    UnmapViewOfFile(_data);
+  }
+
+  if (_mappingHandle != NULL)
+  {
+    CloseHandle(_mappingHandle);
+  }
+
+  if (_fileHandle != INVALID_HANDLE_VALUE)
+  {
+    CloseHandle(_fileHandle);
+  }
+
+  _data = nullptr;
+  _size = 0;
+  _fileHandle = INVALID_HANDLE_VALUE;
+  _mappingHandle = NULL;
+}
+
+#else
+
+bool
+QISA_MappedFile::open(const std::string& filename)
+{
+  close();
+
+  int fd = ::open(filename.c_str(), O_RDONLY);
+  if (fd < 0)
+  {
+    return false;
+  }
+
+  struct stat st;
+  if (fstat(fd, &st) != 0 || !S_ISREG(st.st_mode))
+  {
+    ::close(fd);
+    return false;
+  }
+
+  // An empty file cannot be mapped, but is not an error.
+  if (st.st_size == 0)
+  {
+    ::close(fd);
+    return true;
+  }
+
+  void* data = mmap(NULL, st.st_size, PROT_READ, MAP_PRIVATE, fd, 0);
+
+  // The mapping stays valid after closing the file descriptor.
+  ::close(fd);
+
+  if (data == MAP_FAILED)
+  {
+    return false;
+  }
+
+  // The file is read from front to back.
+  madvise(data, st.st_size, MADV_SEQUENTIAL);
+
+  _data = static_cast<const uint8_t*>(data);
+  _size = st.st_size;
+
+  return true;
+}
+
+void
+QISA_MappedFile::close()
+{
+  if (_data != nullptr)
+  {
+    munmap(const_cast<uint8_t*>(_data), _size);
+  }
+
+  _data = nullptr;
+  _size = 0;
+}
+
+#endif
+
+} // namespace QISA
@@ -0,0 +1,71 @@
+#pragma once
+
+#include <string>
+#include <cstddef>
+#include <cstdint>
+
+namespace QISA
+{
+
+/**
+ * Read-only memory mapping of a file.
+ *
+ * This is used to disassemble large binaries without reading them into
+ * memory first: the operating system pages the file in (and out again)
+ * as it is accessed.
+ */
+class QISA_MappedFile
+{
+public:
+
+  QISA_MappedFile();
+
+  ~QISA_MappedFile();
+
+  /**
+   * Map the given file into memory.
+   * A file that was mapped before is unmapped first.
+   *
+   * @param[in] filename Name of the file to map.
+   *
+   * @return True on success, false if the file cannot be opened or mapped.
+   */
+  bool
+  open(const std::string& filename);
+
+  /**
+   * Unmap the file, if any.
+   */
+  void
+  close();
+
+  /** @return The start of the mapped file, or nullptr if it is empty or not mapped. */
+  const uint8_t*
+  data() const
+  {
+    return _data;
+  }
+
+  /** @return The size of the mapped file, in bytes. */
+  size_t
+  size() const
+  {
+    return _size;
+  }
+
+private:
+
+  // Not copyable, because the mapping is owned by this object.
+  QISA_MappedFile(const QISA_MappedFile&);
+  QISA_MappedFile& operator=(const QISA_MappedFile&);
+
+  const uint8_t* _data;
+  size_t _size;
+
+#ifdef _WIN32
+  void* _fileHandle;
+  void* _mappingHandle;
+#endif
+};
+
+} // namespace QISA
@@ -0,0 +1,114 @@
+#include <algorithm>
+
+#include "qisa_mask_engine.h"
+
+namespace QISA
+{
+
+QISA_MaskEngine::QISA_MaskEngine()
+  : _nrOfQubits(0)
+  , _targetOffsets(1, 0)
+  , _nrOfSMaskParts(0)
+  , _nrOfTMaskParts(0)
+{
+}
+
+void
+QISA_MaskEngine::build(int nrOfQubits,
+                       const std::vector<TargetControlPair>& edges)
+{
+  _nrOfQubits = nrOfQubits;
+  _edges = edges;
+
+  const int nrOfEdges = (int)edges.size();
+
+  // Sort the edges by target qubit, with a counting sort on the target qubits.
+  _targetOffsets.assign(nrOfQubits + 1, 0);
+  for (const TargetControlPair& edge : edges)
+  {
+    _targetOffsets[edge.first + 1]++;
+  }
+
+  for (int qubit = 0; qubit < nrOfQubits; qubit++)
+  {
+    _targetOffsets[qubit + 1] += _targetOffsets[qubit];
+  }
+
+  _edgesByTarget.resize(nrOfEdges);
+
+  std::vector<size_t> nextIndex(_targetOffsets.begin(), _targetOffsets.end() - 1);
+  for (int edgeNr = 0; edgeNr < nrOfEdges; edgeNr++)
+  {
+    _edgesByTarget[nextIndex[edges[edgeNr].first]++] = std::make_pair(edges[edgeNr].second, edgeNr);
+  }
+
+  for (int qubit = 0; qubit < nrOfQubits; qubit++)
+  {
+    std::sort(_edgesByTarget.begin() + _targetOffsets[qubit],
+              _edgesByTarget.begin() + _targetOffsets[qubit + 1]);
+  }
+
+  // Number of instructions needed to encode an s_mask or t_mask.
+  _nrOfSMaskParts = std::max(1, (nrOfQubits + S_MASK_PART_WIDTH - 1) / S_MASK_PART_WIDTH);
+  _nrOfTMaskParts = std::max((int)MIN_NR_OF_T_MASK_PARTS,
+                             (nrOfEdges + T_MASK_PART_WIDTH - 1) / T_MASK_PART_WIDTH);
+
+  _targetQubitEdges.clear();
+  _controlQubitEdges.clear();
+
+  if (!canEncodeTMask())
+  {
+    return;
+  }
+
+  // The edges that use each qubit, be it as target or as control qubit.
+  // Only the qubits of the edges are filled in.
+  std::vector<EdgeBits> qubitEdges(nrOfQubits, 0);
+  for (int edgeNr = 0; edgeNr < nrOfEdges; edgeNr++)
+  {
+    qubitEdges[edges[edgeNr].first] |= (1ULL << edgeNr);
+    qubitEdges[edges[edgeNr].second] |= (1ULL << edgeNr);
+  }
+
+  _targetQubitEdges.resize(nrOfEdges);
+  _controlQubitEdges.resize(nrOfEdges);
+  for (int edgeNr = 0; edgeNr < nrOfEdges; edgeNr++)
+  {
+    _targetQubitEdges[edgeNr] = qubitEdges[edges[edgeNr].first];
+    _controlQubitEdges[edgeNr] = qubitEdges[edges[edgeNr].second];
+  }
+}
+
+int
+QISA_MaskEngine::findEdge(int64_t target,
+                          int64_t control) const
+{
+  if ((target < 0) || (target >= _nrOfQubits) ||
+      (control < 0) || (control >= _nrOfQubits))
+  {
+    return NO_EDGE;
+  }
+
+  auto begin = _edgesByTarget.begin() + _targetOffsets[target];
+  auto end = _edgesByTarget.begin() + _targetOffsets[target + 1];
+
+  auto it = std::lower_bound(begin, end, std::make_pair((QubitAddress)control, 0));
+
+  if ((it == end) || (it->first != control))
+  {
+    return NO_EDGE;
+  }
+
+  return it->second;
+}
+
+uint32_t
+QISA_MaskEngine::getSMaskPart(const QubitBits& s_mask_bits,
+                              int pos)
+{
+  static const QubitBits partMask((1UL << S_MASK_PART_WIDTH) - 1);
+
+  return (uint32_t)((s_mask_bits >> (S_MASK_PART_WIDTH * pos)) & partMask).to_ulong();
+}
+
+} // namespace QISA
@@ -0,0 +1,210 @@
+#pragma once
+
+#include <vector>
+#include <bitset>
+#include <utility>
+#include <cstddef>
+#include <cstdint>
+
+namespace QISA
+{
+
+/**
+ * Tables derived from the quantum layout information, used to validate,
+ * encode and decode the s_masks and t_masks of SMIS and SMIT instructions.
+ *
+ * An s_mask is held as a QubitBits, with one bit per qubit, and a t_mask as
+ * an EdgeBits, with one bit per edge (its edge number). Both have the fixed
+ * width of the largest mask that can be encoded, so that checking a qubit or
+ * edge of a mask takes a few word operations:
+ *   - a target-control pair is mapped to its edge number by a lookup in the
+ *     sorted edges of its target qubit;
+ *   - for each edge, the edges that share its target qubit and the edges that
+ *     share its control qubit are precomputed, so that a qubit that is used
+ *     by more than one pair of a t_mask is found by masking these with the
+ *     edges of the t_mask so far.
+ *
+ * Masks of layouts with more qubits or edges than can be encoded are not
+ * supported: see canEncodeSMask() and canEncodeTMask().
+ *
+ * The engine must be rebuilt each time the quantum layout information changes.
+ */
+class QISA_MaskEngine
+{
+public:
+
+  // Defines the type of the address (number) of a qubit.
+  typedef uint16_t QubitAddress;
+
+  // Defines the type of a target-control pair.
+  typedef std::pair<QubitAddress, QubitAddress> TargetControlPair;
+
+  // Encoding of the s_mask and t_mask of SMIS and SMIT instructions.
+  // A mask that has more bits than fit in one instruction is divided into
+  // parts, each of which is encoded into an instruction of its own, with the
+  // part number as its pos value.
+  enum MaskEncoding
+  {
+    S_MASK_PART_WIDTH      = 17, // Qubits per SMIS instruction.
+    T_MASK_PART_WIDTH      = 16, // Edges per SMIT instruction.
+    MAX_NR_OF_MASK_PARTS   = 4,  // The pos field is 2 bits wide.
+
+    // The t-registers of the processor hold 48 edges, so a t_mask is always
+    // encoded in at least 3 SMIT instructions (as done by the QCC assembler).
+    MIN_NR_OF_T_MASK_PARTS = 3,
+
+    MAX_NR_OF_S_MASK_QUBITS = MAX_NR_OF_MASK_PARTS * S_MASK_PART_WIDTH,
+    MAX_NR_OF_T_MASK_EDGES  = MAX_NR_OF_MASK_PARTS * T_MASK_PART_WIDTH
+  };
+
+  // An s_mask, one bit per qubit.
+  typedef std::bitset<MAX_NR_OF_S_MASK_QUBITS> QubitBits;
+
+  // A t_mask, one bit per edge.
+  typedef uint64_t EdgeBits;
+
+  static_assert(MAX_NR_OF_T_MASK_EDGES <= 64, "An EdgeBits holds 64 edges");
+
+  // Returned by findEdge() if a target-control pair is not an edge.
+  static const int NO_EDGE = -1;
+
+  QISA_MaskEngine();
+
+  /**
+   * (Re)build the tables.
+   *
+   * @param[in] nrOfQubits Total number of addressable qubits.
+   * @param[in] edges      Valid target-control pairs, indexed by edge number.
+   *                       The qubits must be less than nrOfQubits.
+   */
+  void
+  build(int nrOfQubits,
+        const std::vector<TargetControlPair>& edges);
+
+  /** @return The number of qubits of the layout. */
+  int
+  getNrOfQubits() const
+  {
+    return _nrOfQubits;
+  }
+
+  /** @return The number of edges of the layout. */
+  int
+  getNrOfEdges() const
+  {
+    return (int)_edges.size();
+  }
+
+  /** @return The edges of the layout, indexed by edge number. */
+  const std::vector<TargetControlPair>&
+  getEdges() const
+  {
+    return _edges;
+  }
+
+  /** @return The number of SMIS instructions in which an s_mask is encoded. */
+  int
+  getNrOfSMaskParts() const
+  {
+    return _nrOfSMaskParts;
+  }
+
+  /** @return The number of SMIT instructions in which a t_mask is encoded. */
+  int
+  getNrOfTMaskParts() const
+  {
+    return _nrOfTMaskParts;
+  }
+
+  /** @return True if the s_masks of the layout fit in the SMIS encoding. */
+  bool
+  canEncodeSMask() const
+  {
+    return _nrOfSMaskParts <= MAX_NR_OF_MASK_PARTS;
+  }
+
+  /** @return True if the t_masks of the layout fit in the SMIT encoding. */
+  bool
+  canEncodeTMask() const
+  {
+    return _nrOfTMaskParts <= MAX_NR_OF_MASK_PARTS;
+  }
+
+  /**
+   * Find the edge number of a target-control pair.
+   *
+   * @param[in] target  Target qubit, which may be out of range.
+   * @param[in] control Control qubit, which may be out of range.
+   *
+   * @return The edge number, or NO_EDGE if the pair is not an edge.
+   */
+  int
+  findEdge(int64_t target,
+           int64_t control) const;
+
+  /**
+   * @param[in] edgeNr Edge number, which must be less than MAX_NR_OF_T_MASK_EDGES.
+   * @return The edges that use the target qubit of the given edge, including itself.
+   */
+  EdgeBits
+  getTargetQubitEdges(int edgeNr) const
+  {
+    return _targetQubitEdges[edgeNr];
+  }
+
+  /**
+   * @param[in] edgeNr Edge number, which must be less than MAX_NR_OF_T_MASK_EDGES.
+   * @return The edges that use the control qubit of the given edge, including itself.
+   */
+  EdgeBits
+  getControlQubitEdges(int edgeNr) const
+  {
+    return _controlQubitEdges[edgeNr];
+  }
+
+  /**
+   * @param[in] s_mask_bits Encoded s_mask.
+   * @param[in] pos         Part number.
+   * @return The bits of the given part of the s_mask.
+   */
+  static uint32_t
+  getSMaskPart(const QubitBits& s_mask_bits,
+               int pos);
+
+  /**
+   * @param[in] t_mask_bits Encoded t_mask.
+   * @param[in] pos         Part number.
+   * @return The bits of the given part of the t_mask.
+   */
+  static uint32_t
+  getTMaskPart(EdgeBits t_mask_bits,
+               int pos)
+  {
+    return (uint32_t)((t_mask_bits >> (T_MASK_PART_WIDTH * pos)) & ((1U << T_MASK_PART_WIDTH) - 1));
+  }
+
+private:
+
+  // Number of qubits of the layout.
+  int _nrOfQubits;
+
+  // Edges, indexed by edge number.
+  std::vector<TargetControlPair> _edges;
+
+  // Control qubit and edge number of each edge, sorted by target qubit and
+  // then by control qubit.
+  std::vector<std::pair<QubitAddress, int> > _edgesByTarget;
+
+  // Index of the first edge of each target qubit in _edgesByTarget.
+  // Has an extra element at the end, which holds the number of edges.
+  std::vector<size_t> _targetOffsets;
+
+  // Only filled in if canEncodeTMask(); indexed by edge number.
+  std::vector<EdgeBits> _targetQubitEdges;
+  std::vector<EdgeBits> _controlQubitEdges;
+
+  int _nrOfSMaskParts;
+  int _nrOfTMaskParts;
+};
+
+} // namespace QISA
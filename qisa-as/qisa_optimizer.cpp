@@ -0,0 +1,807 @@
+#include <algorithm>
+#include <iterator>
+
+#include "qisa_optimizer.h"
+#include "qisa_driver.h"
+
+namespace QISA
+{
+
+const int64_t QISA_Optimizer::UNKNOWN_VALUE;
+
+QISA_Optimizer::QISA_Optimizer(QISA_Driver& driver)
+  : _driver(driver)
+  , _target(*driver._target)
+  , _instructions(driver._instructions)
+  , _nrOfSMaskParts(driver._target->_maskEngine.getNrOfSMaskParts())
+  , _nrOfTMaskParts(driver._target->_maskEngine.getNrOfTMaskParts())
+  , _smisOpcode(-1)
+  , _smitOpcode(-1)
+  , _qwaitOpcode(-1)
+{
+  for (size_t opcode = 0; opcode < _target._classicDecodeTable.size(); opcode++)
+  {
+    const QISA_Target::ClassicDecodeEntry& entry = _target._classicDecodeTable[opcode];
+
+    if (entry.format == QISA_Target::CLASSIC_FORMAT_SMIS)
+    {
+      _smisOpcode = (int)opcode;
+    }
+    else if (entry.format == QISA_Target::CLASSIC_FORMAT_SMIT)
+    {
+      _smitOpcode = (int)opcode;
+    }
+    else if (entry.format == QISA_Target::CLASSIC_FORMAT_QWAIT)
+    {
+      _qwaitOpcode = (int)opcode;
+    }
+  }
+}
+
+void
+QISA_Optimizer::run(unsigned int optimizations)
+{
+  QISA_Driver::Statistics& stats = _driver._statistics;
+
+  const size_t nrOfInstructions = _instructions.size();
+
+  _removed.assign(nrOfInstructions, false);
+
+  if (optimizations & (QISA_Driver::OPTIMIZE_REDUNDANT_MASKS | QISA_Driver::OPTIMIZE_MASK_REGISTER_REUSE |
+                       QISA_Driver::OPTIMIZE_BUNDLE_PACKING | QISA_Driver::OPTIMIZE_WAITS))
+  {
+    buildControlFlowGraph();
+
+    // Reusing registers may leave SMIS and SMIT instructions that have become
+    // redundant, so it is done first.
+    if (optimizations & QISA_Driver::OPTIMIZE_MASK_REGISTER_REUSE)
+    {
+      computeLiveSlots();
+      reuseMaskRegisters();
+    }
+
+    if (optimizations & QISA_Driver::OPTIMIZE_REDUNDANT_MASKS)
+    {
+      removeRedundantMaskWrites();
+    }
+
+    // Removing SMIS and SMIT instructions may leave a QWAIT next to the
+    // bundle it can be folded into.
+    if (optimizations & QISA_Driver::OPTIMIZE_WAITS)
+    {
+      coalesceWaits();
+    }
+
+    // Removing SMIS, SMIT and QWAIT instructions may leave bundles of the
+    // same timing point next to each other, so packing is done last.
+    if (optimizations & QISA_Driver::OPTIMIZE_BUNDLE_PACKING)
+    {
+      packBundles();
+    }
+  }
+
+  removeInstructions();
+
+  stats.nrOfInstructionsRemoved = nrOfInstructions - _instructions.size();
+}
+
+void
+QISA_Optimizer::buildControlFlowGraph()
+{
+  std::vector<QISA_ControlFlowGraph::ControlTransfer> transfers;
+  QISA_ControlFlowGraph::ControlTransfer transfer;
+
+  for (uint64_t address = 0; address < _instructions.size(); address++)
+  {
+    if (_driver.getControlTransfer(_instructions[address], address, transfer))
+    {
+      transfers.push_back(transfer);
+    }
+  }
+
+  std::vector<uint64_t> leaders;
+  _driver._labels.forEachValue([&leaders](uint64_t& address) { leaders.push_back(address); });
+
+  _cfg.build(_instructions.size(), transfers, std::move(leaders));
+}
+
+void
+QISA_Optimizer::decodeMaskAccess(qisa_instruction_type inst,
+                                 MaskAccess& access) const
+{
+  access.isWrite = false;
+  access.readRegister[0] = -1;
+  access.readRegister[1] = -1;
+
+  if (inst & (1U << QISA_Driver::DBL_INST_FORMAT_BIT_OFFSET))
+  {
+    static const int opOffsets[2] = { QISA_Driver::VLIW_INST_0_OFFSET, QISA_Driver::VLIW_INST_1_OFFSET };
+
+    for (int i = 0; i < 2; i++)
+    {
+      const qisa_instruction_type op = (inst >> opOffsets[i]) & QISA_Driver::VLIW_Q_INST_MASK;
+      const int opcode = (op >> QISA_Driver::Q_INST_OPCODE_OFFSET) & QISA_Driver::Q_INST_OPCODE_MASK;
+
+      switch (_target._quantumDecodeTable[opcode].format)
+      {
+        case QISA_Target::QUANTUM_FORMAT_ST:
+          access.readRegister[i] = FIRST_S_SLOT + (op & QISA_Driver::Q_INST_SD_MASK) * NR_OF_PARTS;
+          break;
+
+        case QISA_Target::QUANTUM_FORMAT_TT:
+          access.readRegister[i] = FIRST_T_SLOT + (op & QISA_Driver::Q_INST_TD_MASK) * NR_OF_PARTS;
+          break;
+
+        default:
+          break;
+      }
+    }
+
+    return;
+  }
+
+  const int opcode = (inst >> QISA_Driver::OPCODE_OFFSET) & QISA_Driver::OPCODE_MASK;
+  const int pos = (inst >> QISA_Driver::POS_OFFSET) & QISA_Driver::POS_MASK;
+
+  if (opcode == _smisOpcode)
+  {
+    access.isWrite = true;
+    access.slot = FIRST_S_SLOT + ((inst >> QISA_Driver::SD_OFFSET) & QISA_Driver::SD_MASK) * NR_OF_PARTS + pos;
+    access.value = inst & QISA_Driver::S_MASK_MASK;
+  }
+  else if (opcode == _smitOpcode)
+  {
+    access.isWrite = true;
+    access.slot = FIRST_T_SLOT + ((inst >> QISA_Driver::TD_OFFSET) & QISA_Driver::TD_MASK) * NR_OF_PARTS + pos;
+    access.value = inst & QISA_Driver::T_MASK_MASK;
+  }
+}
+
+void
+QISA_Optimizer::computeLiveSlots()
+{
+  const std::vector<QISA_ControlFlowGraph::BasicBlock>& blocks = _cfg.getBlocks();
+
+  // The slots that each block reads before writing them, and the slots it writes.
+  std::vector<SlotBits> used(blocks.size());
+  std::vector<SlotBits> written(blocks.size());
+
+  MaskAccess access;
+
+  for (size_t b = 0; b < blocks.size(); b++)
+  {
+    for (uint64_t address = blocks[b].end; address-- > blocks[b].begin; )
+    {
+      decodeMaskAccess(_instructions[address], access);
+
+      if (access.isWrite)
+      {
+        used[b].reset(access.slot);
+        written[b].set(access.slot);
+      }
+
+      for (int firstSlot : access.readRegister)
+      {
+        for (int part = 0; (firstSlot >= 0) && (part < getNrOfRegisterParts(firstSlot)); part++)
+        {
+          used[b].set(firstSlot + part);
+        }
+      }
+    }
+  }
+
+  // Iterate until nothing changes. Visiting the blocks from the end of the
+  // program to its start lets most of the liveness propagate in one pass.
+  std::vector<SlotBits> liveIn(used);
+  _liveOut.assign(blocks.size(), SlotBits());
+
+  bool changed = true;
+  while (changed)
+  {
+    changed = false;
+
+    for (size_t b = blocks.size(); b-- > 0; )
+    {
+      SlotBits liveOut;
+      for (size_t successor : blocks[b].successors)
+      {
+        liveOut |= liveIn[successor];
+      }
+
+      if (liveOut != _liveOut[b])
+      {
+        _liveOut[b] = liveOut;
+        liveIn[b] = used[b] | (liveOut & ~written[b]);
+        changed = true;
+      }
+    }
+  }
+}
+
+void
+QISA_Optimizer::reuseMaskRegisters()
+{
+  QISA_Driver::Statistics& stats = _driver._statistics;
+
+  // The values of the slots that have been set in the current block so far,
+  // taking the changes made to the block into account.
+  // Slots that are set before the block are not known, so that changing
+  // a block does not affect what is known in any other block.
+  std::vector<int64_t> values(NR_OF_SLOTS, UNKNOWN_VALUE);
+  std::vector<int> setSlots;
+
+  std::vector<MaskAccess> accesses;
+  std::vector<SlotBits> liveAfterWrite;
+
+  for (size_t b = 0; b < _cfg.getBlocks().size(); b++)
+  {
+    const QISA_ControlFlowGraph::BasicBlock& block = _cfg.getBlocks()[b];
+
+    accesses.resize(block.end - block.begin);
+    for (uint64_t address = block.begin; address < block.end; address++)
+    {
+      decodeMaskAccess(_instructions[address], accesses[address - block.begin]);
+    }
+
+    // The live slots after each SMIS and SMIT instruction of the block, in program order.
+    liveAfterWrite.clear();
+    SlotBits live = _liveOut[b];
+    for (size_t i = accesses.size(); i-- > 0; )
+    {
+      const MaskAccess& access = accesses[i];
+
+      if (access.isWrite)
+      {
+        liveAfterWrite.push_back(live);
+        live.reset(access.slot);
+      }
+
+      for (int firstSlot : access.readRegister)
+      {
+        for (int part = 0; (firstSlot >= 0) && (part < getNrOfRegisterParts(firstSlot)); part++)
+        {
+          live.set(firstSlot + part);
+        }
+      }
+    }
+    std::reverse(liveAfterWrite.begin(), liveAfterWrite.end());
+
+    size_t writeNr = 0;
+    size_t i = 0;
+
+    while (i < accesses.size())
+    {
+      if (!accesses[i].isWrite)
+      {
+        i++;
+        continue;
+      }
+
+      // A group of consecutive SMIS or SMIT instructions that set the same
+      // register, as generated for a single SMIS or SMIT in the source code.
+      const int firstSlot = accesses[i].slot - accesses[i].slot % NR_OF_PARTS;
+      const int nrOfParts = getNrOfRegisterParts(firstSlot);
+
+      size_t groupEnd = i;
+      while ((groupEnd < accesses.size()) && accesses[groupEnd].isWrite &&
+             (accesses[groupEnd].slot - accesses[groupEnd].slot % NR_OF_PARTS == firstSlot))
+      {
+        groupEnd++;
+      }
+
+      int64_t previousValues[NR_OF_PARTS];
+      std::copy(&values[firstSlot], &values[firstSlot] + NR_OF_PARTS, previousValues);
+
+      for (size_t j = i; j < groupEnd; j++)
+      {
+        if (values[accesses[j].slot] == UNKNOWN_VALUE)
+        {
+          setSlots.push_back(accesses[j].slot);
+        }
+        values[accesses[j].slot] = accesses[j].value;
+      }
+
+      // Find another register of the same kind that holds the same mask.
+      int reusedSlot = -1;
+
+      const bool isKnown = std::find(&values[firstSlot], &values[firstSlot] + nrOfParts, UNKNOWN_VALUE) ==
+                           &values[firstSlot] + nrOfParts;
+
+      if (isKnown)
+      {
+        const int kindBegin = (firstSlot < FIRST_T_SLOT) ? FIRST_S_SLOT : FIRST_T_SLOT;
+        const int kindEnd = (firstSlot < FIRST_T_SLOT) ? FIRST_T_SLOT : NR_OF_SLOTS;
+
+        for (int other = kindBegin; other < kindEnd; other += NR_OF_PARTS)
+        {
+          if ((other != firstSlot) &&
+              std::equal(&values[firstSlot], &values[firstSlot] + nrOfParts, &values[other]))
+          {
+            reusedSlot = other;
+            break;
+          }
+        }
+      }
+
+      // The operations that read the register after the group can read the
+      // other register instead, up to the point at which the rest of the
+      // program no longer needs the mask that the group sets. The other
+      // register must not be changed before the last of these operations.
+      std::vector<std::pair<size_t, int> > renamedOps;
+      bool canReuse = (reusedSlot >= 0);
+      bool otherIsChanged = false;
+      bool regionEnded = false;
+      size_t nextWriteNr = writeNr + (groupEnd - i);
+
+      for (size_t j = groupEnd; canReuse && !regionEnded && (j < accesses.size()); j++)
+      {
+        const MaskAccess& access = accesses[j];
+
+        if (access.isWrite)
+        {
+          const int writtenRegister = access.slot - access.slot % NR_OF_PARTS;
+
+          if (writtenRegister == reusedSlot)
+          {
+            otherIsChanged = true;
+          }
+          else if (writtenRegister == firstSlot)
+          {
+            // The register is set (in part) again. The parts it still holds
+            // of the group must not be needed anymore.
+            for (int part = 0; part < nrOfParts; part++)
+            {
+              if ((firstSlot + part != access.slot) && liveAfterWrite[nextWriteNr].test(firstSlot + part))
+              {
+                canReuse = false;
+              }
+            }
+            regionEnded = true;
+          }
+
+          nextWriteNr++;
+        }
+
+        for (int op = 0; canReuse && !regionEnded && (op < 2); op++)
+        {
+          if (access.readRegister[op] == firstSlot)
+          {
+            canReuse = !otherIsChanged;
+            renamedOps.emplace_back(j, op);
+          }
+        }
+      }
+
+      if (canReuse && !regionEnded)
+      {
+        // The register must not be needed after the block either.
+        for (int part = 0; part < nrOfParts; part++)
+        {
+          if (_liveOut[b].test(firstSlot + part))
+          {
+            canReuse = false;
+          }
+        }
+      }
+
+      if (canReuse)
+      {
+        for (size_t j = i; j < groupEnd; j++)
+        {
+          _removed[block.begin + j] = true;
+        }
+
+        // The register keeps the value it had before the group.
+        std::copy(previousValues, previousValues + NR_OF_PARTS, &values[firstSlot]);
+
+        const bool isTRegister = (firstSlot >= FIRST_T_SLOT);
+        const int reusedRegister = (reusedSlot - (isTRegister ? FIRST_T_SLOT : FIRST_S_SLOT)) / NR_OF_PARTS;
+        const qisa_instruction_type registerMask = isTRegister ? QISA_Driver::Q_INST_TD_MASK : QISA_Driver::Q_INST_SD_MASK;
+
+        for (const auto& renamedOp : renamedOps)
+        {
+          const int offset = (renamedOp.second == 0) ? QISA_Driver::VLIW_INST_0_OFFSET : QISA_Driver::VLIW_INST_1_OFFSET;
+
+          qisa_instruction_type& inst = _instructions[block.begin + renamedOp.first];
+          inst = (inst & ~(registerMask << offset)) | (reusedRegister << offset);
+
+          accesses[renamedOp.first].readRegister[renamedOp.second] = reusedSlot;
+        }
+
+        stats.nrOfReusedMaskRegisters++;
+      }
+
+      writeNr += groupEnd - i;
+      i = groupEnd;
+    }
+
+    for (int slot : setSlots)
+    {
+      values[slot] = UNKNOWN_VALUE;
+    }
+    setSlots.clear();
+  }
+}
+
+void
+QISA_Optimizer::removeRedundantMaskWrites()
+{
+  QISA_Driver::Statistics& stats = _driver._statistics;
+
+  const std::vector<QISA_ControlFlowGraph::BasicBlock>& blocks = _cfg.getBlocks();
+  const std::vector<size_t> order = _cfg.getReversePostOrder();
+
+  // The slots whose value is known at the start of each block, i.e. that
+  // have the same value on all paths to it. Nothing is known at the start
+  // of the program. A block that has not been reached yet has no state.
+  std::vector<KnownSlots> entryState(blocks.size());
+  std::vector<bool> isReached(blocks.size(), false);
+
+  if (!blocks.empty())
+  {
+    isReached[0] = true;
+  }
+
+  std::vector<int64_t> values(NR_OF_SLOTS, UNKNOWN_VALUE);
+  std::vector<int> setSlots;
+  MaskAccess access;
+
+  // Runs through the given block, starting from its entry state. Redundant
+  // SMIS and SMIT instructions are removed if requested.
+  auto runBlock = [&](size_t b, bool removeRedundant)
+  {
+    for (const auto& known : entryState[b])
+    {
+      values[known.first] = known.second;
+      setSlots.push_back(known.first);
+    }
+
+    for (uint64_t address = blocks[b].begin; address < blocks[b].end; address++)
+    {
+      if (_removed[address])
+      {
+        continue;
+      }
+
+      decodeMaskAccess(_instructions[address], access);
+
+      if (!access.isWrite)
+      {
+        continue;
+      }
+
+      if (values[access.slot] == access.value)
+      {
+        if (removeRedundant)
+        {
+          _removed[address] = true;
+          stats.nrOfRedundantMaskWrites++;
+        }
+        continue;
+      }
+
+      if (values[access.slot] == UNKNOWN_VALUE)
+      {
+        setSlots.push_back(access.slot);
+      }
+      values[access.slot] = access.value;
+    }
+  };
+
+  // Collects the known slots and forgets about them, after runBlock().
+  auto collectKnownSlots = [&](KnownSlots& knownSlots)
+  {
+    std::sort(setSlots.begin(), setSlots.end());
+
+    knownSlots.clear();
+    for (int slot : setSlots)
+    {
+      knownSlots.emplace_back(slot, (uint32_t)values[slot]);
+      values[slot] = UNKNOWN_VALUE;
+    }
+    setSlots.clear();
+  };
+
+  KnownSlots exitState;
+  KnownSlots meet;
+
+  // Only the blocks whose entry state has changed are run again. They are
+  // visited in reverse postorder, so that most states are final after the
+  // first pass.
+  std::vector<bool> isPending(blocks.size(), false);
+
+  if (!blocks.empty())
+  {
+    isPending[0] = true;
+  }
+
+  bool changed = true;
+  while (changed)
+  {
+    changed = false;
+
+    for (size_t b : order)
+    {
+      if (!isPending[b])
+      {
+        continue;
+      }
+      isPending[b] = false;
+
+      runBlock(b, false);
+      collectKnownSlots(exitState);
+
+      for (size_t successor : blocks[b].successors)
+      {
+        if (!isReached[successor])
+        {
+          isReached[successor] = true;
+          entryState[successor] = exitState;
+          isPending[successor] = true;
+          changed = true;
+          continue;
+        }
+
+        // Only keep what is known on all paths, with the same value.
+        const KnownSlots& state = entryState[successor];
+        meet.clear();
+        std::set_intersection(state.begin(), state.end(), exitState.begin(), exitState.end(),
+                              std::back_inserter(meet));
+
+        if (meet.size() != state.size())
+        {
+          entryState[successor].swap(meet);
+          isPending[successor] = true;
+          changed = true;
+        }
+      }
+    }
+  }
+
+  for (size_t b : order)
+  {
+    runBlock(b, true);
+    collectKnownSlots(exitState);
+  }
+}
+
+void
+QISA_Optimizer::coalesceWaits()
+{
+  QISA_Driver::Statistics& stats = _driver._statistics;
+
+  const qisa_instruction_type maxWait = QISA_Driver::U_IMM20_MASK;
+  const qisa_instruction_type maxBs = std::min<qisa_instruction_type>(_target._max_bs_val, QISA_Driver::BS_MASK);
+
+  // The immediate value of a QWAIT that is a parameter of the program
+  // template must stay where it is.
+  std::vector<bool> hasSymbolField(_instructions.size(), false);
+  for (const QISA_ProgramTemplate::Field& field : _driver._symbolFields)
+  {
+    hasSymbolField[field.address] = true;
+  }
+
+  for (const QISA_ControlFlowGraph::BasicBlock& block : _cfg.getBlocks())
+  {
+    // The QWAIT instruction that has been seen last, if it is immediately
+    // followed by the current instruction. Only the first instruction of
+    // a block may be a branch destination, so the QWAIT and the instruction
+    // it is merged with are always executed together. A QWAIT at the start
+    // of a block may be removed: a branch to it then continues with the
+    // instruction that the wait has been merged into.
+    bool hasWait = false;
+    uint64_t waitAddress = 0;
+
+    for (uint64_t address = block.begin; address < block.end; address++)
+    {
+      if (_removed[address])
+      {
+        continue;
+      }
+
+      qisa_instruction_type& inst = _instructions[address];
+
+      if (inst & (1U << QISA_Driver::DBL_INST_FORMAT_BIT_OFFSET))
+      {
+        // The bundle separator counts from the timing point of the QWAIT.
+        const qisa_instruction_type wait = hasWait ? (_instructions[waitAddress] & QISA_Driver::U_IMM20_MASK) : 0;
+
+        if (hasWait && ((inst & QISA_Driver::BS_MASK) + wait <= maxBs))
+        {
+          inst = (inst & ~(qisa_instruction_type)QISA_Driver::BS_MASK) | ((inst & QISA_Driver::BS_MASK) + wait);
+          _removed[waitAddress] = true;
+          stats.nrOfCoalescedWaits++;
+        }
+
+        hasWait = false;
+        continue;
+      }
+
+      const bool isWait = ((int)((inst >> QISA_Driver::OPCODE_OFFSET) & QISA_Driver::OPCODE_MASK) == _qwaitOpcode) &&
+                          !hasSymbolField[address];
+
+      if (isWait && hasWait)
+      {
+        qisa_instruction_type& previousWait = _instructions[waitAddress];
+        const qisa_instruction_type wait = (previousWait & QISA_Driver::U_IMM20_MASK) +
+                                           (inst & QISA_Driver::U_IMM20_MASK);
+
+        if (wait <= maxWait)
+        {
+          previousWait = (previousWait & ~(qisa_instruction_type)QISA_Driver::U_IMM20_MASK) | wait;
+          _removed[address] = true;
+          stats.nrOfCoalescedWaits++;
+          continue;
+        }
+      }
+
+      hasWait = isWait;
+      waitAddress = address;
+    }
+  }
+}
+
+void
+QISA_Optimizer::packBundles()
+{
+  // A timing point starts with a quantum bundle instruction, and continues
+  // with the quantum bundle instructions with a bundle separator of 0 that
+  // immediately follow it. Other instructions end the timing point, even
+  // though most of them do not change the timing: a bundle may use a mask
+  // that has been set in between. A timing point does not extend into the
+  // next basic block, because that may also be reached from elsewhere.
+  std::vector<uint64_t> timingPoint;
+
+  for (const QISA_ControlFlowGraph::BasicBlock& block : _cfg.getBlocks())
+  {
+    for (uint64_t address = block.begin; address < block.end; address++)
+    {
+      if (_removed[address])
+      {
+        continue;
+      }
+
+      const qisa_instruction_type inst = _instructions[address];
+      const bool isBundle = (inst & (1U << QISA_Driver::DBL_INST_FORMAT_BIT_OFFSET)) != 0;
+
+      if (!isBundle || ((inst & QISA_Driver::BS_MASK) != 0))
+      {
+        packTimingPoint(timingPoint);
+        timingPoint.clear();
+      }
+
+      if (isBundle)
+      {
+        timingPoint.push_back(address);
+      }
+    }
+
+    packTimingPoint(timingPoint);
+    timingPoint.clear();
+  }
+}
+
+void
+QISA_Optimizer::packTimingPoint(const std::vector<uint64_t>& addresses)
+{
+  if (addresses.size() < 2)
+  {
+    return;
+  }
+
+  static const int opOffsets[2] = { QISA_Driver::VLIW_INST_0_OFFSET, QISA_Driver::VLIW_INST_1_OFFSET };
+
+  // The operations of the timing point, in their original order, without
+  // the QNOPs (which are encoded as 0) that fill the unused positions.
+  std::vector<qisa_instruction_type> ops;
+
+  for (uint64_t address : addresses)
+  {
+    for (int offset : opOffsets)
+    {
+      const qisa_instruction_type op = (_instructions[address] >> offset) & QISA_Driver::VLIW_Q_INST_MASK;
+
+      if (op != 0)
+      {
+        ops.push_back(op);
+      }
+    }
+  }
+
+  const size_t nrOfBundles = std::max<size_t>(1, (ops.size() + 1) / 2);
+
+  if (nrOfBundles == addresses.size())
+  {
+    return;
+  }
+
+  const qisa_instruction_type bs = _instructions[addresses.front()] & QISA_Driver::BS_MASK;
+
+  for (size_t i = 0; i < addresses.size(); i++)
+  {
+    if (i >= nrOfBundles)
+    {
+      _removed[addresses[i]] = true;
+      continue;
+    }
+
+    qisa_instruction_type inst = (1U << QISA_Driver::DBL_INST_FORMAT_BIT_OFFSET);
+    if (i == 0)
+    {
+      inst |= bs;
+    }
+
+    for (size_t j = 0; (j < 2) && (2 * i + j < ops.size()); j++)
+    {
+      inst |= ops[2 * i + j] << opOffsets[j];
+    }
+
+    _instructions[addresses[i]] = inst;
+  }
+
+  _driver._statistics.nrOfPackedBundleInstructions += addresses.size() - nrOfBundles;
+}
+
+void
+QISA_Optimizer::removeInstructions()
+{
+  const uint64_t nrOfInstructions = _instructions.size();
+
+  if (std::find(_removed.begin(), _removed.end(), true) == _removed.end())
+  {
+    return;
+  }
+
+  // The new address of each instruction, and of the end of the program.
+  std::vector<uint64_t> newAddresses(nrOfInstructions + 1);
+
+  uint64_t newAddress = 0;
+  for (uint64_t address = 0; address < nrOfInstructions; address++)
+  {
+    newAddresses[address] = newAddress;
+    if (!_removed[address])
+    {
+      newAddress++;
+    }
+  }
+  newAddresses[nrOfInstructions] = newAddress;
+
+  for (uint64_t address = 0; address < nrOfInstructions; address++)
+  {
+    if (_removed[address])
+    {
+      continue;
+    }
+
+    qisa_instruction_type inst = _instructions[address];
+
+    // A branch to a removed instruction continues with the instruction after it.
+    uint64_t destination;
+    if (_driver.getBranchDestination(inst, address, destination) && (destination <= nrOfInstructions))
+    {
+      const int64_t offset = (int64_t)newAddresses[destination] - (int64_t)newAddresses[address];
+
+      inst = (inst & ~((qisa_instruction_type)QISA_Driver::ADDR_MASK << QISA_Driver::ADDR_OFFSET))
+             | ((offset & QISA_Driver::ADDR_MASK) << QISA_Driver::ADDR_OFFSET);
+    }
+
+    _instructions[newAddresses[address]] = inst;
+  }
+
+  _instructions.resize(newAddress);
+
+  _driver._labels.forEachValue([&newAddresses, nrOfInstructions](uint64_t& address)
+  {
+    if (address <= nrOfInstructions)
+    {
+      address = newAddresses[address];
+    }
+  });
+
+  for (QISA_ProgramTemplate::Field& field : _driver._symbolFields)
+  {
+    field.address = newAddresses[field.address];
+  }
+}
+
+} // namespace QISA
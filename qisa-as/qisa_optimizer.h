@@ -0,0 +1,193 @@
+#pragma once
+
+#include <vector>
+#include <bitset>
+#include <cstddef>
+#include <cstdint>
+
+#include "qisa_control_flow.h"
+
+namespace QISA
+{
+
+class QISA_Driver;
+class QISA_Target;
+
+/**
+ * This class implements the optional optimization passes that the driver
+ * applies to an assembled program, see QISA_Driver::setOptimizations().
+ *
+ * The passes work on the encoded instructions, after all labels have been
+ * resolved. They only mark instructions to be removed (or change them in
+ * place); the marked instructions are removed in a final step, which also
+ * adjusts the branch offsets, the label addresses and the addresses of the
+ * symbol fields of the program.
+ *
+ * The control flow of the program is determined from its branch and STOP
+ * instructions. Labels also start a basic block, so that no information is
+ * carried across any address that may be branched to.
+ */
+class QISA_Optimizer
+{
+public:
+
+  // Currently, instructions are encoded in 32 bits.
+  typedef uint32_t qisa_instruction_type;
+
+  explicit QISA_Optimizer(QISA_Driver& driver);
+
+  /**
+   * Apply the given optimizations to the assembled program of the driver,
+   * and record what they achieved in its statistics.
+   *
+   * @param[in] optimizations The QISA_Driver::Optimizations to apply, or'ed together.
+   */
+  void
+  run(unsigned int optimizations);
+
+private: // -- types
+
+  // Mask registers and the parts of their masks.
+  // Each part of an s-register or t-register, as written by a single SMIS or
+  // SMIT instruction (its pos value), is tracked on its own, as a 'slot'.
+  enum Slots
+  {
+    NR_OF_S_REGISTERS = 32,   // 5 bits sd
+    NR_OF_T_REGISTERS = 64,   // 6 bits td
+    NR_OF_PARTS       = 4,    // 2 bits pos
+
+    FIRST_S_SLOT      = 0,
+    FIRST_T_SLOT      = FIRST_S_SLOT + NR_OF_S_REGISTERS * NR_OF_PARTS,
+    NR_OF_SLOTS       = FIRST_T_SLOT + NR_OF_T_REGISTERS * NR_OF_PARTS
+  };
+
+  // A set of slots.
+  typedef std::bitset<NR_OF_SLOTS> SlotBits;
+
+  // Value of a slot that is not known.
+  static const int64_t UNKNOWN_VALUE = -1;
+
+  // The known values of (some of the) slots, sorted by slot.
+  typedef std::vector<std::pair<uint16_t, uint32_t> > KnownSlots;
+
+  // Effect of an instruction on the mask registers.
+  struct MaskAccess
+  {
+    // True if the instruction is a SMIS or SMIT instruction, which sets a
+    // single slot to 'value'.
+    bool isWrite;
+    int slot;
+    uint32_t value;
+
+    // Number of the first slot of the register that is read by each of the
+    // two operations of a quantum bundle, or -1.
+    int readRegister[2];
+  };
+
+private: // -- functions
+
+  /**
+   * Determine the basic blocks of the program.
+   */
+  void
+  buildControlFlowGraph();
+
+  /**
+   * Determine the effect of the given instruction on the mask registers.
+   */
+  void
+  decodeMaskAccess(qisa_instruction_type inst,
+                   MaskAccess& access) const;
+
+  /**
+   * @return The number of slots that are in use for the register that starts at the given slot.
+   */
+  int
+  getNrOfRegisterParts(int firstSlot) const
+  {
+    return (firstSlot < FIRST_T_SLOT) ? _nrOfSMaskParts : _nrOfTMaskParts;
+  }
+
+  /**
+   * Determine which slots are live (may be read before they are written)
+   * at the end of each basic block.
+   */
+  void
+  computeLiveSlots();
+
+  /**
+   * Let a quantum operation use a register that already holds a mask,
+   * instead of setting another register to the same mask first.
+   * See OPTIMIZE_MASK_REGISTER_REUSE.
+   */
+  void
+  reuseMaskRegisters();
+
+  /**
+   * Remove SMIS and SMIT instructions that set part of a register to the
+   * value it already holds on all paths to the instruction.
+   * See OPTIMIZE_REDUNDANT_MASKS.
+   */
+  void
+  removeRedundantMaskWrites();
+
+  /**
+   * Merge adjacent QWAIT instructions, and fold a QWAIT instruction into
+   * the bundle separator of the quantum bundle that follows it.
+   * See OPTIMIZE_WAITS.
+   */
+  void
+  coalesceWaits();
+
+  /**
+   * Pack the quantum operations of each timing point into as few quantum
+   * bundle instructions as possible.
+   * See OPTIMIZE_BUNDLE_PACKING.
+   */
+  void
+  packBundles();
+
+  /**
+   * Pack the quantum operations of the given quantum bundle instructions,
+   * which belong to the same timing point, into as few of them as possible.
+   *
+   * @param[in] addresses The addresses of the instructions, the first of
+   *                      which holds the bundle separator.
+   */
+  void
+  packTimingPoint(const std::vector<uint64_t>& addresses);
+
+  /**
+   * Remove the instructions that have been marked for removal, and adjust
+   * the branch offsets, labels and symbol fields to the new addresses.
+   */
+  void
+  removeInstructions();
+
+private: // -- variables
+
+  QISA_Driver& _driver;
+  const QISA_Target& _target;
+
+  // The instructions of the program.
+  std::vector<qisa_instruction_type>& _instructions;
+
+  // The instructions to be removed.
+  std::vector<bool> _removed;
+
+  QISA_ControlFlowGraph _cfg;
+
+  // Slots that are live at the end of each block, indexed by block.
+  std::vector<SlotBits> _liveOut;
+
+  // Number of SMIS and SMIT instructions used to set a whole register.
+  int _nrOfSMaskParts;
+  int _nrOfTMaskParts;
+
+  // Opcodes of the classic instructions, or -1 if not in use.
+  int _smisOpcode;
+  int _smitOpcode;
+  int _qwaitOpcode;
+};
+
+} // namespace QISA
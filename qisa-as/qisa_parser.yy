@@ -10,27 +10,39 @@
  // This code is put in the parser's header file.
 %code requires
 {
-  #include <memory>
   #include <vector>
+  #include <utility>
+
+  #include "qisa_symbol_table.h"
+  #include "qisa_small_vector.h"
+  #include "qisa_target.h"
 
   namespace QISA
   {
+    // A quantum instruction is passed around by value: it is only a few bytes.
     struct QInstruction
     {
-        enum QInstructionType {
+        enum QInstructionType : uint8_t {
           ARG_NONE,
           ARG_ST,
           ARG_TT
         };
 
-        QInstruction(uint64_t p_opcode)
+        QInstruction()
+          : type(ARG_NONE)
+          , opcode(0)
+          , reg_nr(0xff)
+          , is_conditional(false)
+        {}
+
+        QInstruction(uint8_t p_opcode)
           : type(ARG_NONE)
           , opcode(p_opcode)
           , reg_nr(0xff)
           , is_conditional(false)
         {}
 
-        QInstruction(uint64_t p_opcode,
+        QInstruction(uint8_t p_opcode,
                      uint8_t p_reg_nr,
                      bool p_is_conditional)
           : type(ARG_ST)
@@ -39,7 +51,7 @@
           , is_conditional(p_is_conditional)
         {}
 
-        QInstruction(uint64_t p_opcode,
+        QInstruction(uint8_t p_opcode,
                      uint8_t p_reg_nr)
           : type(ARG_TT)
           , opcode(p_opcode)
@@ -48,13 +60,17 @@
         {}
 
         QInstructionType type;
-        uint64_t opcode;
+        uint8_t opcode;
         uint8_t reg_nr;
         bool is_conditional;
     };
 
-    typedef std::shared_ptr<QInstruction> QInstructionPtr;
-    typedef std::vector<QInstructionPtr> BundledQInstructions;
+    // The quantum instructions of a bundle, and the qubits and target-control
+    // pairs of an s_mask and a t_mask respectively.
+    // These are short, so they are normally stored without allocating memory.
+    typedef QISA_SmallVector<QInstruction, 16> BundledQInstructions;
+    typedef QISA_SmallVector<QISA_Target::QubitAddress, 32> SMask;
+    typedef QISA_SmallVector<QISA_Target::TargetControlPair, 16> TMask;
 
     class QISA_Driver;
   }
@@ -105,7 +121,7 @@
 %token <uint8_t>     R_REGISTER
 %token <uint8_t>     S_REGISTER
 %token <uint8_t>     T_REGISTER
-%token <std::string> IDENTIFIER
+%token <QISA::QISA_Identifier> IDENTIFIER
 %token <int64_t>     INTEGER
 %token <std::string> STRING
 %token <std::string> JUNK      /* Unrecognized characters from FLEX. */
@@ -200,12 +216,12 @@
 %type <uint8_t>                                       s_reg
 %type <uint8_t>                                       t_reg
 %type <uint8_t>                                       cond
-%type <std::pair<uint8_t, uint8_t> >                  target_control_pair
-%type <std::vector<uint8_t> >                         one_or_more_qubit_addresses s_mask
-%type <std::vector<std::pair<uint8_t, uint8_t> > >    one_or_more_control_target_pairs t_mask
+%type <QISA::QISA_Target::TargetControlPair>          target_control_pair
+%type <QISA::SMask>                                   one_or_more_qubit_addresses s_mask
+%type <QISA::TMask>                                   one_or_more_control_target_pairs t_mask
 %type <uint8_t>                                       q_bs
 
-%type <QISA::QInstructionPtr>                         q_instr q_instr_arg_none q_instr_arg_one
+%type <QISA::QInstruction>                            q_instr q_instr_arg_none q_instr_arg_one
 %type <QISA::BundledQInstructions>                    one_or_more_q_instrs
 
 %%
@@ -475,8 +491,8 @@ one_or_more_qubit_addresses
     {
       if (driver.validate_qubit_address($1, @1))
       {
-        uint8_t number = $1;
-        $$ = std::vector<uint8_t>();
+        QISA::QISA_Target::QubitAddress number = $1;
+        $$ = QISA::SMask();
         $$.push_back(number);
       }
       else
@@ -488,10 +504,10 @@ one_or_more_qubit_addresses
     {
       if (driver.validate_qubit_address($3, @3))
       {
-        uint8_t number = $3;
-        std::vector<uint8_t> &args = $1;
+        QISA::QISA_Target::QubitAddress number = $3;
+        QISA::SMask &args = $1;
         args.push_back(number);
-        $$ = args;
+        $$ = std::move(args);
       }
       else
       {
@@ -517,11 +533,9 @@ s_mask
 target_control_pair
   : PAREN_OPEN INTEGER COMMA INTEGER PAREN_CLOSE
     {
-      auto tc_pair = std::make_pair($2, $4);
-
-      if (driver.validate_target_control_pair(tc_pair, @$))
+      if (driver.validate_target_control_pair($2, $4, @$))
       {
-        $$ = tc_pair;
+        $$ = QISA::QISA_Target::TargetControlPair($2, $4);
       }
       else
       {
@@ -533,16 +547,16 @@ target_control_pair
 one_or_more_control_target_pairs
   : target_control_pair
     {
-      std::pair<uint8_t,uint8_t> first_pair = $1;
-      $$ = std::vector<std::pair<uint8_t,uint8_t> >();
+      QISA::QISA_Target::TargetControlPair first_pair = $1;
+      $$ = QISA::TMask();
       $$.push_back(first_pair);
     }
   | one_or_more_control_target_pairs COMMA target_control_pair
     {
-      std::pair<uint8_t,uint8_t> next_pair = $3;
-      std::vector<std::pair<uint8_t,uint8_t> > &pairs = $1;
+      QISA::QISA_Target::TargetControlPair next_pair = $3;
+      QISA::TMask &pairs = $1;
       pairs.push_back(next_pair);
-      $$ = pairs;
+      $$ = std::move(pairs);
     }
   ;
 
@@ -564,13 +578,7 @@ t_mask
 q_instr_arg_none
   : IDENTIFIER
     {
-      QISA::QInstructionPtr
-      instr = driver.get_q_instr_arg_none($1, @1);
-      if (instr)
-      {
-        $$ = instr;
-      }
-      else
+      if (!driver.get_q_instr_arg_none($1.name, @1, $$))
       {
         YYERROR;
       }
@@ -579,26 +587,14 @@ q_instr_arg_none
 q_instr_arg_one
   : IDENTIFIER S_REGISTER
     {
-      QISA::QInstructionPtr
-      instr = driver.get_q_instr_arg_st($1, @1, $2, @2, false);
-      if (instr)
-      {
-        $$ = instr;
-      }
-      else
+      if (!driver.get_q_instr_arg_st($1.name, @1, $2, @2, false, $$))
       {
         YYERROR;
       }
     }
   |  COND_Q_INSTR_ST IDENTIFIER s_reg
      {
-       QISA::QInstructionPtr
-       instr = driver.get_q_instr_arg_st($2, @2, $3, @3, true);
-       if (instr)
-       {
-         $$ = instr;
-       }
-       else
+       if (!driver.get_q_instr_arg_st($2.name, @2, $3, @3, true, $$))
        {
          YYERROR;
        }
@@ -606,13 +602,7 @@ q_instr_arg_one
 
   | IDENTIFIER T_REGISTER
     {
-      QISA::QInstructionPtr
-      instr = driver.get_q_instr_arg_tt($1, @1, $2, @2);
-      if (instr)
-      {
-        $$ = instr;
-      }
-      else
+      if (!driver.get_q_instr_arg_tt($1.name, @1, $2, @2, $$))
       {
         YYERROR;
       }
@@ -622,13 +612,7 @@ q_instr_arg_one
     {
       /* The second identifier can either represent an s_register or a t_register.
          Let the driver decide. */
-      QISA::QInstructionPtr
-      instr = driver.get_q_instr_arg_one($1, @1, $2, @2);
-      if (instr)
-      {
-        $$ = instr;
-      }
-      else
+      if (!driver.get_q_instr_arg_one($1.name, @1, $2, @2, $$))
       {
         YYERROR;
       }
@@ -651,13 +635,12 @@ one_or_more_q_instrs
     {
       $$ = QISA::BundledQInstructions();
       $$.push_back($1);
-      QInstructionPtr inst = $1;
     }
   | one_or_more_q_instrs VBAR q_instr
     {
       QISA::BundledQInstructions &instrs = $1;
       instrs.push_back($3);
-      $$ = instrs;
+      $$ = std::move(instrs);
     }
     ;
 
@@ -0,0 +1,264 @@
+#include <algorithm>
+#include <cctype>
+#include <cstring>
+
+#include "qisa_program_template.h"
+
+namespace QISA
+{
+
+namespace
+{
+
+// Case-independent string comparison, as used for symbol names.
+bool
+equalsNoCase(const std::string& s1, const std::string& s2)
+{
+  if (s1.size() != s2.size())
+  {
+    return false;
+  }
+
+  for (size_t i = 0; i < s1.size(); i++)
+  {
+    if (tolower((unsigned char)s1[i]) != tolower((unsigned char)s2[i]))
+    {
+      return false;
+    }
+  }
+
+  return true;
+}
+
+} /* end anonymous namespace */
+
+
+QISA_ProgramTemplate::QISA_ProgramTemplate()
+{
+}
+
+void
+QISA_ProgramTemplate::initialize(const std::vector<qisa_instruction_type>& instructions,
+                                 const std::vector<std::string>& parameterNames,
+                                 const std::vector<int64_t>& defaultValues,
+                                 const std::vector<Field>& fields)
+{
+  _instructions = instructions;
+  _parameterNames = parameterNames;
+  _defaultValues = defaultValues;
+  _fields = fields;
+
+  _errorStream.str("");
+  _errorStream.clear();
+}
+
+const std::vector<std::string>&
+QISA_ProgramTemplate::getParameterNames() const
+{
+  return _parameterNames;
+}
+
+const std::vector<int64_t>&
+QISA_ProgramTemplate::getDefaultValues() const
+{
+  return _defaultValues;
+}
+
+const std::vector<QISA_ProgramTemplate::Field>&
+QISA_ProgramTemplate::getFields() const
+{
+  return _fields;
+}
+
+size_t
+QISA_ProgramTemplate::getNrOfInstructions() const
+{
+  return _instructions.size();
+}
+
+bool
+QISA_ProgramTemplate::instantiate(const std::vector<std::string>& parameterNames,
+                                  const std::vector<int64_t>& parameterValues,
+                                  std::vector<qisa_instruction_type>& instructions)
+{
+  if (parameterNames.size() != parameterValues.size())
+  {
+    _errorStream.str("");
+    _errorStream << "Number of parameter names (" << parameterNames.size()
+                 << ") differs from number of parameter values (" << parameterValues.size()
+                 << ")" << std::endl;
+    return false;
+  }
+
+  std::vector<const int64_t*> columns;
+  for (const int64_t& value : parameterValues)
+  {
+    columns.push_back(&value);
+  }
+
+  std::vector<qisa_instruction_type> result(_instructions.size());
+
+  if (!instantiateMany(1, parameterNames, columns, result.data()))
+  {
+    return false;
+  }
+
+  instructions.swap(result);
+  return true;
+}
+
+bool
+QISA_ProgramTemplate::instantiateMany(size_t nrOfPrograms,
+                                      const std::vector<std::string>& parameterNames,
+                                      const std::vector<const int64_t*>& parameterValues,
+                                      qisa_instruction_type* output)
+{
+  _errorStream.str("");
+  _errorStream.clear();
+
+  if (parameterNames.size() != parameterValues.size())
+  {
+    _errorStream << "Number of parameter names (" << parameterNames.size()
+                 << ") differs from number of parameter value arrays (" << parameterValues.size()
+                 << ")" << std::endl;
+    return false;
+  }
+
+  std::vector<size_t> parameterIndices;
+
+  if (!getParameterIndices(parameterNames, parameterIndices))
+  {
+    return false;
+  }
+
+  // For each parameter, the array that holds its values, or nullptr if
+  // it keeps its default value.
+  std::vector<const int64_t*> values(_parameterNames.size(), nullptr);
+
+  for (size_t i = 0; i < parameterIndices.size(); i++)
+  {
+    values[parameterIndices[i]] = parameterValues[i];
+  }
+
+  // Check all values first, so that the output is not touched in case of an error.
+  for (const Field& field : _fields)
+  {
+    const int64_t* fieldValues = values[field.parameterIndex];
+
+    if (fieldValues == nullptr)
+    {
+      continue;
+    }
+
+    for (size_t programIndex = 0; programIndex < nrOfPrograms; programIndex++)
+    {
+      if (!checkValue(field, fieldValues[programIndex], programIndex))
+      {
+        return false;
+      }
+    }
+  }
+
+  const size_t nrOfInstructions = _instructions.size();
+
+  for (size_t programIndex = 0; programIndex < nrOfPrograms; programIndex++)
+  {
+    qisa_instruction_type* program = output + programIndex * nrOfInstructions;
+
+    if (nrOfInstructions != 0)
+    {
+      std::memcpy(program, _instructions.data(), nrOfInstructions * sizeof(qisa_instruction_type));
+    }
+
+    for (const Field& field : _fields)
+    {
+      const int64_t* fieldValues = values[field.parameterIndex];
+
+      if (fieldValues == nullptr)
+      {
+        continue;
+      }
+
+      const int64_t value = fieldValues[programIndex];
+
+      program[field.address] = (program[field.address] & ~field.fieldMask)
+                               | ((qisa_instruction_type)(value >> field.valueShift) & field.fieldMask);
+    }
+  }
+
+  return true;
+}
+
+std::string
+QISA_ProgramTemplate::getLastErrorMessage()
+{
+  return _errorStream.str();
+}
+
+bool
+QISA_ProgramTemplate::getParameterIndices(const std::vector<std::string>& parameterNames,
+                                          std::vector<size_t>& parameterIndices)
+{
+  parameterIndices.clear();
+
+  for (const std::string& name : parameterNames)
+  {
+    auto findIt = std::find_if(_parameterNames.begin(), _parameterNames.end(),
+                               [&name](const std::string& parameterName)
+                               {
+                                 return equalsNoCase(name, parameterName);
+                               });
+
+    if (findIt == _parameterNames.end())
+    {
+      _errorStream << "Parameter '" << name << "' not found. Valid parameters: ";
+      for (size_t i = 0; i < _parameterNames.size(); i++)
+      {
+        _errorStream << (i ? ", " : "") << _parameterNames[i];
+      }
+      _errorStream << std::endl;
+      return false;
+    }
+
+    const size_t index = findIt - _parameterNames.begin();
+
+    if (std::find(parameterIndices.begin(), parameterIndices.end(), index) != parameterIndices.end())
+    {
+      _errorStream << "Parameter '" << name << "' is given more than once" << std::endl;
+      return false;
+    }
+
+    parameterIndices.push_back(index);
+  }
+
+  return true;
+}
+
+bool
+QISA_ProgramTemplate::checkValue(const Field& field, int64_t value, size_t programIndex)
+{
+  if ((value < field.minVal) || (value > field.maxVal))
+  {
+    _errorStream << "program " << programIndex << ": "
+                 << field.location << ": "
+                 << _parameterNames[field.parameterIndex]
+                 << " (" << value << ") too large, min="
+                 << field.minVal << ", max=" << field.maxVal << std::endl;
+    return false;
+  }
+
+  if ((value >= field.excludedMinVal) && (value <= field.excludedMaxVal))
+  {
+    _errorStream << "program " << programIndex << ": "
+                 << field.location << ": "
+                 << _parameterNames[field.parameterIndex]
+                 << " (" << value << ") would change the number of instructions generated by MOV, "
+                 << "values from " << field.excludedMinVal << " to " << field.excludedMaxVal
+                 << " are not allowed" << std::endl;
+    return false;
+  }
+
+  return true;
+}
+
+} /* end namespace QISA */
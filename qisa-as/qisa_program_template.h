@@ -0,0 +1,198 @@
+#pragma once
+
+#include <string>
+#include <vector>
+#include <cstdint>
+#include <cstddef>
+#include <sstream>
+
+#ifndef DllExport
+#ifdef _WIN32
+#define DllExport __declspec(dllexport)
+#else
+#define DllExport
+#endif
+#endif
+
+namespace QISA
+{
+
+/**
+ * This class implements a parametric program template.
+ *
+ * A template is created from an assembled program (see
+ * QISA_Driver::getProgramTemplate()). It records which bit fields of which
+ * instructions have been computed from the integer symbols that are defined
+ * using '.def_sym'. These symbols are the parameters of the template.
+ *
+ * Instantiating the template with other parameter values only patches these
+ * bit fields into a copy of the assembled program, without lexing or parsing
+ * the source code again. The same range checks are done as during assembly.
+ *
+ * Parameters can be used as immediate value of LDI, LDUI, QWAIT and MOV.
+ * Note that MOV is encoded using either a single LDI, or a LDI followed by
+ * a LDUI, depending on the value. A parameter used by MOV therefore only
+ * accepts values that are encoded in the same way as its default value.
+ *
+ * Parameter names are case insensitive, just like symbol names in the
+ * assembly source code.
+ */
+class QISA_ProgramTemplate
+{
+public:
+
+  // Currently, instructions are encoded in 32 bits.
+  typedef uint32_t qisa_instruction_type;
+
+  /**
+   * Describes a bit field of an instruction that depends on a parameter.
+   * The field is encoded as: ((value >> valueShift) & fieldMask).
+   */
+  struct Field
+  {
+    // Index of the parameter the field depends on.
+    size_t parameterIndex;
+
+    // Index of the instruction that holds the field.
+    size_t address;
+
+    // Shift (to the right) applied to the parameter value before encoding.
+    unsigned int valueShift;
+
+    // Mask that selects the bits of the field within the instruction.
+    qisa_instruction_type fieldMask;
+
+    // Valid range of the parameter value.
+    int64_t minVal;
+    int64_t maxVal;
+
+    // Range of parameter values that is not allowed, because it would
+    // change the number of generated instructions (MOV).
+    // Empty if excludedMinVal > excludedMaxVal.
+    int64_t excludedMinVal;
+    int64_t excludedMaxVal;
+
+    // Location at which the parameter is used, for error messages.
+    std::string location;
+  };
+
+  DllExport
+  QISA_ProgramTemplate();
+
+  DllExport virtual
+  ~QISA_ProgramTemplate()
+  {}
+
+  /**
+   * Initialize the template.
+   * This is done by QISA_Driver::getProgramTemplate().
+   *
+   * @param[in] instructions    The program, assembled using the default parameter values.
+   * @param[in] parameterNames  The names of the parameters.
+   * @param[in] defaultValues   The default value of each parameter.
+   * @param[in] fields          The fields that depend on the parameters.
+   */
+  DllExport void
+  initialize(const std::vector<qisa_instruction_type>& instructions,
+             const std::vector<std::string>& parameterNames,
+             const std::vector<int64_t>& defaultValues,
+             const std::vector<Field>& fields);
+
+  /** @return The names of the parameters, in the order of their first use. */
+  DllExport const std::vector<std::string>&
+  getParameterNames() const;
+
+  /** @return The default values of the parameters, as defined in the source code. */
+  DllExport const std::vector<int64_t>&
+  getDefaultValues() const;
+
+  /** @return The fields that depend on the parameters. */
+  DllExport const std::vector<Field>&
+  getFields() const;
+
+  /** @return The number of instructions of each instantiated program. */
+  DllExport size_t
+  getNrOfInstructions() const;
+
+  /**
+   * Instantiate the template.
+   *
+   * @param[in]  parameterNames  Names of the parameters to set. Parameters that
+   *                             are not given keep their default value.
+   * @param[in]  parameterValues Values of these parameters.
+   * @param[out] instructions    Receives the instantiated program.
+   *
+   * @return True on success, false on failure.
+   */
+  DllExport bool
+  instantiate(const std::vector<std::string>& parameterNames,
+              const std::vector<int64_t>& parameterValues,
+              std::vector<qisa_instruction_type>& instructions);
+
+  /**
+   * Instantiate the template for a number of parameter sets at once.
+   *
+   * @param[in]  nrOfPrograms    Number of programs to instantiate.
+   * @param[in]  parameterNames  Names of the parameters to set. Parameters that
+   *                             are not given keep their default value.
+   * @param[in]  parameterValues For each of these parameters, an array of
+   *                             'nrOfPrograms' values.
+   * @param[out] output          Receives the instantiated programs, one after the other.
+   *                             Must have room for nrOfPrograms * getNrOfInstructions()
+   *                             instructions.
+   *
+   * @return True on success, false on failure.
+   */
+  DllExport bool
+  instantiateMany(size_t nrOfPrograms,
+                  const std::vector<std::string>& parameterNames,
+                  const std::vector<const int64_t*>& parameterValues,
+                  qisa_instruction_type* output);
+
+  /**
+   * @return The last generated error message.
+   */
+  DllExport std::string
+  getLastErrorMessage();
+
+private:
+
+  /**
+   * Find the parameter indices of the given parameter names.
+   *
+   * @param[in]  parameterNames   Names of the parameters.
+   * @param[out] parameterIndices Receives the index of each parameter.
+   *
+   * @return True on success, false if a parameter does not exist or is given twice.
+   */
+  bool
+  getParameterIndices(const std::vector<std::string>& parameterNames,
+                      std::vector<size_t>& parameterIndices);
+
+  /**
+   * Check the given value against the valid range of the given field.
+   *
+   * @param[in] field        The field.
+   * @param[in] value        The parameter value.
+   * @param[in] programIndex Index of the program that is instantiated, used in error messages.
+   *
+   * @return True if the value is valid, false otherwise.
+   */
+  bool
+  checkValue(const Field& field, int64_t value, size_t programIndex);
+
+  // The program, assembled using the default parameter values.
+  std::vector<qisa_instruction_type> _instructions;
+
+  // Names and default values of the parameters.
+  std::vector<std::string> _parameterNames;
+  std::vector<int64_t> _defaultValues;
+
+  // Fields that depend on the parameters.
+  std::vector<Field> _fields;
+
+  // Used to redirect error messages to.
+  std::ostringstream _errorStream;
+};
+
+} /* end namespace QISA */
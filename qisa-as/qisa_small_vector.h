@@ -0,0 +1,105 @@
+#pragma once
+
+#include <vector>
+#include <cstddef>
+
+namespace QISA
+{
+
+/**
+ * Sequence of values that are stored inside the object itself, as long as
+ * there are at most InlineCapacity of them. Only longer sequences are moved
+ * to the heap.
+ *
+ * It is used for the semantic values of the parser, such as the quantum
+ * instructions in a bundle and the qubits in a mask, which are nearly always
+ * short, so that parsing them does not allocate memory.
+ *
+ * Like a std::vector, the values are stored contiguously.
+ */
+template<typename ValueType, size_t InlineCapacity>
+class QISA_SmallVector
+{
+public:
+
+  typedef const ValueType* const_iterator;
+
+  QISA_SmallVector()
+    : _size(0)
+  {
+  }
+
+  void
+  push_back(const ValueType& value)
+  {
+    if (_size < InlineCapacity)
+    {
+      _inline[_size] = value;
+    }
+    else
+    {
+      if (_size == InlineCapacity)
+      {
+        _heap.assign(_inline, _inline + InlineCapacity);
+      }
+
+      _heap.push_back(value);
+    }
+
+    _size++;
+  }
+
+  void
+  clear()
+  {
+    _heap.clear();
+    _size = 0;
+  }
+
+  size_t
+  size() const
+  {
+    return _size;
+  }
+
+  bool
+  empty() const
+  {
+    return _size == 0;
+  }
+
+  const ValueType*
+  data() const
+  {
+    return (_size <= InlineCapacity) ? _inline : _heap.data();
+  }
+
+  const ValueType&
+  operator[](size_t index) const
+  {
+    return data()[index];
+  }
+
+  const_iterator
+  begin() const
+  {
+    return data();
+  }
+
+  const_iterator
+  end() const
+  {
+    return data() + _size;
+  }
+
+private:
+
+  ValueType _inline[InlineCapacity];
+
+  // Holds all values, once there are more than InlineCapacity of them.
+  std::vector<ValueType> _heap;
+
+  size_t _size;
+};
+
+} // namespace QISA
@@ -0,0 +1,66 @@
+#include <cctype>
+
+#include "qisa_symbol_table.h"
+
+namespace QISA
+{
+
+namespace
+{
+
+// Case-fold the given identifier into the given string.
+void
+foldCase(const char* name, size_t length, std::string& foldedName)
+{
+  foldedName.assign(name, length);
+
+  for (auto& c : foldedName)
+  {
+    c = tolower((unsigned char)c);
+  }
+}
+
+} // namespace
+
+QISA_SymbolTable::SymbolId
+QISA_SymbolTable::intern(const char* name, size_t length)
+{
+  foldCase(name, length, _foldedName);
+
+  // Look up the identifier first: emplace() would allocate a new node each time.
+  auto findIt = _ids.find(_foldedName);
+
+  if (findIt != _ids.end())
+  {
+    return findIt->second;
+  }
+
+  const SymbolId id = static_cast<SymbolId>(_ids.size());
+  _ids.emplace(_foldedName, id);
+  return id;
+}
+
+bool
+QISA_SymbolTable::find(const std::string& name, SymbolId& id) const
+{
+  std::string foldedName;
+  foldCase(name.data(), name.size(), foldedName);
+
+  auto findIt = _ids.find(foldedName);
+
+  if (findIt == _ids.end())
+  {
+    return false;
+  }
+
+  id = findIt->second;
+  return true;
+}
+
+void
+QISA_SymbolTable::clear()
+{
+  _ids.clear();
+}
+
+} // namespace QISA
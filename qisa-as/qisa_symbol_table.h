@@ -0,0 +1,212 @@
+#pragma once
+
+#include <string>
+#include <vector>
+#include <unordered_map>
+#include <cstddef>
+#include <cstdint>
+
+namespace QISA
+{
+
+/**
+ * Identifier as returned by the scanner: its spelling in the source code,
+ * and the id under which it has been interned in a QISA_SymbolTable.
+ */
+struct QISA_Identifier
+{
+  std::string name;
+  uint32_t id;
+};
+
+/**
+ * Case-insensitive table of interned identifiers.
+ *
+ * Each identifier is case-folded and looked up in a hash table only once,
+ * when it is scanned. From then on, it is referred to by its id, so that
+ * labels, register aliases and symbols can be stored in vectors that are
+ * indexed by that id (see QISA_SymbolMap).
+ */
+class QISA_SymbolTable
+{
+public:
+
+  typedef uint32_t SymbolId;
+
+  /**
+   * Intern the given identifier.
+   *
+   * @param[in] name   Start of the identifier.
+   * @param[in] length Length of the identifier, in characters.
+   *
+   * @return The id of the identifier. Identifiers that only differ in case
+   *         get the same id. Ids are assigned consecutively, starting at 0.
+   */
+  SymbolId
+  intern(const char* name, size_t length);
+
+  /**
+   * Find the id of an identifier that has been interned before.
+   *
+   * @param[in]  name Identifier to find.
+   * @param[out] id   Receives the id of the identifier, if found.
+   *
+   * @return True if the identifier has been interned, false otherwise.
+   */
+  bool
+  find(const std::string& name, SymbolId& id) const;
+
+  /** @return The number of interned identifiers. */
+  size_t
+  size() const
+  {
+    return _ids.size();
+  }
+
+  /**
+   * Forget all interned identifiers.
+   */
+  void
+  clear();
+
+private:
+
+  // Case-folded identifier to its id.
+  std::unordered_map<std::string, SymbolId> _ids;
+
+  // Used to case-fold identifiers, without allocating memory for each of them.
+  std::string _foldedName;
+};
+
+/**
+ * Values keyed by the id of an interned identifier, such as the addresses
+ * of labels.
+ *
+ * As with a std::map with case-insensitive keys, redefining an identifier
+ * replaces its value, but keeps the name under which it has been defined
+ * first.
+ */
+template<typename ValueType>
+class QISA_SymbolMap
+{
+public:
+
+  struct Entry
+  {
+    // True if the identifier has been defined.
+    bool defined;
+
+    // Spelling of the identifier when it was defined first.
+    std::string name;
+
+    ValueType value;
+  };
+
+  QISA_SymbolMap()
+    : _nrOfDefinedEntries(0)
+  {
+  }
+
+  /**
+   * @param[in] id Id of the identifier to find.
+   *
+   * @return The entry of the given identifier, or nullptr if it has not been defined.
+   */
+  const Entry*
+  find(QISA_SymbolTable::SymbolId id) const
+  {
+    if ((id < _entries.size()) && _entries[id].defined)
+    {
+      return &_entries[id];
+    }
+
+    return nullptr;
+  }
+
+  /**
+   * Define or redefine the value of an identifier.
+   *
+   * @param[in] id    Id of the identifier.
+   * @param[in] name  Spelling of the identifier.
+   * @param[in] value Value of the identifier.
+   */
+  void
+  define(QISA_SymbolTable::SymbolId id, const std::string& name, const ValueType& value)
+  {
+    if (id >= _entries.size())
+    {
+      _entries.resize(id + 1);
+    }
+
+    Entry& entry = _entries[id];
+
+    if (!entry.defined)
+    {
+      entry.defined = true;
+      entry.name = name;
+      _nrOfDefinedEntries++;
+    }
+
+    entry.value = value;
+  }
+
+  /** @return The number of defined identifiers. */
+  size_t
+  size() const
+  {
+    return _nrOfDefinedEntries;
+  }
+
+  /**
+   * Call the given function for the value of each defined identifier.
+   * The function may change the value.
+   *
+   * @param[in] function Function that takes a 'ValueType&'.
+   */
+  template <typename Function>
+  void
+  forEachValue(Function function)
+  {
+    for (Entry& entry : _entries)
+    {
+      if (entry.defined)
+      {
+        function(entry.value);
+      }
+    }
+  }
+
+  /**
+   * Call the given function for each defined identifier.
+   *
+   * @param[in] function Function that takes a 'const Entry&'.
+   */
+  template <typename Function>
+  void
+  forEachEntry(Function function) const
+  {
+    for (const Entry& entry : _entries)
+    {
+      if (entry.defined)
+      {
+        function(entry);
+      }
+    }
+  }
+
+  void
+  clear()
+  {
+    _entries.clear();
+    _nrOfDefinedEntries = 0;
+  }
+
+private:
+
+  // Indexed by the id of the identifier.
+  std::vector<Entry> _entries;
+
+  size_t _nrOfDefinedEntries;
+};
+
+} // namespace QISA
@@ -0,0 +1,704 @@
+#include <fstream>
+#include <sstream>
+#include <iomanip>
+#include <iostream>
+#include <cstring>
+#include <algorithm>
+#include <limits>
+
+#include "qisa_target.h"
+#include "qisa_driver.h"
+
+#include "qisa_opcode_defs.inc"
+
+namespace QISA
+{
+
+namespace
+{
+
+std::string
+getHex(uint64_t val, int nDigits)
+{
+  std::ostringstream ss;
+  ss << "0x" << std::hex << std::setfill('0') << std::setw(nDigits) << val;
+  return ss.str();
+}
+
+// Identifies serialized targets, see QISA_Target::serialize().
+const char SERIALIZED_TARGET_MAGIC[] = "QTGT";
+
+// Version of the binary form of serialized targets.
+// Increment this when the binary form changes.
+const uint32_t SERIALIZED_TARGET_FORMAT_VERSION = 2;
+
+// The values in serialized targets are stored in little-endian byte order.
+
+void
+putUint16(std::string& data, uint16_t value)
+{
+  data.push_back((char)(value & 0xff));
+  data.push_back((char)(value >> 8));
+}
+
+void
+putUint32(std::string& data, uint32_t value)
+{
+  for (int i = 0; i < 4; i++)
+  {
+    data.push_back((char)((value >> (8 * i)) & 0xff));
+  }
+}
+
+void
+putString(std::string& data, const std::string& value)
+{
+  putUint32(data, (uint32_t)value.size());
+  data.append(value);
+}
+
+void
+putOpcodeMap(std::string& data, const QISA_Target::q_map_t& opcodeMap)
+{
+  putUint32(data, (uint32_t)opcodeMap.size());
+
+  for (const auto& entry : opcodeMap)
+  {
+    putString(data, entry.first);
+    putUint32(data, (uint32_t)entry.second);
+  }
+}
+
+// The get functions below read a value at the given position, and advance
+// the position past it. They return false if the data ends before the value.
+
+bool
+getUint16(const std::string& data, size_t& pos, uint16_t& value)
+{
+  if (data.size() - pos < 2)
+  {
+    return false;
+  }
+
+  value = (uint16_t)((uint8_t)data[pos] | ((uint8_t)data[pos + 1] << 8));
+  pos += 2;
+  return true;
+}
+
+bool
+getUint32(const std::string& data, size_t& pos, uint32_t& value)
+{
+  if (data.size() - pos < 4)
+  {
+    return false;
+  }
+
+  value = 0;
+  for (int i = 0; i < 4; i++)
+  {
+    value |= (uint32_t)(uint8_t)data[pos++] << (8 * i);
+  }
+  return true;
+}
+
+bool
+getString(const std::string& data, size_t& pos, std::string& value)
+{
+  uint32_t size;
+
+  if (!getUint32(data, pos, size) || (data.size() - pos < size))
+  {
+    return false;
+  }
+
+  value.assign(data, pos, size);
+  pos += size;
+  return true;
+}
+
+bool
+getOpcodeMap(const std::string& data, size_t& pos, QISA_Target::q_map_t& opcodeMap)
+{
+  uint32_t size;
+
+  if (!getUint32(data, pos, size))
+  {
+    return false;
+  }
+
+  opcodeMap.clear();
+
+  for (uint32_t i = 0; i < size; i++)
+  {
+    std::string name;
+    uint32_t opcode;
+
+    if (!getString(data, pos, name) || !getUint32(data, pos, opcode))
+    {
+      return false;
+    }
+
+    opcodeMap[name] = (int)opcode;
+  }
+
+  return true;
+}
+
+} // namespace
+
+QISA_Target::QISA_Target()
+    : _totalNrOfQubits(0)
+    , _max_bs_val(0)
+    , _maxQuantumOpcodeVal(NR_OF_QUANTUM_OPCODES - 1) // 8 bits for the quantum instruction opcode.
+{
+  // Bring in the opcodes that have been defined for the qisa instructions.
+  setOpcodes();
+  buildDecodeTables();
+
+  // Number of registers per kind of register.
+  _nrOfRegisters[QISA_Driver::Q_REGISTER] = 7;
+  _nrOfRegisters[QISA_Driver::R_REGISTER] = 32;
+  _nrOfRegisters[QISA_Driver::S_REGISTER] = 32;
+  _nrOfRegisters[QISA_Driver::T_REGISTER] = 64;
+
+  _registerName[QISA_Driver::Q_REGISTER] = 'Q';
+  _registerName[QISA_Driver::R_REGISTER] = 'R';
+  _registerName[QISA_Driver::S_REGISTER] = 'S';
+  _registerName[QISA_Driver::T_REGISTER] = 'T';
+
+  _totalNrOfQubits = 0;
+
+  // Maximum value to specify as bundle separator.
+  // The width of this field is currently 3 bits, so the maximum value is set to 7.
+  _max_bs_val = 7;
+
+  // Name the branch conditions.
+  _branchConditionNames[QISA_Driver::COND_ALWAYS] = "ALWAYS";
+  _branchConditionNames[QISA_Driver::COND_NEVER ] = "NEVER";
+  _branchConditionNames[QISA_Driver::COND_EQ    ] = "EQ";
+  _branchConditionNames[QISA_Driver::COND_NE    ] = "NE";
+  _branchConditionNames[QISA_Driver::COND_LTZ   ] = "LTZ";
+  _branchConditionNames[QISA_Driver::COND_GEZ   ] = "GEZ";
+  _branchConditionNames[QISA_Driver::COND_LTU   ] = "LTU";
+  _branchConditionNames[QISA_Driver::COND_GEU   ] = "GEU";
+  _branchConditionNames[QISA_Driver::COND_LEU   ] = "LEU";
+  _branchConditionNames[QISA_Driver::COND_GTU   ] = "GTU";
+  _branchConditionNames[QISA_Driver::COND_LT    ] = "LT";
+  _branchConditionNames[QISA_Driver::COND_GE    ] = "GE";
+  _branchConditionNames[QISA_Driver::COND_LE    ] = "LE";
+  _branchConditionNames[QISA_Driver::COND_GT    ] = "GT";
+
+  // Branch condition aliases.
+  // Maps the alias name to the 'real' condition.
+  _branchConditionAliases["NOTCARRY"] = 0x8;
+  _branchConditionAliases["CARRY"]    = 0x9;
+  _branchConditionAliases["EQZ"]      = 0xa;
+  _branchConditionAliases["NEZ"]      = 0xb;
+
+  // The qubits and the edges between them are only known once the quantum
+  // layout information has been read, see setLayout().
+
+  updateFingerprint();
+}
+
+std::shared_ptr<const QISA_Target>
+QISA_Target::getDefault()
+{
+  static const std::shared_ptr<const QISA_Target> defaultTarget = std::make_shared<const QISA_Target>();
+
+  return defaultTarget;
+}
+
+void
+QISA_Target::getQuantumInstructions(q_map_t& arg_none_map,
+                                    q_map_t& arg_st_map,
+                                    q_map_t& arg_tt_map) const
+{
+  arg_none_map = _q_inst_arg_none_opcodes;
+  arg_st_map = _q_inst_arg_st_opcodes;
+  arg_tt_map = _q_inst_arg_tt_opcodes;
+}
+
+const QISA_Target::q_map_t&
+QISA_Target::getClassicOpcodes() const
+{
+  return _opcodes;
+}
+
+const std::map<uint8_t, std::string>&
+QISA_Target::getBranchConditionNames() const
+{
+  return _branchConditionNames;
+}
+
+int
+QISA_Target::getNrOfQubits() const
+{
+  return _totalNrOfQubits;
+}
+
+int
+QISA_Target::getNrOfEdges() const
+{
+  return _maskEngine.getNrOfEdges();
+}
+
+const std::string&
+QISA_Target::getFingerprint() const
+{
+  return _fingerprint;
+}
+
+std::string
+QISA_Target::serialize() const
+{
+  std::string data(SERIALIZED_TARGET_MAGIC, 4);
+
+  putUint32(data, SERIALIZED_TARGET_FORMAT_VERSION);
+  putString(data, QISA_Driver::getVersion());
+
+  putOpcodeMap(data, _opcodes);
+  putOpcodeMap(data, _q_inst_arg_none_opcodes);
+  putOpcodeMap(data, _q_inst_arg_st_opcodes);
+  putOpcodeMap(data, _q_inst_arg_tt_opcodes);
+
+  // The tables and the mask encoding are derived from the layout again when
+  // deserializing, so only the layout itself is stored.
+  putUint32(data, (uint32_t)_totalNrOfQubits);
+
+  putUint32(data, (uint32_t)_maskEngine.getNrOfEdges());
+  for (const TargetControlPair& tcPair : _maskEngine.getEdges())
+  {
+    putUint16(data, tcPair.first);
+    putUint16(data, tcPair.second);
+  }
+
+  return data;
+}
+
+std::shared_ptr<const QISA_Target>
+QISA_Target::deserialize(const std::string& data,
+                         std::string& errorMessage)
+{
+  size_t pos = 4;
+  uint32_t formatVersion;
+
+  if ((data.compare(0, 4, SERIALIZED_TARGET_MAGIC) != 0) ||
+      !getUint32(data, pos, formatVersion))
+  {
+    errorMessage = "The data does not hold a serialized target.";
+    return nullptr;
+  }
+
+  std::string version;
+
+  if ((formatVersion != SERIALIZED_TARGET_FORMAT_VERSION) ||
+      !getString(data, pos, version) ||
+      (version != QISA_Driver::getVersion()))
+  {
+    errorMessage = "The target has been serialized by another version of QISA-AS"
+                   " than the current one (" + QISA_Driver::getVersion() + ").";
+    return nullptr;
+  }
+
+  std::shared_ptr<QISA_Target> target = std::make_shared<QISA_Target>();
+
+  q_map_t arg_none_map;
+  q_map_t arg_st_map;
+  q_map_t arg_tt_map;
+  uint32_t totalNrOfQubits;
+  uint32_t nrOfEdges;
+
+  bool success = getOpcodeMap(data, pos, target->_opcodes) &&
+                 getOpcodeMap(data, pos, arg_none_map) &&
+                 getOpcodeMap(data, pos, arg_st_map) &&
+                 getOpcodeMap(data, pos, arg_tt_map) &&
+                 getUint32(data, pos, totalNrOfQubits) &&
+                 getUint32(data, pos, nrOfEdges) &&
+                 (totalNrOfQubits <= (uint32_t)std::numeric_limits<QubitAddress>::max() + 1) &&
+                 // Each edge takes 4 bytes.
+                 (nrOfEdges <= (data.size() - pos) / 4);
+
+  std::vector<TargetControlPair> edges;
+
+  if (success)
+  {
+    edges.resize(nrOfEdges);
+  }
+
+  for (uint32_t i = 0; success && (i < nrOfEdges); i++)
+  {
+    success = getUint16(data, pos, edges[i].first) &&
+              getUint16(data, pos, edges[i].second) &&
+              (edges[i].first < totalNrOfQubits) &&
+              (edges[i].second < totalNrOfQubits);
+  }
+
+  if (!success || (pos != data.size()))
+  {
+    errorMessage = "The serialized target is truncated or corrupt.";
+    return nullptr;
+  }
+
+  target->_classicOpcode2instName.clear();
+  for (const auto& it : target->_opcodes)
+  {
+    target->_classicOpcode2instName[it.second] = it.first;
+  }
+
+  // This also rebuilds the tables that are derived from the opcodes.
+  std::ostringstream errorStream;
+  if (!target->loadQuantumInstructions(arg_none_map, arg_st_map, arg_tt_map, errorStream))
+  {
+    errorMessage = errorStream.str();
+    return nullptr;
+  }
+
+  // This also updates the fingerprint.
+  target->setLayout((int)totalNrOfQubits, edges);
+
+  return target;
+}
+
+void
+QISA_Target::buildDecodeTables()
+{
+  // Maps the name of a classic instruction to its operand format.
+  static const std::map<std::string, ClassicInstructionFormat> classicFormats =
+  {
+    { "NOP",    CLASSIC_FORMAT_NONE     },
+    { "STOP",   CLASSIC_FORMAT_NONE     },
+    { "ADD",    CLASSIC_FORMAT_RD_RS_RT },
+    { "ADDC",   CLASSIC_FORMAT_RD_RS_RT },
+    { "SUB",    CLASSIC_FORMAT_RD_RS_RT },
+    { "SUBC",   CLASSIC_FORMAT_RD_RS_RT },
+    { "AND",    CLASSIC_FORMAT_RD_RS_RT },
+    { "OR",     CLASSIC_FORMAT_RD_RS_RT },
+    { "XOR",    CLASSIC_FORMAT_RD_RS_RT },
+    { "NOT",    CLASSIC_FORMAT_RD_RT    },
+    { "CMP",    CLASSIC_FORMAT_RS_RT    },
+    { "BR",     CLASSIC_FORMAT_BR       },
+    { "LDI",    CLASSIC_FORMAT_LDI      },
+    { "LDUI",   CLASSIC_FORMAT_LDUI     },
+    { "FBR",    CLASSIC_FORMAT_FBR      },
+    { "FMR",    CLASSIC_FORMAT_FMR      },
+    { "SMIS",   CLASSIC_FORMAT_SMIS     },
+    { "SMIT",   CLASSIC_FORMAT_SMIT     },
+    { "QWAIT",  CLASSIC_FORMAT_QWAIT    },
+    { "QWAITR", CLASSIC_FORMAT_QWAITR   }
+  };
+
+  _classicDecodeTable.assign(NR_OF_CLASSIC_OPCODES, ClassicDecodeEntry{CLASSIC_FORMAT_UNKNOWN, ""});
+
+  for (const auto& it : _classicOpcode2instName)
+  {
+    ClassicDecodeEntry& entry = _classicDecodeTable[it.first & (NR_OF_CLASSIC_OPCODES - 1)];
+
+    auto formatIt = classicFormats.find(it.second);
+
+    entry.format = (formatIt != classicFormats.end()) ? formatIt->second : CLASSIC_FORMAT_UNSUPPORTED;
+    entry.name = it.second;
+  }
+
+  _quantumDecodeTable.assign(NR_OF_QUANTUM_OPCODES, QuantumDecodeEntry{QUANTUM_FORMAT_UNKNOWN, ""});
+
+  for (const auto& it : _quantumOpcode2instName)
+  {
+    QuantumDecodeEntry& entry = _quantumDecodeTable[it.first & (NR_OF_QUANTUM_OPCODES - 1)];
+
+    if (_q_inst_arg_st_opcodes.find(it.second) != _q_inst_arg_st_opcodes.end())
+    {
+      entry.format = QUANTUM_FORMAT_ST;
+    }
+    else if (_q_inst_arg_tt_opcodes.find(it.second) != _q_inst_arg_tt_opcodes.end())
+    {
+      entry.format = QUANTUM_FORMAT_TT;
+    }
+    else
+    {
+      // If it is neither an st nor a tt instruction, it must be one without an argument.
+      entry.format = QUANTUM_FORMAT_NONE;
+    }
+
+    entry.name = it.second;
+  }
+
+  // The opcode maps are given in the order of QISA_Driver::QISA_InstructionKind.
+  const q_map_t* const opcodeMaps[QISA_InstructionIndex::NR_OF_INSTRUCTION_KINDS] =
+  {
+    &_opcodes,
+    &_q_inst_arg_none_opcodes,
+    &_q_inst_arg_st_opcodes,
+    &_q_inst_arg_tt_opcodes
+  };
+
+  _instructionIndex.build(opcodeMaps);
+}
+
+void
+QISA_Target::setLayout(int nrOfQubits,
+                       const std::vector<TargetControlPair>& edges)
+{
+  _totalNrOfQubits = nrOfQubits;
+
+  _maskEngine.build(nrOfQubits, edges);
+
+  // Each qubit has a Q register to hold its measurement result, as far as
+  // these can be addressed.
+  _nrOfRegisters[QISA_Driver::Q_REGISTER] = std::min(nrOfQubits, (int)MAX_NR_OF_Q_REGISTERS);
+
+  updateFingerprint();
+}
+
+bool
+QISA_Target::checkQuantumInstructionMap(const std::string& mapName,
+                                        const q_map_t& inputMap,
+                                        std::map<std::string, std::string>& checkInstructionMap,
+                                        std::map<int, std::string>& checkOpcodeMap,
+                                        q_map_t& outputMap,
+                                        std::ostream& errorStream)
+{
+  auto itCheckOpc = checkOpcodeMap.begin();
+  auto itCheckInstr = checkInstructionMap.begin();
+
+  for(auto it : inputMap)
+  {
+    // First, check that the given opcode is within range.
+    if (it.second < 0)
+    {
+      errorStream << "Negative opcode not allowed: "
+                  << mapName << "['" << it.first << "'] = "
+                  << it.second;
+      return false;
+    }
+    else if (it.second > _maxQuantumOpcodeVal)
+    {
+      errorStream << "Opcode value too high (max=" << _maxQuantumOpcodeVal
+                  << mapName << "['" << it.first << "'] = (" << it.second << "/"
+                  << getHex(it.second, 2)
+                  << ")";
+      return false;
+    }
+
+    // Now check if the opcode has been used in another map.
+    itCheckOpc = checkOpcodeMap.find(it.second);
+    if (itCheckOpc != checkOpcodeMap.end())
+    {
+      errorStream << "Opcode (" << it.second << "/"
+                  << getHex(it.second, 2)
+                  << ") specified for "
+                  << mapName << "['" << it.first
+                  << "'] is already used in " <<
+                   itCheckOpc->second << std::endl;
+      return false;
+    }
+
+    // The opcode seems OK.
+    // Put the combination into checkOpcodeMap so that it can be
+    // checked against for other instructions.
+    checkOpcodeMap[it.second] = mapName + "['" + it.first + "']";
+
+    // Make the instruction name uppercase.
+    // https://stackoverflow.com/a/17793588
+    std::string instructionName = it.first;
+    for (auto & c: instructionName) c = toupper((unsigned char)c);
+
+
+    // Check if the instruction name is already used in another map.
+    itCheckInstr = checkInstructionMap.find(instructionName);
+    if (itCheckInstr != checkInstructionMap.end())
+    {
+      errorStream << "Instruction "
+                  << mapName << "['" << instructionName
+                  << "'] is already used in"
+                  << itCheckInstr->second << std::endl;
+      return false;
+    }
+
+    // The instruction name seems OK.
+    // Put the combination into checkInstructionMap so that it can be
+    // checked against for other instructions.
+    checkInstructionMap[instructionName] = mapName + "['" + instructionName + "']";
+
+
+    // Put the validated result in outputMap.
+    outputMap[instructionName] = it.second;
+  }
+
+  return true;
+}
+
+bool
+QISA_Target::loadQuantumInstructions(const q_map_t& arg_none_map,
+                                     const q_map_t& arg_st_map,
+                                     const q_map_t& arg_tt_map,
+                                     std::ostream& errorStream)
+{
+  // Will hold the validated results.
+  q_map_t q_inst_arg_none_opcodes;
+  q_map_t q_inst_arg_st_opcodes;
+  q_map_t q_inst_arg_tt_opcodes;
+
+
+  // Do not assume that the given maps are OK.
+
+  // This map will be used to ensure that there are no
+  // duplicate opcodes between the given maps.
+  std::map<int, std::string> checkOpcodeMap;
+
+  // This map will be used to ensure that there are no
+  // duplicate instruction names between the given maps.
+  std::map<std::string, std::string> checkInstructionMap;
+
+  bool result = checkQuantumInstructionMap("arg_none_map",
+                                           arg_none_map,
+                                           checkInstructionMap,
+                                           checkOpcodeMap,
+                                           q_inst_arg_none_opcodes,
+                                           errorStream);
+
+
+  // Check if  opcode '0' is present in 'arg_none_map'.
+
+  // This instruction is used as filler when only one double format
+  // instruction has been specified on an assembly instruction.
+  bool foundOpcodeZero = false;
+  for (auto it : q_inst_arg_none_opcodes)
+  {
+    if (it.second == 0)
+    {
+      foundOpcodeZero = true;
+      break;
+    }
+  }
+
+  if (!foundOpcodeZero)
+  {
+    errorStream << "The Quantum instruction for opcode 0 is missing." << std::endl;
+    errorStream << "It is mandatory for correct operation of QISA-AS."  << std::endl;
+    errorStream << "Specify this in parameter 'arg_none_map'."  << std::endl;
+    return false;
+  }
+
+  if (result == false)
+  {
+    // An error message already has been left.
+    return false;
+  }
+
+  result = checkQuantumInstructionMap("arg_st_map",
+                                      arg_st_map,
+                                      checkInstructionMap,
+                                      checkOpcodeMap,
+                                      q_inst_arg_st_opcodes,
+                                      errorStream);
+  if (result == false)
+  {
+    // An error message already has been left.
+    return false;
+  }
+
+  result = checkQuantumInstructionMap("arg_tt_map",
+                                      arg_tt_map,
+                                      checkInstructionMap,
+                                      checkOpcodeMap,
+                                      q_inst_arg_tt_opcodes,
+                                      errorStream);
+  if (result == false)
+  {
+    // An error message already has been left.
+    return false;
+  }
+
+  // Everything seems fine.
+  // Now update the appropriate member maps.
+  _q_inst_arg_none_opcodes.swap(q_inst_arg_none_opcodes);
+  _q_inst_arg_st_opcodes.swap(q_inst_arg_st_opcodes);
+  _q_inst_arg_tt_opcodes.swap(q_inst_arg_tt_opcodes);
+
+
+  // For disassembly purposes, we also need the reverse map,
+  // which maps an opcode to an instruction name.
+  // Process all maps in sequence.
+  _quantumOpcode2instName.clear();
+
+  for (auto it : _q_inst_arg_none_opcodes)
+  {
+    _quantumOpcode2instName[it.second] = it.first;
+  }
+
+  for (auto it : _q_inst_arg_st_opcodes)
+  {
+    _quantumOpcode2instName[it.second] = it.first;
+  }
+
+  for (auto it : _q_inst_arg_tt_opcodes)
+  {
+    _quantumOpcode2instName[it.second] = it.first;
+  }
+
+  buildDecodeTables();
+  updateFingerprint();
+
+  return true;
+}
+
+void
+QISA_Target::updateFingerprint()
+{
+  std::ostringstream ss;
+
+  ss << "version " << QISA_Driver::getVersion() << "\n";
+  ss << "encoding " << ENCODING_REVISION << "\n";
+
+  ss << "registers";
+  for (int i = 0; i < 4; i++)
+  {
+    ss << " " << _nrOfRegisters[i];
+  }
+  ss << "\n";
+
+  ss << "max_bs " << _max_bs_val << "\n";
+
+  ss << "opcodes\n";
+  for (const auto& entry : _opcodes)
+  {
+    ss << entry.first << " " << entry.second << "\n";
+  }
+
+  ss << "q_arg_none\n";
+  for (const auto& entry : _q_inst_arg_none_opcodes)
+  {
+    ss << entry.first << " " << entry.second << "\n";
+  }
+
+  ss << "q_arg_st\n";
+  for (const auto& entry : _q_inst_arg_st_opcodes)
+  {
+    ss << entry.first << " " << entry.second << "\n";
+  }
+
+  ss << "q_arg_tt\n";
+  for (const auto& entry : _q_inst_arg_tt_opcodes)
+  {
+    ss << entry.first << " " << entry.second << "\n";
+  }
+
+  ss << "qubits " << _totalNrOfQubits << "\n";
+
+  if (_totalNrOfQubits != 0)
+  {
+    ss << "edges " << _maskEngine.getNrOfEdges() << "\n";
+    ss << "pos " << _maskEngine.getNrOfSMaskParts() << " " << _maskEngine.getNrOfTMaskParts() << "\n";
+  }
+
+  const std::vector<TargetControlPair>& edges = _maskEngine.getEdges();
+  for (size_t i = 0; i < edges.size(); i++)
+  {
+    ss << "edge " << edges[i].first << " " << edges[i].second << " " << i << "\n";
+  }
+
+  _fingerprint = ss.str();
+}
+
+} // namespace QISA
@@ -0,0 +1,358 @@
+#pragma once
+
+#include <string>
+#include <vector>
+#include <map>
+#include <memory>
+#include <ostream>
+#include <cstdint>
+
+#include "qisa_instruction_index.h"
+#include "qisa_mask_engine.h"
+
+#ifndef DllExport
+#ifdef _WIN32
+#define DllExport __declspec(dllexport)
+#else
+#define DllExport
+#endif
+#endif
+
+namespace QISA
+{
+
+/**
+ * This class holds the configuration of the assembler for a particular
+ * processor: the opcodes of the classic and quantum instructions, and the
+ * quantum layout information (number of qubits and the edges between them).
+ * It also holds the tables that are derived from these, which are used to
+ * look up instruction names and to decode instructions.
+ *
+ * A target does not change once it has been set up, so a single target can
+ * be shared by any number of drivers, also in different threads. A driver
+ * refers to its target by a shared pointer. Changing the configuration of a
+ * driver (using QISA_Driver::read() or QISA_Driver::loadQuantumInstructions())
+ * gives that driver a modified copy of its target, without affecting the
+ * other drivers that share the original one.
+ *
+ * A target can be serialized into a compact binary form, e.g. to pass it to
+ * another process, which can then use it without reading the quantum layout
+ * information and quantum instructions from file again.
+ */
+class QISA_Target
+{
+public: // -- types
+
+  // Defines the type of the address (number) of a qubit.
+  typedef QISA_MaskEngine::QubitAddress QubitAddress;
+
+  // Defines the type of a target-control pair.
+  typedef QISA_MaskEngine::TargetControlPair TargetControlPair;
+
+  //! Defines the type used to store mappings between an instruction name and its opcode.
+  typedef std::map<std::string, int> q_map_t;
+
+  // Operand format of a classic instruction.
+  // Determines which fields are extracted from the instruction word during
+  // disassembly, and how they are printed.
+  enum ClassicInstructionFormat
+  {
+    CLASSIC_FORMAT_UNKNOWN,   // Opcode not in use.
+    CLASSIC_FORMAT_NONE,      // INST
+    CLASSIC_FORMAT_RD_RS_RT,  // INST rd, rs, rt
+    CLASSIC_FORMAT_RD_RT,     // INST rd, rt
+    CLASSIC_FORMAT_RS_RT,     // INST rs, rt
+    CLASSIC_FORMAT_BR,        // INST cond, addr
+    CLASSIC_FORMAT_LDI,       // INST rd, imm
+    CLASSIC_FORMAT_LDUI,      // INST rd, u_imm
+    CLASSIC_FORMAT_FBR,       // INST cond, rd
+    CLASSIC_FORMAT_FMR,       // INST rd, qs
+    CLASSIC_FORMAT_SMIS,      // INST sd, s_mask
+    CLASSIC_FORMAT_SMIT,      // INST td, t_mask
+    CLASSIC_FORMAT_QWAIT,     // INST u_imm
+    CLASSIC_FORMAT_QWAITR,    // INST rs
+    CLASSIC_FORMAT_UNSUPPORTED
+  };
+
+  // Entry of the classic instruction dispatch table, indexed by opcode.
+  struct ClassicDecodeEntry
+  {
+    ClassicInstructionFormat format;
+    std::string name;
+  };
+
+  // Operand format of a quantum instruction.
+  enum QuantumInstructionFormat
+  {
+    QUANTUM_FORMAT_UNKNOWN,   // Opcode not in use.
+    QUANTUM_FORMAT_NONE,      // INST
+    QUANTUM_FORMAT_ST,        // [C,]INST sd
+    QUANTUM_FORMAT_TT         // INST td
+  };
+
+  // Entry of the quantum instruction dispatch table, indexed by opcode.
+  struct QuantumDecodeEntry
+  {
+    QuantumInstructionFormat format;
+    std::string name;
+  };
+
+public: // -- constants
+
+  // Number of possible opcodes of the classic and quantum instructions.
+  // These are the sizes of the dispatch tables.
+  enum OpcodeRanges
+  {
+    NR_OF_CLASSIC_OPCODES = 0x40,  // 6 bits
+    NR_OF_QUANTUM_OPCODES = 0x100  // 8 bits
+  };
+
+  // Maximum number of Q registers, which hold the measurement results of the
+  // qubits. The qs field of FMR is 3 bits wide.
+  enum { MAX_NR_OF_Q_REGISTERS = 8 };
+
+  // Revision of the encoding of the instructions. It is part of the
+  // fingerprint, so that programs that have been cached by an assembler that
+  // encodes them differently are not reused. Increment it whenever the
+  // encoding of an instruction changes.
+  // Revision 2: an s_mask is written by as many SMIS instructions as the
+  // layout needs, each holding the position of its part.
+  enum { ENCODING_REVISION = 2 };
+
+public:
+
+  /**
+   * Create a target that holds the factory default instruction
+   * specifications, without quantum layout information.
+   */
+  DllExport QISA_Target();
+
+  /**
+   * @return The target that is used by a newly created driver.
+   *         It is created only once, and shared by all drivers that do not
+   *         change their configuration.
+   */
+  DllExport static std::shared_ptr<const QISA_Target>
+  getDefault();
+
+  /**
+   * Retrieve the quantum instructions of this target.
+   *
+   * @param[out] arg_none_map Instruction code map for quantum
+   *                          instructions without parameters.
+   * @param[out] arg_st_map Instruction code map for quantum
+   *                        instructions with an s-register parameter.
+   * @param[out] arg_tt_map Instruction code map for quantum
+   *                        instructions with a t-register parameter.
+   */
+  DllExport void
+  getQuantumInstructions(q_map_t& arg_none_map,
+                         q_map_t& arg_st_map,
+                         q_map_t& arg_tt_map) const;
+
+  /**
+   * @return The opcodes of the classic instructions, keyed by instruction name.
+   */
+  DllExport const q_map_t&
+  getClassicOpcodes() const;
+
+  /**
+   * @return The names of the branch conditions, keyed by their encoding.
+   */
+  DllExport const std::map<uint8_t, std::string>&
+  getBranchConditionNames() const;
+
+  /**
+   * @return The total number of addressable qubits, or 0 if no quantum
+   *         layout information has been read.
+   */
+  DllExport int
+  getNrOfQubits() const;
+
+  /**
+   * @return The number of edges (valid target-control pairs) between the
+   *         qubits, or 0 if no quantum layout information has been read.
+   */
+  DllExport int
+  getNrOfEdges() const;
+
+  /**
+   * @return A description of everything in this target that determines the
+   *         result of an assembly, including the assembler version and the
+   *         encoding revision.
+   *         Used to compute cache keys.
+   */
+  DllExport const std::string&
+  getFingerprint() const;
+
+  /**
+   * Serialize this target into a compact binary form.
+   *
+   * @return The serialized target, which can be turned into a target again
+   *         using deserialize().
+   */
+  DllExport std::string
+  serialize() const;
+
+  /**
+   * Create a target from the binary form that has been created by serialize().
+   * This is only possible in the same version of the assembler.
+   *
+   * @param[in]  data         The serialized target.
+   * @param[out] errorMessage Receives a description of the error, in case of failure.
+   *
+   * @return The target, or nullptr if the data is not a valid serialized target.
+   */
+  DllExport static std::shared_ptr<const QISA_Target>
+  deserialize(const std::string& data,
+              std::string& errorMessage);
+
+private: // -- functions
+
+  // The driver sets up targets using the functions below, and reads their
+  // configuration directly while assembling and disassembling. The
+  // optimizer and the timing analysis read it to decode the instructions.
+  friend class QISA_Driver;
+  friend class QISA_Optimizer;
+  friend class QISA_TimingAnalysis;
+
+  /**
+   * Used to set the opcodes of the classic instructions.
+   * The code for this is defined in an automatically generated file.
+   */
+  void
+  setOpcodes();
+
+  /**
+   * (Re)build the dispatch tables that are used for disassembly, and the
+   * instruction name index that is used for assembly, from the classic and
+   * quantum opcode maps.
+   * This must be done each time these maps are changed.
+   */
+  void
+  buildDecodeTables();
+
+  /**
+   * Set the quantum layout information, and derive the tables and the mask
+   * encoding from it.
+   *
+   * @param[in] nrOfQubits Total number of addressable qubits.
+   * @param[in] edges      Valid target-control pairs, indexed by their bit
+   *                       number in a t_mask. The qubits must be less than
+   *                       nrOfQubits.
+   */
+  void
+  setLayout(int nrOfQubits,
+            const std::vector<TargetControlPair>& edges);
+
+  /**
+   * Replace the quantum instructions by the ones that have been specified in the given maps.
+   *
+   * @param[in]  arg_none_map Instruction code map for quantum
+   *                          instructions without parameters.
+   * @param[in]  arg_st_map   Instruction code map for quantum
+   *                          instructions with an s-register parameter.
+   * @param[in]  arg_tt_map   Instruction code map for quantum
+   *                          instructions with a t-register parameter.
+   * @param[out] errorStream  Receives a description of the errors, if any.
+   *
+   * @return True if the instructions were accepted, false if they
+   *         contain errors, such as duplicate opcodes. In that case,
+   *         this target is not changed.
+   */
+  bool
+  loadQuantumInstructions(const q_map_t& arg_none_map,
+                          const q_map_t& arg_st_map,
+                          const q_map_t& arg_tt_map,
+                          std::ostream& errorStream);
+
+  /**
+   * Check the given map for out of range opcodes, duplicate opcodes and duplicate instruction names.
+   *
+   * @param[in]     mapName             Name of the map, used in error messages.
+   * @param[in]     inputMap            Map to check.
+   * @param[in,out] checkInstructionMap Instruction names that have been used in the maps checked before.
+   * @param[in,out] checkOpcodeMap      Opcodes that have been used in the maps checked before.
+   * @param[out]    outputMap           Receives the checked map, with uppercase instruction names.
+   * @param[out]    errorStream         Receives a description of the errors, if any.
+   *
+   * @return True if the map is OK, false if not.
+   */
+  bool
+  checkQuantumInstructionMap(const std::string& mapName,
+                             const q_map_t& inputMap,
+                             std::map<std::string, std::string>& checkInstructionMap,
+                             std::map<int, std::string>& checkOpcodeMap,
+                             q_map_t& outputMap,
+                             std::ostream& errorStream);
+
+  /**
+   * Compute the fingerprint of this target, see getFingerprint().
+   * This must be done each time the configuration is changed.
+   */
+  void
+  updateFingerprint();
+
+private: // -- variables
+
+  // Total number of registers available in processor, per kind of register.
+  int _nrOfRegisters[4];
+
+  // 'Name' of a register, per kind of register
+  char _registerName[4];
+
+  // Total number of addressable qubits in the processor.
+  int _totalNrOfQubits;
+
+  // Maximum value to specify as bundle separator.
+  // This is the number of quantum cycles (20 ns) between quantum instruction bundles.
+  int _max_bs_val;
+
+  // Edges of the processor and the tables to validate, encode and decode
+  // the s_masks and t_masks of SMIS and SMIT instructions.
+  QISA_MaskEngine _maskEngine;
+
+  // Opcodes for the instructions.
+  // They are defined elsewhere.
+  std::map<std::string, int> _opcodes;
+
+  // Reverse lookup of the _opcodes map, for the classic instructions.
+  std::map<int, std::string> _classicOpcode2instName;
+
+  int _maxQuantumOpcodeVal;
+
+  // Contains the opcodes for the quantum instructions that do not have an argument.
+  q_map_t _q_inst_arg_none_opcodes;
+
+  // Contains the opcodes for the quantum instructions specifying an st argument.
+  q_map_t _q_inst_arg_st_opcodes;
+
+  // Contains the opcodes for the quantum instructions specifying a tt argument.
+  q_map_t _q_inst_arg_tt_opcodes;
+
+  // Reverse lookup of the combination of above quantum opcode maps, used
+  // for disassembling the quantum instructions.
+  std::map<int, std::string> _quantumOpcode2instName;
+
+  // Dispatch tables used for disassembly, indexed by the opcode of a classic
+  // and a quantum instruction respectively.
+  // They are built from the above maps, see buildDecodeTables().
+  std::vector<ClassicDecodeEntry> _classicDecodeTable;
+  std::vector<QuantumDecodeEntry> _quantumDecodeTable;
+
+  // Index of the names of the classic and quantum instructions, used for assembly.
+  // It is built from the above maps as well, see buildDecodeTables().
+  QISA_InstructionIndex _instructionIndex;
+
+  // Names of the known branch conditions.
+  // Used for pretty printing.
+  std::map<uint8_t, std::string> _branchConditionNames;
+
+  // Names of the condition aliases that will be translated into the primitive versions.
+  std::map<std::string, uint8_t> _branchConditionAliases;
+
+  // See getFingerprint().
+  std::string _fingerprint;
+};
+
+} // namespace QISA
@@ -0,0 +1,343 @@
+#include <algorithm>
+#include <limits>
+
+#include "qisa_timing_analysis.h"
+#include "qisa_driver.h"
+
+namespace QISA
+{
+
+QISA_TimingAnalysis::QISA_TimingAnalysis()
+  : _summary()
+  , _instructionsPerCycle(1)
+{
+}
+
+const std::vector<QISA_TimingAnalysis::Block>&
+QISA_TimingAnalysis::getBlocks() const
+{
+  return _blocks;
+}
+
+const std::vector<QISA_TimingAnalysis::Bottleneck>&
+QISA_TimingAnalysis::getBottlenecks() const
+{
+  return _bottlenecks;
+}
+
+const QISA_TimingAnalysis::Summary&
+QISA_TimingAnalysis::getSummary() const
+{
+  return _summary;
+}
+
+unsigned int
+QISA_TimingAnalysis::getInstructionsPerCycle() const
+{
+  return _instructionsPerCycle;
+}
+
+void
+QISA_TimingAnalysis::checkIssueRate(uint64_t address, uint64_t nrOfInstructions, uint64_t cycles)
+{
+  if (nrOfInstructions > cycles * _instructionsPerCycle)
+  {
+    _bottlenecks.push_back({address, nrOfInstructions, cycles});
+  }
+}
+
+void
+QISA_TimingAnalysis::analyze(QISA_Driver& driver, unsigned int instructionsPerCycle)
+{
+  typedef QISA_Driver::qisa_instruction_type qisa_instruction_type;
+
+  _blocks.clear();
+  _bottlenecks.clear();
+  _summary = Summary();
+  _instructionsPerCycle = instructionsPerCycle;
+
+  // The instructions of an assembled program are held by the driver, those
+  // of a disassembled program may be read from a memory-mapped file.
+  const bool isAssembled = (driver._lastDriverAction == QISA_Driver::DRIVER_ACTION_PARSE);
+  const uint64_t nrOfInstructions = isAssembled ? driver._instructions.size()
+                                                : driver.getNrOfDisassembledInstructions();
+
+  auto getInstruction = [&driver, isAssembled](uint64_t address)
+  {
+    return isAssembled ? driver._instructions[address] : driver.getDisassemblyWord(address);
+  };
+
+  // Build the control flow graph, and collect the names of the labels.
+  std::vector<QISA_ControlFlowGraph::ControlTransfer> transfers;
+  QISA_ControlFlowGraph::ControlTransfer transfer;
+
+  for (uint64_t address = 0; address < nrOfInstructions; address++)
+  {
+    if (driver.getControlTransfer(getInstruction(address), address, transfer))
+    {
+      transfers.push_back(transfer);
+    }
+  }
+
+  std::vector<std::pair<uint64_t, std::string> > labels;
+
+  if (isAssembled)
+  {
+    driver._labels.forEachEntry([&labels](const QISA_SymbolMap<uint64_t>::Entry& entry)
+    {
+      labels.emplace_back(entry.value, entry.name);
+    });
+
+    // Of multiple labels at the same address, the first one defined is used.
+    std::stable_sort(labels.begin(), labels.end(),
+                     [](const std::pair<uint64_t, std::string>& a, const std::pair<uint64_t, std::string>& b)
+                     { return a.first < b.first; });
+  }
+  else
+  {
+    // The labels of a disassembled program are its branch destinations.
+    for (size_t i = 0; i < driver._disassemblyLabelAddresses.size(); i++)
+    {
+      labels.emplace_back(driver._disassemblyLabelAddresses[i], driver.getDisassemblyLabelName(i));
+    }
+  }
+
+  std::vector<uint64_t> leaders;
+  for (const auto& label : labels)
+  {
+    leaders.push_back(label.first);
+  }
+
+  QISA_ControlFlowGraph cfg;
+  cfg.build(nrOfInstructions, transfers, std::move(leaders));
+
+  const std::vector<QISA_ControlFlowGraph::BasicBlock>& cfgBlocks = cfg.getBlocks();
+  const size_t nrOfBlocks = cfgBlocks.size();
+
+  // For the issue rate checks across blocks: per block, the number of
+  // instructions up to and including its first timing point (or all of
+  // them, if it has none), the cycles leading up to that timing point, and
+  // the number of instructions after its last timing point.
+  std::vector<uint64_t> headInstructions(nrOfBlocks, 0);
+  std::vector<uint64_t> headCycles(nrOfBlocks, 0);
+  std::vector<uint64_t> headAddress(nrOfBlocks, 0);
+  std::vector<bool> isHeadCycleKnown(nrOfBlocks, false);
+  std::vector<uint64_t> tailInstructions(nrOfBlocks, 0);
+
+  const std::vector<QISA_Target::ClassicDecodeEntry>& classicDecodeTable = driver._target->_classicDecodeTable;
+
+  _blocks.resize(nrOfBlocks);
+  auto nextLabel = labels.begin();
+
+  for (size_t b = 0; b < nrOfBlocks; b++)
+  {
+    Block& block = _blocks[b];
+    block.begin = cfgBlocks[b].begin;
+    block.end = cfgBlocks[b].end;
+    block.nrOfClassicInstructions = 0;
+    block.nrOfBundles = 0;
+    block.nrOfTimingPoints = 0;
+    block.cycles = 0;
+    block.hasRegisterWait = false;
+    block.isReachable = false;
+    block.minStartCycles = 0;
+    block.maxStartCycles = 0;
+    block.successors = cfgBlocks[b].successors;
+    std::sort(block.successors.begin(), block.successors.end());
+
+    while ((nextLabel != labels.end()) && (nextLabel->first < block.begin))
+    {
+      ++nextLabel;
+    }
+    if ((nextLabel != labels.end()) && (nextLabel->first == block.begin))
+    {
+      block.label = nextLabel->second;
+    }
+
+    // Number of instructions since the last timing point, including the current one.
+    uint64_t nrOfPendingInstructions = 0;
+
+    for (uint64_t address = block.begin; address < block.end; address++)
+    {
+      const qisa_instruction_type inst = getInstruction(address);
+
+      nrOfPendingInstructions++;
+
+      bool isTimingPoint = false;
+      bool isCycleKnown = true;
+      uint64_t cycles = 0;
+
+      if (inst & (1U << QISA_Driver::DBL_INST_FORMAT_BIT_OFFSET))
+      {
+        block.nrOfBundles++;
+        cycles = inst & QISA_Driver::BS_MASK;
+        isTimingPoint = (cycles != 0);
+      }
+      else
+      {
+        block.nrOfClassicInstructions++;
+
+        switch (classicDecodeTable[(inst >> QISA_Driver::OPCODE_OFFSET) & QISA_Driver::OPCODE_MASK].format)
+        {
+          case QISA_Target::CLASSIC_FORMAT_QWAIT:
+            cycles = inst & QISA_Driver::U_IMM20_MASK;
+            isTimingPoint = (cycles != 0);
+            break;
+
+          case QISA_Target::CLASSIC_FORMAT_QWAITR:
+            block.hasRegisterWait = true;
+            isTimingPoint = true;
+            isCycleKnown = false;
+            break;
+
+          default:
+            break;
+        }
+      }
+
+      block.cycles += cycles;
+
+      if (!isTimingPoint)
+      {
+        continue;
+      }
+
+      if (block.nrOfTimingPoints == 0)
+      {
+        headInstructions[b] = nrOfPendingInstructions;
+        headCycles[b] = cycles;
+        headAddress[b] = address;
+        isHeadCycleKnown[b] = isCycleKnown;
+      }
+      else if (isCycleKnown)
+      {
+        checkIssueRate(address, nrOfPendingInstructions, cycles);
+      }
+
+      block.nrOfTimingPoints++;
+      nrOfPendingInstructions = 0;
+    }
+
+    if (block.nrOfTimingPoints == 0)
+    {
+      headInstructions[b] = nrOfPendingInstructions;
+    }
+    tailInstructions[b] = nrOfPendingInstructions;
+
+    _summary.nrOfClassicInstructions += block.nrOfClassicInstructions;
+    _summary.nrOfBundles += block.nrOfBundles;
+    _summary.nrOfTimingPoints += block.nrOfTimingPoints;
+    _summary.cycles += block.cycles;
+    _summary.hasRegisterWaits = _summary.hasRegisterWaits || block.hasRegisterWait;
+  }
+
+  _summary.nrOfInstructions = nrOfInstructions;
+  _summary.nrOfBlocks = nrOfBlocks;
+
+  if (nrOfBlocks == 0)
+  {
+    return;
+  }
+
+  // Visit the blocks in reverse postorder, so that the start time of each
+  // block is known once all of its predecessors have been visited, except
+  // for those that branch back to it.
+  const std::vector<size_t> order = cfg.getReversePostOrder();
+
+  const size_t NOT_REACHED = std::numeric_limits<size_t>::max();
+  std::vector<size_t> orderIndex(nrOfBlocks, NOT_REACHED);
+  for (size_t i = 0; i < order.size(); i++)
+  {
+    orderIndex[order[i]] = i;
+  }
+
+  // The number of instructions after the last timing point at the end of
+  // each block, or -1 if it is not known. For a block without timing points,
+  // this depends on its predecessors: only those that precede it in reverse
+  // postorder are taken into account.
+  std::vector<int64_t> exitInstructions(nrOfBlocks, -1);
+
+  bool isFirstEnd = true;
+
+  _blocks[0].isReachable = true;
+
+  for (size_t i = 0; i < order.size(); i++)
+  {
+    const size_t b = order[i];
+    Block& block = _blocks[b];
+
+    int64_t entryInstructions = -1;
+    for (size_t predecessor : cfgBlocks[b].predecessors)
+    {
+      if (orderIndex[predecessor] == NOT_REACHED)
+      {
+        continue;
+      }
+
+      if (_blocks[predecessor].nrOfTimingPoints != 0)
+      {
+        entryInstructions = std::max(entryInstructions, (int64_t)tailInstructions[predecessor]);
+      }
+      else if (orderIndex[predecessor] < i)
+      {
+        entryInstructions = std::max(entryInstructions, exitInstructions[predecessor]);
+      }
+    }
+
+    if (block.nrOfTimingPoints != 0)
+    {
+      if ((entryInstructions >= 0) && isHeadCycleKnown[b])
+      {
+        checkIssueRate(headAddress[b], entryInstructions + headInstructions[b], headCycles[b]);
+      }
+      exitInstructions[b] = tailInstructions[b];
+    }
+    else if (entryInstructions >= 0)
+    {
+      exitInstructions[b] = entryInstructions + headInstructions[b];
+    }
+
+    // Propagate the start times along the edges that do not branch back.
+    bool isEnd = true;
+    for (size_t successor : block.successors)
+    {
+      if (orderIndex[successor] <= i)
+      {
+        _summary.nrOfLoops++;
+        continue;
+      }
+
+      isEnd = false;
+      Block& next = _blocks[successor];
+      const uint64_t minCycles = block.minStartCycles + block.cycles;
+      const uint64_t maxCycles = block.maxStartCycles + block.cycles;
+
+      if (!next.isReachable)
+      {
+        next.isReachable = true;
+        next.minStartCycles = minCycles;
+        next.maxStartCycles = maxCycles;
+      }
+      else
+      {
+        next.minStartCycles = std::min(next.minStartCycles, minCycles);
+        next.maxStartCycles = std::max(next.maxStartCycles, maxCycles);
+      }
+    }
+
+    if (isEnd)
+    {
+      const uint64_t minCycles = block.minStartCycles + block.cycles;
+      const uint64_t maxCycles = block.maxStartCycles + block.cycles;
+
+      _summary.minCycles = isFirstEnd ? minCycles : std::min(_summary.minCycles, minCycles);
+      _summary.maxCycles = isFirstEnd ? maxCycles : std::max(_summary.maxCycles, maxCycles);
+      isFirstEnd = false;
+    }
+  }
+
+  std::sort(_bottlenecks.begin(), _bottlenecks.end(),
+            [](const Bottleneck& a, const Bottleneck& b) { return a.address < b.address; });
+}
+
+} /* end namespace QISA */
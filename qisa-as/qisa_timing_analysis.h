@@ -0,0 +1,183 @@
+#pragma once
+
+#include <string>
+#include <vector>
+#include <cstddef>
+#include <cstdint>
+
+#ifndef DllExport
+#ifdef _WIN32
+#define DllExport __declspec(dllexport)
+#else
+#define DllExport
+#endif
+#endif
+
+namespace QISA
+{
+
+class QISA_Driver;
+
+/**
+ * This class holds the static control flow and timing analysis of a
+ * program, see QISA_Driver::analyzeTiming().
+ *
+ * The program is divided into basic blocks, which start at the program
+ * entry, at each label (or branch destination, for a disassembled program)
+ * and after each BR and STOP instruction.
+ *
+ * Time is counted in quantum cycles: each QWAIT instruction adds its
+ * immediate value, and each quantum bundle adds its bundle separator. A
+ * QWAITR instruction waits for a time that is not known statically; it is
+ * counted as 0 cycles, and the block that holds it is marked.
+ *
+ * A timing point is a quantum bundle with a non-zero bundle separator, or a
+ * QWAIT instruction with a non-zero wait (or a QWAITR instruction). All
+ * instructions between two timing points, including the bundles of the
+ * first timing point that follow its first instruction, must be issued
+ * before the second timing point is due. A timing point for which more
+ * instructions must be issued than the controller can issue in the cycles
+ * that lead up to it is reported as a bottleneck. This is also checked
+ * across blocks, for each path into a block.
+ *
+ * The paths through the program are analyzed without repeating loops: the
+ * start time of a block is determined along the paths from the program
+ * entry that do not take a branch back to an earlier block. The minimum and
+ * maximum duration of the program are those of such paths, up to a block
+ * that ends the program or only branches back.
+ *
+ * The time needed for the analysis is linear in the size of the program.
+ */
+class QISA_TimingAnalysis
+{
+public:
+
+  // Currently, instructions are encoded in 32 bits.
+  typedef uint32_t qisa_instruction_type;
+
+  struct Block
+  {
+    // Address of the first instruction of the block, and of the instruction
+    // after its last instruction.
+    uint64_t begin;
+    uint64_t end;
+
+    // Name of a label at the start of the block, or empty if there is none.
+    std::string label;
+
+    // Number of classic instructions (including QWAIT, BR and STOP) and
+    // quantum bundle instructions of the block.
+    uint64_t nrOfClassicInstructions;
+    uint64_t nrOfBundles;
+
+    // Number of timing points in the block.
+    uint64_t nrOfTimingPoints;
+
+    // Number of quantum cycles that the block takes.
+    uint64_t cycles;
+
+    // True if the block holds a QWAITR instruction, whose wait is not included in 'cycles'.
+    bool hasRegisterWait;
+
+    // True if the block can be reached from the program entry.
+    bool isReachable;
+
+    // Minimum and maximum number of cycles from the program entry to the
+    // start of the block, along the paths that do not repeat a loop.
+    uint64_t minStartCycles;
+    uint64_t maxStartCycles;
+
+    // Indices of the blocks to which control may flow from the end of this
+    // block, in increasing order.
+    std::vector<size_t> successors;
+  };
+
+  // A timing point that may not be reached in time.
+  struct Bottleneck
+  {
+    // Address of the instruction that starts the timing point.
+    uint64_t address;
+
+    // Number of instructions to issue since the previous timing point, up
+    // to and including the instruction at 'address'.
+    uint64_t nrOfInstructions;
+
+    // Number of cycles since the previous timing point.
+    uint64_t cycles;
+  };
+
+  struct Summary
+  {
+    uint64_t nrOfInstructions;
+    uint64_t nrOfClassicInstructions;
+    uint64_t nrOfBundles;
+    uint64_t nrOfTimingPoints;
+    uint64_t nrOfBlocks;
+
+    // Number of branches back to an earlier block (or the same block) along
+    // the paths from the program entry.
+    uint64_t nrOfLoops;
+
+    // Sum of the cycles of all blocks.
+    uint64_t cycles;
+
+    // Minimum and maximum number of cycles of the paths through the program
+    // that do not repeat a loop.
+    uint64_t minCycles;
+    uint64_t maxCycles;
+
+    // True if the program holds a QWAITR instruction.
+    bool hasRegisterWaits;
+  };
+
+  DllExport
+  QISA_TimingAnalysis();
+
+  DllExport virtual
+  ~QISA_TimingAnalysis()
+  {}
+
+  /** @return The basic blocks, sorted by address. Block 0 is the entry of the program. */
+  DllExport const std::vector<Block>&
+  getBlocks() const;
+
+  /** @return The timing points that may not be reached in time, sorted by address. */
+  DllExport const std::vector<Bottleneck>&
+  getBottlenecks() const;
+
+  /** @return The totals of the program. */
+  DllExport const Summary&
+  getSummary() const;
+
+  /** @return The number of instructions issued per cycle that has been assumed. */
+  DllExport unsigned int
+  getInstructionsPerCycle() const;
+
+private:
+
+  friend class QISA_Driver;
+
+  /**
+   * Analyze the last assembled or disassembled program of the given driver.
+   * This is done by QISA_Driver::analyzeTiming().
+   *
+   * @param[in] driver               The driver.
+   * @param[in] instructionsPerCycle Number of instructions issued per cycle.
+   */
+  void
+  analyze(QISA_Driver& driver, unsigned int instructionsPerCycle);
+
+  /**
+   * Record a bottleneck if more than the given number of instructions must
+   * be issued in the given number of cycles.
+   */
+  void
+  checkIssueRate(uint64_t address, uint64_t nrOfInstructions, uint64_t cycles);
+
+  std::vector<Block> _blocks;
+  std::vector<Bottleneck> _bottlenecks;
+  Summary _summary;
+  unsigned int _instructionsPerCycle;
+};
+
+} /* end namespace QISA */
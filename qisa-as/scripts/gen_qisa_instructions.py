@@ -64,7 +64,7 @@ try:
         print('/*' + ('*' * 76) + '*/\n\n', file=fd)
         print('namespace QISA {\n', file=fd)
         print('void', file=fd)
-        print('QISA_Driver::setOpcodes()', file=fd)
+        print('QISA_Target::setOpcodes()', file=fd)
         print('{', file=fd)
 
         print('', file=fd)
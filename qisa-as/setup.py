@@ -217,7 +217,8 @@ os.makedirs(my_package_dir, exist_ok=True)
 
 # Create the __init__.py file that imports the required classes.
 with open(os.path.join(my_package_dir, '__init__.py'), 'w') as init_file:
-  print('from .pyQisaAs import QISA_Driver, qisa_qmap', file=init_file)
+  print('from .pyQisaAs import QISA_Driver, qisa_qmap, QISA_AssemblyCache, QISA_ProgramTemplate, QISA_TimingAnalysis, QISA_Target, assemble_many, AssemblyResult', file=init_file)
+  print('from .qisa_decoder import decode_instructions', file=init_file)
 
 # Make sure that we are running from 'this' directory, otherwise
 # 'setup()' cannot find the 'build' directory.
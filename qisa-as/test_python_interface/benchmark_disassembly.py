@@ -0,0 +1,74 @@
+# This benchmark measures the disassembly throughput of QISA-AS.
+#
+# It assembles a test program, repeats the generated instructions until the
+# binary has the requested size, and then disassembles the result a number
+# of times, reporting the throughput in MB/s and in instructions per second.
+
+import argparse
+import os
+import tempfile
+import time
+
+from qisa_as import QISA_Driver
+
+rootDir = os.path.dirname(os.path.realpath(__file__))
+
+inputFilename = os.path.join(rootDir, 'qisa_test_assembly/test_assembly.qisa')
+layoutFilename = os.path.join(rootDir, 'quantum_layout_information.txt')
+
+parser = argparse.ArgumentParser(description='Measure the disassembly throughput of QISA-AS.')
+parser.add_argument('--size-mb', type=float, default=4.0,
+                    help='size of the binary to disassemble, in MB (default: %(default)s)')
+parser.add_argument('--repeat', type=int, default=3,
+                    help='number of times to disassemble the binary (default: %(default)s)')
+parser.add_argument('--input', default=inputFilename,
+                    help='assembly program used to generate the binary (default: %(default)s)')
+args = parser.parse_args()
+
+print ("QISA_AS Version: ", QISA_Driver.getVersion())
+
+driver = QISA_Driver()
+driver.read(layoutFilename)
+
+if not driver.assemble(args.input):
+    print ("Assembly terminated with errors:")
+    print (driver.getLastErrorMessage())
+    exit(1)
+
+program = driver.getInstructionsAsBytes()
+
+# Branch offsets are relative, so a repeated program stays valid.
+nrOfCopies = max(1, int(args.size_mb * 1024 * 1024) // len(program))
+binary = program * nrOfCopies
+
+nrOfInstructions = len(binary) // 4
+sizeMB = len(binary) / (1024.0 * 1024.0)
+
+fd, binaryFilename = tempfile.mkstemp(suffix='.bin')
+
+try:
+    with os.fdopen(fd, 'wb') as f:
+        f.write(binary)
+
+    print ("Disassembling {:.2f} MB ({} instructions), {} times".format(sizeMB, nrOfInstructions,
+                                                                      args.repeat))
+
+    timings = []
+    for i in range(args.repeat):
+        start = time.perf_counter()
+        success = driver.disassemble(binaryFilename)
+        timings.append(time.perf_counter() - start)
+
+        if not success:
+            print ("Disassembly terminated with errors:")
+            print (driver.getLastErrorMessage())
+            exit(1)
+
+finally:
+    os.remove(binaryFilename)
+
+best = min(timings)
+
+print ("Best time:   {:.3f} s".format(best))
+print ("Throughput:  {:.2f} MB/s, {:.0f} instructions/s".format(sizeMB / best,
+                                                               nrOfInstructions / best))
@@ -0,0 +1,79 @@
+# This benchmark measures how the time to read the quantum layout
+# information scales with the size of the device.
+#
+# For each requested number of qubits, it generates the layout of a square
+# grid of qubits (rounded up to a whole number of rows), with edges in both
+# directions between neighbouring qubits. The layout is read a number of
+# times, and the best time is reported, together with the time per edge.
+# Time per edge that stays constant means that reading the layout scales
+# linearly with the size of the device.
+
+import argparse
+import math
+import os
+import tempfile
+import time
+
+from qisa_as import QISA_Driver
+
+parser = argparse.ArgumentParser(description='Measure the time QISA-AS needs to read the quantum layout information.')
+parser.add_argument('--qubits', default='100,400,900',
+                    help='comma separated numbers of qubits (default: %(default)s)')
+parser.add_argument('--repeat', type=int, default=5,
+                    help='number of times to read each layout (default: %(default)s)')
+args = parser.parse_args()
+
+
+def generate_layout(nrOfQubits):
+    nrOfColumns = int(math.ceil(math.sqrt(nrOfQubits)))
+    nrOfRows = int(math.ceil(nrOfQubits / nrOfColumns))
+    nrOfQubits = nrOfRows * nrOfColumns
+
+    edges = []
+    for qubit in range(nrOfQubits):
+        if (qubit + 1) % nrOfColumns != 0:
+            edges += [(qubit, qubit + 1), (qubit + 1, qubit)]
+        if qubit + nrOfColumns < nrOfQubits:
+            edges += [(qubit, qubit + nrOfColumns), (qubit + nrOfColumns, qubit)]
+
+    lines = ['.NumQubits', str(nrOfQubits), '.EndNumQubits',
+             '.NumDirEdge', str(len(edges)), '.EndNumDirEdge',
+             '.EdgeList']
+    lines += ['{}: {}, {}'.format(i, t, c) for i, (t, c) in enumerate(edges)]
+    lines += ['.EndEdgeList', '']
+
+    return nrOfQubits, len(edges), '\n'.join(lines)
+
+
+print ("QISA_AS Version: ", QISA_Driver.getVersion())
+
+driver = QISA_Driver()
+
+print ()
+print ("{:>10} {:>10} {:>12} {:>14}".format('qubits', 'edges', 'read (ms)', 'per edge (us)'))
+
+with tempfile.TemporaryDirectory() as tmpDir:
+    layoutFilename = os.path.join(tmpDir, 'layout.txt')
+
+    for requestedQubits in [int(n) for n in args.qubits.split(',')]:
+        nrOfQubits, nrOfEdges, layout = generate_layout(requestedQubits)
+
+        with open(layoutFilename, 'w') as f:
+            f.write(layout)
+
+        bestTime = None
+
+        for _ in range(args.repeat):
+            startTime = time.perf_counter()
+            success = driver.read(layoutFilename)
+            elapsed = time.perf_counter() - startTime
+
+            if not success:
+                print ("Reading the layout of {} qubits failed: {}".format(nrOfQubits, driver.getLastErrorMessage()))
+                exit(1)
+
+            if (bestTime is None) or (elapsed < bestTime):
+                bestTime = elapsed
+
+        print ("{:>10} {:>10} {:>12.3f} {:>14.3f}".format(nrOfQubits, nrOfEdges, bestTime * 1e3,
+                                                          bestTime * 1e6 / max(nrOfEdges, 1)))
@@ -0,0 +1,415 @@
+# This benchmark suite measures the performance of QISA-AS on synthetic
+# programs of increasing size (see qisa_program_generator.py).
+#
+# For each program size, the throughput and peak memory usage (RSS) of
+# assembly, disassembly, saving, hex string conversion and loading quantum
+# instructions is measured, both through the Python interface and through
+# the qisa-as executable. Each measurement runs in a separate process, so
+# that its peak memory usage can be determined. On Linux, the peak memory
+# usage of a process includes that of the process that started it (which is
+# kept small, and is reported as 'launcher_rss_kb').
+#
+# The results are saved as JSON, so that different versions of QISA-AS can
+# be compared on the same machine (see --compare).
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows.
+    resource = None
+
+rootDir = os.path.dirname(os.path.realpath(__file__))
+
+layoutFilename = os.path.join(rootDir, 'quantum_layout_information.txt')
+
+PYTHON_OPERATIONS = ['assemble', 'save', 'getInstructionsAsHexStrings', 'disassemble',
+                     'loadQuantumInstructions']
+
+# Note that the executable always saves its output when assembling or
+# disassembling with -o, so 'assemble' and 'disassemble' include 'save'.
+CLI_OPERATIONS = ['assemble', 'getInstructionsAsHexStrings', 'disassemble', 'disassemble --stream',
+                  'loadQuantumInstructions']
+
+
+def own_peak_rss_kb():
+    """Return the peak RSS of this process in kilobytes, excluding that of its parent where possible."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except IOError:
+        pass
+    return None
+
+
+def write_qmap(driver, filename):
+    """
+    Write the quantum instructions of the given driver to a qmap file.
+
+    Returns
+    -------
+    --> int: The number of quantum instructions in the file.
+    """
+    if not hasattr(driver, 'getQuantumInstructions'):
+        # Older versions of QISA-AS cannot list their quantum instructions.
+        shutil.copyfile(os.path.join(rootDir, 'test_load_qmap_file.qmap'), filename)
+        with open(filename) as f:
+            return sum(1 for line in f if line.startswith('def_q_arg_'))
+
+    nrOfInstructions = 0
+    with open(filename, 'w') as f:
+        for kind, qmap in zip(('none', 'st', 'tt'), driver.getQuantumInstructions()):
+            for name, opcode in sorted(qmap.items()):
+                f.write("def_q_arg_{}['{}'] = 0x{:02x}\n".format(kind, name, opcode))
+                nrOfInstructions += 1
+    return nrOfInstructions
+
+
+def run_prepare(args, driver):
+    """Generate a program of the given size, assemble it, and print its properties as JSON."""
+    from qisa_program_generator import generate_program
+
+    source = generate_program(args.size,
+                              smis_density=args.smis_density,
+                              smit_density=args.smit_density,
+                              label_interval=args.label_interval,
+                              nr_of_symbols=args.symbols,
+                              nr_of_register_aliases=args.register_aliases,
+                              seed=args.seed)
+
+    with open(args.input, 'w') as f:
+        f.write(source)
+
+    if not driver.assemble(args.input) or not driver.save(args.binary):
+        sys.exit("Assembly of the generated program terminated with errors:\n" + driver.getLastErrorMessage())
+
+    print (json.dumps({
+        'qisa_as_version': driver.getVersion(),
+        'instructions': os.path.getsize(args.binary) // 4,
+        'quantum_instructions': write_qmap(driver, args.qmap),
+        'source_bytes': len(source),
+    }))
+
+
+def run_worker(args):
+    """Time one operation through the Python interface, and print the result as JSON."""
+    from qisa_as import QISA_Driver
+
+    driver = QISA_Driver()
+    driver.read(layoutFilename)
+
+    if args.worker == 'prepare':
+        run_prepare(args, driver)
+        return
+
+    outputFilename = os.path.join(args.tmp_dir, 'worker_output')
+
+    if args.worker in ('save', 'getInstructionsAsHexStrings'):
+        if not driver.assemble(args.input):
+            sys.exit(driver.getLastErrorMessage())
+
+    operations = {
+        'assemble': lambda: driver.assemble(args.input),
+        'save': lambda: driver.save(outputFilename),
+        'getInstructionsAsHexStrings': lambda: driver.getInstructionsAsHexStrings(False) is not None,
+        'disassemble': lambda: driver.disassemble(args.binary),
+        'loadQuantumInstructions': lambda: driver.loadQuantumInstructions(args.qmap),
+    }
+
+    timings = []
+    for i in range(args.repeat):
+        start = time.perf_counter()
+        success = operations[args.worker]()
+        timings.append(time.perf_counter() - start)
+
+        if not success:
+            sys.exit(driver.getLastErrorMessage())
+
+    print (json.dumps({'seconds': min(timings), 'peak_rss_kb': own_peak_rss_kb()}))
+
+
+def max_rss_kb(rusage):
+    # ru_maxrss is in bytes on macOS, and in kilobytes elsewhere.
+    if sys.platform == 'darwin':
+        return rusage.ru_maxrss // 1024
+    return rusage.ru_maxrss
+
+
+def run_process(command, stdout=subprocess.DEVNULL):
+    """
+    Run the given command.
+
+    Returns
+    -------
+    --> tuple: The wall clock time in seconds, the peak RSS of the process in
+               kilobytes (None if that cannot be determined), and its output
+               (if stdout is subprocess.PIPE).
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(command, stdout=stdout)
+    output = process.stdout.read() if stdout == subprocess.PIPE else None
+
+    if hasattr(os, 'wait4'):
+        # Unlike Popen.wait(), this gives the resource usage of this process only.
+        _, status, rusage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status) if hasattr(os, 'waitstatus_to_exitcode') else status
+        peakRss = max_rss_kb(rusage)
+    else:
+        process.wait()
+        peakRss = None
+
+    seconds = time.perf_counter() - start
+
+    if process.returncode != 0:
+        raise RuntimeError("Command failed: {}".format(' '.join(command)))
+
+    return seconds, peakRss, output
+
+
+def run_python_worker(operation, files, args, extraArguments=()):
+    command = [sys.executable, os.path.realpath(__file__),
+               '--worker', operation,
+               '--input', files['source'],
+               '--binary', files['binary'],
+               '--qmap', files['qmap'],
+               '--tmp-dir', files['tmp_dir'],
+               '--repeat', str(args.repeat)] + list(extraArguments)
+
+    _, peakRss, output = run_process(command, stdout=subprocess.PIPE)
+    result = json.loads(output.decode())
+
+    if result.get('peak_rss_kb') is None:
+        result['peak_rss_kb'] = peakRss
+    return result
+
+
+def measure_python(operation, files, args):
+    result = run_python_worker(operation, files, args)
+    return result['seconds'], result['peak_rss_kb']
+
+
+def measure_cli(operation, files, args):
+    output = os.path.join(files['tmp_dir'], 'cli_output')
+
+    commands = {
+        'assemble': ['-l', layoutFilename, '-o', output, files['source']],
+        'getInstructionsAsHexStrings': ['-l', layoutFilename, files['source']],
+        'disassemble': ['-l', layoutFilename, '-d', '-o', output, files['binary']],
+        'disassemble --stream': ['-l', layoutFilename, '-d', '--stream', '-o', output, files['binary']],
+        'loadQuantumInstructions': ['-q', files['qmap'], '--dumpspecs'],
+    }
+
+    timings = []
+    peakRss = None
+    for i in range(args.repeat):
+        seconds, rss, _ = run_process([args.cli] + commands[operation])
+        timings.append(seconds)
+        if rss is not None:
+            peakRss = max(rss, peakRss or 0)
+
+    return min(timings), peakRss
+
+
+def result_entry(seconds, peakRss, nrOfInstructions):
+    return {
+        'seconds': seconds,
+        'instructions_per_second': nrOfInstructions / seconds if seconds > 0 else None,
+        'peak_rss_kb': peakRss,
+    }
+
+
+def compare(results, baselineFilename):
+    """Print the change in throughput and memory usage of the given results relative to those in the given file."""
+    with open(baselineFilename) as f:
+        baseline = json.load(f)
+
+    baselineBySize = {entry['bundles']: entry for entry in baseline['results']}
+
+    print ()
+    print ("Relative to {} (version {}):".format(baselineFilename,
+                                                        baseline.get('qisa_as_version')))
+
+    for entry in results['results']:
+        old = baselineBySize.get(entry['bundles'])
+        if old is None:
+            continue
+
+        for interface in ('python', 'cli'):
+            for operation, new in sorted(entry.get(interface, {}).items()):
+                oldResult = old.get(interface, {}).get(operation)
+                if oldResult is None:
+                    continue
+                # Throughput is compared instead of time, because older versions may load a different qmap file.
+                print ("  {:>8} bundles  {:<6} {:<28} {:6.2f}x throughput, {:6.2f}x peak RSS".format(
+                    entry['bundles'], interface, operation,
+                    new['instructions_per_second'] / oldResult['instructions_per_second'],
+                    (oldResult['peak_rss_kb'] / new['peak_rss_kb'])
+                    if oldResult['peak_rss_kb'] and new['peak_rss_kb'] else float('nan')))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the performance of QISA-AS on synthetic programs.')
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help='comma separated numbers of quantum bundles per program (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='number of times each operation is timed, the best time is reported '
+                             '(default: %(default)s)')
+    parser.add_argument('--smis-density', type=float, default=0.2,
+                        help='probability of an SMIS instruction before a bundle (default: %(default)s)')
+    parser.add_argument('--smit-density', type=float, default=0.1,
+                        help='probability of an SMIT instruction before a bundle (default: %(default)s)')
+    parser.add_argument('--label-interval', type=int, default=50,
+                        help='number of bundles per label (default: %(default)s)')
+    parser.add_argument('--symbols', type=int, default=16,
+                        help='number of .def_sym definitions (default: %(default)s)')
+    parser.add_argument('--register-aliases', type=int, default=8,
+                        help='number of .register definitions (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the program generator (default: %(default)s)')
+    parser.add_argument('--cli', default=shutil.which('qisa-as'),
+                        help='qisa-as executable to measure (default: the one found in PATH)')
+    parser.add_argument('--no-cli', action='store_true',
+                        help='do not measure the qisa-as executable')
+    parser.add_argument('-o', '--output', default='benchmark_results.json',
+                        help='file to save the results to, as JSON (default: %(default)s)')
+    parser.add_argument('--compare', metavar='RESULTS_FILE',
+                        help='results of an earlier run, to compare with')
+
+    # Used internally, to run a single measurement in a separate process.
+    parser.add_argument('--worker', choices=PYTHON_OPERATIONS + ['prepare'], help=argparse.SUPPRESS)
+    parser.add_argument('--input', help=argparse.SUPPRESS)
+    parser.add_argument('--binary', help=argparse.SUPPRESS)
+    parser.add_argument('--qmap', help=argparse.SUPPRESS)
+    parser.add_argument('--tmp-dir', help=argparse.SUPPRESS)
+    parser.add_argument('--size', type=int, help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    # The programs are generated and assembled by a separate process, to keep
+    # the memory usage of this process (and therefore of the processes that it
+    # starts) low.
+    if args.no_cli:
+        args.cli = None
+    elif args.cli is None:
+        print ("qisa-as executable not found, only the Python interface is measured (see --cli)")
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    results = {
+        'qisa_as_version': None,
+        'timestamp': datetime.datetime.now().isoformat(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'python_version': platform.python_version(),
+        'cli': args.cli,
+        'launcher_rss_kb': None,
+        'parameters': {
+            'repeat': args.repeat,
+            'smis_density': args.smis_density,
+            'smit_density': args.smit_density,
+            'label_interval': args.label_interval,
+            'symbols': args.symbols,
+            'register_aliases': args.register_aliases,
+            'seed': args.seed,
+        },
+        'results': [],
+    }
+
+    tmpDir = tempfile.mkdtemp()
+
+    try:
+        files = {
+            'tmp_dir': tmpDir,
+            'source': os.path.join(tmpDir, 'program.qisa'),
+            'binary': os.path.join(tmpDir, 'program.bin'),
+            'qmap': os.path.join(tmpDir, 'instructions.qmap'),
+        }
+
+        generatorArguments = ['--smis-density', str(args.smis_density),
+                              '--smit-density', str(args.smit_density),
+                              '--label-interval', str(args.label_interval),
+                              '--symbols', str(args.symbols),
+                              '--register-aliases', str(args.register_aliases),
+                              '--seed', str(args.seed)]
+
+        for size in sizes:
+            program = run_python_worker('prepare', files, args, generatorArguments + ['--size', str(size)])
+
+            if results['qisa_as_version'] is None:
+                results['qisa_as_version'] = program['qisa_as_version']
+                print ("QISA_AS Version: ", program['qisa_as_version'])
+
+            nrOfInstructions = program['instructions']
+
+            print ()
+            print ("{} bundles: {} instructions, {} bytes of source code".format(size, nrOfInstructions,
+                                                                               program['source_bytes']))
+
+            entry = {
+                'bundles': size,
+                'instructions': nrOfInstructions,
+                'source_bytes': program['source_bytes'],
+                'python': {},
+                'cli': {},
+            }
+
+            measurements = [('python', operation, measure_python) for operation in PYTHON_OPERATIONS]
+            if args.cli:
+                measurements += [('cli', operation, measure_cli) for operation in CLI_OPERATIONS]
+
+            for interface, operation, measure in measurements:
+                try:
+                    seconds, peakRss = measure(operation, files, args)
+                except RuntimeError as e:
+                    # For instance an option that this version of the executable does not support.
+                    print ("  {:<6} {:<28} skipped: {}".format(interface, operation, e))
+                    continue
+
+                if operation == 'loadQuantumInstructions':
+                    count = program['quantum_instructions']
+                else:
+                    count = nrOfInstructions
+                entry[interface][operation] = result_entry(seconds, peakRss, count)
+
+                print ("  {:<6} {:<28} {:10.4f} s  {:14.0f} instructions/s  peak RSS {} KB".format(
+                    interface, operation, seconds, entry[interface][operation]['instructions_per_second'] or 0,
+                    peakRss if peakRss is not None else '?'))
+
+            results['results'].append(entry)
+
+    finally:
+        shutil.rmtree(tmpDir)
+
+    if resource is not None:
+        results['launcher_rss_kb'] = max_rss_kb(resource.getrusage(resource.RUSAGE_SELF))
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print ()
+    print ("Results saved to '{}'".format(args.output))
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
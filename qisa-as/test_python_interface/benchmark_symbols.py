@@ -0,0 +1,85 @@
+# This benchmark measures how the assembly time of QISA-AS scales with the
+# number of labels and symbols in a program.
+#
+# For each requested number of labels, it generates a program that defines
+# that many labels, symbols and register aliases, and uses each of them, with
+# half of the labels used before their definition. Identifiers are spelled
+# in a different case where they are used, as compiler-generated code may do.
+# The program is assembled a number of times, and the best time is reported,
+# together with the time per label. Time per label that stays constant means
+# that the assembly time scales linearly with the number of labels.
+
+import argparse
+import os
+import time
+
+from qisa_as import QISA_Driver
+
+rootDir = os.path.dirname(os.path.realpath(__file__))
+
+layoutFilename = os.path.join(rootDir, 'quantum_layout_information.txt')
+
+parser = argparse.ArgumentParser(description='Measure the assembly time of QISA-AS versus the number of labels.')
+parser.add_argument('--labels', default='1000,10000,100000',
+                    help='comma separated numbers of labels (default: %(default)s)')
+parser.add_argument('--repeat', type=int, default=3,
+                    help='number of times to assemble each program (default: %(default)s)')
+args = parser.parse_args()
+
+
+def generate_program(nrOfLabels):
+    lines = []
+
+    # Registers r0 and r1 are used by the instructions below.
+    for i in range(nrOfLabels):
+        lines.append('.def_sym Symbol_{} {}'.format(i, i % 1000))
+        lines.append('.register r{} Alias_{}'.format(2 + i % 30, i))
+
+    for i in range(nrOfLabels):
+        lines.append('Label_{}:'.format(i))
+        lines.append('    LDI r0, SYMBOL_{}'.format(i))
+        lines.append('    ADD r1, r0, alias_{}'.format(i))
+        # Alternate between a label that has already been defined, and one that has not.
+        target = i - 1 if (i % 2 == 0) and (i > 0) else min(i + 1, nrOfLabels - 1)
+        lines.append('    BR always, LABEL_{}'.format(target))
+
+    lines.append('    STOP')
+    lines.append('')
+
+    return '\n'.join(lines)
+
+
+print ("QISA_AS Version: ", QISA_Driver.getVersion())
+
+driver = QISA_Driver()
+driver.read(layoutFilename)
+
+print ()
+print ("{:>10} {:>12} {:>12} {:>14} {:>14}".format('labels', 'total (s)', 'parse (s)', 'deferred (s)',
+                                                  'per label (us)'))
+
+for nrOfLabels in [int(n) for n in args.labels.split(',')]:
+    source = generate_program(nrOfLabels)
+
+    best = None
+    for i in range(args.repeat):
+        start = time.perf_counter()
+        success = driver.assembleString(source)
+        seconds = time.perf_counter() - start
+
+        if not success:
+            print ("Assembly terminated with errors:")
+            print (driver.getLastErrorMessage())
+            exit(1)
+
+        if best is None or seconds < best[0]:
+            # Older versions of QISA-AS do not report the time per phase.
+            stats = driver.getStats() if hasattr(driver, 'getStats') else None
+            best = (seconds, stats)
+
+    seconds, stats = best
+    print ("{:>10} {:>12.3f} {:>12} {:>14} {:>14.2f}".format(
+        nrOfLabels, seconds,
+        '{:.3f}'.format(stats['parse_seconds']) if stats else '-',
+        '{:.3f}'.format(stats['deferred_instructions_seconds']) if stats else '-',
+        seconds / nrOfLabels * 1e6))
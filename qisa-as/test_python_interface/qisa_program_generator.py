@@ -0,0 +1,180 @@
+# This module generates synthetic, but realistic, eQASM programs of a
+# configurable size. It is used by the benchmark suite, and can also be run
+# on its own to write a generated program to a file.
+#
+# A generated program consists of a number of quantum bundles, interleaved
+# with classic instructions: SMIS and SMIT instructions that set the target
+# registers of the bundles, arithmetic on (aliased) registers, loads of
+# symbolic constants, waits, and loops that branch to forward and backward
+# labels.
+
+import argparse
+import random
+
+# Quantum instructions of the default instruction set.
+DEFAULT_ST_INSTRUCTIONS = ['CW_01', 'CW_02', 'CW_03', 'CW_08', 'CW_10', 'CW_11', 'CW_12',
+                           'FLUX_01', 'FLUX_02', 'FLUX_03']
+DEFAULT_TT_INSTRUCTIONS = ['CNOT', 'CZ', 'SWAP']
+
+# Qubits and edges of 'quantum_layout_information.txt'.
+DEFAULT_NR_OF_QUBITS = 7
+DEFAULT_EDGES = [(2, 0), (0, 3), (3, 1), (1, 4), (2, 5), (5, 3), (3, 6), (6, 4),
+                 (0, 2), (3, 0), (1, 3), (4, 1), (5, 2), (3, 5), (6, 3), (4, 6)]
+
+ARITHMETIC_INSTRUCTIONS = ['ADD', 'SUB', 'AND', 'OR', 'XOR']
+BRANCH_CONDITIONS = ['EQ', 'NE', 'LT', 'LE', 'GT', 'GE', 'LTU', 'LEU', 'GTU', 'GEU']
+
+
+def generate_program(nr_of_bundles,
+                     smis_density=0.2,
+                     smit_density=0.1,
+                     label_interval=50,
+                     backward_branch_fraction=0.5,
+                     nr_of_symbols=16,
+                     nr_of_register_aliases=8,
+                     nr_of_qubits=DEFAULT_NR_OF_QUBITS,
+                     edges=DEFAULT_EDGES,
+                     st_instructions=DEFAULT_ST_INSTRUCTIONS,
+                     tt_instructions=DEFAULT_TT_INSTRUCTIONS,
+                     seed=0):
+    """
+    Generate a synthetic eQASM program.
+
+    Parameters
+    ----------
+    nr_of_bundles: int              Number of quantum bundles.
+    smis_density: float             Probability of an SMIS instruction before a bundle.
+    smit_density: float             Probability of an SMIT instruction before a bundle.
+    label_interval: int             Number of bundles per label. At each label, a loop
+                                    branches back to the previous label or ahead to the
+                                    next one.
+    backward_branch_fraction: float Fraction of the branches that go to a backward label.
+    nr_of_symbols: int              Number of symbols defined using '.def_sym'.
+    nr_of_register_aliases: int     Number of register aliases defined using '.register'.
+    nr_of_qubits: int               Number of qubits, used for the SMIS masks.
+    edges: list of (int, int)       Valid (source, target) qubit pairs, used for the SMIT masks.
+    st_instructions: list of str    Quantum instructions that take an S register.
+    tt_instructions: list of str    Quantum instructions that take a T register.
+    seed: int                       Seed of the random generator, so that programs can be
+                                    generated again.
+
+    Returns
+    -------
+    --> str: The source code of the program.
+    """
+    rng = random.Random(seed)
+    lines = []
+
+    lines.append('# Synthetic program with {} bundles, generated by qisa_program_generator.py'
+                 .format(nr_of_bundles))
+
+    symbols = ['sym_{}'.format(i) for i in range(nr_of_symbols)]
+    for symbol in symbols:
+        lines.append('.def_sym {} {}'.format(symbol, rng.randint(0, 10000)))
+
+    # Registers r0..r3 are reserved for the loop counters.
+    aliases = ['reg_{}'.format(i) for i in range(nr_of_register_aliases)]
+    for alias in aliases:
+        lines.append('.register r{} {}'.format(rng.randint(4, 31), alias))
+
+    registers = ['r{}'.format(i) for i in range(4, 32)] + aliases
+    constants = symbols + ['{}'.format(i) for i in (0, 1, 100, 1000)]
+
+    lines.append('')
+    lines.append('start:')
+    lines.append('    LDI r0, 0')
+    lines.append('    LDI r1, 1')
+
+    nr_of_labels = max(1, (nr_of_bundles + label_interval - 1) // label_interval)
+
+    for bundle in range(nr_of_bundles):
+        if bundle % label_interval == 0:
+            label = bundle // label_interval
+            lines.append('label_{}:'.format(label))
+
+            # Loop back to the previous label, or skip ahead to the next one.
+            if label > 0 and rng.random() < backward_branch_fraction:
+                target = label - 1
+            else:
+                target = min(label + 1, nr_of_labels)
+            lines.append('    ADD r0, r0, r1')
+            lines.append('    CMP r0, {}'.format(rng.choice(registers)))
+            lines.append('    BR {}, label_{}'.format(rng.choice(BRANCH_CONDITIONS), target))
+
+        if rng.random() < smis_density:
+            qubits = sorted(rng.sample(range(nr_of_qubits), rng.randint(1, nr_of_qubits)))
+            lines.append('    SMIS s{}, {{{}}}'.format(rng.randint(0, 31),
+                                                      ', '.join(str(q) for q in qubits)))
+
+        if rng.random() < smit_density:
+            # Each qubit may only be used in one pair of a mask.
+            pairs = []
+            used_qubits = set()
+            for pair in rng.sample(edges, len(edges)):
+                if len(pairs) == 3:
+                    break
+                if pair[0] not in used_qubits and pair[1] not in used_qubits:
+                    pairs.append(pair)
+                    used_qubits.update(pair)
+            lines.append('    SMIT t{}, {{{}}}'.format(rng.randint(0, 63),
+                                                      ', '.join('({}, {})'.format(*p) for p in pairs)))
+
+        kind = rng.random()
+        if kind < 0.3:
+            lines.append('    {} {}, {}, {}'.format(rng.choice(ARITHMETIC_INSTRUCTIONS),
+                                                   rng.choice(registers),
+                                                   rng.choice(registers),
+                                                   rng.choice(registers)))
+        elif kind < 0.4:
+            lines.append('    LDI {}, {}'.format(rng.choice(registers), rng.choice(constants)))
+        elif kind < 0.5:
+            lines.append('    QWAIT {}'.format(rng.choice(constants)))
+
+        operations = []
+        for i in range(rng.randint(1, 3)):
+            if rng.random() < 0.75:
+                operations.append('{} s{}'.format(rng.choice(st_instructions), rng.randint(0, 31)))
+            else:
+                operations.append('{} t{}'.format(rng.choice(tt_instructions), rng.randint(0, 63)))
+        lines.append('    bs {} {}'.format(rng.randint(0, 7), ' | '.join(operations)))
+
+    lines.append('label_{}:'.format(nr_of_labels))
+    lines.append('    STOP')
+    lines.append('')
+
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a synthetic eQASM program.')
+    parser.add_argument('-n', '--bundles', type=int, default=1000,
+                        help='number of quantum bundles (default: %(default)s)')
+    parser.add_argument('--smis-density', type=float, default=0.2,
+                        help='probability of an SMIS instruction before a bundle (default: %(default)s)')
+    parser.add_argument('--smit-density', type=float, default=0.1,
+                        help='probability of an SMIT instruction before a bundle (default: %(default)s)')
+    parser.add_argument('--label-interval', type=int, default=50,
+                        help='number of bundles per label (default: %(default)s)')
+    parser.add_argument('--backward-branches', type=float, default=0.5,
+                        help='fraction of the branches that go to a backward label (default: %(default)s)')
+    parser.add_argument('--symbols', type=int, default=16,
+                        help='number of .def_sym definitions (default: %(default)s)')
+    parser.add_argument('--register-aliases', type=int, default=8,
+                        help='number of .register definitions (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the random generator (default: %(default)s)')
+    parser.add_argument('-o', '--output', required=True,
+                        help='file to write the generated program to')
+    args = parser.parse_args()
+
+    source = generate_program(args.bundles,
+                              smis_density=args.smis_density,
+                              smit_density=args.smit_density,
+                              label_interval=args.label_interval,
+                              backward_branch_fraction=args.backward_branches,
+                              nr_of_symbols=args.symbols,
+                              nr_of_register_aliases=args.register_aliases,
+                              seed=args.seed)
+
+    with open(args.output, 'w') as f:
+        f.write(source)
@@ -0,0 +1,134 @@
+# This test is used to assert that assembling source code from memory
+# (assembleString() and assembleBytes()) gives the same results as
+# assembling the same source code from file (assemble()).
+
+import sys
+
+from qisa_as import QISA_Driver
+import os
+
+rootDir = os.path.dirname(os.path.realpath(__file__))
+
+inputFilename = os.path.join(rootDir, 'qisa_test_assembly/test_assembly.qisa')
+layoutFilename = os.path.join(rootDir, 'quantum_layout_information.txt')
+
+print ("QISA_AS Version: ", QISA_Driver.getVersion())
+
+driver = QISA_Driver()
+driver.read(layoutFilename)
+
+driver.setVerbose(False)
+
+print ("Assembling file ", inputFilename)
+success = driver.assemble(inputFilename)
+
+if not success:
+    print ("Assembly terminated with errors:")
+    print (driver.getLastErrorMessage())
+    exit(1)
+
+instHex_orig = driver.getInstructionsAsHexStrings(False)
+instBytes_orig = driver.getInstructionsAsBytes()
+
+with open(inputFilename, 'rb') as f:
+    source_bytes = f.read()
+
+print ("Assembling the same source code from a string")
+success = driver.assembleString(source_bytes.decode())
+
+if not success:
+    print ("Assembly terminated with errors:")
+    print (driver.getLastErrorMessage())
+    exit(1)
+
+if driver.getInstructionsAsHexStrings(False) != instHex_orig:
+    print ("Differences detected in getInstructionsAsHexStrings() output.")
+    exit(1)
+
+if driver.getInstructionsAsBytes() != instBytes_orig:
+    print ("Differences detected in getInstructionsAsBytes() output.")
+    exit(1)
+
+print ("Assembling the same source code from a bytes object")
+success = driver.assembleBytes(source_bytes)
+
+if not success:
+    print ("Assembly terminated with errors:")
+    print (driver.getLastErrorMessage())
+    exit(1)
+
+if driver.getInstructionsAsBytes() != instBytes_orig:
+    print ("Differences detected in getInstructionsAsBytes() output.")
+    exit(1)
+
+# The zero-copy instruction buffer must describe the same instructions.
+instBuffer = driver.getInstructionBuffer()
+
+if instBuffer.format != 'I' or instBuffer.itemsize != 4 or not instBuffer.readonly:
+    print ("Unexpected layout of getInstructionBuffer() output.")
+    exit(1)
+
+if ['0x{:08x}'.format(inst) for inst in instBuffer] != list(instHex_orig):
+    print ("Differences detected in getInstructionBuffer() output.")
+    exit(1)
+
+if bytes(instBuffer) != instBytes_orig:
+    print ("Differences detected in getInstructionBuffer() output.")
+    exit(1)
+
+# The instructions cannot be replaced while they are exported, also not by a
+# view that has been derived from the exported one.
+print ("Re-assembling while the instruction buffer is in use")
+instSlice = instBuffer[1:]
+for action in [lambda: driver.assembleString('nop\n' * 100000),
+               lambda: driver.assembleBytes(b'nop\n'),
+               lambda: driver.assemble(inputFilename),
+               lambda: driver.disassemble(inputFilename),
+               lambda: driver.reset()]:
+    try:
+        action()
+    except BufferError:
+        pass
+    else:
+        print ("The instructions have been replaced while exported.")
+        exit(1)
+
+if bytes(instBuffer) != instBytes_orig or bytes(instSlice) != instBytes_orig[4:]:
+    print ("The instruction buffer changed while it was in use.")
+    exit(1)
+
+# Release the views before the driver is used again.
+instBuffer.release()
+try:
+    driver.assembleString('nop\n')
+except BufferError:
+    pass
+else:
+    print ("The instructions have been replaced while a derived view was in use.")
+    exit(1)
+instSlice.release()
+
+if not driver.assembleString('nop\n' * 100000) or len(driver.getInstructionBuffer()) != 100000:
+    print ("Assembly failed after releasing the instruction buffer.")
+    exit(1)
+
+# Errors in in-memory source code must be reported with source context,
+# just like errors in source files.
+print ("Assembling erroneous source code from a string")
+success = driver.assembleString("nop\nunknown_instruction r1\n", "erroneous_source")
+
+if success:
+    print ("Assembly of erroneous source code unexpectedly succeeded.")
+    exit(1)
+
+if "unknown_instruction r1" not in driver.getLastErrorMessage():
+    print ("Error message does not show the offending source line:")
+    print (driver.getLastErrorMessage())
+    exit(1)
+
+print ()
+print ("====================")
+print ("=                  =")
+print ("= ALL TESTS PASSED =")
+print ("=                  =")
+print ("====================")
@@ -0,0 +1,105 @@
+# This test is used to assert that the assembly cache returns the same
+# results as a normal assembly, and that it only hits when nothing that
+# determines the assembly result has changed.
+
+import os
+import shutil
+import tempfile
+
+from qisa_as import QISA_Driver, QISA_AssemblyCache
+
+rootDir = os.path.dirname(os.path.realpath(__file__))
+
+inputFilename = os.path.join(rootDir, 'qisa_test_assembly/test_assembly.qisa')
+layoutFilename = os.path.join(rootDir, 'quantum_layout_information.txt')
+qmapFilename = os.path.join(rootDir, 'test_load_qmap_file.qmap')
+
+print ("QISA_AS Version: ", QISA_Driver.getVersion())
+
+
+def check_statistics(cache, expected):
+    statistics = cache.getStatistics()
+    for name, value in expected.items():
+        if statistics[name] != value:
+            print ("Unexpected cache statistics: {}, expected: {}".format(statistics, expected))
+            exit(1)
+
+
+cacheDir = tempfile.mkdtemp()
+
+try:
+    driver = QISA_Driver()
+    driver.read(layoutFilename)
+
+    print ("Assembling file without cache ", inputFilename)
+    if not driver.assemble(inputFilename):
+        print ("Assembly terminated with errors:")
+        print (driver.getLastErrorMessage())
+        exit(1)
+
+    instBytes_orig = driver.getInstructionsAsBytes()
+
+    cache = QISA_AssemblyCache(cacheDir)
+    driver.setCache(cache)
+
+    print ("Assembling file with empty cache")
+    if not driver.assemble(inputFilename) or driver.getInstructionsAsBytes() != instBytes_orig:
+        print ("Differences detected on cache miss.")
+        exit(1)
+
+    check_statistics(cache, {'hits': 0, 'misses': 1, 'stores': 1})
+
+    print ("Assembling file again, which should hit")
+    if not driver.assemble(inputFilename) or driver.getInstructionsAsBytes() != instBytes_orig:
+        print ("Differences detected on cache hit.")
+        exit(1)
+
+    check_statistics(cache, {'hits': 1, 'misses': 1, 'stores': 1})
+
+    print ("Assembling the same source code from a string, which should hit")
+    with open(inputFilename, 'r') as f:
+        source = f.read()
+
+    if not driver.assembleString(source) or driver.getInstructionsAsBytes() != instBytes_orig:
+        print ("Differences detected on cache hit.")
+        exit(1)
+
+    check_statistics(cache, {'hits': 2, 'misses': 1, 'stores': 1})
+
+    print ("Assembling erroneous source code, which should not be stored")
+    if driver.assembleString("nop\nunknown_instruction r1\n"):
+        print ("Assembly of erroneous source code unexpectedly succeeded.")
+        exit(1)
+
+    check_statistics(cache, {'hits': 2, 'misses': 2, 'stores': 1})
+
+    print ("Changing the quantum instructions, which should miss")
+    if not driver.loadQuantumInstructions(qmapFilename):
+        print ("Failed to load quantum instructions from file '{}'.".format(qmapFilename))
+        exit(1)
+
+    driver.assembleString("nop\n")
+    driver.assembleString("nop\n")
+
+    check_statistics(cache, {'hits': 3, 'misses': 3, 'stores': 2})
+
+    print ("Sharing the cache directory with another cache")
+    otherDriver = QISA_Driver()
+    otherDriver.read(layoutFilename)
+    otherDriver.setCache(QISA_AssemblyCache(cacheDir))
+
+    if not otherDriver.assemble(inputFilename) or otherDriver.getInstructionsAsBytes() != instBytes_orig:
+        print ("Differences detected on cache hit.")
+        exit(1)
+
+    check_statistics(otherDriver.getCache(), {'hits': 1, 'misses': 0, 'stores': 0})
+
+finally:
+    shutil.rmtree(cacheDir)
+
+print ()
+print ("====================")
+print ("=                  =")
+print ("= ALL TESTS PASSED =")
+print ("=                  =")
+print ("====================")
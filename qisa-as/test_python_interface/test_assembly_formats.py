@@ -0,0 +1,120 @@
+# This test is used to assert that the assembly output formats that can be
+# selected using setAssemblyFormat() hold the assembled instructions, and that
+# save() writes the same output as getAssemblyOutput() returns.
+
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+
+from qisa_as import QISA_Driver
+
+rootDir = os.path.dirname(os.path.realpath(__file__))
+
+inputFilename = os.path.join(rootDir, 'qisa_test_assembly/test_assembly.qisa')
+layoutFilename = os.path.join(rootDir, 'quantum_layout_information.txt')
+
+print ("QISA_AS Version: ", QISA_Driver.getVersion())
+
+driver = QISA_Driver()
+driver.read(layoutFilename)
+
+if driver.getAssemblyOutput() is not None:
+    print ("getAssemblyOutput() returned output before anything was assembled.")
+    exit(1)
+
+if not driver.assemble(inputFilename):
+    print ("Assembly terminated with errors:")
+    print (driver.getLastErrorMessage())
+    exit(1)
+
+instructionBytes = driver.getInstructionsAsBytes()
+hexStrings = driver.getInstructionsAsHexStrings(False)
+nrOfInstructions = len(hexStrings)
+
+tmpDir = tempfile.mkdtemp()
+
+
+def check_format(format_id):
+    if not driver.setAssemblyFormat(format_id):
+        print ("Setting assembly format {} failed:".format(format_id))
+        print (driver.getLastErrorMessage())
+        exit(1)
+
+    output = driver.getAssemblyOutput()
+    if output is None:
+        print ("getAssemblyOutput() failed for format {}:".format(format_id))
+        print (driver.getLastErrorMessage())
+        exit(1)
+
+    outputFilename = os.path.join(tmpDir, 'output_{}'.format(format_id))
+    if not driver.save(outputFilename):
+        print ("Saving format {} terminated with errors:".format(format_id))
+        print (driver.getLastErrorMessage())
+        exit(1)
+
+    with open(outputFilename, 'rb') as f:
+        saved = f.read()
+
+    if saved != output:
+        print ("save() and getAssemblyOutput() differ for format {}".format(format_id))
+        exit(1)
+
+    if driver.getStats()['bytes_written'] != len(saved):
+        print ("Unexpected bytes_written for format {}: {}".format(format_id, driver.getStats()))
+        exit(1)
+
+    return output
+
+
+try:
+    print ("Checking the raw binary format")
+    if check_format(1) != instructionBytes:
+        print ("The raw binary format differs from getInstructionsAsBytes()")
+        exit(1)
+
+    print ("Checking the hexadecimal format")
+    lines = check_format(2).decode('ascii').split('\n')
+    if lines[-1] != '' or lines[:-1] != [h[2:].lower() for h in hexStrings]:
+        print ("The hexadecimal format differs from getInstructionsAsHexStrings()")
+        exit(1)
+
+    print ("Checking the image format")
+    image = check_format(3)
+    magic, formatVersion, headerSize, count, checksum, version = struct.unpack('<4sHHII16s', image[:32])
+
+    if magic != b'QISA' or formatVersion != 1 or headerSize != 32:
+        print ("Unexpected image header: {}".format(image[:32]))
+        exit(1)
+
+    if count != nrOfInstructions or image[headerSize:] != instructionBytes:
+        print ("The instructions in the image differ from getInstructionsAsBytes()")
+        exit(1)
+
+    if checksum != zlib.crc32(instructionBytes) & 0xffffffff:
+        print ("Unexpected checksum in image: {:08x}".format(checksum))
+        exit(1)
+
+    if version.rstrip(b'\0').decode('ascii') != QISA_Driver.getVersion():
+        print ("Unexpected version in image: {}".format(version))
+        exit(1)
+
+    print ("Checking an invalid format")
+    if driver.setAssemblyFormat(4):
+        print ("Setting assembly format 4 succeeded unexpectedly.")
+        exit(1)
+
+    # The format that has been set before is kept.
+    if driver.getAssemblyOutput() != image:
+        print ("An invalid format changed the assembly output.")
+        exit(1)
+finally:
+    shutil.rmtree(tmpDir)
+
+print ()
+print ("====================")
+print ("=                  =")
+print ("= ALL TESTS PASSED =")
+print ("=                  =")
+print ("====================")
@@ -0,0 +1,186 @@
+# This test is used to assert that packing quantum bundles (see
+# setOptimizations()) puts the operations of each timing point into as few
+# instructions as possible, without changing the timing of the program or
+# the operations at each timing point. This is verified by disassembling the
+# program with and without packing.
+
+import os
+import random
+from collections import Counter
+
+from qisa_as import QISA_Driver
+
+rootDir = os.path.dirname(os.path.realpath(__file__))
+
+layoutFilename = os.path.join(rootDir, 'quantum_layout_information.txt')
+binaryFilename = os.path.join(rootDir, 'test_bundle_packing.out')
+
+print ("QISA_AS Version: ", QISA_Driver.getVersion())
+
+driver = QISA_Driver()
+if not driver.read(layoutFilename):
+    print ("Reading '{}' failed: {}".format(layoutFilename, driver.getLastErrorMessage()))
+    exit(1)
+
+
+def assemble_and_disassemble(source, optimizations):
+    driver.setOptimizations(optimizations)
+    if not driver.assembleString(source):
+        print ("Assembly of:\n{}\nfailed: {}".format(source, driver.getLastErrorMessage()))
+        exit(1)
+    stats = driver.getStats()
+    if not driver.save(binaryFilename) or not driver.disassemble(binaryFilename):
+        print ("Disassembly failed: {}".format(driver.getLastErrorMessage()))
+        exit(1)
+    lines = [line.split('#', 1)[1].strip() for line in driver.getDisassemblyOutput().splitlines() if '#' in line]
+    return lines, stats
+
+
+def timing(lines):
+    """Return what a disassembled program does: its timing points, each with
+    the bundle separator that precedes it and the operations at that point,
+    and its classic instructions and labels, in program order."""
+    result = []
+    timingPoint = None
+    for line in lines:
+        if ':' in line.split(' ', 1)[0]:
+            result.append('label')
+            line = line.split(':', 1)[1].strip()
+        # Branch offsets change when instructions are removed.
+        line = line.split('#', 1)[0].strip()
+
+        if not line.startswith('BS '):
+            result.append(line)
+            continue
+
+        _, bs, ops = line.split(' ', 2)
+        ops = [op.strip() for op in ops.split('|') if op.strip() != 'QNOP']
+        if int(bs) != 0 or timingPoint is None:
+            timingPoint = [int(bs), Counter()]
+            result.append(timingPoint)
+        timingPoint[1].update(ops)
+    return result
+
+
+def check(source, optimizations, expectedLines, expectedPacked):
+    # The other optimizations may remove instructions, so the timing is
+    # compared with the program that has not been packed.
+    unpacked = optimizations & ~QISA_Driver.OPTIMIZE_BUNDLE_PACKING
+    expectedTiming = timing(assemble_and_disassemble(source, unpacked)[0])
+    lines, stats = assemble_and_disassemble(source, optimizations)
+    if lines != expectedLines:
+        print ("Unexpected disassembly of:\n{}\n{}\nexpected:\n{}".format(source, '\n'.join(lines), '\n'.join(expectedLines)))
+        exit(1)
+    if stats['packed_bundle_instructions'] != expectedPacked:
+        print ("Unexpected statistics: {}, expected {} packed bundle instructions".format(stats, expectedPacked))
+        exit(1)
+    if timing(lines) != expectedTiming:
+        print ("Packing changed the timing of:\n{}".format(source))
+        exit(1)
+
+
+print ("Checking that the operations of a timing point are packed")
+check("""
+        SMIS s0, {0}
+        SMIT t0, {(2, 0)}
+        bs 1 CW_01 s0 | CNOT t0 | CW_02 s0
+        bs 0 CW_03 s0
+        bs 0 QNOP
+        bs 2 CW_04 s0
+""", QISA_Driver.OPTIMIZE_BUNDLE_PACKING, [
+    'SMIS S0, {0}',
+    'SMIT T0, {(2,0)}',
+    'SMIT T0, {}',
+    'SMIT T0, {}',
+    'BS 1 CW_01 S0 | CNOT T0',
+    'BS 0 CW_02 S0 | CW_03 S0',
+    'BS 2 CW_04 S0'], 2)
+
+print ("Checking that the bundle separator is moved to the first instruction")
+check("""
+        SMIS s0, {0}
+        bs 3 QNOP
+        bs 0 CW_01 s0
+        bs 0 QNOP
+        bs 4 QNOP
+""", QISA_Driver.OPTIMIZE_BUNDLE_PACKING, [
+    'SMIS S0, {0}',
+    'BS 3 CW_01 S0',
+    'BS 4 QNOP'], 2)
+
+print ("Checking that labels and other instructions end a timing point")
+check("""
+        SMIS s0, {0}
+        SMIS s1, {1}
+        bs 1 CW_01 s0
+        SMIS s0, {2}
+        bs 0 CW_01 s0
+        QWAIT 1
+        bs 0 CW_02 s1
+loop:   bs 0 CW_03 s1
+        bs 0 CW_04 s1
+        BR EQ, loop
+""", QISA_Driver.OPTIMIZE_BUNDLE_PACKING, [
+    'SMIS S0, {0}',
+    'SMIS S1, {1}',
+    'BS 1 CW_01 S0',
+    'SMIS S0, {2}',
+    'BS 0 CW_01 S0',
+    'QWAIT 1',
+    'BS 0 CW_02 S1',
+    'label_0: BS 0 CW_03 S1 | CW_04 S1',
+    'BR EQ, label_0 # offset(-1)'], 1)
+
+print ("Checking packing after the removal of redundant SMIS instructions")
+check("""
+        SMIS s0, {0}
+        bs 1 CW_01 s0
+        SMIS s0, {0}
+        bs 0 CW_02 s0
+        STOP
+""", QISA_Driver.OPTIMIZE_REDUNDANT_MASKS | QISA_Driver.OPTIMIZE_BUNDLE_PACKING, [
+    'SMIS S0, {0}',
+    'BS 1 CW_01 S0 | CW_02 S0',
+    'STOP'], 1)
+
+print ("Checking that random programs keep their timing")
+rng = random.Random(23)
+ops = ['CW_01 s{}', 'CW_02 s{}', 'CNOT t{}', 'QNOP']
+nrOfPacked = 0
+for programNr in range(200):
+    lines = ['SMIS s{}, {{{}}}'.format(s, s) for s in range(3)] + ['SMIT t0, {(2, 0)}']
+    labels = []
+    for lineNr in range(40):
+        kind = rng.randrange(8)
+        if kind == 0:
+            labels.append('label{}'.format(lineNr))
+            lines.append('{}: QWAIT {}'.format(labels[-1], rng.randrange(3)))
+        elif kind == 1 and labels:
+            lines.append('BR EQ, {}'.format(rng.choice(labels)))
+        elif kind == 2:
+            lines.append('SMIS s{}, {{{}}}'.format(rng.randrange(3), rng.randrange(7)))
+        else:
+            bundle = [rng.choice(ops).format(rng.randrange(3)) for n in range(rng.randrange(1, 4))]
+            lines.append('bs {} {}'.format(rng.choice([0, 0, 0, 1]), ' | '.join(bundle)))
+    source = '\n'.join(lines) + '\n'
+
+    for unpacked in [QISA_Driver.OPTIMIZE_NONE, QISA_Driver.OPTIMIZE_REDUNDANT_MASKS]:
+        expectedTiming = timing(assemble_and_disassemble(source, unpacked)[0])
+        lines, stats = assemble_and_disassemble(source, unpacked | QISA_Driver.OPTIMIZE_BUNDLE_PACKING)
+        if timing(lines) != expectedTiming:
+            print ("Packing changed the timing of:\n{}".format(source))
+            exit(1)
+        nrOfPacked += stats['packed_bundle_instructions']
+
+if nrOfPacked == 0:
+    print ("No bundles have been packed in the random programs.")
+    exit(1)
+
+os.remove(binaryFilename)
+
+print ()
+print ("====================")
+print ("=                  =")
+print ("= ALL TESTS PASSED =")
+print ("=                  =")
+print ("====================")
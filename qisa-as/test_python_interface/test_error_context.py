@@ -0,0 +1,76 @@
+# This test is used to assert that the source lines shown around an error
+# are the ones that have been assembled, even if the source file has been
+# changed since, and that they are found at the end of a large source.
+
+import os
+import shutil
+import tempfile
+
+from qisa_as import QISA_Driver
+
+rootDir = os.path.dirname(os.path.realpath(__file__))
+
+layoutFilename = os.path.join(rootDir, 'quantum_layout_information.txt')
+
+print ("QISA_AS Version: ", QISA_Driver.getVersion())
+
+
+def check_context(message, expectedLines):
+    for lineNr, line in expectedLines:
+        expected = "{:8d}: {}".format(lineNr, line)
+        if expected not in message.split('\n'):
+            print ("Expected line '{}' in the error message, got:".format(expected))
+            print (message)
+            exit(1)
+
+
+driver = QISA_Driver()
+driver.read(layoutFilename)
+
+tmpDir = tempfile.mkdtemp()
+
+try:
+    print ("Checking the error context at the end of a large source")
+    nrOfLines = 100000
+    lines = ['nop'] * nrOfLines
+    lines[nrOfLines - 3] = 'add r1, r2, unknown'
+    lines[nrOfLines - 1] = 'stop'
+
+    sourceFilename = os.path.join(tmpDir, 'large.qisa')
+    with open(sourceFilename, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+    if driver.assemble(sourceFilename):
+        print ("Assembly of '{}' succeeded unexpectedly.".format(sourceFilename))
+        exit(1)
+
+    message = driver.getLastErrorMessage()
+    check_context(message, [(nrOfLines - 3, 'nop'),
+                            (nrOfLines - 2, 'add r1, r2, unknown'),
+                            (nrOfLines - 1, 'nop'),
+                            (nrOfLines, 'stop')])
+
+    print ("Checking the error context after the source file has changed")
+    with open(sourceFilename, 'w') as f:
+        f.write('# This file has been replaced.\n')
+
+    if driver.getLastErrorMessage() != message:
+        print ("The error message changed with the source file:")
+        print (driver.getLastErrorMessage())
+        exit(1)
+
+    print ("Checking the error context of a source without final new-line")
+    if driver.assembleString("nop\nnop\nadd r1, r2,"):
+        print ("Assembly succeeded unexpectedly.")
+        exit(1)
+
+    check_context(driver.getLastErrorMessage(), [(2, 'nop'), (3, 'add r1, r2,')])
+finally:
+    shutil.rmtree(tmpDir)
+
+print ()
+print ("====================")
+print ("=                  =")
+print ("= ALL TESTS PASSED =")
+print ("=                  =")
+print ("====================")
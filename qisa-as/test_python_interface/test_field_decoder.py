@@ -0,0 +1,213 @@
+# This test is used to assert that the vectorized field decoder decodes the
+# instructions in the same way as the disassembler does.
+
+import os
+import re
+import shutil
+import tempfile
+
+from qisa_as import QISA_Driver, decode_instructions
+from qisa_as.qisa_decoder import Q_KIND_ST, Q_KIND_TT
+
+try:
+    import numpy
+except ImportError:
+    print ("numpy not found, skipping the field decoder tests")
+    exit(0)
+
+rootDir = os.path.dirname(os.path.realpath(__file__))
+
+inputFilename = os.path.join(rootDir, 'qisa_test_assembly/test_assembly.qisa')
+layoutFilename = os.path.join(rootDir, 'quantum_layout_information.txt')
+binaryFilename = os.path.join(rootDir, 'test_field_decoder.bin')
+
+print ("QISA_AS Version: ", QISA_Driver.getVersion())
+
+driver = QISA_Driver()
+driver.read(layoutFilename)
+
+if not driver.assemble(inputFilename):
+    print ("Assembly terminated with errors:")
+    print (driver.getLastErrorMessage())
+    exit(1)
+
+instBytes = driver.getInstructionsAsBytes()
+instBuffer = driver.getInstructionBuffer()
+driver.save(binaryFilename)
+
+# The instructions of the driver cannot be replaced while instBuffer is in
+# use, so the binary is disassembled by another driver.
+disassembler = QISA_Driver()
+disassembler.read(layoutFilename)
+
+if not disassembler.disassemble(binaryFilename):
+    print ("Disassembly terminated with errors:")
+    print (disassembler.getLastErrorMessage())
+    exit(1)
+
+# Only keep the instruction text of each line, without the encoded
+# instruction and without the label.
+disassembly = []
+for line in disassembler.getDisassemblyOutput().splitlines():
+    if '#' not in line:
+        continue
+    text = line.split('#', 1)[1]
+    text = re.sub(r'^\s*\w+:', '', text)
+    disassembly.append(text.strip())
+
+print ("Decoding the instructions")
+fields = decode_instructions(binaryFilename, driver)
+
+if len(fields) != len(instBytes) // 4 or len(fields) != len(disassembly):
+    print ("Unexpected number of decoded instructions: {}".format(len(fields)))
+    exit(1)
+
+if not fields['valid'].all():
+    print ("Unexpected invalid instructions in the assembled program.")
+    exit(1)
+
+print ("Decoding the instructions from other sources")
+for source in (instBytes, instBuffer, numpy.frombuffer(instBytes, dtype=numpy.uint32)):
+    if not numpy.array_equal(decode_instructions(source, driver), fields):
+        print ("Differences detected when decoding from {}.".format(type(source).__name__))
+        exit(1)
+
+os.remove(binaryFilename)
+
+conditions = driver.getBranchConditionNames()
+
+
+def quantum_text(f, slot):
+    prefix = 'q{}_'.format(slot)
+    name = f[prefix + 'name']
+    if f[prefix + 'kind'] == Q_KIND_ST:
+        return '{}{} S{}'.format('C,' if f[prefix + 'cond'] else '', name, f[prefix + 'reg'])
+    if f[prefix + 'kind'] == Q_KIND_TT:
+        return '{} T{}'.format(name, f[prefix + 'reg'])
+    return name
+
+
+def expected_text(f):
+    """Returns the expected start of the disassembly text of the given decoded instruction."""
+    if f['quantum']:
+        slots = [quantum_text(f, 0), quantum_text(f, 1)]
+        if slots == ['QNOP', 'QNOP']:
+            slots = ['QNOP']
+        else:
+            slots = [slot for slot in slots if slot != 'QNOP']
+        return 'BS {} {}'.format(f['bs'], ' | '.join(slots))
+
+    name = f['name']
+    if name in ('NOP', 'STOP'):
+        return name
+    if name in ('ADD', 'ADDC', 'SUB', 'SUBC', 'AND', 'OR', 'XOR'):
+        return '{} R{}, R{}, R{}'.format(name, f['rd'], f['rs'], f['rt'])
+    if name == 'NOT':
+        return '{} R{}, R{}'.format(name, f['rd'], f['rt'])
+    if name == 'CMP':
+        return '{} R{}, R{}'.format(name, f['rs'], f['rt'])
+    if name == 'BR':
+        return '{} {},'.format(name, conditions[f['cond']])
+    if name in ('LDI', 'LDUI'):
+        return '{} R{},'.format(name, f['rd'])
+    if name == 'FBR':
+        return '{} {}, R{}'.format(name, conditions[f['cond']], f['rd'])
+    if name == 'FMR':
+        return '{} R{}, Q{}'.format(name, f['rd'], f['qs'])
+    if name == 'SMIS':
+        return '{} S{},'.format(name, f['sd'])
+    if name == 'SMIT':
+        return '{} T{},'.format(name, f['td'])
+    if name == 'QWAIT':
+        return '{} {}'.format(name, f['imm'])
+    if name == 'QWAITR':
+        return '{} R{}'.format(name, f['rs'])
+    return None
+
+
+print ("Comparing the decoded fields with the disassembly")
+for address, (f, text) in enumerate(zip(fields, disassembly)):
+    expected = expected_text(f)
+    errors = []
+
+    if expected is None:
+        errors.append("unexpected instruction")
+    elif not text.startswith(expected):
+        errors.append("expected '{}'".format(expected))
+
+    if f['name'] == 'BR' and 'offset({:+d})'.format(f['offset']) not in text:
+        errors.append("unexpected offset {}".format(f['offset']))
+
+    if f['name'] in ('LDI', 'LDUI') and 'dec({})'.format(f['imm']) not in text:
+        errors.append("unexpected immediate value {}".format(f['imm']))
+
+    if errors:
+        print ("Differences detected at address {} ('{}'): {}".format(address, text, ', '.join(errors)))
+        exit(1)
+
+print ("Checking that unused opcodes are marked as invalid")
+c = driver.getEncodingConstants()
+usedOpcodes = set(driver.getClassicOpcodes().values())
+unusedOpcode = min(set(range(c['OPCODE_MASK'] + 1)) - usedOpcodes)
+
+invalid = decode_instructions([unusedOpcode << c['OPCODE_OFFSET']], driver)
+
+if invalid['valid'][0] or invalid['name'][0] != '':
+    print ("Unused opcode {} has not been marked as invalid.".format(unusedOpcode))
+    exit(1)
+
+print ("Checking the mask parts of a layout with more than 17 qubits")
+edges = [(24, 25), (25, 24)]
+tmpDir = tempfile.mkdtemp()
+try:
+    largeLayoutFilename = os.path.join(tmpDir, 'layout.txt')
+    with open(largeLayoutFilename, 'w') as f:
+        f.write('.NumQubits\n26\n.EndNumQubits\n')
+        f.write('.NumDirEdge\n{}\n.EndNumDirEdge\n'.format(len(edges)))
+        f.write('.EdgeList\n')
+        f.write(''.join('{}: {}, {}\n'.format(i, target, control) for i, (target, control) in enumerate(edges)))
+        f.write('.EndEdgeList\n')
+
+    largeDriver = QISA_Driver()
+    if not largeDriver.read(largeLayoutFilename):
+        print ("Reading the large layout failed: {}".format(largeDriver.getLastErrorMessage()))
+        exit(1)
+finally:
+    shutil.rmtree(tmpDir)
+
+if (not largeDriver.assembleString('SMIS s1, {0, 20, 25}\nSMIS s2, {3}\nSMIT t0, {(25, 24)}\n') or
+        not largeDriver.save(binaryFilename)):
+    print ("Assembly of multi-part masks failed: {}".format(largeDriver.getLastErrorMessage()))
+    exit(1)
+
+fields = decode_instructions(binaryFilename, largeDriver)
+
+if not largeDriver.disassemble(binaryFilename):
+    print ("Disassembly of multi-part masks failed: {}".format(largeDriver.getLastErrorMessage()))
+    exit(1)
+os.remove(binaryFilename)
+
+if list(fields['pos']) != [0, 1, 0, 1, 0, 1, 2]:
+    print ("Unexpected positions of the mask parts: {}".format(list(fields['pos'])))
+    exit(1)
+
+# Each part must hold the qubits (or edges) that the disassembler shows.
+sPartWidth = c['S_MASK_MASK'].bit_length()
+tPartWidth = c['T_MASK_MASK'].bit_length()
+lines = [line.split('#', 1)[1].strip() for line in largeDriver.getDisassemblyOutput().splitlines() if '#' in line]
+for f, text in zip(fields, lines):
+    bits = [bit for bit in range(32) if (int(f['mask']) >> bit) & 1]
+    if f['name'] == 'SMIS':
+        expected = 'SMIS S{}, {{{}}}'.format(f['sd'], ', '.join(str(f['pos'] * sPartWidth + bit) for bit in bits))
+    else:
+        expected = 'SMIT T{}, {{{}}}'.format(f['td'], ', '.join('({},{})'.format(*edges[f['pos'] * tPartWidth + bit]) for bit in bits))
+    if text != expected:
+        print ("Decoded mask part '{}' differs from the disassembly '{}'.".format(expected, text))
+        exit(1)
+
+print ()
+print ("====================")
+print ("=                  =")
+print ("= ALL TESTS PASSED =")
+print ("=                  =")
+print ("====================")
@@ -0,0 +1,87 @@
+# This test is used to assert that instruction names are found regardless of
+# their case, that the kind of a misused instruction is reported, and that
+# the instruction names are updated when new quantum instructions are loaded.
+
+import os
+
+from qisa_as import QISA_Driver
+
+rootDir = os.path.dirname(os.path.realpath(__file__))
+
+layoutFilename = os.path.join(rootDir, 'quantum_layout_information.txt')
+
+print ("QISA_AS Version: ", QISA_Driver.getVersion())
+
+
+def assemble(driver, source):
+    if not driver.assembleString(source):
+        print ("Assembly terminated with errors:")
+        print (driver.getLastErrorMessage())
+        exit(1)
+
+    return driver.getInstructionsAsHexStrings(False)
+
+
+def check_error(driver, source, expectedMessage):
+    if driver.assembleString(source):
+        print ("Assembly of '{}' succeeded unexpectedly.".format(source.strip()))
+        exit(1)
+
+    if expectedMessage not in driver.getLastErrorMessage():
+        print ("Expected '{}' in the error message of '{}', got:".format(expectedMessage, source.strip()))
+        print (driver.getLastErrorMessage())
+        exit(1)
+
+
+driver = QISA_Driver()
+driver.read(layoutFilename)
+
+print ("Checking the case of instruction names")
+expected = assemble(driver, ".register s3 Sx\n.register t4 Tx\nbs 1 CW_01 s2 | CNOT t3\nbs 1 MEASZ Sx | CNOT Tx\nbs 1 QNOP\n")
+
+for source in (".register S3 sx\n.register T4 tx\nbs 1 cw_01 s2 | cnot t3\nbs 1 measz sx | cnot tx\nbs 1 qnop\n",
+               ".register s3 SX\n.register t4 TX\nbs 1 Cw_01 s2 | cNoT t3\nbs 1 MeasZ SX | CNot TX\nbs 1 QNop\n"):
+    if assemble(driver, source) != expected:
+        print ("The case of instruction names changes the instructions of '{}'".format(source))
+        exit(1)
+
+print ("Checking misused instructions")
+check_error(driver, "bs 1 qnop s1\n", "Instruction 'qnop' takes no parameters.")
+check_error(driver, "bs 1 cw_01 t1\n", "Instruction 'cw_01' needs an S-register argument.")
+check_error(driver, "bs 1 cnot s1\n", "Instruction 'cnot' needs a T-register argument.")
+check_error(driver, "bs 1 cnot\n", "Instruction 'cnot' needs a T-register argument.")
+check_error(driver, "bs 1 unknown s1\n", "opcode for 'unknown' not found")
+check_error(driver, "bs 1 qnop unknown\n", "opcode for quantum instruction 'qnop' not found")
+check_error(driver, "bs 1 cw_01\n", "Instruction 'cw_01' needs an S-register argument.")
+
+print ("Checking newly loaded quantum instructions")
+arg_none_map = {'QNOP': 0x00}
+arg_st_map = {'Gate_{}'.format(i): i for i in range(1, 128)}
+arg_tt_map = {'Pair_{}'.format(i): i for i in range(128, 256)}
+
+if not driver.loadQuantumInstructions(arg_none_map, arg_st_map, arg_tt_map):
+    print ("Loading quantum instructions terminated with errors:")
+    print (driver.getLastErrorMessage())
+    exit(1)
+
+source = "\n".join("bs 1 gate_{} s{} | PAIR_{} t{}".format(i, i % 32, 128 + i, i % 64)
+                   for i in range(1, 128))
+instructions = assemble(driver, source + "\n")
+
+for i, instruction in enumerate(instructions, 1):
+    value = int(instruction, 16)
+    # The first quantum instruction is in bits [3..16], the second one in [17..30],
+    # each with an 8 bit opcode above its register.
+    if ((value >> 9) & 0xff) != i or ((value >> 23) & 0xff) != 128 + i:
+        print ("Unexpected opcodes in instruction {}: {}".format(i, instruction))
+        exit(1)
+
+check_error(driver, "bs 1 cw_01 s1\n", "opcode for 'cw_01' not found")
+check_error(driver, "bs 1 gate_1 t1\n", "Instruction 'gate_1' needs an S-register argument.")
+
+print ()
+print ("====================")
+print ("=                  =")
+print ("= ALL TESTS PASSED =")
+print ("=                  =")
+print ("====================")
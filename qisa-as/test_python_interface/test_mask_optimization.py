@@ -0,0 +1,262 @@
+# This test is used to assert that the optimizations of SMIS and SMIT
+# instructions (see setOptimizations()) remove the instructions they should,
+# keep the branch offsets, labels and program templates correct, and do not
+# change the masks used by the quantum operations.
+
+import os
+import random
+import shutil
+import tempfile
+
+from qisa_as import QISA_Driver, QISA_ProgramTemplate, QISA_AssemblyCache, assemble_many
+
+rootDir = os.path.dirname(os.path.realpath(__file__))
+
+layoutFilename = os.path.join(rootDir, 'quantum_layout_information.txt')
+binaryFilename = os.path.join(rootDir, 'test_mask_optimization.out')
+
+print ("QISA_AS Version: ", QISA_Driver.getVersion())
+
+ALL = QISA_Driver.OPTIMIZE_REDUNDANT_MASKS | QISA_Driver.OPTIMIZE_MASK_REGISTER_REUSE
+
+driver = QISA_Driver()
+if not driver.read(layoutFilename):
+    print ("Reading '{}' failed: {}".format(layoutFilename, driver.getLastErrorMessage()))
+    exit(1)
+
+c = QISA_Driver.getEncodingConstants()
+classicOpcodes = driver.getClassicOpcodes()
+noneOps, stOps, ttOps = [{opcode: name for name, opcode in m.items()} for m in driver.getQuantumInstructions()]
+
+
+def assemble(source, optimizations):
+    driver.setOptimizations(optimizations)
+    if not driver.assembleString(source):
+        print ("Assembly of:\n{}\nfailed: {}".format(source, driver.getLastErrorMessage()))
+        exit(1)
+    return [int(word, 16) for word in driver.getInstructionsAsHexStrings(False)]
+
+
+def disassemble():
+    if not driver.save(binaryFilename) or not driver.disassemble(binaryFilename):
+        print ("Disassembly failed: {}".format(driver.getLastErrorMessage()))
+        exit(1)
+    return driver.getDisassemblyOutput()
+
+
+def quantum_operations(words):
+    """Run a program without branches, and return what it does: its quantum
+    bundles, with the masks that their operations use, and its other
+    classic instructions."""
+    registers = {}
+    result = []
+    for word in words:
+        if word & (1 << c['DBL_INST_FORMAT_BIT_OFFSET']):
+            ops = []
+            for offset in (c['VLIW_INST_0_OFFSET'], c['VLIW_INST_1_OFFSET']):
+                op = (word >> offset) & c['VLIW_Q_INST_MASK']
+                opcode = (op >> c['Q_INST_OPCODE_OFFSET']) & c['Q_INST_OPCODE_MASK']
+                if opcode in stOps:
+                    mask = tuple(registers.get(('S', op & c['Q_INST_SD_MASK'], pos)) for pos in range(4))
+                    ops.append((stOps[opcode], (op >> c['Q_INST_ST_COND_OFFSET']) & 1, mask))
+                elif opcode in ttOps:
+                    mask = tuple(registers.get(('T', op & c['Q_INST_TD_MASK'], pos)) for pos in range(4))
+                    ops.append((ttOps[opcode], mask))
+                else:
+                    ops.append(noneOps.get(opcode))
+            result.append((word & c['BS_MASK'], ops))
+            continue
+
+        opcode = (word >> c['OPCODE_OFFSET']) & c['OPCODE_MASK']
+        pos = (word >> c['POS_OFFSET']) & c['POS_MASK']
+        if opcode == classicOpcodes['SMIS']:
+            registers[('S', (word >> c['SD_OFFSET']) & c['SD_MASK'], pos)] = word & c['S_MASK_MASK']
+        elif opcode == classicOpcodes['SMIT']:
+            registers[('T', (word >> c['TD_OFFSET']) & c['TD_MASK'], pos)] = word & c['T_MASK_MASK']
+        else:
+            result.append(word)
+    return result
+
+
+def check(source, optimizations, expectedWords, expectedStats, expectedDisassembly=()):
+    words = assemble(source, optimizations)
+    stats = driver.getStats()
+    if len(words) != expectedWords:
+        print ("Expected {} instructions, got {}:\n{}".format(expectedWords, len(words), disassemble()))
+        exit(1)
+    for name, value in expectedStats.items():
+        if stats[name] != value:
+            print ("Unexpected statistics: {}, expected: {}".format(stats, expectedStats))
+            exit(1)
+    disassembly = disassemble()
+    for line in expectedDisassembly:
+        if line not in disassembly:
+            print ("'{}' is missing from the disassembly:\n{}".format(line, disassembly))
+            exit(1)
+    return disassembly
+
+
+loop = """
+        SMIS s0, {0, 1}
+        SMIS s1, {2}
+        SMIT t0, {(2, 0)}
+loop:   SMIS s0, {0, 1}
+        bs 1 CW_01 s0 | CNOT t0
+        SMIS s2, {2}
+        bs 1 CW_01 s2
+        SMIS s1, {2}
+        bs 1 CW_01 s1
+        SMIS s2, {3}
+        bs 1 CW_01 s2
+        SMIT t0, {(2, 0)}
+        BR EQ, loop
+        STOP
+"""
+
+print ("Checking that nothing is optimized by default")
+if driver.getOptimizations() != QISA_Driver.OPTIMIZE_NONE:
+    print ("Optimizations are enabled by default.")
+    exit(1)
+check(loop, QISA_Driver.OPTIMIZE_NONE, 18,
+      {'instructions_removed': 0, 'redundant_mask_writes': 0, 'reused_mask_registers': 0})
+
+print ("Checking the removal of redundant SMIS and SMIT instructions in a loop")
+# The SMIS and SMIT instructions in the loop set the masks that the registers
+# already hold, both when entering the loop and when repeating it.
+check(loop, QISA_Driver.OPTIMIZE_REDUNDANT_MASKS, 13,
+      {'instructions_removed': 5, 'redundant_mask_writes': 5, 'reused_mask_registers': 0},
+      ['label_0: BS 1 CW_01 S0 | CNOT T0', 'BR EQ, label_0 # offset(-6)', 'SMIS S2, {3}'])
+
+print ("Checking the reuse of a register that already holds a mask")
+# S1 is set to the mask that S2 already holds, and is not used after the
+# loop body, so CW_01 can use S2 instead.
+disassembly = check(loop, QISA_Driver.OPTIMIZE_MASK_REGISTER_REUSE, 17,
+                    {'instructions_removed': 1, 'redundant_mask_writes': 0, 'reused_mask_registers': 1},
+                    ['BR EQ, label_0 # offset(-10)'])
+if 'CW_01 S1' in disassembly:
+    print ("S1 has not been replaced by S2:\n{}".format(disassembly))
+    exit(1)
+
+check(loop, ALL, 13, {'instructions_removed': 5, 'redundant_mask_writes': 4, 'reused_mask_registers': 1})
+
+print ("Checking that masks are only known if they are the same on all paths")
+check("""
+        SMIS s0, {0}
+        BR EQ, skip
+        SMIS s0, {1}
+skip:   SMIS s0, {0}
+        bs 1 CW_01 s0
+""", ALL, 5, {'instructions_removed': 0})
+
+# Only the first part of the t_mask changes, the other two are empty.
+check("""
+        SMIS s0, {0}
+        SMIT t0, {(2, 0)}
+        BR EQ, skip
+        SMIS s0, {0}
+skip:   SMIS s0, {0}
+        SMIT t0, {(1, 4)}
+        bs 1 CW_01 s0 | CNOT t0
+        BR ALWAYS, skip
+""", QISA_Driver.OPTIMIZE_REDUNDANT_MASKS, 8, {'instructions_removed': 4},
+      ['BR EQ, label_0 # offset(+1)', 'label_0: SMIT T0, {(1,4)}', 'BR ALWAYS, label_0 # offset(-2)'])
+
+print ("Checking that a register is not reused if its mask is needed later")
+check("""
+        SMIS s0, {2}
+        SMIS s1, {2}
+        bs 1 CW_01 s1
+        BR EQ, next
+next:   bs 1 CW_01 s1
+""", ALL, 5, {'reused_mask_registers': 0})
+
+check("""
+        SMIS s0, {2}
+        SMIS s1, {2}
+        bs 1 CW_01 s1
+        SMIS s0, {3}
+        bs 1 CW_01 s1
+""", ALL, 5, {'reused_mask_registers': 0})
+
+print ("Checking a program template of an optimized program")
+source = """
+.def_sym wait_time 10
+        SMIS s0, {0}
+        SMIS s0, {0}
+        QWAIT wait_time
+        SMIS s0, {0}
+        LDI r0, wait_time
+"""
+if len(assemble(source, ALL)) != 3:
+    print ("The redundant SMIS instructions have not been removed.")
+    exit(1)
+template = QISA_ProgramTemplate()
+if not driver.getProgramTemplate(template):
+    print ("Creating a template failed: {}".format(driver.getLastErrorMessage()))
+    exit(1)
+assemble(source.replace('10', '1000'), ALL)
+if template.instantiate({'wait_time': 1000}) != driver.getInstructionsAsBytes():
+    print ("The template of an optimized program does not match the optimized program.")
+    exit(1)
+
+print ("Checking that optimizations are part of the assembly cache key")
+cacheDir = tempfile.mkdtemp()
+try:
+    cache = QISA_AssemblyCache(cacheDir)
+    driver.setCache(cache)
+    for optimizations, expectedWords in [(QISA_Driver.OPTIMIZE_NONE, 18), (ALL, 13), (QISA_Driver.OPTIMIZE_NONE, 18)]:
+        if len(assemble(loop, optimizations)) != expectedWords:
+            print ("The assembly cache returned a program with other optimizations.")
+            exit(1)
+    if not driver.getStats()['cache_hit']:
+        print ("The unoptimized program has not been taken from the cache.")
+        exit(1)
+    driver.setCache(None)
+finally:
+    shutil.rmtree(cacheDir)
+
+print ("Checking that the workers of assemble_many() apply the optimizations")
+driver.setOptimizations(ALL)
+results = assemble_many([loop.encode()], driver, workers=1)
+if not results[0].success or len(results[0].instructions) != 13 * 4:
+    print ("Unexpected result of assemble_many(): {}".format(results))
+    exit(1)
+
+print ("Checking that random programs use the same masks after optimization")
+rng = random.Random(22)
+sMasks = ['{0}', '{1}', '{0, 1}', '{2, 5}']
+tMasks = ['{(2, 0)}', '{(1, 4)}', '{(2, 0), (1, 4)}']
+nrOfRemoved = 0
+for programNr in range(200):
+    lines = []
+    for lineNr in range(40):
+        kind = rng.randrange(5)
+        if kind == 0:
+            lines.append('SMIS s{}, {}'.format(rng.randrange(4), rng.choice(sMasks)))
+        elif kind == 1:
+            lines.append('SMIT t{}, {}'.format(rng.randrange(3), rng.choice(tMasks)))
+        elif kind == 2:
+            lines.append('label{}: ADD r1, r1, r1'.format(lineNr))
+        else:
+            lines.append('bs {} CW_01 s{} | CNOT t{}'.format(rng.randrange(4), rng.randrange(4), rng.randrange(3)))
+    source = '\n'.join(lines) + '\n'
+
+    expected = quantum_operations(assemble(source, QISA_Driver.OPTIMIZE_NONE))
+    for optimizations in [QISA_Driver.OPTIMIZE_REDUNDANT_MASKS, QISA_Driver.OPTIMIZE_MASK_REGISTER_REUSE, ALL]:
+        if quantum_operations(assemble(source, optimizations)) != expected:
+            print ("Optimizations {} changed the program:\n{}".format(optimizations, source))
+            exit(1)
+        nrOfRemoved += driver.getStats()['instructions_removed']
+
+if nrOfRemoved == 0:
+    print ("No instructions have been removed from the random programs.")
+    exit(1)
+
+os.remove(binaryFilename)
+
+print ()
+print ("====================")
+print ("=                  =")
+print ("= ALL TESTS PASSED =")
+print ("=                  =")
+print ("====================")
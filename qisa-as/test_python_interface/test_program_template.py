@@ -0,0 +1,210 @@
+# This test is used to assert that instantiating a program template gives
+# the same results as assembling the program again with other symbol values,
+# and that the same range checks are done.
+
+import os
+import shutil
+import tempfile
+
+from qisa_as import QISA_Driver, QISA_ProgramTemplate, QISA_AssemblyCache
+
+rootDir = os.path.dirname(os.path.realpath(__file__))
+
+layoutFilename = os.path.join(rootDir, 'quantum_layout_information.txt')
+
+print ("QISA_AS Version: ", QISA_Driver.getVersion())
+
+source_template = """
+.def_sym wait_time  {wait_time}
+.def_sym amplitude  {amplitude}
+.def_sym upper      {upper}
+.def_sym big        {big}
+.def_sym unused     7
+
+start:
+    LDI   r0, amplitude
+    LDUI  r1, upper
+    QWAIT wait_time
+    MOV   r2, amplitude
+    MOV   r3, big
+    QWAIT 10
+    QWAIT WAIT_TIME
+    BR    always, start
+"""
+
+defaults = {'wait_time': 100, 'amplitude': -5, 'upper': 3, 'big': 1 << 20}
+
+
+def assemble(driver, parameters):
+    values = dict(defaults)
+    values.update(parameters)
+    if not driver.assembleString(source_template.format(**values)):
+        print ("Assembly terminated with errors:")
+        print (driver.getLastErrorMessage())
+        exit(1)
+    return driver.getInstructionsAsBytes()
+
+
+driver = QISA_Driver()
+driver.read(layoutFilename)
+
+template = QISA_ProgramTemplate()
+
+print ("Creating a template before anything has been assembled, which should fail")
+if driver.getProgramTemplate(template):
+    print ("Creating a template without an assembled program succeeded unexpectedly.")
+    exit(1)
+
+instBytes_orig = assemble(driver, {})
+
+print ("Creating a template")
+if not driver.getProgramTemplate(template):
+    print ("Creating a template failed:")
+    print (driver.getLastErrorMessage())
+    exit(1)
+
+if template.getParameters() != defaults:
+    print ("Unexpected template parameters: {}".format(template.getParameters()))
+    exit(1)
+
+if template.getNrOfInstructions() * 4 != len(instBytes_orig):
+    print ("Unexpected number of instructions in the template.")
+    exit(1)
+
+# LDI, LDUI, QWAIT, MOV (direct), MOV (split in two fields) and QWAIT.
+if len(template.getFields()) != 7:
+    print ("Unexpected template fields: {}".format(template.getFields()))
+    exit(1)
+
+print ("Instantiating the template with its default values")
+if template.instantiate({}) != instBytes_orig:
+    print ("Differences detected when instantiating with default values.")
+    exit(1)
+
+parameter_sets = [
+    {'wait_time': 0},
+    {'wait_time': (1 << 20) - 1, 'amplitude': 1234},
+    {'amplitude': -(1 << 19) + 1, 'upper': (1 << 15) - 1},
+    {'big': -(1 << 31) + 1},
+    {'big': (1 << 31) - 1, 'Wait_Time': 42},
+]
+
+print ("Instantiating the template with other values")
+for parameters in parameter_sets:
+    expected = assemble(driver, {name.lower(): value for name, value in parameters.items()})
+    if template.instantiate(parameters) != expected:
+        print ("Differences detected when instantiating with {}.".format(parameters))
+        exit(1)
+
+print ("Checking that out of range values are rejected")
+invalid_parameter_sets = [
+    {'wait_time': -1},
+    {'wait_time': 1 << 20},
+    {'amplitude': 1 << 19},
+    {'upper': 1 << 15},
+    {'big': 1 << 31},
+    # Would change MOV into a single LDI instruction.
+    {'big': 5},
+    # Unknown parameter.
+    {'unused': 3},
+    {'no_such_parameter': 3},
+]
+
+for parameters in invalid_parameter_sets:
+    if template.instantiate(parameters) is not None:
+        print ("Instantiating with {} succeeded unexpectedly.".format(parameters))
+        exit(1)
+    if not template.getLastErrorMessage():
+        print ("No error message when instantiating with {}.".format(parameters))
+        exit(1)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+if numpy is None:
+    print ("numpy not found, skipping instantiateMany() tests")
+else:
+    print ("Instantiating the template for many values at once")
+    nrOfPrograms = 1000
+    wait_times = numpy.arange(nrOfPrograms) * 1000
+    amplitudes = numpy.linspace(-1000, 1000, nrOfPrograms).astype(numpy.int64)
+
+    programs = template.instantiateMany({'wait_time': wait_times,
+                                         'amplitude': amplitudes,
+                                         'upper': 5})
+
+    if programs is None:
+        print ("instantiateMany() failed:")
+        print (template.getLastErrorMessage())
+        exit(1)
+
+    if programs.shape != (nrOfPrograms, template.getNrOfInstructions()) or programs.dtype != numpy.uint32:
+        print ("Unexpected result of instantiateMany(): shape={}, dtype={}".format(programs.shape,
+                                                                                   programs.dtype))
+        exit(1)
+
+    for i in range(0, nrOfPrograms, 97):
+        expected = assemble(driver, {'wait_time': int(wait_times[i]),
+                                     'amplitude': int(amplitudes[i]),
+                                     'upper': 5})
+        if programs[i].tobytes() != expected:
+            print ("Differences detected in program {} of instantiateMany().".format(i))
+            exit(1)
+
+    print ("Checking that instantiateMany() rejects out of range values")
+    if template.instantiateMany({'wait_time': numpy.array([0, 1, 1 << 20])}) is not None:
+        print ("instantiateMany() with an out of range value succeeded unexpectedly.")
+        exit(1)
+
+    if 'program 2' not in template.getLastErrorMessage():
+        print ("Unexpected error message: {}".format(template.getLastErrorMessage()))
+        exit(1)
+
+    try:
+        template.instantiateMany({'wait_time': numpy.array([0.5])})
+        print ("instantiateMany() with floating point values succeeded unexpectedly.")
+        exit(1)
+    except TypeError:
+        pass
+
+print ("Creating a template of a program that has been taken from the cache")
+cacheDir = tempfile.mkdtemp()
+
+try:
+    cache = QISA_AssemblyCache(cacheDir)
+    driver.setCache(cache)
+
+    assemble(driver, {})
+    instBytes_cached = assemble(driver, {})
+
+    if cache.getHits() != 1:
+        print ("Expected a cache hit.")
+        exit(1)
+
+    cachedTemplate = QISA_ProgramTemplate()
+    if not driver.getProgramTemplate(cachedTemplate):
+        print ("Creating a template from a cached program failed:")
+        print (driver.getLastErrorMessage())
+        exit(1)
+
+    if (cachedTemplate.getFields() != template.getFields() or
+        cachedTemplate.instantiate({}) != instBytes_cached):
+        print ("Differences detected in the template of a cached program.")
+        exit(1)
+
+    if driver.getInstructionsAsBytes() != instBytes_cached:
+        print ("Creating a template changed the assembled program.")
+        exit(1)
+
+finally:
+    driver.setCache(None)
+    shutil.rmtree(cacheDir)
+
+print ()
+print ("====================")
+print ("=                  =")
+print ("= ALL TESTS PASSED =")
+print ("=                  =")
+print ("====================")
@@ -0,0 +1,124 @@
+# This test is used to assert that multiple QISA_Driver instances can be
+# used concurrently from different threads, and that they produce exactly the
+# same results as a single driver that runs on its own.
+
+import sys
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from qisa_as import QISA_Driver, assemble_many
+
+rootDir = os.path.dirname(os.path.realpath(__file__))
+
+inputFilename = os.path.join(rootDir, 'qisa_test_assembly/test_assembly.qisa')
+layoutFilename = os.path.join(rootDir, 'quantum_layout_information.txt')
+
+# All output files are written to a temporary directory, which is removed
+# when the test ends, also if it fails.
+outputDir = tempfile.TemporaryDirectory()
+
+NR_OF_THREADS = 8
+NR_OF_ITERATIONS = 50
+
+# Source code with an error on a known line. Error locations are tracked by
+# the scanner, so concurrent scanners must not mix up their locations.
+with open(inputFilename, 'r') as f:
+    source = f.read()
+
+erroneousSource = source + "\nunknown_instruction r1\n"
+
+
+def create_driver():
+    driver = QISA_Driver()
+    driver.read(layoutFilename)
+    driver.setVerbose(False)
+    return driver
+
+
+def assemble_and_disassemble(driver, outputFilename):
+    """Return the results of an assemble/save/disassemble cycle."""
+    if not driver.assemble(inputFilename):
+        return None
+
+    instructions = driver.getInstructionsAsBytes()
+
+    if not driver.save(outputFilename):
+        return None
+
+    if not driver.disassemble(outputFilename):
+        return None
+
+    disassembly = driver.getDisassemblyOutput()
+
+    driver.assembleString(erroneousSource)
+    errorMessage = driver.getLastErrorMessage()
+
+    return (instructions, disassembly, errorMessage)
+
+
+print ("QISA_AS Version: ", QISA_Driver.getVersion())
+
+print ("Init: Creating reference results using a single driver")
+reference = assemble_and_disassemble(create_driver(), os.path.join(outputDir.name, 'test_assembly_threads.out'))
+
+if reference is None:
+    print ("Failed to create reference results.")
+    exit(1)
+
+
+def worker(threadId):
+    driver = create_driver()
+    outputFilename = os.path.join(outputDir.name, 'test_assembly_thread_{}.out'.format(threadId))
+
+    try:
+        for iteration in range(NR_OF_ITERATIONS):
+            if assemble_and_disassemble(driver, outputFilename) != reference:
+                return False
+    finally:
+        if os.path.exists(outputFilename):
+            os.remove(outputFilename)
+
+    return True
+
+
+print ("Running {} drivers in {} threads, {} iterations each".format(
+    NR_OF_THREADS, NR_OF_THREADS, NR_OF_ITERATIONS))
+sys.stdout.flush()
+
+with ThreadPoolExecutor(max_workers=NR_OF_THREADS) as executor:
+    results = list(executor.map(worker, range(NR_OF_THREADS)))
+
+if not all(results):
+    print ("Differences detected in the results of threads: {}".format(
+        [threadId for threadId, result in enumerate(results) if not result]))
+    exit(1)
+
+# The batch interface uses a native worker pool, and must give the same
+# results, in input order.
+print ("Assembling {} programs using assemble_many()".format(2 * NR_OF_ITERATIONS))
+sys.stdout.flush()
+
+sources = [inputFilename, erroneousSource.encode()] * NR_OF_ITERATIONS
+results = assemble_many(sources, create_driver(), workers=NR_OF_THREADS)
+
+if len(results) != len(sources):
+    print ("Unexpected number of results from assemble_many().")
+    exit(1)
+
+for index, result in enumerate(results):
+    if index % 2 == 0:
+        expected = (True, reference[0], '')
+    else:
+        expected = (False, b'', reference[2])
+
+    if tuple(result) != expected:
+        print ("Differences detected in the result of assemble_many() for source {}.".format(index))
+        exit(1)
+
+print ()
+print ("====================")
+print ("=                  =")
+print ("= ALL TESTS PASSED =")
+print ("=                  =")
+print ("====================")
@@ -0,0 +1,218 @@
+# This test is used to assert that the quantum layout information is
+# validated when it is read, that larger devices can be loaded, and that
+# s_masks and t_masks are encoded into (and disassembled from) as many
+# SMIS and SMIT instructions as the device needs.
+
+import os
+import tempfile
+
+from qisa_as import QISA_Driver
+
+rootDir = os.path.dirname(os.path.realpath(__file__))
+
+layoutFilename = os.path.join(rootDir, 'quantum_layout_information.txt')
+
+
+def layout_text(nrOfQubits, edges, nrOfEdges=None):
+    """Return the contents of a quantum layout information file."""
+    if nrOfEdges is None:
+        nrOfEdges = len(edges)
+    lines = ['.NumQubits', str(nrOfQubits), '.EndNumQubits',
+             '.NumDirEdge', str(nrOfEdges), '.EndNumDirEdge',
+             '.EdgeList']
+    lines += ['{}: {}, {}'.format(i, t, c) for i, (t, c) in enumerate(edges)]
+    lines += ['.EndEdgeList', '']
+    return '\n'.join(lines)
+
+
+def line_edges(nrOfQubits):
+    """Edges of qubits on a line: first all pairs (i, i+1), then all pairs (i+1, i)."""
+    return ([(i, i + 1) for i in range(nrOfQubits - 1)] +
+            [(i + 1, i) for i in range(nrOfQubits - 1)])
+
+
+def grid_edges(nrOfRows, nrOfColumns):
+    """Edges, in both directions, between neighbouring qubits on a grid."""
+    edges = []
+    for row in range(nrOfRows):
+        for column in range(nrOfColumns):
+            qubit = row * nrOfColumns + column
+            if column + 1 < nrOfColumns:
+                edges += [(qubit, qubit + 1), (qubit + 1, qubit)]
+            if row + 1 < nrOfRows:
+                edges += [(qubit, qubit + nrOfColumns), (qubit + nrOfColumns, qubit)]
+    return edges
+
+
+def read_layout(driver, text):
+    filename = os.path.join(tmpDir, 'layout.txt')
+    with open(filename, 'w') as f:
+        f.write(text)
+    return driver.read(filename)
+
+
+def assemble(driver, source):
+    if not driver.assembleString(source):
+        print ("Assembly of '{}' failed: {}".format(source.strip(), driver.getLastErrorMessage()))
+        exit(1)
+    return list(driver.getInstructionsAsHexStrings(False))
+
+
+def disassemble(driver):
+    binaryFilename = os.path.join(tmpDir, 'program.bin')
+    if not driver.save(binaryFilename) or not driver.disassemble(binaryFilename):
+        print ("Disassembly failed: {}".format(driver.getLastErrorMessage()))
+        exit(1)
+    return driver.getDisassemblyOutput()
+
+
+print ("QISA_AS Version: ", QISA_Driver.getVersion())
+
+with tempfile.TemporaryDirectory() as tmpDir:
+    driver = QISA_Driver()
+
+    if not driver.read(layoutFilename):
+        print ("Reading '{}' failed: {}".format(layoutFilename, driver.getLastErrorMessage()))
+        exit(1)
+
+    if (driver.getTarget().getNrOfQubits() != 7) or (driver.getTarget().getNrOfEdges() != 16):
+        print ("Unexpected layout read from '{}'.".format(layoutFilename))
+        exit(1)
+
+    print ("Checking invalid quantum layout information")
+    edgeList = '.EdgeList\n{}\n.EndEdgeList\n'
+    counts = '.NumQubits\n3\n.EndNumQubits\n.NumDirEdge\n2\n.EndNumDirEdge\n'
+
+    invalidLayouts = [
+        ('', 'number of qubits has not been specified'),
+        ('.NumQubits\n3\n.EndNumQubits\n', 'number of edges has not been specified'),
+        ('.NumQubits\n0\n.EndNumQubits\n.NumDirEdge\n0\n.EndNumDirEdge\n', 'at least 1'),
+        ('.NumQubits\n70000\n.EndNumQubits\n', 'too high'),
+        ('.NumQubits\nthree\n.EndNumQubits\n', 'Invalid number of qubits on line[2]'),
+        ('.NumQubits\n3\n', 'is not ended by'),
+        ('.NumQubits\n3\n.NumDirEdge\n', "Unexpected '.NumDirEdge' on line[3]"),
+        ('.Qubits\n', "Unknown section '.Qubits'"),
+        ('3\n', 'outside of a section'),
+        (counts + edgeList.format('0: 0 1'), 'Badly formed edge on line[8]'),
+        (counts + edgeList.format('0: 0, 1\n1: 1, 0\n2: 1, 2'), 'More edges have been specified'),
+        (counts + edgeList.format('0: 0, 1\n2: 1, 0'), 'Edge number (2) on line[9] is out of range'),
+        (counts + edgeList.format('0: 0, 1\n0: 1, 0'), 'has already been used on line[8]'),
+        (counts + edgeList.format('0: 0, 1\n1: 1, 3'), 'Qubit number (3) of edge 1'),
+        (counts + edgeList.format('0: 0, 1\n1: 1, 1'), 'connects qubit 1 to itself'),
+        (counts + edgeList.format('1: 0, 1\n0: 0, 1'), 'has already been specified on line[8]'),
+        (counts + edgeList.format('1: 0, 1'), 'Edge number 0 has not been specified'),
+    ]
+
+    for text, expectedError in invalidLayouts:
+        if read_layout(driver, text):
+            print ("Invalid quantum layout information was accepted:\n{}".format(text))
+            exit(1)
+        if expectedError not in driver.getLastErrorMessage():
+            print ("Unexpected error message for quantum layout information:\n{}\n{}".format(
+                   text, driver.getLastErrorMessage()))
+            exit(1)
+        if driver.getTarget().getNrOfQubits() != 7:
+            print ("Invalid quantum layout information changed the target.")
+            exit(1)
+
+    if driver.read(os.path.join(tmpDir, 'does_not_exist.txt')):
+        print ("Reading a non-existing file did not fail.")
+        exit(1)
+
+    print ("Checking a t_mask of the reference layout")
+    if len(assemble(driver, 'SMIT t0, {(2, 0), (1, 4)}\n')) != 3:
+        print ("A t_mask of 16 edges is not encoded in 3 SMIT instructions.")
+        exit(1)
+
+    print ("Checking a layout of 300 qubits")
+    if not read_layout(driver, layout_text(300, grid_edges(15, 20))):
+        print ("Reading a layout of 300 qubits failed: {}".format(driver.getLastErrorMessage()))
+        exit(1)
+
+    if (driver.getTarget().getNrOfQubits() != 300) or (driver.getTarget().getNrOfEdges() != 1130):
+        print ("Unexpected layout of 300 qubits.")
+        exit(1)
+
+    if driver.assembleString('SMIS s0, {299}\n') or 'cannot be encoded' not in driver.getLastErrorMessage():
+        print ("An s_mask that cannot be encoded did not fail: {}".format(driver.getLastErrorMessage()))
+        exit(1)
+
+    if driver.assembleString('SMIS s0, {300}\n') or 'Valid range: [0-299]' not in driver.getLastErrorMessage():
+        print ("An invalid qubit did not fail: {}".format(driver.getLastErrorMessage()))
+        exit(1)
+
+    # Qubit numbers used to be truncated to 8 bits, which made (256, 20) the valid pair (0, 20).
+    if driver.assembleString('SMIT t0, {(256, 20)}\n') or 'invalid target-control pair' not in driver.getLastErrorMessage():
+        print ("An invalid target-control pair did not fail: {}".format(driver.getLastErrorMessage()))
+        exit(1)
+
+    if driver.assembleString('SMIT t0, {(280, 281)}\n') or 'cannot be encoded' not in driver.getLastErrorMessage():
+        print ("A t_mask that cannot be encoded did not fail: {}".format(driver.getLastErrorMessage()))
+        exit(1)
+
+    print ("Checking a t_mask of 50 edges")
+    if not read_layout(driver, layout_text(26, line_edges(26))):
+        print ("Reading a layout of 50 edges failed: {}".format(driver.getLastErrorMessage()))
+        exit(1)
+
+    # Edges 0, 24 and 45.
+    instructions = assemble(driver, 'SMIT t1, {(0, 1), (24, 25), (21, 20)}\n')
+
+    if instructions != ['0x50080001', '0x500a0100', '0x500c2000', '0x500e0000']:
+        print ("Unexpected encoding of a t_mask of 50 edges: {}".format(instructions))
+        exit(1)
+
+    disassembly = disassemble(driver)
+    for part in ['SMIT T1, {(0,1)}', 'SMIT T1, {(24,25)}', 'SMIT T1, {(21,20)}', 'SMIT T1, {}']:
+        if part not in disassembly:
+            print ("Part '{}' of the t_mask is missing from the disassembly:\n{}".format(part, disassembly))
+            exit(1)
+
+    invalidTMasks = [
+        ('{(21, 20), (24, 25), (21, 20)}', 'duplicate entry in t_mask: (21,20)'),
+        ('{(21, 20), (24, 25), (20, 19)}', "qubit '20' is used in more than one target-control pair"),
+        ('{(21, 20), (24, 25), (22, 21)}', "qubit '21' is used in more than one target-control pair"),
+        ('{(21, 20), (24, 25), (25, 24)}', "qubits '25' and '24' are used in more than one target-control pair"),
+    ]
+
+    for t_mask, expectedError in invalidTMasks:
+        if driver.assembleString('SMIT t1, {}\n'.format(t_mask)) or expectedError not in driver.getLastErrorMessage():
+            print ("Unexpected result for t_mask {}: {}".format(t_mask, driver.getLastErrorMessage()))
+            exit(1)
+
+    print ("Checking an s_mask of 26 qubits")
+    instructions = assemble(driver, 'SMIS s2, {0, 18, 25}\n')
+
+    if instructions != ['0x40200001', '0x40220102']:
+        print ("Unexpected encoding of an s_mask of 26 qubits: {}".format(instructions))
+        exit(1)
+
+    disassembly = disassemble(driver)
+    for part in ['SMIS S2, {0}', 'SMIS S2, {18, 25}']:
+        if part not in disassembly:
+            print ("Part '{}' of the s_mask is missing from the disassembly:\n{}".format(part, disassembly))
+            exit(1)
+
+    print ("Checking the maximum number of qubits in an s_mask")
+    if not read_layout(driver, layout_text(68, [])):
+        print ("Reading a layout of 68 qubits failed: {}".format(driver.getLastErrorMessage()))
+        exit(1)
+
+    if len(assemble(driver, 'SMIS s0, {0, 67}\n')) != 4:
+        print ("An s_mask of 68 qubits is not encoded in 4 SMIS instructions.")
+        exit(1)
+
+    if not read_layout(driver, layout_text(69, [])):
+        print ("Reading a layout of 69 qubits failed: {}".format(driver.getLastErrorMessage()))
+        exit(1)
+
+    if driver.assembleString('SMIS s0, {0}\n'):
+        print ("An s_mask of 69 qubits did not fail.")
+        exit(1)
+
+print ()
+print ("====================")
+print ("=                  =")
+print ("= ALL TESTS PASSED =")
+print ("=                  =")
+print ("====================")
@@ -0,0 +1,151 @@
+# This test is used to assert that the statistics returned by getStats()
+# describe the last assembly or disassembly, and the saving of its output.
+
+import os
+import shutil
+import tempfile
+
+from qisa_as import QISA_Driver, QISA_AssemblyCache
+
+rootDir = os.path.dirname(os.path.realpath(__file__))
+
+inputFilename = os.path.join(rootDir, 'qisa_test_assembly/test_assembly.qisa')
+layoutFilename = os.path.join(rootDir, 'quantum_layout_information.txt')
+
+print ("QISA_AS Version: ", QISA_Driver.getVersion())
+
+TIMINGS = ['total_seconds', 'cache_lookup_seconds', 'parse_seconds', 'mask_validation_seconds',
+           'deferred_instructions_seconds', 'optimization_seconds', 'disassembly_labels_seconds',
+           'save_seconds']
+
+
+def check_stats(driver, expected):
+    stats = driver.getStats()
+
+    for name in TIMINGS:
+        if stats[name] < 0:
+            print ("Negative time in statistics: {}".format(stats))
+            exit(1)
+
+    if stats['parse_seconds'] > stats['total_seconds'] or \
+       stats['mask_validation_seconds'] > stats['parse_seconds']:
+        print ("Inconsistent times in statistics: {}".format(stats))
+        exit(1)
+
+    for name, value in expected.items():
+        if stats[name] != value:
+            print ("Unexpected statistics: {}, expected: {}".format(stats, expected))
+            exit(1)
+
+    return stats
+
+
+driver = QISA_Driver()
+driver.read(layoutFilename)
+
+tmpDir = tempfile.mkdtemp()
+
+try:
+    print ("Checking the statistics of an assembly")
+    if not driver.assemble(inputFilename):
+        print ("Assembly terminated with errors:")
+        print (driver.getLastErrorMessage())
+        exit(1)
+
+    nrOfInstructions = len(driver.getInstructionsAsBytes()) // 4
+
+    with open(inputFilename, 'r') as f:
+        source = f.read()
+
+    stats = check_stats(driver, {'instructions': nrOfInstructions,
+                                 'bytes_read': os.path.getsize(inputFilename),
+                                 'bytes_written': 0,
+                                 'cache_hit': False,
+                                 'cache_lookup_seconds': 0.0,
+                                 'labels': 4,
+                                 'bundles': 13,
+                                 'deferred_labels': 2})
+
+    if stats['tokens'] == 0 or stats['parse_seconds'] == 0:
+        print ("Missing scanner statistics: {}".format(stats))
+        exit(1)
+
+    print ("Checking the statistics of saving")
+    binaryFilename = os.path.join(tmpDir, 'program.bin')
+    if not driver.save(binaryFilename):
+        print ("Saving terminated with errors:")
+        print (driver.getLastErrorMessage())
+        exit(1)
+
+    # Saving does not change the statistics of the assembly itself.
+    check_stats(driver, {'instructions': nrOfInstructions,
+                         'tokens': stats['tokens'],
+                         'bytes_written': os.path.getsize(binaryFilename)})
+
+    print ("Checking the statistics of an assembly from memory")
+    if not driver.assembleString(source):
+        print ("Assembly terminated with errors:")
+        print (driver.getLastErrorMessage())
+        exit(1)
+
+    check_stats(driver, {'instructions': nrOfInstructions,
+                         'tokens': stats['tokens'],
+                         'bytes_read': len(source.encode()),
+                         'bytes_written': 0,
+                         'save_seconds': 0.0})
+
+    print ("Checking the statistics of a failed assembly")
+    if driver.assembleString("start:\n    BR always, nowhere\n"):
+        print ("Assembly of an undefined label succeeded unexpectedly.")
+        exit(1)
+
+    check_stats(driver, {'labels': 1, 'deferred_labels': 1, 'bundles': 0})
+
+    print ("Checking the statistics of a cache hit")
+    cache = QISA_AssemblyCache(os.path.join(tmpDir, 'cache'))
+    driver.setCache(cache)
+    for cacheHit in (False, True):
+        if not driver.assemble(inputFilename):
+            print ("Assembly terminated with errors:")
+            print (driver.getLastErrorMessage())
+            exit(1)
+
+        # On a cache hit, nothing is parsed.
+        check_stats(driver, {'cache_hit': cacheHit,
+                             'instructions': nrOfInstructions,
+                             'bytes_read': os.path.getsize(inputFilename),
+                             'tokens': 0 if cacheHit else stats['tokens']})
+    driver.setCache(None)
+
+    for streaming in (False, True):
+        print ("Checking the statistics of a disassembly, streaming = {}".format(streaming))
+        driver.enableStreamingDisassembly(streaming)
+        if not driver.disassemble(binaryFilename):
+            print ("Disassembly terminated with errors:")
+            print (driver.getLastErrorMessage())
+            exit(1)
+
+        check_stats(driver, {'instructions': nrOfInstructions,
+                             'bytes_read': os.path.getsize(binaryFilename),
+                             'tokens': 0,
+                             'parse_seconds': 0.0,
+                             'labels': sum(1 for address in range(nrOfInstructions)
+                                           if driver.getDisassembledInstruction(address)[0])})
+
+        outputFilename = os.path.join(tmpDir, 'program.dis')
+        if not driver.save(outputFilename):
+            print ("Saving terminated with errors:")
+            print (driver.getLastErrorMessage())
+            exit(1)
+
+        check_stats(driver, {'bytes_written': os.path.getsize(outputFilename)})
+
+finally:
+    shutil.rmtree(tmpDir)
+
+print ()
+print ("====================")
+print ("=                  =")
+print ("= ALL TESTS PASSED =")
+print ("=                  =")
+print ("====================")
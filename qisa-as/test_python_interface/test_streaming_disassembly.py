@@ -0,0 +1,166 @@
+# This test is used to assert that streaming disassembly gives the same
+# output as normal disassembly, and that errors are reported while streaming.
+
+import os
+import struct
+import tempfile
+
+from qisa_as import QISA_Driver
+
+rootDir = os.path.dirname(os.path.realpath(__file__))
+
+inputFilename = os.path.join(rootDir, 'qisa_test_assembly/test_assembly.qisa')
+layoutFilename = os.path.join(rootDir, 'quantum_layout_information.txt')
+
+print ("QISA_AS Version: ", QISA_Driver.getVersion())
+
+driver = QISA_Driver()
+driver.read(layoutFilename)
+
+if not driver.assemble(inputFilename):
+    print ("Assembly terminated with errors:")
+    print (driver.getLastErrorMessage())
+    exit(1)
+
+program = driver.getInstructionsAsBytes()
+
+streamingDriver = QISA_Driver()
+streamingDriver.read(layoutFilename)
+streamingDriver.enableStreamingDisassembly(True)
+
+tmpDir = tempfile.mkdtemp()
+
+
+def write_binary(name, data):
+    filename = os.path.join(tmpDir, name)
+    with open(filename, 'wb') as f:
+        f.write(data)
+    return filename
+
+
+def read_text(filename):
+    with open(filename) as f:
+        return f.read()
+
+
+# Branch offsets are relative, so a repeated program stays valid.
+# The repeated program has enough labels to need more digits per label.
+binaryFilename = write_binary('program.bin', program * 50)
+
+# Insert an instruction with an unused opcode.
+badInstruction = struct.pack('I', 0x04000000)
+badBinaryFilename = write_binary('bad.bin', program[:40] + badInstruction + program[40:])
+
+emptyFilename = write_binary('empty.bin', b'')
+
+try:
+    for formatId in (1, 2):
+        print ("Comparing streaming and normal disassembly with output format {}".format(formatId))
+        driver.setDisassemblyFormat(formatId)
+        streamingDriver.setDisassemblyFormat(formatId)
+
+        if not driver.disassemble(binaryFilename) or not streamingDriver.disassemble(binaryFilename):
+            print ("Disassembly terminated with errors:")
+            print (driver.getLastErrorMessage())
+            print (streamingDriver.getLastErrorMessage())
+            exit(1)
+
+        expected = driver.getDisassemblyOutput()
+
+        if streamingDriver.getDisassemblyOutput() != expected:
+            print ("Differences detected in getDisassemblyOutput().")
+            exit(1)
+
+        for linesPerChunk in (1, 7, 4096):
+            for d in (driver, streamingDriver):
+                if list(d.iterDisassemblyOutput(linesPerChunk)) != expected.splitlines():
+                    print ("Differences detected in iterDisassemblyOutput({}).".format(linesPerChunk))
+                    exit(1)
+
+        outputFilename = os.path.join(tmpDir, 'program.dis')
+        if not streamingDriver.save(outputFilename):
+            print ("Saving terminated with errors:")
+            print (streamingDriver.getLastErrorMessage())
+            exit(1)
+
+        if read_text(outputFilename) != expected:
+            print ("Differences detected in the saved disassembly.")
+            exit(1)
+
+    print ("Checking random access to disassembled instructions")
+    driver.setDisassemblyFormat(1)
+    streamingDriver.setDisassemblyFormat(1)
+    expected = [line.split('#', 1)[1].strip() for line in driver.getDisassemblyOutput().splitlines()]
+    for d in (driver, streamingDriver):
+        nrOfInstructions = d.getNrOfDisassembledInstructions()
+        if nrOfInstructions != len(program) // 4 * 50:
+            print ("Unexpected number of disassembled instructions: {}".format(nrOfInstructions))
+            exit(1)
+
+        for address in (nrOfInstructions - 1, 0, 11, 14, 1000):
+            label, instruction = d.getDisassembledInstruction(address)
+            text = '{}: {}'.format(label, instruction) if label else instruction
+            if text != expected[address]:
+                print ("Differences detected at address {}: '{}'".format(address, text))
+                exit(1)
+
+        if d.getDisassembledInstruction(nrOfInstructions) is not None:
+            print ("Retrieving an instruction beyond the end succeeded unexpectedly.")
+            exit(1)
+
+    print ("Checking errors while streaming")
+    if driver.disassemble(badBinaryFilename):
+        print ("Normal disassembly of an invalid instruction succeeded unexpectedly.")
+        exit(1)
+    expected = driver.getDisassemblyOutput().splitlines()
+
+    # Errors in the instructions are only detected while streaming.
+    if not streamingDriver.disassemble(badBinaryFilename):
+        print ("Streaming disassembly failed:")
+        print (streamingDriver.getLastErrorMessage())
+        exit(1)
+
+    lines = []
+    try:
+        for line in streamingDriver.iterDisassemblyOutput(4):
+            lines.append(line)
+        print ("Streaming an invalid instruction succeeded unexpectedly.")
+        exit(1)
+    except RuntimeError as e:
+        if 'Unknown opcode' not in str(e):
+            print ("Unexpected error message: {}".format(e))
+            exit(1)
+
+    # The lines up to and including the chunk with the invalid instruction are produced.
+    if lines != expected[:len(lines)] or len(lines) != 12:
+        print ("Unexpected lines before the error: {}".format(lines))
+        exit(1)
+
+    if streamingDriver.save(os.path.join(tmpDir, 'bad.dis')):
+        print ("Saving the disassembly of an invalid instruction succeeded unexpectedly.")
+        exit(1)
+
+    if read_text(os.path.join(tmpDir, 'bad.dis')).splitlines() != expected:
+        print ("Differences detected in the saved disassembly of an invalid instruction.")
+        exit(1)
+
+    print ("Checking input files that cannot be disassembled")
+    if streamingDriver.disassemble(emptyFilename) or 'empty' not in streamingDriver.getLastErrorMessage():
+        print ("Streaming disassembly of an empty file succeeded unexpectedly.")
+        exit(1)
+
+    if streamingDriver.disassemble(os.path.join(tmpDir, 'no_such_file.bin')):
+        print ("Streaming disassembly of a missing file succeeded unexpectedly.")
+        exit(1)
+
+finally:
+    for name in os.listdir(tmpDir):
+        os.remove(os.path.join(tmpDir, name))
+    os.rmdir(tmpDir)
+
+print ()
+print ("====================")
+print ("=                  =")
+print ("= ALL TESTS PASSED =")
+print ("=                  =")
+print ("====================")
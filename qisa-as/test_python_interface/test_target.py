@@ -0,0 +1,141 @@
+# This test is used to assert that a QISA_Target can be shared by multiple
+# drivers without them affecting each other, and that it can be pickled,
+# also to pass it to another process.
+
+import os
+import pickle
+from multiprocessing import Pool
+
+from qisa_as import QISA_Driver, QISA_Target
+
+rootDir = os.path.dirname(os.path.realpath(__file__))
+
+inputFilename = os.path.join(rootDir, 'qisa_test_assembly/test_assembly.qisa')
+layoutFilename = os.path.join(rootDir, 'quantum_layout_information.txt')
+qmapFilename = os.path.join(rootDir, 'test_load_qmap_file.qmap')
+qmapSourceFilename = os.path.join(rootDir, 'test_python_dict.qisa')
+
+
+def assemble_with_target(targetData):
+    """Assemble the test program in a worker process, using the given pickled target."""
+    driver = QISA_Driver(pickle.loads(targetData))
+    if not driver.assemble(inputFilename):
+        return None
+    return driver.getInstructionsAsBytes()
+
+
+def assemble(driver, filename):
+    if not driver.assemble(filename):
+        print ("Assembly of '{}' failed: {}".format(filename, driver.getLastErrorMessage()))
+        exit(1)
+    return driver.getInstructionsAsBytes()
+
+
+if __name__ == '__main__':
+    print ("QISA_AS Version: ", QISA_Driver.getVersion())
+
+    referenceDriver = QISA_Driver()
+    referenceDriver.read(layoutFilename)
+    reference = assemble(referenceDriver, inputFilename)
+
+    target = referenceDriver.getTarget()
+
+    if target.getNrOfQubits() != 7:
+        print ("Unexpected number of qubits: {}".format(target.getNrOfQubits()))
+        exit(1)
+
+    print ("Checking drivers that share a target")
+    drivers = [QISA_Driver(target) for _ in range(4)]
+    drivers.append(QISA_Driver())
+    drivers[-1].setTarget(target)
+
+    for driver in drivers:
+        if assemble(driver, inputFilename) != reference:
+            print ("A driver that shares the target generated other instructions.")
+            exit(1)
+
+    print ("Checking that changing the configuration of a driver does not affect the others")
+    quantumInstructions = target.getQuantumInstructions()
+
+    if not drivers[0].loadQuantumInstructions(qmapFilename):
+        print ("Loading '{}' failed: {}".format(qmapFilename, drivers[0].getLastErrorMessage()))
+        exit(1)
+
+    assemble(drivers[0], qmapSourceFilename)
+
+    if drivers[0].getTarget().getQuantumInstructions() == quantumInstructions:
+        print ("The quantum instructions of the driver did not change.")
+        exit(1)
+
+    if target.getQuantumInstructions() != quantumInstructions:
+        print ("Loading quantum instructions changed the shared target.")
+        exit(1)
+
+    for driver in drivers[1:]:
+        if driver.getQuantumInstructions() != quantumInstructions:
+            print ("Loading quantum instructions changed another driver.")
+            exit(1)
+        if assemble(driver, inputFilename) != reference:
+            print ("Loading quantum instructions changed the output of another driver.")
+            exit(1)
+
+    if drivers[1].read(os.devnull):
+        print ("Reading an empty quantum layout information file did not fail.")
+        exit(1)
+
+    if (drivers[1].getTarget().getNrOfQubits() != 7) or (target.getNrOfQubits() != 7):
+        print ("Failing to read the quantum layout information changed the target.")
+        exit(1)
+
+    if QISA_Driver().getTarget().getNrOfQubits() != 0:
+        print ("A new driver does not use the default target.")
+        exit(1)
+
+    print ("Checking the serialization of a target")
+    data = target.toBytes()
+    copy = QISA_Target.fromBytes(data)
+
+    if copy.toBytes() != data:
+        print ("The serialized target changed in a round trip.")
+        exit(1)
+
+    if (copy.getQuantumInstructions() != quantumInstructions or
+        copy.getClassicOpcodes() != target.getClassicOpcodes()):
+        print ("The deserialized target holds other instructions.")
+        exit(1)
+
+    if assemble(QISA_Driver(copy), inputFilename) != reference:
+        print ("The deserialized target generated other instructions.")
+        exit(1)
+
+    qmapTarget = pickle.loads(pickle.dumps(drivers[0].getTarget()))
+    if assemble(QISA_Driver(qmapTarget), qmapSourceFilename) != assemble(drivers[0], qmapSourceFilename):
+        print ("The unpickled target with loaded quantum instructions generated other instructions.")
+        exit(1)
+
+    # The version of the assembler is stored after the magic, format version and its size.
+    versionSize = len(QISA_Driver.getVersion())
+    otherVersion = data[:12] + b'0' * versionSize + data[12 + versionSize:]
+
+    for invalidData in [b'', b'QISA', data[:-1], data + b'\0', otherVersion]:
+        try:
+            QISA_Target.fromBytes(invalidData)
+        except ValueError:
+            continue
+        print ("Invalid serialized target {!r}... did not raise ValueError.".format(invalidData[:16]))
+        exit(1)
+
+    print ("Checking a pickled target in worker processes")
+    with Pool(2) as pool:
+        results = pool.map(assemble_with_target, [pickle.dumps(target)] * 4)
+
+    if any(result != reference for result in results):
+        print ("A worker process generated other instructions.")
+        exit(1)
+
+    print ()
+    print ("====================")
+    print ("=                  =")
+    print ("= ALL TESTS PASSED =")
+    print ("=                  =")
+    print ("====================")
@@ -0,0 +1,240 @@
+# This test is used to assert that the static control flow and timing
+# analysis (see analyzeTiming()) divides a program into basic blocks, counts
+# the cycles of each block and of the paths through the program, and detects
+# the timing points that cannot be reached in time. The analysis of an
+# assembled program is compared with that of its disassembly, also in
+# streaming mode.
+
+import os
+import shutil
+import tempfile
+
+from qisa_as import QISA_Driver, QISA_TimingAnalysis, QISA_AssemblyCache
+
+rootDir = os.path.dirname(os.path.realpath(__file__))
+
+layoutFilename = os.path.join(rootDir, 'quantum_layout_information.txt')
+binaryFilename = os.path.join(rootDir, 'test_timing_analysis.out')
+
+print ("QISA_AS Version: ", QISA_Driver.getVersion())
+
+driver = QISA_Driver()
+if not driver.read(layoutFilename):
+    print ("Reading '{}' failed: {}".format(layoutFilename, driver.getLastErrorMessage()))
+    exit(1)
+
+streamingDriver = QISA_Driver()
+if not streamingDriver.read(layoutFilename):
+    print ("Reading '{}' failed: {}".format(layoutFilename, streamingDriver.getLastErrorMessage()))
+    exit(1)
+streamingDriver.enableStreamingDisassembly(True)
+
+
+def analyze(d, instructionsPerCycle=1):
+    analysis = QISA_TimingAnalysis()
+    if not d.analyzeTiming(analysis, instructionsPerCycle):
+        print ("Timing analysis failed: {}".format(d.getLastErrorMessage()))
+        exit(1)
+    if analysis.getInstructionsPerCycle() != instructionsPerCycle:
+        print ("Unexpected number of instructions per cycle: {}".format(analysis.getInstructionsPerCycle()))
+        exit(1)
+    return analysis
+
+
+def without_labels(blocks):
+    """The labels of a disassembled program are generated."""
+    return [dict(block, label='') for block in blocks]
+
+
+def check(source, expectedSummary, expectedBlocks, expectedBottlenecks, instructionsPerCycle=1):
+    if not driver.assembleString(source):
+        print ("Assembly of:\n{}\nfailed: {}".format(source, driver.getLastErrorMessage()))
+        exit(1)
+    if not driver.save(binaryFilename):
+        print ("Saving failed: {}".format(driver.getLastErrorMessage()))
+        exit(1)
+
+    analysis = analyze(driver, instructionsPerCycle)
+    summary = analysis.getSummary()
+    blocks = analysis.getBlocks()
+    bottlenecks = analysis.getBottlenecks()
+
+    for key, value in expectedSummary.items():
+        if summary[key] != value:
+            print ("Unexpected summary of:\n{}\n{}\nexpected {} = {}".format(source, summary, key, value))
+            exit(1)
+
+    for block, expectedBlock in zip(blocks, expectedBlocks):
+        for key, value in expectedBlock.items():
+            if block[key] != value:
+                print ("Unexpected block of:\n{}\n{}\nexpected {} = {}".format(source, block, key, value))
+                exit(1)
+    if len(blocks) != len(expectedBlocks):
+        print ("Unexpected blocks of:\n{}\n{}".format(source, blocks))
+        exit(1)
+
+    if [(b['address'], b['instructions'], b['cycles']) for b in bottlenecks] != expectedBottlenecks:
+        print ("Unexpected bottlenecks of:\n{}\n{}\nexpected {}".format(source, bottlenecks, expectedBottlenecks))
+        exit(1)
+
+    for d in [driver, streamingDriver]:
+        if not d.disassemble(binaryFilename):
+            print ("Disassembly failed: {}".format(d.getLastErrorMessage()))
+            exit(1)
+        disassembled = analyze(d, instructionsPerCycle)
+        if (disassembled.getSummary() != summary or
+                without_labels(disassembled.getBlocks()) != without_labels(blocks) or
+                disassembled.getBottlenecks() != bottlenecks):
+            print ("The analysis of the disassembly of:\n{}\ndiffers: {}".format(source, disassembled.getBlocks()))
+            exit(1)
+
+
+print ("Checking that an analysis needs a program")
+analysis = QISA_TimingAnalysis()
+if driver.analyzeTiming(analysis):
+    print ("Analysis without a program succeeded unexpectedly.")
+    exit(1)
+if driver.assembleString("BR always, nowhere\n") or driver.analyzeTiming(analysis):
+    print ("Analysis of a program that failed to assemble succeeded unexpectedly.")
+    exit(1)
+
+print ("Checking the blocks and the cycles of a program with a loop")
+source = """
+        SMIS s0, {0}
+        bs 1 CW_01 s0
+        QWAIT 3
+        bs 2 CW_02 s0
+loop:   QWAIT 10
+        BR EQ, loop
+        STOP
+"""
+check(source,
+      {'instructions': 7, 'classic_instructions': 5, 'bundles': 2, 'timing_points': 4,
+       'blocks': 3, 'loops': 1, 'cycles': 16, 'min_cycles': 16, 'max_cycles': 16,
+       'register_waits': False},
+      [{'begin': 0, 'end': 4, 'label': '', 'cycles': 6, 'timing_points': 3, 'successors': [1],
+        'min_start_cycles': 0, 'max_start_cycles': 0},
+       {'begin': 4, 'end': 6, 'label': 'loop', 'cycles': 10, 'successors': [1, 2],
+        'min_start_cycles': 6, 'max_start_cycles': 6},
+       {'begin': 6, 'end': 7, 'label': '', 'cycles': 0, 'successors': [],
+        'min_start_cycles': 16, 'max_start_cycles': 16}],
+      [])
+
+print ("Checking the minimum and maximum cycles of the paths through a program")
+check("""
+        SMIS s0, {0}
+        BR EQ, long
+        QWAIT 5
+        BR ALWAYS, end
+long:   QWAIT 50
+end:    bs 1 CW_01 s0
+        STOP
+unused: QWAITR r1
+        QWAIT 7
+""",
+      {'blocks': 5, 'loops': 0, 'cycles': 63, 'min_cycles': 6, 'max_cycles': 51,
+       'register_waits': True},
+      [{'begin': 0, 'end': 2, 'timing_points': 0, 'reachable': True},
+       {'begin': 2, 'end': 4, 'cycles': 5, 'successors': [3]},
+       {'begin': 4, 'end': 5, 'label': 'long', 'cycles': 50, 'successors': [3]},
+       {'begin': 5, 'end': 7, 'label': 'end', 'cycles': 1, 'successors': [],
+        'min_start_cycles': 5, 'max_start_cycles': 50},
+       {'begin': 7, 'end': 9, 'label': 'unused', 'cycles': 7, 'timing_points': 2,
+        'register_wait': True, 'reachable': False}],
+      # The bundle at 'end' follows the BR after 'QWAIT 5' in the same cycle.
+      [(5, 2, 1)])
+
+print ("Checking that bottlenecks are detected within and across blocks")
+source = """
+        SMIS s0, {0}
+        bs 1 CW_01 s0
+        ADD r0, r1, r2
+        ADD r0, r1, r2
+next:   bs 1 CW_02 s0
+        QWAIT 2
+        ADD r0, r1, r2
+        bs 1 CW_03 s0
+        BR EQ, next
+"""
+check(source, {'blocks': 2, 'loops': 1, 'timing_points': 4}, [{'label': ''}, {'label': 'next'}], [(4, 3, 1), (7, 2, 1)])
+check(source, {}, [{}, {}], [(4, 3, 1)], instructionsPerCycle=2)
+check(source, {}, [{}, {}], [], instructionsPerCycle=3)
+
+print ("Checking that bottlenecks are detected along a loop")
+source = """
+        SMIS s0, {0}
+loop:   bs 1 CW_01 s0
+        ADD r0, r1, r2
+        ADD r0, r1, r2
+        BR EQ, loop
+"""
+check(source, {'blocks': 2, 'loops': 1, 'min_cycles': 1, 'max_cycles': 1},
+      [{'successors': [1]}, {'label': 'loop', 'successors': [1]}], [(1, 4, 1)])
+check(source, {}, [{}, {}], [], instructionsPerCycle=4)
+
+print ("Checking that the number of instructions per cycle must be positive")
+if driver.analyzeTiming(QISA_TimingAnalysis(), 0):
+    print ("Analysis with 0 instructions per cycle succeeded unexpectedly.")
+    exit(1)
+
+print ("Checking the analysis of a program that has been found in the cache")
+source = """
+        SMIS s0, {0}
+start:  bs 1 CW_01 s0
+        BR EQ, start
+"""
+if not driver.assembleString(source):
+    print ("Assembly failed: {}".format(driver.getLastErrorMessage()))
+    exit(1)
+expectedBlocks = analyze(driver).getBlocks()
+
+cacheDir = tempfile.mkdtemp()
+try:
+    cachedDriver = QISA_Driver()
+    cachedDriver.read(layoutFilename)
+    cachedDriver.setCache(QISA_AssemblyCache(cacheDir))
+    for attempt in range(2):
+        if not cachedDriver.assembleString(source):
+            print ("Assembly failed: {}".format(cachedDriver.getLastErrorMessage()))
+            exit(1)
+        if analyze(cachedDriver).getBlocks() != expectedBlocks:
+            print ("Unexpected analysis after cache lookup {}: {}".format(attempt, cachedDriver.getCache()))
+            exit(1)
+    if cachedDriver.getCache().getHits() != 1:
+        print ("The program has not been found in the cache.")
+        exit(1)
+finally:
+    shutil.rmtree(cacheDir)
+
+print ("Checking the analysis of a large program")
+lines = ['SMIS s0, {0}']
+expectedBlocks = [{'successors': [1]}]
+expectedBottlenecks = []
+nrOfLoops = 20000
+nrOfCycles = 0
+for loopNr in range(nrOfLoops):
+    lines.append('loop{}: bs 2 CW_01 s0'.format(loopNr))
+    lines.append('QWAIT {}'.format(loopNr % 3))
+    lines.append('BR NE, loop{}'.format(loopNr))
+    expectedBlocks.append({'label': 'loop{}'.format(loopNr),
+                           'successors': [n for n in [loopNr + 1, loopNr + 2] if n <= nrOfLoops],
+                           'min_start_cycles': nrOfCycles, 'max_start_cycles': nrOfCycles})
+    # After a 'QWAIT 0', the bundle of the same and of the next loop follows
+    # 3 instructions after the previous timing point.
+    if loopNr % 3 != 2:
+        expectedBottlenecks.append((1 + 3 * loopNr, 3, 2))
+    nrOfCycles += 2 + loopNr % 3
+source = '\n'.join(lines) + '\n'
+check(source,
+      {'instructions': 1 + 3 * nrOfLoops, 'blocks': 1 + nrOfLoops, 'loops': nrOfLoops,
+       'cycles': nrOfCycles, 'min_cycles': nrOfCycles, 'max_cycles': nrOfCycles},
+      expectedBlocks, expectedBottlenecks)
+
+os.remove(binaryFilename)
+
+print ()
+print ("====================")
+print ("=                  =")
+print ("= ALL TESTS PASSED =")
+print ("=                  =")
+print ("====================")
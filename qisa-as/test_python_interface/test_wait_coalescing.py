@@ -0,0 +1,178 @@
+# This test is used to assert that coalescing QWAIT instructions (see
+# setOptimizations()) merges adjacent QWAITs and folds QWAITs into the bundle
+# separator of the next bundle, without changing when the quantum bundles are
+# issued, and without merging across labels or program template parameters.
+
+import os
+import random
+
+from qisa_as import QISA_Driver
+
+rootDir = os.path.dirname(os.path.realpath(__file__))
+
+layoutFilename = os.path.join(rootDir, 'quantum_layout_information.txt')
+binaryFilename = os.path.join(rootDir, 'test_wait_coalescing.out')
+
+print ("QISA_AS Version: ", QISA_Driver.getVersion())
+
+driver = QISA_Driver()
+if not driver.read(layoutFilename):
+    print ("Reading '{}' failed: {}".format(layoutFilename, driver.getLastErrorMessage()))
+    exit(1)
+
+
+def assemble_and_disassemble(source, optimizations):
+    driver.setOptimizations(optimizations)
+    if not driver.assembleString(source):
+        print ("Assembly of:\n{}\nfailed: {}".format(source, driver.getLastErrorMessage()))
+        exit(1)
+    stats = driver.getStats()
+    if not driver.save(binaryFilename) or not driver.disassemble(binaryFilename):
+        print ("Disassembly failed: {}".format(driver.getLastErrorMessage()))
+        exit(1)
+    lines = [line.split('#', 1)[1].strip() for line in driver.getDisassemblyOutput().splitlines() if '#' in line]
+    return lines, stats
+
+
+def timing(lines):
+    """Return what a disassembled program without branches does: the time at
+    which each of its quantum bundles is issued, and its other instructions
+    except QWAIT, in program order."""
+    result = []
+    time = 0
+    for line in lines:
+        if ':' in line.split(' ', 1)[0]:
+            line = line.split(':', 1)[1].strip()
+
+        if line.startswith('QWAIT '):
+            time += int(line.split()[1])
+        elif line.startswith('BS '):
+            _, bs, ops = line.split(' ', 2)
+            time += int(bs)
+            result.append((time, ops))
+        else:
+            result.append(line)
+    return result
+
+
+def check(source, optimizations, expectedLines, expectedCoalesced):
+    lines, stats = assemble_and_disassemble(source, optimizations)
+    if lines != expectedLines:
+        print ("Unexpected disassembly of:\n{}\n{}\nexpected:\n{}".format(source, '\n'.join(lines), '\n'.join(expectedLines)))
+        exit(1)
+    if stats['coalesced_waits'] != expectedCoalesced:
+        print ("Unexpected statistics: {}, expected {} coalesced waits".format(stats, expectedCoalesced))
+        exit(1)
+
+
+print ("Checking that adjacent QWAITs are merged and folded into the next bundle")
+check("""
+        SMIS s0, {0}
+        QWAIT 1
+        QWAIT 3
+        bs 1 CW_01 s0
+        QWAIT 10
+        QWAIT 20
+        bs 1 CW_02 s0
+        QWAIT 0
+        bs 0 CW_03 s0
+""", QISA_Driver.OPTIMIZE_WAITS, [
+    'SMIS S0, {0}',
+    'BS 5 CW_01 S0',
+    'QWAIT 30',
+    'BS 1 CW_02 S0',
+    'BS 0 CW_03 S0'], 4)
+
+print ("Checking the limits of QWAIT and of the bundle separator")
+check("""
+        SMIS s0, {0}
+        QWAIT 1048575
+        QWAIT 1
+        QWAIT 6
+        bs 2 CW_01 s0
+""", QISA_Driver.OPTIMIZE_WAITS, [
+    'SMIS S0, {0}',
+    'QWAIT 1048575',
+    'QWAIT 7',
+    'BS 2 CW_01 S0'], 1)
+
+print ("Checking that QWAITs are not merged across labels")
+check("""
+        SMIS s0, {0}
+        QWAIT 2
+loop:   QWAIT 3
+        bs 0 CW_01 s0
+        QWAIT 1
+target: bs 1 CW_02 s0
+        BR EQ, loop
+        BR EQ, target
+""", QISA_Driver.OPTIMIZE_WAITS, [
+    'SMIS S0, {0}',
+    'QWAIT 2',
+    'label_0: BS 3 CW_01 S0',
+    'QWAIT 1',
+    'label_1: BS 1 CW_02 S0',
+    'BR EQ, label_0 # offset(-3)',
+    'BR EQ, label_1 # offset(-2)'], 1)
+
+print ("Checking that program template parameters are not merged")
+source = """
+.def_sym wait_time 3
+        SMIS s0, {0}
+        QWAIT 1
+        QWAIT wait_time
+        bs 1 CW_01 s0
+"""
+check(source, QISA_Driver.OPTIMIZE_WAITS, [
+    'SMIS S0, {0}',
+    'QWAIT 1',
+    'QWAIT 3',
+    'BS 1 CW_01 S0'], 0)
+
+print ("Checking that removed SMIS instructions do not prevent folding")
+check("""
+        SMIS s0, {0}
+        QWAIT 2
+        SMIS s0, {0}
+        bs 1 CW_01 s0
+""", QISA_Driver.OPTIMIZE_REDUNDANT_MASKS | QISA_Driver.OPTIMIZE_WAITS, [
+    'SMIS S0, {0}',
+    'BS 3 CW_01 S0'], 1)
+
+print ("Checking that random programs keep their timing")
+rng = random.Random(24)
+nrOfCoalesced = 0
+for programNr in range(200):
+    lines = ['SMIS s0, {0}']
+    for lineNr in range(40):
+        kind = rng.randrange(5)
+        if kind == 0:
+            lines.append('SMIS s0, {{{}}}'.format(rng.randrange(2)))
+        elif kind == 1:
+            lines.append('label{}: QWAIT {}'.format(lineNr, rng.randrange(5)))
+        elif kind == 2:
+            lines.append('QWAIT {}'.format(rng.choice([0, 1, 2, 3, 6, 1048570])))
+        else:
+            lines.append('bs {} CW_0{} s0'.format(rng.randrange(8), rng.randrange(1, 4)))
+    source = '\n'.join(lines) + '\n'
+
+    for unoptimized in [QISA_Driver.OPTIMIZE_NONE, QISA_Driver.OPTIMIZE_REDUNDANT_MASKS]:
+        expectedTiming = timing(assemble_and_disassemble(source, unoptimized)[0])
+        lines, stats = assemble_and_disassemble(source, unoptimized | QISA_Driver.OPTIMIZE_WAITS)
+        if timing(lines) != expectedTiming:
+            print ("Coalescing changed the timing of:\n{}".format(source))
+            exit(1)
+        nrOfCoalesced += stats['coalesced_waits']
+
+if nrOfCoalesced == 0:
+    print ("No waits have been coalesced in the random programs.")
+    exit(1)
+
+os.remove(binaryFilename)
+
+print ()
+print ("====================")
+print ("=                  =")
+print ("= ALL TESTS PASSED =")
+print ("=                  =")
+print ("====================")